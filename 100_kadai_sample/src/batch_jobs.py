@@ -0,0 +1,100 @@
+"""
+処理概要:
+    - OpenAI Batch API と Anthropic Message Batches API の両方で使う、バッチ処理の共通部品。
+    - 設定ファイルの `batch` セクション（保存先・ポーリング間隔・1バッチあたりの件数上限）、行ごとの結果、分割・ポーリング処理をまとめています。
+使用方法:
+    - `BatchSettings.from_dict(config["batch"])` で設定を読み込み、`chunked(requests, settings.max_requests)` で1バッチずつに分割します。
+    - `poll_until_done(retrieve, poll_interval)` は `done` が真になるまで `retrieve()` を繰り返し、最後に取得したバッチを返します。
+      `on_poll=report_progress()` を渡すと、状態や件数が変わったときだけ `[batch]` 行を表示します。
+    - 行ごとのリクエストには `row_custom_id(row_number)` を付け、結果は `custom_id_row(custom_id)` で行番号に戻します。
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Mapping, Optional, Protocol, Sequence, TypeVar
+
+# The OpenAI limit; Anthropic accepts up to 100,000 requests per batch.
+MAX_REQUESTS_PER_BATCH = 50000
+DEFAULT_BATCH_DIR = "batches"
+DEFAULT_POLL_INTERVAL = 30.0
+
+T = TypeVar("T")
+J = TypeVar("J")
+
+
+@dataclass
+class BatchSettings:
+    """Typed view over the `batch` config section."""
+
+    dir: str = DEFAULT_BATCH_DIR
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+    max_requests: int = MAX_REQUESTS_PER_BATCH
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "BatchSettings":
+        return cls(
+            dir=str(data.get("dir", DEFAULT_BATCH_DIR)),
+            poll_interval=max(0.0, float(data.get("poll_interval", DEFAULT_POLL_INTERVAL))),  # type: ignore[arg-type]
+            max_requests=max(1, int(data.get("max_requests", MAX_REQUESTS_PER_BATCH))),  # type: ignore[arg-type]
+        )
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Outcome of one batch request; exactly one of `text` / `error` is meaningful."""
+
+    custom_id: str
+    text: str = ""
+    error: Optional[str] = None
+
+
+class Summarized(Protocol):
+    def summary(self) -> str: ...
+
+
+def row_custom_id(row_number: int) -> str:
+    """Return the custom_id of the request for sheet row `row_number`."""
+    return f"row-{row_number}"
+
+
+def custom_id_row(custom_id: str) -> int:
+    """Return the sheet row number encoded by `row_custom_id`."""
+    return int(custom_id.split("-", 1)[1])
+
+
+def report_progress() -> Callable[[Summarized], None]:
+    """Return a poll callback that prints a `[batch]` line whenever the status or counts change."""
+    last: List[str] = []
+
+    def report(batch: Summarized) -> None:
+        line = batch.summary()
+        if not last or last[-1] != line:
+            print(f"[batch] {line}")
+            last.append(line)
+
+    return report
+
+
+def chunked(items: Sequence[T], size: int) -> List[Sequence[T]]:
+    """Split requests into groups of at most `size` (one batch each)."""
+    size = max(1, size)
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def poll_until_done(
+    retrieve: Callable[[], J],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    on_poll: Optional[Callable[[J], None]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> J:
+    """Call `retrieve` until the returned batch is `done`, sleeping in between."""
+    while True:
+        job = retrieve()
+        if on_poll is not None:
+            on_poll(job)
+        if job.done:  # type: ignore[attr-defined]
+            return job
+        sleep(poll_interval)
+
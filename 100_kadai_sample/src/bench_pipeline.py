@@ -0,0 +1,303 @@
+"""
+処理概要:
+    - `mock_api_server` をローカルで起動し、本物の `fill_spreadsheet.run_job` / `search_single.run_search_job` を
+      モックのOpenAI・Anthropic・Google Sheetsに向けて実行する負荷試験ツール。APIキーや料金は不要です。
+    - 処理行数/秒、段（search / letter / sheets）ごとのクライアント側の所要時間 p50/p95/p99、エンドポイント別の呼び出し回数・429・5xx件数を表示します。
+      所要時間はジョブの `--metrics` トレースから取り、レート制限の待機・再試行を含みます（モック側の処理時間は `svc p50` として別に表示）。
+使用方法:
+    - `python3 bench_pipeline.py --rows 200 --workers 8` で営業文生成ジョブを計測します。
+    - `--job search` で search_single を、`--pipeline` / `--stream` で各実行モードを計測します。`--batch` はBatch API経由の実行です
+      （`--job search` はOpenAI Batch API、fill は営業文のみAnthropic Message Batches API。`--batch-expire-rate` で期限切れ行の再生成も試せます）。
+    - 応答遅延・エラー率は `--latency anthropic=0.8 --latency openai=1.5`、`--error-rate 0.02`、`--throttle-rate 0.05` のように指定します。
+    - 実際のジョブ出力は既定で抑止されます。表示する場合は `--verbose` を付けてください。
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from mock_api_server import CallRecord, MockAPIServer, MockProfile  # noqa: E402
+
+PROVIDERS = ("openai", "anthropic", "sheets")
+STAGE_NAMES = {"openai": "search", "anthropic": "letter", "sheets": "sheets"}
+OUTPUT_SHEET = "結果"
+HEADER = ["NAME", "URL", "ADDRESS", "検索結果", "セールスレター"]
+SEARCH_TEMPLATE = "{{company_name}}（{{company_url}}）について、所在地 {{address}} の事業内容を調べてください。"
+MESSAGE_TEMPLATE = "自社情報: {{self_info}}\n上記の自社から {{company_name}} 向けの営業フォーム文を作成してください。\n調査結果: {{company_description}}"
+SELF_INFO = "株式会社サンプル: 業務効率化ツールを提供しています。"
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of `values` (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def seed_spreadsheet(server: MockAPIServer, rows: int, prefilled: float = 0.0, output_chars: int = 400) -> None:
+    """Fill the mock spreadsheet with templates and `rows` company rows.
+
+    The first `prefilled` fraction of rows already carry a search result and
+    sales letter of `output_chars` characters, as after an earlier run.
+    """
+    server.sheet.put("企業検索prompt", [["template"], [SEARCH_TEMPLATE]])
+    server.sheet.put("フォーム文prompt", [["template"], [MESSAGE_TEMPLATE]])
+    server.sheet.put("自社情報", [["info"], [SELF_INFO]])
+    done = int(rows * prefilled)
+    filler = "済" * output_chars
+    companies = [
+        [f"テスト株式会社{index:05d}", f"https://example{index:05d}.co.jp", f"東京都千代田区{index}-1"]
+        + ([filler, filler] if index <= done else ["", ""])
+        for index in range(1, rows + 1)
+    ]
+    server.sheet.put(OUTPUT_SHEET, [HEADER] + companies)
+
+
+def bench_config(server: MockAPIServer, args: argparse.Namespace) -> Dict[str, object]:
+    """Return a config document pointing every client at the mock server."""
+    concurrency = max(1, args.workers)
+    return {
+        "spreadsheet_id": "mock-spreadsheet",
+        "service_account_file": "",
+        "sheets_api_endpoint": server.url("sheets"),
+        "ranges": {
+            "company_names": f"'{OUTPUT_SHEET}'!A2:A",
+            "search_prompt_template": "'企業検索prompt'!A2",
+            "message_prompt_template": "'フォーム文prompt'!A2",
+            "business_info": "'自社情報'!A2",
+        },
+        "output": {"sheet_name": OUTPUT_SHEET, "start_row": 2, "batch_size": args.batch_size, "flush_interval": 10.0},
+        "openai": {
+            "api_key": "mock-openai-key",
+            "base_url": server.url("openai"),
+            "model": "gpt-5",
+            "max_tokens": 1000,
+            "concurrency": concurrency,
+        },
+        "anthropic": {
+            "api_key": "mock-anthropic-key",
+            "api_url": server.url("anthropic"),
+            "model": "claude-opus-4-1-20250805",
+            "max_tokens": 1000,
+            "concurrency": concurrency,
+            "http": {"pool_size": concurrency},
+        },
+        "pipeline": {"queue_size": concurrency * 2},
+        "batch": {"poll_interval": 0.1},
+    }
+
+
+def run_benchmark(server: MockAPIServer, args: argparse.Namespace, trace_path: Optional[Path] = None) -> float:
+    """Run the selected job against `server` and return the wall-clock seconds.
+
+    With `trace_path` the job writes its `--metrics` trace there, from which
+    `client_latencies` reads the client-side timings.
+    """
+    document = bench_config(server, args)
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    if args.job == "search":
+        from search_single import SearchConfig, run_search_job
+
+        with sink, tempfile.TemporaryDirectory() as batch_dir:
+            config = SearchConfig.from_dict(document)
+            config.batch.dir = batch_dir
+            run_search_job(
+                config,
+                limit=None,
+                overwrite=False,
+                dry_run=False,
+                use_web_search=args.web_search,
+                workers=1 if args.batch else args.workers,
+                use_cache=False,
+                batch=args.batch,
+                metrics_path=trace_path,
+            )
+    else:
+        from fill_spreadsheet import AppConfig, run_job
+
+        with sink:
+            run_job(
+                AppConfig.from_dict(document),
+                limit=None,
+                overwrite=False,
+                dry_run=False,
+                use_web_search=args.web_search,
+                workers=args.workers,
+                pipelined=args.pipeline,
+                use_cache=False,
+                stream=args.stream,
+                batch=args.batch,
+                metrics_path=trace_path,
+            )
+    return time.perf_counter() - started
+
+
+def client_latencies(trace_path: Path) -> Dict[str, List[float]]:
+    """Read the client-side seconds per stage (search / letter / sheets) and per written row from a job trace.
+
+    Stage times run from the call to its result in the job, so they include
+    rate-limit waits, retries and backoff. Sheets has no stage of its own, so
+    its entry is the per-call time seen by the client. `row` runs from the
+    start of work on a row to its write being queued, including the time it
+    waited between stages and for earlier rows.
+    """
+    latencies: Dict[str, List[float]] = {}
+    if not trace_path.exists():
+        return latencies
+    with trace_path.open("r", encoding="utf-8") as fh:
+        for raw in fh:
+            event = json.loads(raw)
+            kind, name = event.get("event"), str(event.get("name", ""))
+            if kind == "stage":
+                latencies.setdefault(name, []).append(float(event["seconds"]))
+            elif kind == "call" and name.startswith("sheets."):
+                latencies.setdefault("sheets", []).append(float(event["seconds"]))
+            elif kind == "row" and name in ("queued", "dry-run"):
+                latencies.setdefault("row", []).append(float(event["seconds"]))
+    return latencies
+
+
+def _latency_columns(seconds: Sequence[float]) -> str:
+    # A Message Batches letter has no per-row client timing.
+    if not seconds:
+        return f"{'-':>9}" * 3
+    return f"{percentile(seconds, 0.50):>8.3f}s{percentile(seconds, 0.95):>8.3f}s{percentile(seconds, 0.99):>8.3f}s"
+
+
+def format_report(
+    job: str,
+    rows: int,
+    elapsed: float,
+    calls: Dict[str, List[CallRecord]],
+    client: Optional[Dict[str, List[float]]] = None,
+) -> List[str]:
+    """Return the report lines for one benchmark run.
+
+    p50/p95/p99 are the client-side `client` timings (see `client_latencies`);
+    `svc p50` is the mock's own handling time, i.e. the configured latency.
+    """
+    client = client or {}
+    lines = [f"[bench] {job}: {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0.0:.1f} rows/s)"]
+    lines.append(
+        f"[bench] {'stage':<8}{'calls':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'svc p50':>9}{'429':>6}{'5xx':>6}{'KiB':>9}"
+    )
+    for provider in PROVIDERS:
+        records = calls.get(provider, [])
+        if not records:
+            continue
+        stage = STAGE_NAMES[provider]
+        service = [record.seconds for record in records if record.status == 200]
+        throttled = sum(1 for record in records if record.status == 429)
+        failed = sum(1 for record in records if record.status >= 500)
+        received = sum(record.response_bytes for record in records) / 1024
+        lines.append(
+            f"[bench] {stage:<8}{len(records):>7}{_latency_columns(client.get(stage, []))}"
+            f"{percentile(service, 0.50):>8.3f}s{throttled:>6}{failed:>6}{received:>9.1f}"
+        )
+    if client.get("row"):
+        lines.append(f"[bench] {'row':<8}{len(client['row']):>7}{_latency_columns(client['row'])}")
+    routes: Dict[str, int] = {}
+    for records in calls.values():
+        for record in records:
+            routes[record.route] = routes.get(record.route, 0) + 1
+    lines.append("[bench] calls: " + ", ".join(f"{route}={count}" for route, count in sorted(routes.items())))
+    return lines
+
+
+def _parse_provider_values(values: Optional[List[str]], option: str) -> Dict[str, float]:
+    parsed: Dict[str, float] = {}
+    for item in values or []:
+        provider, sep, value = item.partition("=")
+        if not sep or provider not in PROVIDERS:
+            raise SystemExit(f"{option} expects PROVIDER=VALUE with PROVIDER in {', '.join(PROVIDERS)}: {item}")
+        parsed[provider] = float(value)
+    return parsed
+
+
+def build_profiles(args: argparse.Namespace) -> Dict[str, MockProfile]:
+    latency = _parse_provider_values(args.latency, "--latency")
+    profiles: Dict[str, MockProfile] = {}
+    for provider in PROVIDERS:
+        is_llm = provider != "sheets"
+        profiles[provider] = MockProfile(
+            latency=latency.get(provider, 0.2 if is_llm else 0.05),
+            jitter=args.jitter,
+            error_rate=args.error_rate if is_llm else 0.0,
+            throttle_rate=args.throttle_rate if is_llm else 0.0,
+            retry_after=args.retry_after,
+            output_chars=args.output_chars,
+            token_interval=args.token_interval,
+            batch_expire_rate=args.batch_expire_rate if is_llm else 0.0,
+        )
+    return profiles
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the spreadsheet jobs against local mock APIs")
+    parser.add_argument("--job", choices=("fill", "search"), default="fill", help="計測するジョブ（既定: fill = fill_spreadsheet）")
+    parser.add_argument("--rows", type=int, default=100, help="モックシートに用意する企業行数")
+    parser.add_argument("--workers", type=int, default=4, help="ジョブに渡す並行数（--pipeline 時は各段の並行数）")
+    parser.add_argument("--pipeline", action="store_true", help="fill_spreadsheet を --pipeline モードで実行します")
+    parser.add_argument("--stream", action="store_true", help="fill_spreadsheet を --stream モードで実行します")
+    parser.add_argument("--web-search", action="store_true", help="検索段でResponses API（Web検索）を使います")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="--job search はOpenAI Batch API、fill は営業文をAnthropic Message Batches API経由で実行します",
+    )
+    parser.add_argument(
+        "--batch-expire-rate", type=float, default=0.0, help="Message Batchesの各リクエストが expired で返る確率（同期APIへの切り替えの計測用）"
+    )
+    parser.add_argument("--batch-size", type=int, default=100, help="シート書き込みのバッチ件数")
+    parser.add_argument("--prefilled", type=float, default=0.0, help="検索結果・セールスレターが入力済みの行の割合（再実行の計測用）")
+    parser.add_argument(
+        "--latency",
+        action="append",
+        metavar="PROVIDER=SECONDS",
+        help="プロバイダーごとの平均応答時間（既定: openai/anthropic 0.2, sheets 0.05）",
+    )
+    parser.add_argument("--jitter", type=float, default=0.0, help="応答時間に加える一様乱数の幅（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="LLM呼び出しが500を返す確率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="LLM呼び出しが429を返す確率")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429応答の Retry-After（秒）")
+    parser.add_argument("--output-chars", type=int, default=400, help="モック応答の文字数")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="ストリーミング時のチャンク間隔（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="エラー注入の乱数シード")
+    parser.add_argument("--verbose", action="store_true", help="ジョブ自体の出力も表示します")
+    args = parser.parse_args(argv)
+    if args.batch and (args.pipeline or args.stream):
+        parser.error("--batch cannot be combined with --pipeline or --stream")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    with MockAPIServer(profiles=build_profiles(args), seed=args.seed) as server:
+        seed_spreadsheet(server, args.rows, args.prefilled, args.output_chars)
+        with tempfile.TemporaryDirectory() as trace_dir:
+            trace_path = Path(trace_dir) / "trace.jsonl"
+            elapsed = run_benchmark(server, args, trace_path)
+            client = client_latencies(trace_path)
+        calls = server.stats.by_provider()
+    for line in format_report(args.job, args.rows, elapsed, calls, client):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+処理概要:
+    - `PromptBuilder` のプロンプト生成速度を、以前の実装（プレースホルダごとにテンプレート全体へ `str.replace` を繰り返す方式）と比較するマイクロベンチマーク。
+    - 検索プロンプト・営業文プロンプトそれぞれについて、1行あたりの描画時間（マイクロ秒）と速度比を表示し、両者の出力が一致することも確認します。
+    - ブロック単位の描画（`render_search_prompts` / `render_message_prompts`）の時間も併せて表示します。
+使用方法:
+    - `python3 bench_prompt_builder.py --rows 2000 --self-info-chars 4000` のように実行します。
+    - `--template-chars` でテンプレート本文の長さ、`--repeat` で計測の繰り返し回数（最良値を採用）を変更できます。
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+CURRENT_DIR = Path(__file__).resolve().parent
+if str(CURRENT_DIR) not in sys.path:
+    sys.path.insert(0, str(CURRENT_DIR))
+
+from prompt_builder import COMPANY_KEYS, PLACEHOLDER_PREFIX, PLACEHOLDER_SUFFIX, PromptBuilder  # noqa: E402
+
+
+def legacy_replacements(company: Mapping[str, str], self_info: str) -> Dict[str, str]:
+    """The replacement dict the previous implementation rebuilt on every call."""
+    replacements = {key: company.get(key, "") for key in COMPANY_KEYS}
+    replacements["self_info"] = self_info
+    return replacements
+
+
+def legacy_substitute(template: str, replacements: Mapping[str, str]) -> str:
+    """The previous substitution: one full-template `str.replace` per key."""
+    result = template
+    for key, value in replacements.items():
+        result = result.replace(f"{PLACEHOLDER_PREFIX}{key}{PLACEHOLDER_SUFFIX}", value)
+    return result
+
+
+def legacy_search_prompt(template: str, self_info: str, company: Mapping[str, str]) -> str:
+    prompt = legacy_substitute(template, legacy_replacements(company, self_info))
+    return prompt.strip() or company.get("company_url") or company.get("company_name", "")
+
+
+def legacy_message_prompt(template: str, self_info: str, company: Mapping[str, str], description: str) -> str:
+    replacements = legacy_replacements(company, self_info)
+    replacements["company_description"] = description
+    return legacy_substitute(template, replacements)
+
+
+def sample_templates(template_chars: int) -> Dict[str, str]:
+    """Return search/message templates padded with `template_chars` of instructions."""
+    body = ("以下の条件に従って丁寧に記述してください。" * (template_chars // 20 + 1))[:template_chars]
+    return {
+        "search": "{{company_name}}（{{company_url}}、{{address}}）の事業内容・従業員数 {{num_employees}} を調べてください。\n" + body,
+        "message": (
+            "{{company_name}} 様（{{registered_company_name}}）向けの営業フォーム文を作成してください。\n"
+            "問い合わせ先: {{contact_form_url}}\n調査結果:\n{{company_description}}\n" + body + "\n自社情報:\n{{self_info}}"
+        ),
+    }
+
+
+def sample_companies(rows: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "company_name": f"テスト株式会社{index:05d}",
+            "company_name_encoded": f"%E3%83%86%E3%82%B9%E3%83%88{index:05d}",
+            "company_url": f"https://example{index:05d}.co.jp",
+            "num_employees": str(index % 500),
+            "contact_form_url": f"https://example{index:05d}.co.jp/contact",
+            "address": f"東京都千代田区{index}-1",
+            "prefecture_id": "13",
+            "registered_company_name": f"テスト{index:05d}",
+            "registered_company_name_encoded": f"%E3%83%86{index:05d}",
+        }
+        for index in range(rows)
+    ]
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    """Return the fastest of `repeat` timed calls, in seconds."""
+    timings = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(rows: int, self_info_chars: int, template_chars: int, repeat: int) -> List[str]:
+    """Benchmark both implementations and return the report lines."""
+    templates = sample_templates(template_chars)
+    self_info = ("弊社は業務効率化ツールを提供しています。" * (self_info_chars // 20 + 1))[:self_info_chars]
+    companies = sample_companies(rows)
+    description = "モック検索結果。" * 50
+    builder = PromptBuilder(search_template=templates["search"], message_template=templates["message"], self_info=self_info)
+
+    for company in companies[:50]:
+        if builder.render_search_prompt(company) != legacy_search_prompt(templates["search"], self_info, company):
+            raise SystemExit("search prompts differ between implementations")
+        if builder.render_message_prompt(company, description) != legacy_message_prompt(
+            templates["message"], self_info, company, description
+        ):
+            raise SystemExit("message prompts differ between implementations")
+    descriptions = [description] * len(companies)
+    if builder.render_search_prompts(companies[:50]) != [builder.render_search_prompt(c) for c in companies[:50]]:
+        raise SystemExit("block search prompts differ from single-row rendering")
+
+    cases: Sequence[tuple] = (
+        (
+            "search",
+            lambda: [legacy_search_prompt(templates["search"], self_info, company) for company in companies],
+            lambda: [builder.render_search_prompt(company) for company in companies],
+            lambda: builder.render_search_prompts(companies),
+        ),
+        (
+            "message",
+            lambda: [legacy_message_prompt(templates["message"], self_info, company, description) for company in companies],
+            lambda: [builder.render_message_prompt(company, description) for company in companies],
+            lambda: builder.render_message_prompts(companies, descriptions),
+        ),
+    )
+    lines = [f"[bench] {rows} rows, template {template_chars} chars, self_info {self_info_chars} chars (best of {repeat})"]
+    for name, legacy, compiled, block in cases:
+        before = best_of(repeat, legacy) / rows * 1e6
+        after = best_of(repeat, compiled) / rows * 1e6
+        batched = best_of(repeat, block) / rows * 1e6
+        lines.append(
+            f"[bench] {name:<8} legacy {before:8.2f} us/row  compiled {after:8.2f} us/row  ({before / after if after else 0.0:.1f}x)"
+            f"  block {batched:8.2f} us/row"
+        )
+    return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare compiled PromptBuilder rendering with the previous str.replace loop")
+    parser.add_argument("--rows", type=int, default=2000, help="描画する企業行数")
+    parser.add_argument("--self-info-chars", type=int, default=2000, help="自社情報の文字数")
+    parser.add_argument("--template-chars", type=int, default=1000, help="テンプレート本文の文字数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    for line in run(max(1, args.rows), args.self_info_chars, args.template_chars, args.repeat):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
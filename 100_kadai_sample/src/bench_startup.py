@@ -0,0 +1,154 @@
+"""
+処理概要:
+    - `python -X importtime` で `fill_spreadsheet` / `search_single` を別プロセスで import し、CLIの起動にかかる import 時間を計測する。
+    - 累積時間の大きいモジュールと、起動時に読み込んではいけない重い依存（OpenAI SDK、Google APIクライアント、cryptography、python-dotenv、asyncio）が
+      読み込まれていないかを表示する。重い依存が読み込まれた場合や `--budget-ms` を超えた場合は終了コード1で終了するため、回帰の検出に使える。
+使用方法:
+    - `python3 bench_startup.py` で両CLIを計測します。`--module search_single` で対象を絞れます。
+    - `--repeat 5` で計測を繰り返して最良値を採用し、`--top 15` で表示するモジュール数を変更できます。
+    - `--budget-ms 300` を付けると、CLIモジュールの import 時間がこの値を超えたときに失敗します（環境によって差が大きいため既定では無効）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+CURRENT_DIR = Path(__file__).resolve().parent
+
+CLI_MODULES = ("fill_spreadsheet", "search_single")
+# Loaded only once a run needs them (first API call, first Sheets request, after argument parsing).
+DEFERRED_MODULES = (
+    "openai",
+    "googleapiclient",
+    "google.oauth2",
+    "google.auth",
+    "cryptography",
+    "dotenv",
+    "httpx",
+    "asyncio",
+)
+
+
+@dataclass
+class ImportTime:
+    """One line of `-X importtime` output, in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTime]:
+    """Parse `import time: self | cumulative | name` lines; the indentation of the name gives the depth."""
+    entries: List[ImportTime] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append(
+            ImportTime(
+                module=stripped,
+                self_us=int(fields[0]),
+                cumulative_us=int(fields[1]),
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return entries
+
+
+def measure(module: str, python: str = sys.executable) -> List[ImportTime]:
+    """Import `module` in a fresh interpreter and return its import timings."""
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(CURRENT_DIR),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def loaded_deferred(entries: Sequence[ImportTime]) -> List[str]:
+    """Return the deferred dependencies (or their submodules) that the import pulled in."""
+    names = {entry.module for entry in entries}
+    return [
+        deferred
+        for deferred in DEFERRED_MODULES
+        if any(name == deferred or name.startswith(deferred + ".") for name in names)
+    ]
+
+
+def module_total_ms(entries: Sequence[ImportTime], module: str) -> float:
+    """Cumulative import time of the top-level `module`, in milliseconds."""
+    for entry in reversed(entries):
+        if entry.module == module and entry.depth == 0:
+            return entry.cumulative_us / 1000
+    return 0.0
+
+
+def subtree(entries: Sequence[ImportTime], module: str) -> List[ImportTime]:
+    """Return the imports triggered by the top-level `module` (children are listed before their parent)."""
+    for end in range(len(entries) - 1, -1, -1):
+        if entries[end].module == module and entries[end].depth == 0:
+            start = end
+            while start > 0 and entries[start - 1].depth > 0:
+                start -= 1
+            return list(entries[start:end])
+    return []
+
+
+def report(module: str, repeat: int, top: int, budget_ms: Optional[float]) -> List[str]:
+    """Measure `module` and return the report lines; a line starting with `[fail]` marks a regression."""
+    runs = [measure(module) for _ in range(max(1, repeat))]
+    entries = min(runs, key=lambda run: module_total_ms(run, module))
+    total = module_total_ms(entries, module)
+    lines = [f"[startup] {module}: {total:.1f} ms to import (best of {len(runs)})"]
+    # Direct children of the CLI module, heaviest first (interpreter startup imports are excluded).
+    children: Dict[str, float] = {}
+    for entry in subtree(entries, module):
+        if entry.depth == 1:
+            children[entry.module] = max(children.get(entry.module, 0.0), entry.cumulative_us / 1000)
+    for name, ms in sorted(children.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"[startup]   {name:<28} {ms:8.1f} ms")
+    deferred = loaded_deferred(subtree(entries, module))
+    if deferred:
+        lines.append(f"[fail] {module} imports {', '.join(deferred)} at startup; load it on first use instead")
+    if budget_ms is not None and total > budget_ms:
+        lines.append(f"[fail] {module} takes {total:.1f} ms to import, over the {budget_ms:.0f} ms budget")
+    return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure CLI import time with python -X importtime")
+    parser.add_argument("--module", action="append", choices=CLI_MODULES, help="計測するモジュール（既定: 両方）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数（最良値を採用）")
+    parser.add_argument("--top", type=int, default=10, help="表示する直下のモジュール数")
+    parser.add_argument("--budget-ms", type=float, default=None, help="import 時間の上限（ミリ秒）。超えると終了コード1")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    failed = False
+    for module in args.module or CLI_MODULES:
+        for line in report(module, args.repeat, args.top, args.budget_ms):
+            print(line)
+            failed = failed or line.startswith("[fail]")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
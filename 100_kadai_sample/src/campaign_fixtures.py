@@ -0,0 +1,45 @@
+"""
+Overview:
+    - Shared test fixtures for runs against the local mock APIs: the result sheet headers, the prompt and
+      business-info sheets, and config documents pointing every client at a `MockAPIServer`.
+Usage:
+    - Call `put_prompt_sheets(server)`, write `[HEADER] + rows` with `server.sheet.put(sheet_name, ...)`, then save
+      `campaign_config(server, spreadsheet_id, sheet_name)` (or `search_config` for search_single) as the config file.
+"""
+
+from mock_api_server import MockAPIServer
+
+# Result sheet columns of fill_spreadsheet (search result and letter) and of search_single (search result only).
+HEADER = ["NAME", "URL", "ADDRESS", "検索結果", "セールスレター"]
+SEARCH_HEADER = HEADER[:4]
+
+
+def put_prompt_sheets(server: MockAPIServer) -> None:
+    """Write the search and letter templates and the business info the configs point at."""
+    server.sheet.put("企業検索prompt", [["template"], ["{{company_name}} を調べて"]])
+    server.sheet.put("フォーム文prompt", [["template"], ["{{self_info}} から {{company_name}} へ"]])
+    server.sheet.put("自社情報", [["info"], ["自社"]])
+
+
+def search_config(server: MockAPIServer, spreadsheet_id: str, sheet_name: str) -> dict:
+    """Config document for search_single reading and writing `sheet_name`."""
+    return {
+        "spreadsheet_id": spreadsheet_id,
+        "service_account_file": "",
+        "sheets_api_endpoint": server.url("sheets"),
+        "ranges": {
+            "company_names": f"'{sheet_name}'!A2:A",
+            "search_prompt_template": "'企業検索prompt'!A2",
+            "business_info": "'自社情報'!A2",
+        },
+        "output": {"sheet_name": sheet_name},
+        "openai": {"api_key": "mock-openai-key", "base_url": server.url("openai"), "max_tokens": 100},
+    }
+
+
+def campaign_config(server: MockAPIServer, spreadsheet_id: str, sheet_name: str) -> dict:
+    """Config document for fill_spreadsheet: `search_config` plus the letter template and Anthropic."""
+    config = search_config(server, spreadsheet_id, sheet_name)
+    config["ranges"]["message_prompt_template"] = "'フォーム文prompt'!A2"
+    config["anthropic"] = {"api_key": "mock-anthropic-key", "api_url": server.url("anthropic"), "max_tokens": 100}
+    return config
@@ -5,33 +5,82 @@
 使用方法:
     - 環境変数 `ANTHROPIC_API_KEY` にAPIキーを設定するか、`ClaudeClient` にapi_keyを渡します。
     - `ClaudeClient.generate_text(prompt)` を呼び出してレスポンス文字列を受け取ります。
+    - `ClaudeClient.stream_text(prompt, should_abort=...)` はSSEで受信した差分を順次返す `streaming.TextStream` を返します。
+    - `cache_prefix` に全プロンプト共通の先頭部分（`PromptBuilder.message_prefix`）を指定すると、その部分を `cache_control` 付きのブロックで送り、
+      Anthropicのプロンプトキャッシュで2回目以降の入力トークンの料金と最初のトークンまでの時間を減らします。効果は `prompt_cache_stats` で確認できます。
+    - 通信は `http_transport.HTTPTransport` の接続プールを使い、keep-alive で接続を再利用します（`transport` で共有・設定変更可）。
+    - `metrics`（`metrics.RunMetrics`）を渡すと、1回の送信ごとの所要時間・送受信バイト数・トークン使用量を記録します。
+    - 429・529（過負荷）・5xx・通信エラーは `retry`（`retry_policy.RetryPolicy`）に従い、`Retry-After` を尊重してバックオフしながら再送します。
+    - asyncioから多数の生成を同時に行う場合は `AsyncClaudeClient` を使い、`await client.generate_text(prompt)` とします（`httpx` が必要）。
+    - 大量の行をまとめて生成する場合は `ClaudeBatchClient`（Message Batches API）で `create([(custom_id, client.request_params(prompt)), ...])` し、
+      `wait(batch_id)` で終了まで待ってから `results(batch)` で `custom_id` ごとの `batch_jobs.BatchResult` を受け取ります。
 """
 
 from __future__ import annotations
 
 import json
 import os
-import urllib.error
-import urllib.request
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from batch_jobs import DEFAULT_POLL_INTERVAL, BatchResult, poll_until_done
+from http_transport import HTTPTransport, TransportError, load_httpx
+from metrics import RunMetrics, usage_fields
+from rate_limiter import ProviderRateLimiter, estimate_tokens
+from response_cache import ResponseCache, cache_key
+from retry_policy import RetryPolicy, network_error, status_error
+from streaming import AbortPredicate, StreamStats, TextStream, iter_sse_events, open_stream
 
 API_URL = "https://api.anthropic.com/v1/messages"
+API_VERSION = "2023-06-01"
 DEFAULT_MODEL = "claude-opus-4-1-20250805"
 DEFAULT_MAX_TOKENS = 1024
+REQUEST_TIMEOUT = 60
+DEFAULT_MAX_CONNECTIONS = 100
+BATCH_COUNT_FIELDS = ("processing", "succeeded", "errored", "canceled", "expired")
+CACHE_CONTROL = {"type": "ephemeral"}
+# Shorter prefixes are processed normally; Haiku models need 2048 tokens.
+MIN_CACHEABLE_TOKENS = 1024
+
 
+def _build_request_payload(prompt: str, model: str, max_tokens: int, cache_prefix: str = "") -> Dict[str, object]:
+    """Construct payload dictionary for Claude API.
 
-def _build_request_payload(prompt: str, model: str, max_tokens: int) -> Dict[str, object]:
-    """Construct payload dictionary for Claude API."""
+    When `prompt` starts with `cache_prefix`, the prefix is sent as its own
+    text block marked for prompt caching and the rest follows as a second block.
+    """
+    content: object = prompt
+    if cache_prefix and prompt.startswith(cache_prefix):
+        blocks: List[Dict[str, object]] = [{"type": "text", "text": cache_prefix, "cache_control": dict(CACHE_CONTROL)}]
+        if len(prompt) > len(cache_prefix):
+            blocks.append({"type": "text", "text": prompt[len(cache_prefix) :]})
+        content = blocks
     return {
         "model": model,
         "max_tokens": max_tokens,
         "messages": [
-            {"role": "user", "content": prompt},
+            {"role": "user", "content": content},
         ],
     }
 
 
+def _status_error(status: int, reason: str, headers) -> RuntimeError:
+    """Return the exception for an error response; 429/529/5xx are retryable."""
+    return status_error("anthropic", status, f"Claude API error: {status} {reason}", headers)
+
+
+def _build_request_headers(api_key: str) -> Dict[str, str]:
+    """Return HTTP headers required by the Messages API."""
+    return {
+        "content-type": "application/json",
+        "x-api-key": api_key,
+        "anthropic-version": API_VERSION,
+    }
+
+
 def _render_content_text(content: List[Dict[str, object]]) -> str:
     """Join text blocks returned by Claude into a single string."""
     text_blocks: List[str] = []
@@ -41,6 +90,69 @@ def _render_content_text(content: List[Dict[str, object]]) -> str:
     return "".join(text_blocks)
 
 
+def _usage_tokens(document: Dict[str, object]) -> Optional[int]:
+    """Return input + output tokens reported in a Messages API response.
+
+    Prompt-cache writes count toward the input limit; cache reads do not.
+    """
+    usage = document.get("usage")
+    if not isinstance(usage, dict):
+        return None
+    total = 0
+    for key in ("input_tokens", "cache_creation_input_tokens", "output_tokens"):
+        value = usage.get(key)
+        if isinstance(value, int):
+            total += value
+    return total
+
+
+@dataclass
+class PromptCacheStats:
+    """Thread-safe totals of the prompt-cache fields in Messages API usage."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record(self, usage: object) -> None:
+        if not isinstance(usage, dict):
+            return
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += int(usage.get("input_tokens", 0) or 0)
+            self.cache_read_tokens += int(usage.get("cache_read_input_tokens", 0) or 0)
+            self.cache_write_tokens += int(usage.get("cache_creation_input_tokens", 0) or 0)
+
+    def summary(self) -> str:
+        with self._lock:
+            total = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+            share = self.cache_read_tokens / total if total else 0.0
+            return (
+                f"{self.requests} requests, {self.cache_read_tokens} input tokens read from cache ({share:.0%}), "
+                f"{self.cache_write_tokens} written to cache, {self.input_tokens} uncached"
+            )
+
+
+def _extract_text_from_response(raw: str) -> str:
+    """Parse a Messages API response body and return its text content."""
+    return _extract_text_from_document(json.loads(raw))
+
+
+def _extract_text_from_document(document: Dict[str, object]) -> str:
+    """Return the text content of an already-parsed Messages API response."""
+    content_blocks = document.get("content", [])
+    if not isinstance(content_blocks, list):
+        raise RuntimeError("Unexpected Claude response format: missing content array")
+
+    text = _render_content_text(content_blocks)
+    if text:
+        return text
+
+    return json.dumps(document, ensure_ascii=False)
+
+
 @dataclass
 class ClaudeClient:
     """Minimal client for Anthropic Claude text generation."""
@@ -49,6 +161,14 @@ class ClaudeClient:
     model: str = DEFAULT_MODEL
     max_tokens: int = DEFAULT_MAX_TOKENS
     api_url: str = API_URL
+    rate_limiter: Optional[ProviderRateLimiter] = None
+    cache: Optional[ResponseCache] = None
+    transport: HTTPTransport = field(default_factory=HTTPTransport, repr=False)
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("anthropic"))
+    cache_prefix: str = ""
+    metrics: Optional[RunMetrics] = field(default=None, repr=False)
+    stream_stats: StreamStats = field(default_factory=StreamStats, init=False, repr=False)
+    prompt_cache_stats: PromptCacheStats = field(default_factory=PromptCacheStats, init=False, repr=False)
 
     def __post_init__(self) -> None:
         if not self.api_key:
@@ -67,43 +187,381 @@ class ClaudeClient:
             raise ValueError(f"Environment variable {env_var} is empty")
         return cls(api_key=key, model=model, max_tokens=max_tokens)
 
+    def request_params(self, prompt: str) -> Dict[str, object]:
+        """Return the Messages API body `generate_text` would send for `prompt`."""
+        return _build_request_payload(prompt, self.model, self.max_tokens, self.cache_prefix)
+
+    def cache_key_for(self, prompt: str) -> str:
+        """Return the response-cache key `generate_text` uses for `prompt`."""
+        return cache_key("anthropic:messages", self.model, self.max_tokens, None, prompt)
+
     def generate_text(self, prompt: str) -> str:
         """Send prompt to Claude and return the combined text content."""
         if not prompt:
             raise ValueError("Prompt must be a non-empty string")
+        if self.cache is None:
+            return self._send(prompt)
+        return self.cache.get_or_create(self.cache_key_for(prompt), lambda: self._send(prompt))
 
-        payload = _build_request_payload(prompt=prompt, model=self.model, max_tokens=self.max_tokens)
-        data = json.dumps(payload).encode("utf-8")
+    def _retry(self, attempt):
+        return attempt() if self.retry is None else self.retry.call(attempt)
 
-        request = urllib.request.Request(
-            self.api_url,
-            data=data,
-            headers={
-                "content-type": "application/json",
-                "x-api-key": self.api_key,
-                "anthropic-version": "2023-06-01",
-            },
-            method="POST",
+    def _observe(self, name: str, started: float, sent: int, received: int, status: int, usage: object = None) -> None:
+        if self.metrics is not None:
+            self.metrics.observe(
+                "call",
+                f"anthropic.{name}",
+                time.perf_counter() - started,
+                status=status,
+                bytes_sent=sent,
+                bytes_received=received,
+                **usage_fields(usage),
+            )
+
+    def _send(self, prompt: str) -> str:
+        data = json.dumps(self.request_params(prompt)).encode("utf-8")
+
+        def attempt() -> str:
+            reserved = 0
+            if self.rate_limiter is not None:
+                reserved = estimate_tokens(prompt, self.max_tokens)
+                self.rate_limiter.acquire(reserved)
+
+            started = time.perf_counter()
+            try:
+                try:
+                    response = self.transport.request(
+                        "POST", self.api_url, body=data, headers=_build_request_headers(self.api_key)
+                    )
+                except TransportError as err:
+                    self._observe("messages", started, len(data), 0, 0)
+                    raise network_error(f"Network error contacting Claude API: {err}") from err
+                if response.status >= 400:
+                    self._observe("messages", started, len(data), len(response.body), response.status)
+                    raise _status_error(response.status, response.reason, response.headers)
+                document = json.loads(response.body.decode("utf-8"))
+            except BaseException:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.refund(reserved)
+                raise
+            self._observe("messages", started, len(data), len(response.body), response.status, document.get("usage"))
+            if self.rate_limiter is not None:
+                self.rate_limiter.settle(reserved, _usage_tokens(document))
+            self.prompt_cache_stats.record(document.get("usage"))
+            return _extract_text_from_document(document)
+
+        return self._retry(attempt)
+
+    def stream_text(self, prompt: str, should_abort: Optional[AbortPredicate] = None) -> TextStream:
+        """Stream the reply over SSE; iterating yields text deltas as they arrive."""
+        if not prompt:
+            raise ValueError("Prompt must be a non-empty string")
+        return open_stream(
+            lambda stream: self._stream_deltas(stream, prompt),
+            should_abort,
+            self.stream_stats,
+            self.cache,
+            self.cache_key_for(prompt),
         )
 
+    def _stream_deltas(self, stream: TextStream, prompt: str) -> Iterator[str]:
+        payload = self.request_params(prompt)
+        payload["stream"] = True
+        data = json.dumps(payload).encode("utf-8")
+
+        # Only opening the stream is retried; a failure after deltas were yielded ends the stream.
+        def attempt():
+            reserved = 0
+            if self.rate_limiter is not None:
+                reserved = estimate_tokens(prompt, self.max_tokens)
+                self.rate_limiter.acquire(reserved)
+            stream.mark_sent()
+            stack = ExitStack()
+            try:
+                try:
+                    response = stack.enter_context(
+                        self.transport.stream("POST", self.api_url, body=data, headers=_build_request_headers(self.api_key))
+                    )
+                except TransportError as err:
+                    raise network_error(f"Network error contacting Claude API: {err}") from err
+                if response.status >= 400:
+                    stack.close()
+                    self._observe("messages.stream", stream.started, len(data), 0, response.status)
+                    raise _status_error(response.status, response.reason, response.headers)
+            except BaseException:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.refund(reserved)
+                raise
+            return reserved, stack, response
+
+        reserved, stack, response = self._retry(attempt)
+        input_tokens = output_tokens = 0
+        usage: Dict[str, object] = {}
+        received = [0]
+
+        def counted(lines: Iterable[bytes]) -> Iterator[bytes]:
+            for line in lines:
+                received[0] += len(line)
+                yield line
+
         try:
-            with urllib.request.urlopen(request, timeout=60) as response:
-                raw = response.read().decode("utf-8")
-        except urllib.error.HTTPError as err:
-            raise RuntimeError(f"Claude API error: {err.code} {err.reason}") from err
-        except urllib.error.URLError as err:
-            raise RuntimeError(f"Network error contacting Claude API: {err.reason}") from err
-
-        document = json.loads(raw)
-        content_blocks = document.get("content", [])
-        if not isinstance(content_blocks, list):
-            raise RuntimeError("Unexpected Claude response format: missing content array")
-
-        text = _render_content_text(content_blocks)
-        if text:
-            return text
-
-        return json.dumps(document, ensure_ascii=False)
+            with stack:
+                for event in iter_sse_events(counted(response.lines)):
+                    document = json.loads(event.data)
+                    kind = document.get("type")
+                    if kind == "content_block_delta":
+                        delta = document.get("delta") or {}
+                        if delta.get("type") == "text_delta":
+                            yield str(delta.get("text", ""))
+                    elif kind == "message_start":
+                        usage = (document.get("message") or {}).get("usage") or {}
+                        input_tokens = int(usage.get("input_tokens", 0) or 0)
+                        input_tokens += int(usage.get("cache_creation_input_tokens", 0) or 0)
+                        self.prompt_cache_stats.record(usage)
+                    elif kind == "message_delta":
+                        stream.finish_reason = (document.get("delta") or {}).get("stop_reason")
+                        output_tokens = int((document.get("usage") or {}).get("output_tokens", 0) or 0)
+                    elif kind == "error":
+                        message = (document.get("error") or {}).get("message", event.data)
+                        raise RuntimeError(f"Claude API error: {message}")
+        except TransportError as err:
+            raise RuntimeError(f"Network error contacting Claude API: {err}") from err
+        finally:
+            # Also runs when the caller aborts the stream early.
+            self._observe(
+                "messages.stream", stream.started, len(data), received[0], response.status, {**usage, "output_tokens": output_tokens}
+            )
+
+        stream.usage_tokens = input_tokens + output_tokens
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(reserved, stream.usage_tokens)
+
+    def close(self) -> None:
+        """Close pooled keep-alive connections."""
+        self.transport.close()
+
+
+@dataclass
+class AsyncClaudeClient:
+    """asyncio counterpart of ClaudeClient backed by a shared httpx.AsyncClient."""
+
+    api_key: str
+    model: str = DEFAULT_MODEL
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    api_url: str = API_URL
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    rate_limiter: Optional[ProviderRateLimiter] = None
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("anthropic"))
+    _client: Optional[object] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.api_key:
+            raise ValueError("Claude API key is required")
+
+    @classmethod
+    def from_env(
+        cls,
+        env_var: str = "ANTHROPIC_API_KEY",
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+    ) -> "AsyncClaudeClient":
+        """Create a client using an API key from environment variables."""
+        key = os.getenv(env_var, "").strip()
+        if not key:
+            raise ValueError(f"Environment variable {env_var} is empty")
+        return cls(api_key=key, model=model, max_tokens=max_tokens)
+
+    def _http(self):
+        if self._client is None:
+            httpx = load_httpx()
+            self._client = httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def generate_text(self, prompt: str) -> str:
+        """Send prompt to Claude and return the combined text content."""
+        if not prompt:
+            raise ValueError("Prompt must be a non-empty string")
+
+        httpx = load_httpx()
+        payload = _build_request_payload(prompt=prompt, model=self.model, max_tokens=self.max_tokens)
+
+        async def attempt() -> str:
+            reserved = 0
+            if self.rate_limiter is not None:
+                reserved = estimate_tokens(prompt, self.max_tokens)
+                await self.rate_limiter.acquire_async(reserved)
+            try:
+                try:
+                    response = await self._http().post(
+                        self.api_url,
+                        content=json.dumps(payload).encode("utf-8"),
+                        headers=_build_request_headers(self.api_key),
+                    )
+                except httpx.TransportError as err:
+                    raise network_error(f"Network error contacting Claude API: {err}") from err
+                if response.status_code >= 400:
+                    raise _status_error(response.status_code, response.reason_phrase, response.headers)
+                document = json.loads(response.text)
+            except BaseException:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.refund(reserved)
+                raise
+            if self.rate_limiter is not None:
+                self.rate_limiter.settle(reserved, _usage_tokens(document))
+            return _extract_text_from_document(document)
+
+        return await (attempt() if self.retry is None else self.retry.call_async(attempt))
+
+    async def aclose(self) -> None:
+        """Close pooled connections held by the underlying HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "AsyncClaudeClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+@dataclass(frozen=True)
+class MessageBatch:
+    """The fields of a Message Batch object this module acts on."""
+
+    id: str
+    processing_status: str
+    results_url: Optional[str] = None
+    processing: int = 0
+    succeeded: int = 0
+    errored: int = 0
+    canceled: int = 0
+    expired: int = 0
+
+    @classmethod
+    def from_document(cls, document: Mapping[str, object]) -> "MessageBatch":
+        counts = document.get("request_counts") or {}
+        return cls(
+            id=str(document["id"]),
+            processing_status=str(document.get("processing_status", "")),
+            results_url=document.get("results_url") or None,  # type: ignore[arg-type]
+            **{name: int(counts.get(name, 0) or 0) for name in BATCH_COUNT_FIELDS},  # type: ignore[union-attr]
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.processing_status == "ended"
+
+    def summary(self) -> str:
+        return (
+            f"{self.id} {self.processing_status}: {self.succeeded} succeeded, {self.errored} errored, "
+            f"{self.expired} expired, {self.canceled} canceled, {self.processing} processing"
+        )
+
+
+def parse_batch_results(data: bytes) -> Dict[str, BatchResult]:
+    """Parse a Message Batch results file into results keyed by custom_id."""
+    results: Dict[str, BatchResult] = {}
+    for raw in data.decode("utf-8").splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        custom_id = str(line.get("custom_id", ""))
+        result = line.get("result") or {}
+        kind = result.get("type")
+        if kind == "succeeded":
+            results[custom_id] = BatchResult(custom_id, text=_extract_text_from_document(result.get("message") or {}))
+        elif kind == "errored":
+            error = (result.get("error") or {}).get("error") or {}
+            results[custom_id] = BatchResult(custom_id, error=f"{error.get('type')}: {error.get('message')}")
+        else:
+            results[custom_id] = BatchResult(custom_id, error=f"request {kind}")
+    return results
+
+
+@dataclass
+class ClaudeBatchClient:
+    """Create Message Batches, poll them and fetch their results.
+
+    Batches live under `{api_url}/batches`, so a custom `api_url` (e.g. the
+    local mock server) redirects them along with the synchronous calls.
+    """
+
+    api_key: str
+    api_url: str = API_URL
+    transport: HTTPTransport = field(default_factory=HTTPTransport, repr=False)
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("anthropic"))
+    sleep: Callable[[float], None] = field(default=time.sleep, repr=False)
+    metrics: Optional[RunMetrics] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.api_key:
+            raise ValueError("Claude API key is required")
+        self.api_url = self.api_url.rstrip("/")
+
+    def _request(self, method: str, url: str, body: Optional[bytes] = None, retry_network: bool = True) -> bytes:
+        def attempt() -> bytes:
+            started = time.perf_counter()
+            try:
+                response = self.transport.request(method, url, body=body, headers=_build_request_headers(self.api_key))
+            except TransportError as err:
+                if not retry_network:
+                    raise RuntimeError(f"Network error contacting Claude Message Batches API: {err}") from err
+                raise network_error(f"Network error contacting Claude Message Batches API: {err}") from err
+            if self.metrics is not None:
+                self.metrics.observe(
+                    "call",
+                    f"anthropic.batches.{method.lower()}",
+                    time.perf_counter() - started,
+                    status=response.status,
+                    bytes_sent=len(body or b""),
+                    bytes_received=len(response.body),
+                )
+            if response.status >= 400:
+                detail = response.body.decode("utf-8", "replace")
+                message = f"Claude Message Batches API error: {response.status} {response.reason}: {detail[:200]}"
+                raise status_error("anthropic", response.status, message, response.headers, detail)
+            return response.body
+
+        return attempt() if self.retry is None else self.retry.call(attempt)
+
+    def create(self, requests: Iterable[Tuple[str, Mapping[str, object]]]) -> MessageBatch:
+        """Create a batch from (custom_id, Messages API params) pairs."""
+        document = {"requests": [{"custom_id": custom_id, "params": params} for custom_id, params in requests]}
+        body = json.dumps(document, ensure_ascii=False).encode("utf-8")
+        # A create whose reply was lost may already have started a billed batch,
+        # so only rejected requests (429/529/5xx) are sent again.
+        raw = self._request("POST", f"{self.api_url}/batches", body, retry_network=False)
+        return MessageBatch.from_document(json.loads(raw.decode("utf-8")))
+
+    def retrieve(self, batch_id: str) -> MessageBatch:
+        raw = self._request("GET", f"{self.api_url}/batches/{batch_id}")
+        return MessageBatch.from_document(json.loads(raw.decode("utf-8")))
+
+    def wait(
+        self,
+        batch_id: str,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        on_poll: Optional[Callable[[MessageBatch], None]] = None,
+    ) -> MessageBatch:
+        """Poll until the batch has ended and return it."""
+        return poll_until_done(lambda: self.retrieve(batch_id), poll_interval, on_poll, self.sleep)
+
+    def results(self, batch: MessageBatch) -> Dict[str, BatchResult]:
+        """Return the per-request results of an ended batch."""
+        if not batch.results_url:
+            return {}
+        return parse_batch_results(self._request("GET", batch.results_url))
+
+    def close(self) -> None:
+        """Close pooled keep-alive connections."""
+        self.transport.close()
 
 
 def read_api_key(env_var: str = "ANTHROPIC_API_KEY") -> Optional[str]:
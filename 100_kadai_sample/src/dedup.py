@@ -0,0 +1,175 @@
+"""
+処理概要:
+    - 結果シートで同じ企業（URLのホスト名と登記社名が同じ行。登記社名が無ければURLのページ、URLが無ければ登記社名が同じ行）が複数行に並んでいる場合に、
+      検索・営業文の生成を1グループ1回にまとめます。ホスト名だけでは同じ企業とみなしません（共有のホストを別の企業が使うため）。
+    - 最初にたどり着いた行だけがAPIを呼び、同じグループの他の行（実行中に並行して待っていた行、後から来た行）はその結果を受け取ります。
+使用方法:
+    - `company_key(url, registered_name)` で行のグループキーを作ります（どちらも空なら `None` で、その行はまとめません）。
+    - `dedup = CompanyDedup()` を作り、`dedup.search.run(key, row_number, func)` / `dedup.letter.run(...)` で呼び出しを包みます。
+    - Message Batches のように一括で送る場合は `dedup.letter.group(...)` で代表行と相乗り行に分けます。
+    - 実行後は `dedup.summary()` で呼び出し回数と相乗りした行の割合を表示できます。
+"""
+
+from __future__ import annotations
+
+import threading
+import unicodedata
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+T = TypeVar("T")
+O = TypeVar("O")
+
+
+def url_host(url: str) -> str:
+    """Return the lower-cased host of `url` without a leading `www.`; scheme-less URLs are accepted."""
+    url = url.strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "//" + url
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def normalize_name(name: str) -> str:
+    """Fold width, case and whitespace so 'ＡＢＣ 株式会社' and 'abc株式会社' compare equal."""
+    folded = unicodedata.normalize("NFKC", name).casefold()
+    return "".join(folded.split())
+
+
+def url_page(url: str) -> str:
+    """Return `url_host(url)` plus its path without a trailing `/`; query and fragment are dropped."""
+    host = url_host(url)
+    if not host:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = "//" + url
+    try:
+        path = urlsplit(url).path.rstrip("/")
+    except ValueError:
+        return host
+    return host + path
+
+
+def company_key(url: str, registered_name: str = "") -> Optional[str]:
+    """Return the group key for a row, or None when the row has nothing to identify it.
+
+    A shared host (sites.google.com, facebook.com, rental servers) does not
+    identify a company on its own, so the host only groups rows together
+    with the registered name. Without a registered name the whole page (host
+    and path) must match; without a URL the registered name alone is used.
+    """
+    registered = normalize_name(registered_name)
+    host = url_host(url)
+    if host and registered:
+        return f"host:{host}|registered:{registered}"
+    if host:
+        return f"page:{url_page(url)}"
+    if registered:
+        return f"registered:{registered}"
+    return None
+
+
+class SharedCalls(Generic[O]):
+    """Run one call per key and hand its result to every other caller with the same key.
+
+    Callers arriving while the call is in flight wait for it; later callers
+    get the stored result. A failed call is not stored: the callers waiting
+    on it see the same error, and the next caller runs the call again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "Future[Tuple[O, object]]"] = {}
+        self.calls = 0
+        self.shared = 0
+        self.sources: Dict[O, O] = {}
+
+    def run(self, key: Optional[Hashable], owner: O, func: Callable[[], T]) -> T:
+        """Return `func()` for the first caller of `key`, and that same value for the rest.
+
+        `owner` identifies the caller (a row number); followers are recorded
+        in `sources` against the owner whose call they reused.
+        """
+        if key is None:
+            with self._lock:
+                self.calls += 1
+            return func()
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            source, value = future.result()  # type: ignore[union-attr]
+            with self._lock:
+                self.sources[owner] = source
+            return value  # type: ignore[return-value]
+
+        try:
+            value = func()
+        except BaseException as err:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(err)  # type: ignore[union-attr]
+            raise
+        future.set_result((owner, value))  # type: ignore[union-attr]
+        return value
+
+    def group(self, keyed: Iterable[Tuple[Optional[Hashable], O]]) -> Dict[O, List[O]]:
+        """Split owners into leaders and followers without calling anything.
+
+        Returns leader -> followers in first-seen order; owners with a `None`
+        key are leaders of their own. Counts and `sources` are updated as if
+        each leader had made one call.
+        """
+        groups: Dict[O, List[O]] = {}
+        leaders: Dict[Hashable, O] = {}
+        with self._lock:
+            for key, owner in keyed:
+                leader = leaders.get(key) if key is not None else None
+                if leader is None:
+                    if key is not None:
+                        leaders[key] = owner
+                    groups[owner] = []
+                    self.calls += 1
+                else:
+                    groups[leader].append(owner)
+                    self.sources[owner] = leader
+                    self.shared += 1
+        return groups
+
+    def summary(self) -> str:
+        rows = self.calls + self.shared
+        ratio = self.shared / rows if rows else 0.0
+        return f"{self.calls} calls for {rows} rows ({self.shared} shared, {ratio:.0%})"
+
+
+class CompanyDedup:
+    """Shared search and letter calls for one run, keyed by row number."""
+
+    def __init__(self) -> None:
+        self.search: SharedCalls[int] = SharedCalls()
+        self.letter: SharedCalls[int] = SharedCalls()
+
+    def source_of(self, row_number: int) -> Optional[int]:
+        """Return the row whose results `row_number` reused, if any."""
+        return self.letter.sources.get(row_number, self.search.sources.get(row_number))
+
+    def summary(self) -> str:
+        return f"search: {self.search.summary()}; letter: {self.letter.summary()}"
@@ -0,0 +1,363 @@
+"""
+処理概要:
+    - 複数のスプレッドシート（設定ファイル）の行を1つのプロセスで交互に処理するランナー。`fill_spreadsheet.py` を設定ファイルごとに順番に実行する代わりに、
+      全シートの行を1つの同時実行数（`--workers`）とプロバイダーごとのレート制限の下で並べて流します。
+    - 次に処理する行は重み付きラウンドロビン（smooth weighted round-robin）でシートを選ぶため、行数の多いシートが他のシートを待たせ続けることがありません。
+      重みを付けたシートは、その比率で多くの行が割り当てられます。
+    - レート制限・再試行・同時実行数の自動調整・HTTP接続・応答キャッシュは全シートで共有します（`sheet_job.WarmClients`）。
+    - 行の処理（検索と営業文の生成、実行ジャーナル、書き込みのまとめ）は `fill_spreadsheet.py` の `--workers` と同じです。各シートの出力行には `[<設定ファイル名>]` が付きます。
+使用方法:
+    - `python3 fanout_runner.py --config ../80_tools/clients/ --workers 8`（フォルダを指定するとその中の `*.json` をすべて読み込みます）
+    - `python3 fanout_runner.py --config a.json --config b.json --weight a=3 --limits ../80_tools/config.json`
+      （`--weight <設定ファイル名>=<重み>` で割り当てを偏らせ、`--limits` の `rate_limits` / `retry` を共有の上限にします。既定は最初の設定ファイルの値）
+    - `--limit` / `--overwrite` / `--dry-run` / `--web-search` / `--dedupe` / `--no-cache` / `--resume` / `--stream` は `fill_spreadsheet.py` と同じ意味で、すべてのシートに適用されます。
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, TextIO, Tuple
+
+from fill_spreadsheet import AppConfig, Campaign, RowResult, default_journal_path, load_config, start_campaign
+from row_executor import TaskOutcome
+from sheet_job import CompanyRecord, WarmClients, load_env_file
+
+CURRENT_DIR = Path(__file__).resolve().parent
+
+
+@dataclass
+class FairScheduler:
+    """Interleave items from several named sources by smooth weighted round-robin.
+
+    Each pick adds every active source's weight to its credit and takes the
+    source with the most credit, which then pays the total weight. Weights
+    2:1 give A, B, A, A, B, A, ...; equal weights alternate. Sources are read
+    lazily, one item per pick, and dropped once exhausted.
+    """
+
+    _sources: Dict[str, Iterator[object]] = field(default_factory=dict)
+    _weights: Dict[str, int] = field(default_factory=dict)
+    _credit: Dict[str, int] = field(default_factory=dict)
+    picked: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, name: str, items: Iterator[object], weight: int = 1) -> None:
+        if weight < 1:
+            raise ValueError(f"Weight of {name} must be >= 1")
+        self._sources[name] = items
+        self._weights[name] = weight
+        self._credit[name] = 0
+        self.picked[name] = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._sources)
+
+    def next(self) -> Optional[Tuple[str, object]]:
+        """Return the next (source, item), or None when every source is exhausted."""
+        while self._sources:
+            total = sum(self._weights[name] for name in self._sources)
+            for name in self._sources:
+                self._credit[name] += self._weights[name]
+            chosen = max(self._sources, key=lambda name: self._credit[name])
+            self._credit[chosen] -= total
+            try:
+                item = next(self._sources[chosen])
+            except StopIteration:
+                del self._sources[chosen]
+                continue
+            self.picked[chosen] += 1
+            return chosen, item
+        return None
+
+
+class PrefixedOutput(io.TextIOBase):
+    """Text stream that starts every line written through it with `prefix`."""
+
+    def __init__(self, target: TextIO, prefix: str) -> None:
+        super().__init__()
+        self.target = target
+        self.prefix = prefix
+        self._line_start = True
+
+    def write(self, text: str) -> int:  # type: ignore[override]
+        for line in text.splitlines(keepends=True):
+            if self._line_start:
+                self.target.write(self.prefix)
+            self.target.write(line)
+            self._line_start = line.endswith("\n")
+        return len(text)
+
+    def flush(self) -> None:
+        self.target.flush()
+
+
+@contextmanager
+def labelled(name: str) -> Iterator[None]:
+    """Prefix this campaign's log lines with `[name] ` so interleaved sheets stay readable."""
+    with redirect_stdout(PrefixedOutput(sys.stdout, f"[{name}] ")):  # type: ignore[type-var]
+        yield
+
+
+def collect_configs(paths: Sequence[Path]) -> List[Path]:
+    """Expand directories to their `*.json` files (sorted) and keep files as given."""
+    found: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            found.extend(sorted(path.glob("*.json")))
+        else:
+            found.append(path)
+    if not found:
+        raise ValueError("No config files found")
+    return found
+
+
+def campaign_names(paths: Sequence[Path]) -> List[str]:
+    """Name each campaign after its config file's stem, numbering repeats."""
+    names: List[str] = []
+    for path in paths:
+        name = path.stem
+        suffix = 2
+        while name in names:
+            name = f"{path.stem}-{suffix}"
+            suffix += 1
+        names.append(name)
+    return names
+
+
+def journal_paths(paths: Sequence[Path], names: Sequence[str], configs: Sequence[AppConfig]) -> List[Path]:
+    """Use each config's usual journal, giving campaigns that share a spreadsheet one journal each."""
+    spreadsheets = [config.spreadsheet_id for config in configs]
+    journals: List[Path] = []
+    for path, name, config in zip(paths, names, configs):
+        journal = default_journal_path(path, config)
+        if spreadsheets.count(config.spreadsheet_id) > 1:
+            journal = journal.with_name(f"{config.spreadsheet_id}.{name}.jsonl")
+        journals.append(journal)
+    return journals
+
+
+def parse_weights(values: Optional[List[str]], names: Sequence[str]) -> Dict[str, int]:
+    """Parse `--weight name=N` options; unknown names are an error, unlisted campaigns weigh 1."""
+    weights = {name: 1 for name in names}
+    for value in values or []:
+        name, sep, number = value.partition("=")
+        if not sep or name not in weights:
+            raise ValueError(f"--weight expects <config name>=<weight> with one of {', '.join(names)}: {value}")
+        weights[name] = int(number)
+        if weights[name] < 1:
+            raise ValueError(f"--weight for {name} must be >= 1")
+    return weights
+
+
+def run_interleaved(
+    campaigns: Mapping[str, Campaign],
+    weights: Mapping[str, int],
+    clients: WarmClients,
+    workers: int,
+) -> Dict[str, int]:
+    """Run the rows of every campaign on one pool of `workers` threads, picked fairly across campaigns.
+
+    At most `workers` rows are in flight; whenever one finishes, the
+    scheduler picks the next row, so a sheet's share of the slots follows its
+    weight for as long as it has rows left. Finished rows are logged and
+    queued for writing on this thread as they complete. Throttling from
+    either provider lowers the shared concurrency (AIMD), as with --workers.
+    Returns the number of rows each campaign wrote (or dry-ran).
+    """
+    scheduler = FairScheduler()
+    for name, campaign in campaigns.items():
+        scheduler.add(name, campaign.records, weights.get(name, 1))  # type: ignore[arg-type]
+    gate = clients.retries.adaptive_gate(["openai", "anthropic"], workers)
+    processed = {name: 0 for name in campaigns}
+    pending: Dict["Future[Optional[RowResult]]", Tuple[str, CompanyRecord]] = {}
+
+    def handle(name: str, outcome: TaskOutcome[CompanyRecord, Optional[RowResult]]) -> None:
+        with labelled(name):
+            processed[name] += campaigns[name].consume([outcome])
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while True:
+                while len(pending) < max(1, workers):
+                    picked = scheduler.next()
+                    if picked is None:
+                        break
+                    name, record = picked
+                    task = campaigns[name].steps.generate
+                    if gate is not None:
+                        task = gate.wrap(task)
+                    pending[pool.submit(task, record)] = (name, record)  # type: ignore[arg-type]
+                if not pending:
+                    break
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, record = pending.pop(future)
+                    error = future.exception()
+                    outcome: TaskOutcome[CompanyRecord, Optional[RowResult]] = (
+                        TaskOutcome(item=record, error=error)
+                        if error is not None
+                        else TaskOutcome(item=record, result=future.result())
+                    )
+                    handle(name, outcome)
+    finally:
+        if gate is not None:
+            clients.retries.release_gate(gate)
+            adapted = gate.summary()
+            if adapted:
+                print(f"[concurrency] rows: {adapted}")
+    print("[fanout] Rows started per sheet: " + ", ".join(f"{name}={count}" for name, count in scheduler.picked.items()))
+    return processed
+
+
+def shared_clients(limits_path: Path) -> WarmClients:
+    """Build the clients every campaign shares from the `rate_limits` / `retry` sections of `limits_path`."""
+    with limits_path.open("r", encoding="utf-8") as fh:
+        return WarmClients.from_dict(json.load(fh))
+
+
+def run_fanout(
+    config_paths: Sequence[Path],
+    workers: int,
+    weights: Optional[List[str]] = None,
+    limits_path: Optional[Path] = None,
+    limit: Optional[int] = None,
+    overwrite: bool = False,
+    dry_run: bool = False,
+    use_web_search: bool = False,
+    resume: bool = False,
+    use_cache: bool = True,
+    stream: bool = False,
+    dedupe: bool = False,
+) -> Dict[str, int]:
+    """Prepare every config's campaign, run their rows interleaved and print each summary."""
+    paths = collect_configs(config_paths)
+    names = campaign_names(paths)
+    weight_of = parse_weights(weights, names)
+
+    configs = [load_config(path) for path in paths]
+    targets: Dict[Tuple[str, str], str] = {}
+    for name, config in zip(names, configs):
+        target = (config.spreadsheet_id, config.output_sheet_name)
+        if target in targets:
+            raise ValueError(
+                f"{name} and {targets[target]} both write to {config.output_sheet_name} of {config.spreadsheet_id}"
+            )
+        targets[target] = name
+    journals = journal_paths(paths, names, configs)
+
+    clients = shared_clients(limits_path or paths[0])
+    started = time.perf_counter()
+    campaigns: Dict[str, Campaign] = {}
+    try:
+        for name, config, journal in zip(names, configs, journals):
+            with labelled(name):
+                campaign = start_campaign(
+                    config,
+                    limit,
+                    overwrite,
+                    dry_run,
+                    use_web_search=use_web_search,
+                    journal_path=journal,
+                    resume=resume,
+                    use_cache=use_cache,
+                    stream=stream,
+                    dedupe=dedupe,
+                    clients=clients,
+                )
+            if campaign is not None:
+                campaigns[name] = campaign
+
+        with ExitStack() as writers:
+            for campaign in campaigns.values():
+                writers.enter_context(campaign.writer)
+            processed = run_interleaved(campaigns, weight_of, clients, workers)
+            # Flush here so each sheet's last write is logged under its name;
+            # the stack still flushes whatever is left if a row raised.
+            for name, campaign in campaigns.items():
+                with labelled(name):
+                    campaign.writer.flush()
+        for name, campaign in campaigns.items():
+            with labelled(name):
+                campaign.finish(processed[name])
+    except BaseException:
+        # Campaigns started before the failure still hold their journals and
+        # gates; close them (close is idempotent after finish) before the shared clients.
+        for campaign in campaigns.values():
+            campaign.close()
+        raise
+    finally:
+        summary = clients.summary_lines()
+        clients.close()
+    print(
+        f"[fanout] {sum(processed.values())} rows across {len(campaigns)} sheets "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    for line in summary:
+        print(line)
+    return processed
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fill several spreadsheets at once with fair row scheduling.")
+    parser.add_argument(
+        "--config",
+        required=True,
+        action="append",
+        type=Path,
+        help="設定ファイル、または設定ファイル(*.json)を含むフォルダ。複数指定できます",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="全シート合計で同時に処理する行数")
+    parser.add_argument(
+        "--weight",
+        action="append",
+        default=None,
+        help="<設定ファイル名>=<重み> で行の割り当てを偏らせます（既定: すべて1 = ラウンドロビン）",
+    )
+    parser.add_argument(
+        "--limits",
+        type=Path,
+        default=None,
+        help="全シートで共有する rate_limits / retry を読む設定ファイル（既定: 最初の設定ファイル）",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Process only the first N companies of each sheet")
+    parser.add_argument("--overwrite", action="store_true", help="既存のフォーム文章結果があっても上書きします")
+    parser.add_argument("--dry-run", action="store_true", help="シート更新を行わず処理内容だけ表示します")
+    parser.add_argument("--web-search", action="store_true", help="OpenAIのWeb検索機能を使用して企業情報を検索します")
+    parser.add_argument("--resume", action="store_true", help="各シートの実行ジャーナルから続きを処理します")
+    parser.add_argument("--no-cache", action="store_true", help="応答キャッシュを使いません")
+    parser.add_argument("--stream", action="store_true", help="応答をストリーミングで受信します")
+    parser.add_argument("--dedupe", action="store_true", help="同じ企業の行の検索・営業文を1回だけ生成します（シートごと）")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    load_env_file(CURRENT_DIR.parent / ".env")
+    run_fanout(
+        args.config,
+        workers=args.workers,
+        weights=args.weight,
+        limits_path=args.limits,
+        limit=args.limit,
+        overwrite=args.overwrite,
+        dry_run=args.dry_run,
+        use_web_search=args.web_search,
+        resume=args.resume,
+        use_cache=not args.no_cache,
+        stream=args.stream,
+        dedupe=args.dedupe,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,13 @@
 使用方法:
     - `python3 fill_spreadsheet.py --config ../80_tools/config.json` などと実行します。
     - `--web-search` オプションを付けるとOpenAIのWeb検索機能を使用します。
+    - `--workers N` を付けるとN行まで並行してAPI呼び出しを行います（ログと書き込みは行順のまま）。
+    - `--pipeline` を付けるとOpenAI検索段とClaude営業文段を別スレッド群で流し、各段の並行数・間隔は設定ファイルの `openai` / `anthropic` セクションで指定します。
+    - `--batch` を付けると全行の検索を終えてから、営業文をAnthropic Message Batches APIでまとめて生成します（料金は同期APIの半額、完了まで最大24時間）。
+      バッチ内で失敗・期限切れになった行は通常のMessages APIで1行ずつ生成し直します。ポーリング間隔と1バッチの件数は設定ファイルの `batch` セクションで指定します。
+    - 営業文プロンプトの全行共通の先頭部分（自社情報など）はClaudeのプロンプトキャッシュで送ります（`anthropic.prompt_cache` で無効化可）。
+    - `--dedupe` を付けると、URLのホスト名と登記社名（登記社名が無ければURLのページ、URLが無ければ登記社名）が同じ行の検索・営業文を1回だけ生成し、同じ企業の全行に書き込みます。
+    - `--metrics PATH` を付けると、行・段・API呼び出しごとの所要時間、送受信バイト数、トークン数、再試行、キャッシュのヒットをJSONLで書き出し、最後に分布を表示します。
     - 事前にサービスアカウントJSONとOpenAI / ClaudeのAPIキーを設定ファイルか環境変数で指定してください。
     - スプレッドシートのヘッダー行に `NAME`, `URL`, `検索結果`, `セールスレター` が含まれている必要があります。
 """
@@ -12,25 +19,57 @@
 from __future__ import annotations
 
 import argparse
-import json
-import os
 import sys
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional
-from urllib.parse import quote_plus
-
-from dotenv import load_dotenv
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
 CURRENT_DIR = Path(__file__).resolve().parent
 if str(CURRENT_DIR) not in sys.path:
     sys.path.append(str(CURRENT_DIR))
 
-from claude_client import ClaudeClient, read_api_key as read_claude_key
-from google_sheets_client import GoogleSheetsClient
-from openai_client import OpenAIClient, read_api_key as read_openai_key
+from batch_jobs import BatchSettings, chunked, custom_id_row, report_progress, row_custom_id
+from claude_client import (
+    API_URL as CLAUDE_API_URL,
+    MIN_CACHEABLE_TOKENS,
+    ClaudeBatchClient,
+    ClaudeClient,
+    read_api_key as read_claude_key,
+)
+from dedup import CompanyDedup, company_key
+from google_sheets_client import (
+    SheetBatchWriter,
+    SheetsSettings,
+    SpreadsheetHandle,
+    column_letter,
+    fetch_column_cells,
+    iter_column_blocks,
+)
+from http_transport import HTTPSettings
+from metrics import RunMetrics
+from openai_client import OpenAIClient
+from pipeline import DEFAULT_QUEUE_SIZE, StageSettings, run_two_stage
 from prompt_builder import PromptBuilder
+from rate_limiter import ProviderLimits, estimate_tokens
+from response_cache import CacheSettings
+from retry_policy import AdaptiveConcurrency, RetryRegistry, RetrySettings
+from row_executor import TaskOutcome, run_ordered
+from run_journal import JournalEntry, JournalKey, RunJournal, company_hash
+from sheet_job import (
+    ColumnIndexes,
+    CompanyRecord,
+    SheetJob,
+    WarmClients,
+    common_settings,
+    load_env_file,
+    load_job_config,
+    report_flush,
+    safe_get,
+)
+from streaming import AbortPredicate, max_chars
+
+T = TypeVar("T")
 
 
 @dataclass
@@ -45,6 +84,9 @@ class AppConfig:
     business_info_range: str
     output_sheet_name: str
     output_start_row: int
+    write_batch_size: int
+    write_flush_interval: float
+    read_block_size: int
     openai_model: str
     openai_max_tokens: int
     openai_api_key: Optional[str]
@@ -53,358 +95,737 @@ class AppConfig:
     anthropic_max_tokens: int
     anthropic_api_key: Optional[str]
     anthropic_api_key_env: str
-    request_interval: float
+    rate_limits: Dict[str, ProviderLimits] = field(default_factory=dict)
+    search_stage: StageSettings = field(default_factory=StageSettings)
+    letter_stage: StageSettings = field(default_factory=StageSettings)
+    pipeline_queue_size: int = DEFAULT_QUEUE_SIZE
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    anthropic_http: HTTPSettings = field(default_factory=HTTPSettings)
+    openai_stream_max_chars: int = 0
+    anthropic_stream_max_chars: int = 0
+    anthropic_prompt_cache: bool = True
+    openai_base_url: Optional[str] = None
+    anthropic_api_url: Optional[str] = None
+    sheets_api_endpoint: Optional[str] = None
+    retry: RetrySettings = field(default_factory=RetrySettings)
+    batch: BatchSettings = field(default_factory=BatchSettings)
+    sheets: SheetsSettings = field(default_factory=SheetsSettings)
 
     @classmethod
     def from_dict(cls, data: Dict[str, object]) -> "AppConfig":
         ranges = data.get("ranges", {})  # type: ignore[arg-type]
-        output = data.get("output", {})  # type: ignore[arg-type]
         openai = data.get("openai", {})  # type: ignore[arg-type]
         anthropic = data.get("anthropic", {})  # type: ignore[arg-type]
+        pipeline = data.get("pipeline", {})  # type: ignore[arg-type]
         return cls(
-            spreadsheet_id=str(data["spreadsheet_id"]),
-            service_account_file=str(data["service_account_file"]),
+            **common_settings(data),  # type: ignore[arg-type]
             company_names_range=str(ranges["company_names"]),
-            search_prompt_range=str(ranges["search_prompt_template"]),
             message_prompt_range=str(ranges["message_prompt_template"]),
-            business_info_range=str(ranges["business_info"]),
-            output_sheet_name=str(output.get("sheet_name", "結果")),
-            output_start_row=int(output.get("start_row", 2)),
             openai_model=str(openai.get("model", "gpt-5")),
             openai_max_tokens=int(openai.get("max_tokens", 10024)),
-            openai_api_key=str(openai.get("api_key", "")) or None,
-            openai_api_key_env=str(openai.get("api_key_env", "OPENAI_API_KEY")),
             anthropic_model=str(anthropic.get("model", "claude-opus-4-1-20250805")),
             anthropic_max_tokens=int(anthropic.get("max_tokens", 1024)),
             anthropic_api_key=str(anthropic.get("api_key", "")) or None,
             anthropic_api_key_env=str(anthropic.get("api_key_env", "ANTHROPIC_API_KEY")),
-            request_interval=float(data.get("request_interval", anthropic.get("request_interval", openai.get("request_interval", 0)))),
+            search_stage=StageSettings(concurrency=max(1, int(openai.get("concurrency", 1)))),
+            letter_stage=StageSettings(concurrency=max(1, int(anthropic.get("concurrency", 1)))),
+            pipeline_queue_size=max(1, int(pipeline.get("queue_size", DEFAULT_QUEUE_SIZE))),
+            anthropic_http=HTTPSettings.from_dict(anthropic.get("http", {})),
+            openai_stream_max_chars=int(openai.get("stream_max_chars", 0)),
+            anthropic_stream_max_chars=int(anthropic.get("stream_max_chars", 0)),
+            anthropic_prompt_cache=bool(anthropic.get("prompt_cache", True)),
+            anthropic_api_url=str(anthropic.get("api_url", "")) or None,
         )
 
 
 def load_config(path: Path) -> AppConfig:
-    with path.open("r", encoding="utf-8") as fh:
-        data = json.load(fh)
-    config = AppConfig.from_dict(data)
-
-    # Resolve service account credential file to an absolute path for
-    # robust execution regardless of current working directory.
-    service_account = config.service_account_file
-    resolved_path: Optional[Path] = None
-
-    def _candidate_paths() -> List[Path]:
-        candidates: List[Path] = []
-        given = Path(service_account)
-        if given.is_absolute():
-            candidates.append(given)
-        else:
-            # 1) Relative to config file location
-            candidates.append((path.parent / given))
-            # 2) Relative to repository root (two levels up from src)
-            repo_root = CURRENT_DIR.parent.parent
-            candidates.append((repo_root / given))
-            # 3) Relative to this module directory (rare but harmless)
-            candidates.append((CURRENT_DIR / given))
-        # 4) Environment variable fallback
-        env = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "").strip()
-        if env:
-            candidates.append(Path(env))
-        return candidates
-
-    for candidate in _candidate_paths():
-        try:
-            if candidate.exists():
-                resolved_path = candidate.resolve()
-                break
-        except OSError:
-            # Ignore permission or transient FS errors when checking candidates
-            continue
+    return load_job_config(path, AppConfig.from_dict)
+
+
+def _iter_data_blocks(
+    sheet: SpreadsheetHandle,
+    config: AppConfig,
+    columns: ColumnIndexes,
+    overwrite: bool,
+) -> Iterator[Tuple[int, List[List[str]]]]:
+    """Yield row blocks holding only the cells run_job needs.
+
+    Input columns are always read. Unless overwriting, the セールスレター column
+    decides which rows are skipped, and the 検索結果 column, which is only
+    reused for rows whose letter is still empty, is fetched for those rows alone.
+    """
+    wanted = columns.input_columns() + ([] if overwrite else [columns.sales_letter])
+    # Rows hold a company when their name or URL is set, so those columns bound the read.
+    blocks = iter_column_blocks(
+        sheet,
+        config.output_sheet_name,
+        wanted,
+        config.output_start_row,
+        config.read_block_size,
+        key_columns=[columns.name, columns.url],
+    )
+    for first_row, rows in blocks:
+        if not overwrite:
+            unfinished = [
+                first_row + offset
+                for offset, row in enumerate(rows)
+                if (safe_get(row, columns.name) or safe_get(row, columns.url)) and not safe_get(row, columns.sales_letter)
+            ]
+            found = fetch_column_cells(sheet, config.output_sheet_name, columns.search_result, unfinished)
+            for row_number, value in found.items():
+                row = rows[row_number - first_row]
+                row.extend([""] * (columns.search_result + 1 - len(row)))
+                row[columns.search_result] = value
+        yield first_row, rows
 
-    if resolved_path is None:
-        tried = ", ".join(str(p) for p in _candidate_paths())
-        raise FileNotFoundError(
-            f"Service account file not found. Tried: {tried}"
-        )
 
-    config.service_account_file = str(resolved_path)
-    return config
+@dataclass
+class RowResult:
+    """Generated outputs for a single row, ready to be written back."""
 
+    search_result: str
+    sales_letter: str
+    search_prompt: Optional[str] = None
+    replayed: bool = False
 
-def read_single_cell(sheet: "SpreadsheetHandle", range_name: str) -> str:
-    values = sheet.fetch_values(range_name)
-    if not values or not values[0]:
-        raise ValueError(f"Range {range_name} is empty; check spreadsheet setup")
-    return values[0][0]
 
+def _needs_processing(record: CompanyRecord, overwrite: bool) -> bool:
+    return overwrite or not record.sales_letter
 
-@dataclass
-class ColumnIndexes:
-    """Hold zero-based column indexes resolved from the header row."""
 
-    name: int
-    url: int
-    search_result: int
-    sales_letter: int
-    num_employees: Optional[int] = None
-    contact_form_url: Optional[int] = None
-    address: Optional[int] = None
-    prefecture_id: Optional[int] = None
-    registered_company_name: Optional[int] = None
+def _journal_key(record: CompanyRecord) -> JournalKey:
+    return record.row_number, company_hash(record.name, record.url, record.registered_company_name)
+
+
+def _dedup_key(record: CompanyRecord) -> Optional[str]:
+    return company_key(record.url, record.registered_company_name)
+
+
+def _letter_key(record: CompanyRecord, search_result: str) -> Optional[Tuple[str, str]]:
+    """Rows share a letter only when they are the same company with the same search result."""
+    key = _dedup_key(record)
+    return None if key is None else (key, search_result)
 
 
 @dataclass
-class CompanyRecord:
-    """Represent a single spreadsheet row with the required context."""
+class StreamMode:
+    """Whether API replies are streamed, and the length caps that abort them early (0 = no cap)."""
+
+    enabled: bool = False
+    search_max_chars: int = 0
+    letter_max_chars: int = 0
+
+    @staticmethod
+    def _abort(limit: int) -> Optional[AbortPredicate]:
+        return max_chars(limit) if limit > 0 else None
+
+    @property
+    def search_abort(self) -> Optional[AbortPredicate]:
+        return self._abort(self.search_max_chars)
+
+    @property
+    def letter_abort(self) -> Optional[AbortPredicate]:
+        return self._abort(self.letter_max_chars)
+
+
+def _search_stage(
+    record: CompanyRecord,
+    builder: PromptBuilder,
+    openai_client: OpenAIClient,
+    overwrite: bool,
+    use_web_search: bool,
+    streaming: Optional[StreamMode] = None,
+) -> Tuple[str, Optional[str]]:
+    """Return (search_result, search_prompt); the prompt is None when the sheet value is reused."""
+    search_result = record.search_result
+    if not overwrite and search_result:
+        return search_result, None
+
+    search_prompt = builder.render_search_prompt(record.prompt_context())
+    if streaming is not None and streaming.enabled:
+        stream_call = openai_client.stream_search if use_web_search else openai_client.stream_text
+        search_result = stream_call(search_prompt, streaming.search_abort).final_text()
+    elif use_web_search:
+        search_result = openai_client.search_and_generate(search_prompt)
+    else:
+        search_result = openai_client.generate_text(search_prompt)
+    return search_result, search_prompt
+
+
+def _letter_stage(
+    record: CompanyRecord,
+    builder: PromptBuilder,
+    claude_client: ClaudeClient,
+    overwrite: bool,
+    search_result: str,
+    streaming: Optional[StreamMode] = None,
+) -> str:
+    """Return the sales letter, generating it with Claude unless the sheet value is kept."""
+    sales_letter = record.sales_letter if not overwrite else ""
+    if overwrite or not sales_letter:
+        message_prompt = builder.render_message_prompt(record.prompt_context(), search_result)
+        if streaming is not None and streaming.enabled:
+            sales_letter = claude_client.stream_text(message_prompt, streaming.letter_abort).final_text()
+        else:
+            sales_letter = claude_client.generate_text(message_prompt)
+    return sales_letter
 
-    row_number: int
-    name: str
-    url: str
-    search_result: str
-    sales_letter: str
-    num_employees: str = ""
-    contact_form_url: str = ""
-    address: str = ""
-    prefecture_id: str = ""
-    registered_company_name: str = ""
-
-    def prompt_context(self) -> Dict[str, str]:
-        """Return replacements for prompt templates."""
-        return {
-            "company_name": self.name,
-            "company_name_encoded": _url_encode(self.name),
-            "company_url": self.url,
-            "num_employees": self.num_employees,
-            "contact_form_url": self.contact_form_url,
-            "address": self.address,
-            "prefecture_id": self.prefecture_id,
-            "registered_company_name": self.registered_company_name,
-            "registered_company_name_encoded": _url_encode(self.registered_company_name),
-        }
-
-
-def _collect_header_values(row: List[str]) -> List[str]:
-    return [cell.strip() for cell in row]
-
-
-def _url_encode(value: str) -> str:
-    if not value:
-        return ""
-    return quote_plus(value)
-
-
-def _build_column_indexes(header: List[str]) -> ColumnIndexes:
-    normalized = _collect_header_values(header)
-    positions: Dict[str, List[int]] = {}
-    for idx, value in enumerate(normalized):
-        if not value:
-            continue
-        positions.setdefault(value, []).append(idx)
-
-    def pick(label: str, *, required: bool = False, prefer_before: Optional[int] = None, prefer_after: Optional[int] = None) -> Optional[int]:
-        candidates = positions.get(label, [])
-        if prefer_before is not None:
-            before_candidates = [idx for idx in candidates if idx < prefer_before]
-            if before_candidates:
-                candidates = before_candidates
-        if prefer_after is not None:
-            after_candidates = [idx for idx in candidates if idx > prefer_after]
-            if after_candidates:
-                candidates = after_candidates
-        if not candidates:
-            if required:
-                raise ValueError(f"列 '{label}' がヘッダーにありません。スプレッドシートを確認してください。")
-            return None
-        return candidates[0]
-
-    url_idx = pick("URL", required=True)
-    if url_idx is None:  # for type checker; runtime guarded above
-        raise AssertionError("URL column lookup failed")
-
-    name_idx = pick("NAME", required=True, prefer_before=url_idx)
-    if name_idx is None:
-        raise AssertionError("NAME column lookup failed")
-    num_idx = pick("NUM_EMPLOYEES", prefer_before=url_idx)
-    contact_idx = pick("CONTACT_FORM_URL", prefer_after=url_idx)
-    address_idx = pick("ADDRESS", prefer_after=url_idx)
-    prefecture_idx = pick("PREFECTURE_ID", prefer_after=url_idx)
-
-    registered_idx = None
-    for label in ("REGISTERED_COMPANY_NAME", "REGISTERED_NAME", "登記業名"):
-        candidate = pick(label, prefer_before=url_idx)
-        if candidate is not None:
-            registered_idx = candidate
-            break
-
-    search_idx = pick("検索結果", required=True, prefer_after=url_idx)
-    if search_idx is None:
-        raise AssertionError("検索結果 column lookup failed")
-    sales_idx = pick("セールスレター", required=True, prefer_after=search_idx)
-    if sales_idx is None:
-        raise AssertionError("セールスレター column lookup failed")
-
-    return ColumnIndexes(
-        name=name_idx,
-        url=url_idx,
-        search_result=search_idx,
-        sales_letter=sales_idx,
-        num_employees=num_idx,
-        contact_form_url=contact_idx,
-        address=address_idx,
-        prefecture_id=prefecture_idx,
-        registered_company_name=registered_idx,
-    )
 
+SearchOutput = Optional[Tuple[str, Optional[str]]]
 
-def _safe_get(row: List[str], index: Optional[int]) -> str:
-    if index is None:
-        return ""
-    if index < len(row):
-        return row[index].strip()
-    return ""
 
+@dataclass
+class RowSteps:
+    """Search and letter steps shared by the --workers and --pipeline paths.
+
+    When a journal is attached, finished work recorded by a previous run is
+    reused instead of calling the APIs again, and new results are journaled
+    as soon as they are generated. With `dedup`, rows of the same company
+    make one search and one letter call between them. With `metrics`, each
+    row's wall time and each search/letter stage that called an API are timed.
+    """
+
+    builder: PromptBuilder
+    openai_client: OpenAIClient
+    claude_client: ClaudeClient
+    overwrite: bool
+    use_web_search: bool
+    journal: Optional[RunJournal] = None
+    streaming: Optional[StreamMode] = None
+    dedup: Optional[CompanyDedup] = None
+    metrics: Optional[RunMetrics] = None
+
+    def _timed(self, stage: str, record: CompanyRecord, func: Callable[[], T]) -> T:
+        if self.metrics is None:
+            return func()
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.metrics.observe("stage", stage, time.perf_counter() - started, row=record.row_number)
 
-def _column_number_to_a1(index: int) -> str:
-    index += 1
-    letters: List[str] = []
-    while index > 0:
-        index, remainder = divmod(index - 1, 26)
-        letters.append(chr(65 + remainder))
-    return "".join(reversed(letters))
+    def journal_entry(self, record: CompanyRecord) -> Optional[JournalEntry]:
+        if self.journal is None:
+            return None
+        return self.journal.state.get(_journal_key(record))
+
+    def search(self, record: CompanyRecord) -> SearchOutput:
+        """Return (search_result, search_prompt), or None when the row is skipped."""
+        if self.metrics is not None:
+            self.metrics.row_started(record.row_number)
+        entry = self.journal_entry(record)
+        if entry is not None and entry.written:
+            return None
+        if not _needs_processing(record, self.overwrite):
+            return None
+        if entry is not None and entry.search_result is not None:
+            return entry.search_result, None
+
+        def call() -> Tuple[str, Optional[str]]:
+            return self._timed(
+                "search",
+                record,
+                lambda: _search_stage(
+                    record, self.builder, self.openai_client, self.overwrite, self.use_web_search, self.streaming
+                ),
+            )
 
+        if not self.overwrite and record.search_result:
+            # A search result already on the sheet belongs to this row; only API calls are shared.
+            search_result, search_prompt = record.search_result, None
+            generated = False
+        elif self.dedup is not None:
+            search_result, search_prompt = self.dedup.search.run(_dedup_key(record), record.row_number, call)
+            generated = True
+            if record.row_number in self.dedup.search.sources:
+                search_prompt = None
+        else:
+            search_result, search_prompt = call()
+            generated = True
+        if self.journal is not None and generated:
+            self.journal.record_search(_journal_key(record), search_result)
+        return search_result, search_prompt
+
+    def letter(self, record: CompanyRecord, searched: SearchOutput) -> Optional[RowResult]:
+        """Return the finished row, replaying a journaled letter when one exists."""
+        if searched is None:
+            return None
+        search_result, search_prompt = searched
+        entry = self.journal_entry(record)
+        if entry is not None and entry.sales_letter is not None:
+            return RowResult(search_result=search_result, sales_letter=entry.sales_letter, replayed=True)
+
+        def call() -> str:
+            return self._timed(
+                "letter",
+                record,
+                lambda: _letter_stage(
+                    record, self.builder, self.claude_client, self.overwrite, search_result, self.streaming
+                ),
+            )
 
-def _build_company_records(rows: List[List[str]], columns: ColumnIndexes, start_row: int) -> List[CompanyRecord]:
-    records: List[CompanyRecord] = []
-    for offset, row in enumerate(rows):
-        name = _safe_get(row, columns.name)
-        url = _safe_get(row, columns.url)
-        if not name and not url:
+        if self.dedup is not None:
+            sales_letter = self.dedup.letter.run(_letter_key(record, search_result), record.row_number, call)
+        else:
+            sales_letter = call()
+        return self.finish(record, searched, sales_letter)
+
+    def finish(self, record: CompanyRecord, searched: Tuple[str, Optional[str]], sales_letter: str) -> RowResult:
+        """Journal a newly generated letter and return the finished row."""
+        search_result, search_prompt = searched
+        if self.journal is not None:
+            self.journal.record_letter(_journal_key(record), search_result, sales_letter)
+        return RowResult(search_result=search_result, sales_letter=sales_letter, search_prompt=search_prompt)
+
+    def generate(self, record: CompanyRecord) -> Optional[RowResult]:
+        return self.letter(record, self.search(record))
+
+
+def _gated(gate: Optional[AdaptiveConcurrency], func: Callable[[CompanyRecord], T]) -> Callable[[CompanyRecord], T]:
+    return func if gate is None else gate.wrap(func)
+
+
+def _run_pipelined(
+    config: AppConfig,
+    records: Iterable[CompanyRecord],
+    steps: RowSteps,
+    retries: RetryRegistry,
+) -> Tuple[Iterator[TaskOutcome[CompanyRecord, Optional[RowResult]]], Dict[str, AdaptiveConcurrency]]:
+    """Stream rows through an OpenAI search stage feeding a Claude letter stage."""
+    print(
+        f"[pipeline] search stage: {config.search_stage.concurrency} workers, "
+        f"letter stage: {config.letter_stage.concurrency} workers, queue size {config.pipeline_queue_size}"
+    )
+    # Each stage backs off only on its own provider's throttling.
+    gates = {
+        "search": retries.adaptive_gate(["openai"], config.search_stage.concurrency),
+        "letter": retries.adaptive_gate(["anthropic"], config.letter_stage.concurrency),
+    }
+    outcomes = run_two_stage(
+        records,
+        _gated(gates["search"], steps.search),
+        _gated(gates["letter"], steps.letter),
+        first_workers=config.search_stage.concurrency,
+        second_workers=config.letter_stage.concurrency,
+        queue_size=config.pipeline_queue_size,
+    )
+    return outcomes, {name: gate for name, gate in gates.items() if gate is not None}
+
+
+def _batch_letters(
+    config: AppConfig,
+    claude_client: ClaudeClient,
+    batch_client: ClaudeBatchClient,
+    prompts: Dict[int, str],
+    deliver: Callable[[int, str], None],
+) -> None:
+    """Generate letters for `prompts` (keyed by row number) through Message Batches.
+
+    Cached letters are delivered without a request. Rows whose batch request
+    errored, expired or is missing are left undelivered for the caller.
+    """
+    cache = claude_client.cache
+    requests: List[Tuple[str, Dict[str, object]]] = []
+    keys: Dict[str, str] = {}
+    for row_number, prompt in prompts.items():
+        key = claude_client.cache_key_for(prompt)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            deliver(row_number, cached)
             continue
-        record = CompanyRecord(
-            row_number=start_row + offset,
-            name=name,
-            url=url,
-            search_result=_safe_get(row, columns.search_result),
-            sales_letter=_safe_get(row, columns.sales_letter),
-            num_employees=_safe_get(row, columns.num_employees),
-            contact_form_url=_safe_get(row, columns.contact_form_url),
-            address=_safe_get(row, columns.address),
-            prefecture_id=_safe_get(row, columns.prefecture_id),
-            registered_company_name=_safe_get(row, columns.registered_company_name),
+        custom_id = row_custom_id(row_number)
+        keys[custom_id] = key
+        requests.append((custom_id, claude_client.request_params(prompt)))
+
+    for group in chunked(requests, config.batch.max_requests):
+        batch = batch_client.create(group)
+        print(f"[batch] Submitted {batch.id} ({len(group)} letters)")
+        batch = batch_client.wait(batch.id, config.batch.poll_interval, on_poll=report_progress())
+        results = batch_client.results(batch)
+        for custom_id, _ in group:
+            result = results.get(custom_id)
+            if result is None or result.error is not None:
+                reason = result.error if result is not None else f"no result in batch {batch.id}"
+                print(f"[batch] {custom_id}: {reason}; retrying with the Messages API")
+                continue
+            if cache is not None:
+                cache.put(keys[custom_id], result.text)
+            deliver(custom_id_row(custom_id), result.text)
+
+
+def _run_batched(
+    config: AppConfig,
+    records: Iterable[CompanyRecord],
+    steps: RowSteps,
+    batch_client: ClaudeBatchClient,
+    retries: RetryRegistry,
+    workers: int,
+) -> Tuple[List[TaskOutcome[CompanyRecord, Optional[RowResult]]], Dict[str, AdaptiveConcurrency]]:
+    """Search every row, then generate the pending letters as Message Batches.
+
+    Letters whose batch request failed fall back to one synchronous Messages
+    API call per row, so a batch failure never leaves a row unwritten. With
+    dedup, one prompt is sent per company and its letter goes to every row of it.
+    """
+    gates = {
+        "search": retries.adaptive_gate(["openai"], workers),
+        "letter": retries.adaptive_gate(["anthropic"], workers),
+    }
+    searched = list(run_ordered(_gated(gates["search"], steps.search), records, workers=workers))
+
+    pending: List[TaskOutcome[CompanyRecord, SearchOutput]] = []
+    for outcome in searched:
+        entry = steps.journal_entry(outcome.item)
+        if outcome.ok and outcome.result is not None and (entry is None or entry.sales_letter is None):
+            pending.append(outcome)
+    by_row = {outcome.item.row_number: outcome for outcome in pending}
+    # Leader row -> rows that take the same letter.
+    if steps.dedup is not None:
+        followers = steps.dedup.letter.group(
+            (_letter_key(outcome.item, outcome.result[0]), outcome.item.row_number)  # type: ignore[index]
+            for outcome in pending
         )
-        records.append(record)
-    return records
+    else:
+        followers = {row_number: [] for row_number in by_row}
+    leaders = [by_row[row_number] for row_number in followers]
+    rendered = steps.builder.render_message_prompts(
+        [outcome.item.prompt_context() for outcome in leaders],
+        [outcome.result[0] for outcome in leaders],  # type: ignore[index]
+    )
+    prompts = {outcome.item.row_number: prompt for outcome, prompt in zip(leaders, rendered)}
 
+    letters: Dict[int, RowResult] = {}
 
-def run_job(config: AppConfig, limit: Optional[int], overwrite: bool, dry_run: bool, use_web_search: bool = False) -> None:
-    client = GoogleSheetsClient(service_account_file=config.service_account_file)
-    sheet = client.open_spreadsheet(config.spreadsheet_id)
+    def deliver(row_number: int, sales_letter: str) -> None:
+        for member in [row_number] + followers[row_number]:
+            outcome = by_row[member]
+            letters[member] = steps.finish(outcome.item, outcome.result, sales_letter)  # type: ignore[arg-type]
 
-    search_template = read_single_cell(sheet, config.search_prompt_range)
-    message_template = read_single_cell(sheet, config.message_prompt_range)
-    self_info = read_single_cell(sheet, config.business_info_range)
+    if prompts:
+        _batch_letters(config, steps.claude_client, batch_client, prompts, deliver)
 
-    builder = PromptBuilder(
-        search_template=search_template,
-        message_template=message_template,
-        self_info=self_info,
-    )
+    failures: Dict[int, BaseException] = {}
+    retry_rows = [row_number for row_number in prompts if row_number not in letters]
+    if retry_rows:
+        print(f"[batch] Generating {len(retry_rows)} letters with the Messages API")
 
-    header_range = f"{config.output_sheet_name}!A1:ZZ1"
-    header_rows = sheet.fetch_values(header_range)
-    if not header_rows:
-        raise ValueError("ヘッダー行が取得できませんでした。スプレッドシートの設定を確認してください。")
-    columns = _build_column_indexes(header_rows[0])
+        def generate(row_number: int) -> str:
+            return steps.claude_client.generate_text(prompts[row_number])
 
-    data_range = f"{config.output_sheet_name}!A{config.output_start_row}:ZZ"
-    data_rows = sheet.fetch_values(data_range)
-    company_records = _build_company_records(data_rows, columns, config.output_start_row)
+        for outcome in run_ordered(_gated(gates["letter"], generate), retry_rows, workers=workers):
+            if outcome.ok:
+                deliver(outcome.item, outcome.result)  # type: ignore[arg-type]
+            else:
+                for member in [outcome.item] + followers[outcome.item]:  # type: ignore[operator]
+                    failures[member] = outcome.error  # type: ignore[assignment]
+
+    outcomes: List[TaskOutcome[CompanyRecord, Optional[RowResult]]] = []
+    for outcome in searched:
+        record = outcome.item
+        if not outcome.ok:
+            outcomes.append(TaskOutcome(item=record, error=outcome.error))
+        elif record.row_number in failures:
+            outcomes.append(TaskOutcome(item=record, error=failures[record.row_number]))
+        elif record.row_number in letters:
+            outcomes.append(TaskOutcome(item=record, result=letters[record.row_number]))
+        else:
+            # Skipped rows (None) and rows whose letter was journaled earlier.
+            outcomes.append(TaskOutcome(item=record, result=steps.letter(record, outcome.result)))
+    return outcomes, {name: gate for name, gate in gates.items() if gate is not None}
 
-    if limit is not None:
-        company_records = company_records[:limit]
 
-    if not company_records:
-        print("処理対象の企業行がありません。シートのデータを確認してください。")
-        return
+@dataclass
+class Campaign:
+    """One spreadsheet's run, prepared by `start_campaign`: rows to process, row steps and write-back handlers.
+
+    `run_job` drives a single campaign; `fanout_runner` interleaves the rows
+    of several. Finished rows are handed to `consume` on the caller's thread,
+    which logs them and queues their writes on `writer`.
+    """
+
+    config: AppConfig
+    job: SheetJob
+    columns: ColumnIndexes
+    records: Iterator[CompanyRecord]
+    steps: RowSteps
+    claude_client: ClaudeClient
+    dry_run: bool = False
+    stream: bool = False
+    journal: Optional[RunJournal] = None
+    replayed: int = 0
+    writer: SheetBatchWriter = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.writer = self.job.writer(self.on_flush)
+
+    def on_flush(self, range_count: int, updated_cells: int, keys: List[object]) -> None:
+        report_flush(range_count, updated_cells)
+        if self.journal is not None:
+            self.journal.record_written(keys)  # type: ignore[arg-type]
+
+    def on_row(self, record: CompanyRecord, row: RowResult) -> str:
+        config, columns = self.config, self.columns
+        if row.replayed:
+            self.replayed += 1
+            print(f"[resume] Row {record.row_number} reusing journaled results")
+        elif self.steps.dedup is not None:
+            source = self.steps.dedup.source_of(record.row_number)
+            if source is not None:
+                print(f"[dedup] Row {record.row_number} reusing results generated for row {source}")
+
+        if row.search_prompt is not None:
+            print(f"[prompt][row {record.row_number}] from sheet '{config.output_sheet_name}':\n{row.search_prompt}\n")
 
-    openai_key = config.openai_api_key or read_openai_key(config.openai_api_key_env)
-    if not openai_key:
-        raise ValueError("OpenAI API key is not configured. Provide openai.api_key or set environment variable.")
+        row_number = record.row_number
+        search_col = column_letter(columns.search_result)
+        sales_col = column_letter(columns.sales_letter)  # type: ignore[arg-type]
+        if self.dry_run:
+            print(
+                f"[dry-run] Would update {config.output_sheet_name}!{search_col}{row_number} "
+                f"and {config.output_sheet_name}!{sales_col}{row_number}"
+            )
+            status = "dry-run"
+        elif columns.sales_letter == columns.search_result + 1:
+            update_range = f"{config.output_sheet_name}!{search_col}{row_number}:{sales_col}{row_number}"
+            print(f"[write] Queued {update_range}")
+            self.writer.add(update_range, [[row.search_result, row.sales_letter]], key=_journal_key(record))
+            status = "queued"
+        else:
+            first_range = f"{config.output_sheet_name}!{search_col}{row_number}"
+            second_range = f"{config.output_sheet_name}!{sales_col}{row_number}"
+            print(f"[write] Queued {first_range} and {second_range}")
+            self.writer.add(first_range, [[row.search_result]])
+            # Key only the last range so the row counts as written once both have landed.
+            self.writer.add(second_range, [[row.sales_letter]], key=_journal_key(record))
+            status = "queued"
+        return "replayed" if row.replayed else status
+
+    def on_skip(self, record: CompanyRecord) -> None:
+        entry = self.steps.journal_entry(record)
+        if entry is not None and entry.written:
+            print(f"[resume] Row {record.row_number} already written by a previous run")
+        else:
+            print(f"[skip] Row {record.row_number} already filled for {record.name or record.url}")
+
+    def consume(self, outcomes: Iterable[TaskOutcome[CompanyRecord, Optional[RowResult]]]) -> int:
+        """Log finished rows and queue their writes; return how many were written or dry-run."""
+        return self.job.consume(outcomes, self.on_row, self.on_skip, self.writer)
+
+    def close(self) -> None:
+        """Close the journal and the run's response cache and trace, and release the Claude connection pool.
+
+        Safe to call more than once; `SheetJob.finish` closes the cache again.
+        """
+        try:
+            if self.journal is not None:
+                self.journal.close()
+        finally:
+            self.job.close()
+            self.job.release_transport(self.claude_client.transport)
+
+    def finish(self, total_processed: int, gates: Optional[Dict[str, AdaptiveConcurrency]] = None) -> None:
+        """Print the run summary and close the journal (call after `writer` has been flushed)."""
+        steps, claude_client = self.steps, self.claude_client
+        try:
+            print(f"Completed processing {total_processed} companies.")
+            if self.replayed:
+                print(f"[journal] {self.replayed} rows written from journaled results without new API calls")
+            if steps.dedup is not None:
+                print(f"[dedup] {steps.dedup.summary()}")
+            print(f"[http] anthropic: {claude_client.transport.stats.summary()}")
+            if claude_client.cache_prefix and claude_client.prompt_cache_stats.requests:
+                print(f"[prompt-cache] anthropic: {claude_client.prompt_cache_stats.summary()}")
+            if self.stream:
+                print(f"[stream] openai: {steps.openai_client.stream_stats.summary()}")
+                print(f"[stream] anthropic: {claude_client.stream_stats.summary()}")
+        finally:
+            self.close()
+        self.job.finish(gates)
+
+
+def start_campaign(
+    config: AppConfig,
+    limit: Optional[int],
+    overwrite: bool,
+    dry_run: bool,
+    use_web_search: bool = False,
+    journal_path: Optional[Path] = None,
+    resume: bool = False,
+    use_cache: bool = True,
+    stream: bool = False,
+    dedupe: bool = False,
+    metrics_path: Optional[Path] = None,
+    clients: Optional[WarmClients] = None,
+    progress: Optional[Callable[[int, str], None]] = None,
+) -> Optional[Campaign]:
+    """Connect to the sheet, read its templates and header and build the clients; None when no rows need work."""
+    job = SheetJob.start(config, metrics_path, clients=clients, progress=progress)
+    try:
+        return _build_campaign(
+            job, config, limit, overwrite, dry_run, use_web_search, journal_path, resume, use_cache, stream, dedupe
+        )
+    except BaseException:
+        # A resident worker keeps running after a failed start, so the job's cache and gates must not leak.
+        job.close()
+        raise
+
+
+def _build_campaign(
+    job: SheetJob,
+    config: AppConfig,
+    limit: Optional[int],
+    overwrite: bool,
+    dry_run: bool,
+    use_web_search: bool,
+    journal_path: Optional[Path],
+    resume: bool,
+    use_cache: bool,
+    stream: bool,
+    dedupe: bool,
+) -> Optional[Campaign]:
+    builder = job.prompt_builder(config.message_prompt_range)
+    columns = job.read_columns(require_sales_letter=True)
+
+    # Rows are read block by block while earlier rows are being processed,
+    # and only the columns the prompts and skip checks need.
+    blocks = _iter_data_blocks(job.sheet, config, columns, overwrite)
+    company_records = job.records(blocks, columns, limit)
+    if company_records is None:
+        job.close()
+        return None
 
     claude_key = config.anthropic_api_key or read_claude_key(config.anthropic_api_key_env)
     if not claude_key:
         raise ValueError("Claude API key is not configured. Provide anthropic.api_key or set environment variable.")
 
-    openai_client = OpenAIClient(
-        api_key=openai_key,
-        model=config.openai_model,
-        max_tokens=config.openai_max_tokens,
-    )
+    cache = job.open_cache(use_cache)
+    openai_client = job.openai_client(config.openai_model, config.openai_max_tokens)
     claude_client = ClaudeClient(
         api_key=claude_key,
         model=config.anthropic_model,
         max_tokens=config.anthropic_max_tokens,
+        rate_limiter=job.rate_limiters.get("anthropic"),
+        cache=cache,
+        transport=job.transport(config.anthropic_http),
+        api_url=config.anthropic_api_url or CLAUDE_API_URL,
+        retry=job.retries.get("anthropic"),
+        cache_prefix=builder.message_prefix if config.anthropic_prompt_cache else "",
+        metrics=job.metrics,
     )
+    if config.anthropic_prompt_cache:
+        prefix_tokens = estimate_tokens(builder.message_prefix)
+        if prefix_tokens < MIN_CACHEABLE_TOKENS:
+            print(
+                f"[prompt-cache] Letter prompts share a prefix of about {prefix_tokens} tokens; Claude caches "
+                f"prefixes from {MIN_CACHEABLE_TOKENS} tokens, so put {{{{self_info}}}} and fixed instructions "
+                "before the first company placeholder"
+            )
 
-    total_processed = 0
-    for record in company_records:
-        if record.sales_letter and not overwrite:
-            print(f"[skip] Row {record.row_number} already filled for {record.name or record.url}")
-            continue
+    journal: Optional[RunJournal] = None
+    if journal_path is not None:
+        journal = RunJournal.open(journal_path, resume=resume)
+        if resume:
+            print(
+                f"[journal] Resuming from {journal_path}: {journal.state.written} rows already written, "
+                f"{journal.state.pending_writes} generated rows pending write"
+            )
 
-        try:
-            company_context = record.prompt_context()
-
-            search_result = record.search_result
-            if overwrite or not search_result:
-                search_prompt = builder.render_search_prompt(company_context)
-                print(
-                    f"[prompt][row {record.row_number}] from sheet '{config.output_sheet_name}':\n{search_prompt}\n"
-                )
-                if use_web_search:
-                    search_result = openai_client.search_and_generate(search_prompt)
-                else:
-                    search_result = openai_client.generate_text(search_prompt)
-
-            sales_letter = record.sales_letter if not overwrite else ""
-            if overwrite or not sales_letter:
-                message_prompt = builder.render_message_prompt(company_context, search_result)
-                sales_letter = claude_client.generate_text(message_prompt)
-        except Exception as err:  # noqa: BLE001 - surface upstream errors
-            identifier = record.name or record.url or f"row {record.row_number}"
-            print(f"[error] {identifier}: {err}")
-            continue
+    steps = RowSteps(
+        builder=builder,
+        openai_client=openai_client,
+        claude_client=claude_client,
+        overwrite=overwrite,
+        use_web_search=use_web_search,
+        journal=journal,
+        streaming=StreamMode(
+            enabled=stream,
+            search_max_chars=config.openai_stream_max_chars,
+            letter_max_chars=config.anthropic_stream_max_chars,
+        ),
+        dedup=CompanyDedup() if dedupe else None,
+        metrics=job.metrics,
+    )
+    return Campaign(
+        config=config,
+        job=job,
+        columns=columns,
+        records=company_records,
+        steps=steps,
+        claude_client=claude_client,
+        dry_run=dry_run,
+        stream=stream,
+        journal=journal,
+    )
 
-        row_number = record.row_number
-        search_col = _column_number_to_a1(columns.search_result)
-        sales_col = _column_number_to_a1(columns.sales_letter)
 
-        if dry_run:
-            print(
-                f"[dry-run] Would update {config.output_sheet_name}!{search_col}{row_number} "
-                f"and {config.output_sheet_name}!{sales_col}{row_number}"
+def run_job(
+    config: AppConfig,
+    limit: Optional[int],
+    overwrite: bool,
+    dry_run: bool,
+    use_web_search: bool = False,
+    workers: int = 1,
+    pipelined: bool = False,
+    journal_path: Optional[Path] = None,
+    resume: bool = False,
+    use_cache: bool = True,
+    stream: bool = False,
+    batch: bool = False,
+    dedupe: bool = False,
+    metrics_path: Optional[Path] = None,
+    clients: Optional[WarmClients] = None,
+    progress: Optional[Callable[[int, str], None]] = None,
+) -> None:
+    campaign = start_campaign(
+        config,
+        limit,
+        overwrite,
+        dry_run,
+        use_web_search=use_web_search,
+        journal_path=journal_path,
+        resume=resume,
+        use_cache=use_cache,
+        stream=stream,
+        dedupe=dedupe,
+        metrics_path=metrics_path,
+        clients=clients,
+        progress=progress,
+    )
+    if campaign is None:
+        return
+    job, steps = campaign.job, campaign.steps
+
+    gates: Dict[str, AdaptiveConcurrency] = {}
+    try:
+        if batch:
+            batch_client = ClaudeBatchClient(
+                api_key=campaign.claude_client.api_key,
+                api_url=campaign.claude_client.api_url,
+                transport=campaign.claude_client.transport,
+                retry=job.retries.get("anthropic"),
+                metrics=job.metrics,
             )
+            outcomes, gates = _run_batched(config, campaign.records, steps, batch_client, job.retries, workers)
+        elif pipelined:
+            outcomes, gates = _run_pipelined(config, campaign.records, steps, job.retries)
         else:
-            if columns.sales_letter == columns.search_result + 1:
-                update_range = (
-                    f"{config.output_sheet_name}!{search_col}{row_number}:{sales_col}{row_number}"
-                )
-                updated = sheet.update_values(update_range, [[search_result, sales_letter]])
-                print(f"[write] Updated {update_range} ({updated} cells)")
-            else:
-                first_range = f"{config.output_sheet_name}!{search_col}{row_number}"
-                second_range = f"{config.output_sheet_name}!{sales_col}{row_number}"
-                updated_first = sheet.update_values(first_range, [[search_result]])
-                updated_second = sheet.update_values(second_range, [[sales_letter]])
-                print(
-                    f"[write] Updated {first_range} ({updated_first} cells) and {second_range} "
-                    f"({updated_second} cells)"
-                )
+            # Throttling from either provider lowers how many rows run at once.
+            outcomes = job.run_rows(steps.generate, campaign.records, workers, ["openai", "anthropic"])
+
+        # LLM calls run on worker threads; logging and sheet writes stay on this
+        # thread so rows are reported in sheet order. (With --pipeline the row
+        # blocks are read on the feeder thread; the Sheets client serialises calls.)
+        with campaign.writer:
+            total_processed = campaign.consume(outcomes)
+    except BaseException:
+        job.gates.update(gates)
+        campaign.close()
+        raise
+    campaign.finish(total_processed, gates)
 
-        total_processed += 1
-        if config.request_interval > 0:
-            time.sleep(config.request_interval)
 
-    print(f"Completed processing {total_processed} companies.")
+def default_journal_path(config_path: Path, config: AppConfig) -> Path:
+    return config_path.parent / "journal" / f"{config.spreadsheet_id}.jsonl"
 
 
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
@@ -414,17 +835,79 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser.add_argument("--overwrite", action="store_true", help="既存のフォーム文章結果があっても上書きします")
     parser.add_argument("--dry-run", action="store_true", help="シート更新を行わず処理内容だけ表示します")
     parser.add_argument("--web-search", action="store_true", help="OpenAIのWeb検索機能を使用して企業情報を検索します")
-    return parser.parse_args(argv)
+    parser.add_argument("--workers", type=int, default=1, help="同時に処理する行数（既定: 1 = 逐次処理）")
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="OpenAI検索とClaude営業文生成を別々の並行数で流す2段パイプラインで処理します（設定ファイルの concurrency を使用）",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="前回の実行ジャーナルを読み込み、書き込み済みの行を飛ばし生成済みの結果を再利用して続きから処理します",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        default=None,
+        help="実行ジャーナル(JSONL)の保存先（既定: 設定ファイルと同じフォルダの journal/<spreadsheet_id>.jsonl）",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="応答キャッシュを使わず、すべての検索・営業文をAPIで生成し直します",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="OpenAI/Claudeの応答をストリーミングで受信し、最初のトークンまでの時間を集計します（stream_max_chars 超過で打ち切り）",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="全行の検索後、営業文をAnthropic Message Batches APIでまとめて生成します（失敗した行は通常のAPIで生成し直します）",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="URLのホスト名と登記社名（登記社名が無ければURLのページ、URLが無ければ登記社名）が同じ行をまとめ、検索・営業文を1回だけ生成して全行に書き込みます",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="行・段・API呼び出しごとの所要時間、送受信バイト数、トークン数、再試行、キャッシュのヒットをJSONLで書き出します",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.batch and (args.pipeline or args.stream):
+        parser.error("--batch cannot be combined with --pipeline or --stream")
+    return args
 
 
 def main(argv: Optional[List[str]] = None) -> None:
-    # Load .env file from parent directory (01_codex)
-    env_path = CURRENT_DIR.parent / ".env"
-    load_dotenv(env_path)
-
     args = parse_args(argv)
+    # Load .env file from parent directory (01_codex)
+    load_env_file(CURRENT_DIR.parent / ".env")
     config = load_config(args.config)
-    run_job(config, limit=args.limit, overwrite=args.overwrite, dry_run=args.dry_run, use_web_search=args.web_search)
+    journal_path = args.journal or default_journal_path(args.config, config)
+    run_job(
+        config,
+        limit=args.limit,
+        overwrite=args.overwrite,
+        dry_run=args.dry_run,
+        use_web_search=args.web_search,
+        workers=args.workers,
+        pipelined=args.pipeline,
+        journal_path=journal_path,
+        resume=args.resume,
+        use_cache=not args.no_cache,
+        stream=args.stream,
+        batch=args.batch,
+        dedupe=args.dedupe,
+        metrics_path=args.metrics,
+    )
 
 
 if __name__ == "__main__":
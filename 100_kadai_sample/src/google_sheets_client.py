@@ -4,17 +4,36 @@
     - スプレッドシートID単位のハンドルを作り、範囲の読み取りと書き込みを行います。
 使用方法:
     - Google Cloudで発行したサービスアカウントJSONを用意し、`GoogleSheetsClient` にパスを渡します。
+    - `api_endpoint` を指定すると接続先を差し替えます（`mock_api_server` などローカルのモックへ向ける用途。この場合は認証しません）。
+    - ディスカバリー文書はネットワークから取得せず、google-api-python-client 同梱の静的コピー（`discovery_document` 指定時はそのファイル）を使います。
+    - `token_cache`（`token_cache.TokenCache`）を渡すと、アクセストークンを暗号化して保存し、有効期限まで次回以降の実行で再利用します。
     - `client.open_spreadsheet(spreadsheet_id)` で `SpreadsheetHandle` を取得し、`fetch_values` や `update_values` を利用します。
+    - 行数の多いシートは `for first_row, rows in handle.iter_row_blocks("結果", start_row=2):` でブロック単位に読み込めます
+      （必要になった時点で次のブロックを取得するため、先頭ブロックの到着後すぐに処理を始められます）。
+    - 一部の列だけが必要な場合は `iter_column_blocks(handle, "結果", [0, 1, 4], start_row=2)` で、
+      指定列だけを `values.batchGet` で取得します（大きな出力列を転送せずに済みます）。
+    - `metrics`（`metrics.RunMetrics`）を渡すと、API呼び出しごとの所要時間と送受信バイト数（JSON本文のサイズ）を `sheets.<メソッド>` として記録します。
+    - 429・5xx・通信エラーは `retry`（`retry_policy.RetryPolicy`）に従ってバックオフしながら再送します。
+    - 多数の行を書き込む場合は `with SheetBatchWriter(handle) as writer: writer.add(range, values)` とすると、
+      `values.batchUpdate` でまとめて1リクエストに集約されます（件数・経過時間のしきい値と終了時に送信）。
 """
 
 from __future__ import annotations
 
+import json
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Iterable, List, Optional, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from metrics import RunMetrics
+from rate_limiter import ProviderRateLimiter
+from retry_policy import RetryPolicy, network_error, status_error
+from token_cache import TokenCache
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 10.0
+DEFAULT_READ_BLOCK_SIZE = 500
 
 DEFAULT_SCOPES: Sequence[str] = (
     "https://www.googleapis.com/auth/spreadsheets",
@@ -22,27 +41,149 @@ DEFAULT_SCOPES: Sequence[str] = (
 )
 
 
+def _http_error():
+    """Return googleapiclient's HttpError; the client libraries are imported on first use."""
+    from googleapiclient.errors import HttpError
+
+    return HttpError
+
+
+@dataclass
+class SheetsSettings:
+    """Typed view over the `sheets` config section."""
+
+    # Encrypted access-token file; empty disables the cache.
+    token_cache: str = ""
+    # Local Sheets v4 discovery document; empty uses the copy bundled with google-api-python-client.
+    discovery_document: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "SheetsSettings":
+        return cls(
+            token_cache=str(data.get("token_cache", "") or ""),
+            discovery_document=str(data.get("discovery_document", "") or ""),
+        )
+
+
+def build_service(
+    service_account_file: str,
+    scopes: Sequence[str],
+    api_endpoint: Optional[str] = None,
+    discovery_document: Optional[str] = None,
+    credentials: Any = None,
+):
+    """Build the Sheets v4 discovery service.
+
+    The Google client libraries take a few hundred milliseconds to import,
+    so they are loaded here rather than at module import; `--help` and
+    `--query` runs never pay for them. The discovery document is never
+    fetched over the network: it comes from `discovery_document` when given,
+    else from the static copy bundled with google-api-python-client.
+    """
+    from googleapiclient.discovery import build, build_from_document
+
+    client_options = None
+    if api_endpoint:
+        from google.auth.credentials import AnonymousCredentials
+
+        # Local mock endpoints do not check credentials.
+        credentials = AnonymousCredentials()
+        client_options = {"api_endpoint": api_endpoint}
+    elif credentials is None:
+        credentials = load_credentials(service_account_file, scopes)
+    if discovery_document:
+        with open(discovery_document, "r", encoding="utf-8") as fh:
+            document = fh.read()
+        return build_from_document(document, credentials=credentials, client_options=client_options)
+    return build(
+        "sheets",
+        "v4",
+        credentials=credentials,
+        client_options=client_options,
+        static_discovery=True,
+        cache_discovery=False,
+    )
+
+
+def load_credentials(service_account_file: str, scopes: Sequence[str], token_cache: Optional[TokenCache] = None) -> Any:
+    """Load service account credentials, primed with a cached access token when one is still valid."""
+    from google.oauth2.service_account import Credentials
+
+    credentials = Credentials.from_service_account_file(service_account_file, scopes=list(scopes))
+    if token_cache is not None:
+        token_cache.load(credentials)
+    return credentials
+
+
+def observe_request(metrics: RunMetrics, request: Any, started: float, status: int, payload: Any = None) -> None:
+    """Record one Sheets API request as `sheets.<method>`.
+
+    The client library hands back parsed JSON, so the reply (`payload`, a
+    dict or an error body) is re-serialised to estimate the bytes received.
+    """
+    if payload is None:
+        received = 0
+    elif isinstance(payload, str):
+        received = len(payload.encode("utf-8"))
+    else:
+        received = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    # HttpRequest.methodId looks like "sheets.spreadsheets.values.batchGet".
+    method = str(getattr(request, "methodId", "") or "request").replace("sheets.spreadsheets.", "")
+    body = getattr(request, "body", None) or ""
+    metrics.observe(
+        "call",
+        f"sheets.{method}",
+        time.perf_counter() - started,
+        status=status,
+        bytes_sent=len(body.encode("utf-8") if isinstance(body, str) else body),
+        bytes_received=received,
+    )
+
+
 @dataclass
 class GoogleSheetsClient:
     """Thin wrapper for Google Sheets API service creation."""
 
     service_account_file: str
     scopes: Sequence[str] = DEFAULT_SCOPES
+    rate_limiter: Optional[ProviderRateLimiter] = None
+    api_endpoint: Optional[str] = None
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("sheets"))
+    metrics: Optional[RunMetrics] = field(default=None, repr=False)
+    token_cache: Optional[TokenCache] = None
+    discovery_document: Optional[str] = None
     _service: Optional[object] = field(default=None, init=False, repr=False)
-
-    def __post_init__(self) -> None:
-        credentials = Credentials.from_service_account_file(
-            self.service_account_file,
-            scopes=list(self.scopes),
-        )
-        self._service = build("sheets", "v4", credentials=credentials)
+    _credentials: Any = field(default=None, init=False, repr=False)
+    _saved_token: Optional[str] = field(default=None, init=False, repr=False)
+    # The discovery service's httplib2 connection is not thread-safe; lazy
+    # readers may run on a feeder thread while writes happen on the main one.
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
 
     @property
-    def service(self):  # pragma: no cover - accessor
+    def service(self):
+        """The discovery service, built on first use (callers hold `_lock`)."""
         if self._service is None:
-            raise RuntimeError("Google Sheets service is not initialized")
+            if not self.api_endpoint:
+                self._credentials = load_credentials(self.service_account_file, self.scopes, self.token_cache)
+                self._saved_token = self._credentials.token
+            self._service = build_service(
+                self.service_account_file,
+                self.scopes,
+                self.api_endpoint,
+                discovery_document=self.discovery_document,
+                credentials=self._credentials,
+            )
         return self._service
 
+    def remember_token(self) -> None:
+        """Write the access token to `token_cache` after it is minted or refreshed (callers hold `_lock`)."""
+        if self.token_cache is None or self._credentials is None:
+            return
+        token = self._credentials.token
+        if token and token != self._saved_token:
+            self.token_cache.save(self._credentials)
+            self._saved_token = token
+
     def open_spreadsheet(self, spreadsheet_id: str) -> "SpreadsheetHandle":
         """Return a handle bound to the provided spreadsheet ID."""
         if not spreadsheet_id:
@@ -57,19 +198,91 @@ class SpreadsheetHandle:
     client: GoogleSheetsClient
     spreadsheet_id: str
 
+    def _execute(self, build_request: Callable[[], Any], failure: str) -> Dict[str, Any]:
+        """Throttle, execute and retry one API request; `failure` prefixes error messages."""
+
+        def attempt() -> Dict[str, Any]:
+            if self.client.rate_limiter is not None:
+                self.client.rate_limiter.acquire()
+            request = None
+            started = time.perf_counter()
+            try:
+                with self.client._lock:
+                    request = build_request()
+                    response = request.execute()
+                    self.client.remember_token()
+            except _http_error() as err:
+                detail = err.content.decode("utf-8", "replace") if isinstance(err.content, bytes) else str(err.content)
+                self._observe(request, started, int(err.resp.status), detail)
+                raise status_error("sheets", int(err.resp.status), f"{failure}: {err}", err.resp, detail) from err
+            except OSError as err:
+                # Socket timeouts and resets from the underlying httplib2 connection.
+                self._observe(request, started, 0)
+                raise network_error(f"{failure}: {err}") from err
+            self._observe(request, started, 200, response)
+            return response
+
+        if self.client.retry is None:
+            return attempt()
+        return self.client.retry.call(attempt)
+
+    def _observe(self, request: Any, started: float, status: int, payload: Any = None) -> None:
+        if self.client.metrics is not None:
+            observe_request(self.client.metrics, request, started, status, payload)
+
     def fetch_values(self, range_name: str) -> List[List[str]]:
         """Return cell values from the given A1 range."""
-        try:
-            response = (
-                self.client.service.spreadsheets()
-                .values()
-                .get(spreadsheetId=self.spreadsheet_id, range=range_name)
-                .execute()
-            )
-        except HttpError as err:
-            raise RuntimeError(f"Failed to fetch {range_name}: {err}") from err
+        response = self._execute(
+            lambda: self.client.service.spreadsheets()
+            .values()
+            .get(spreadsheetId=self.spreadsheet_id, range=range_name),
+            f"Failed to fetch {range_name}",
+        )
         return response.get("values", [])
 
+    def batch_fetch_values(self, ranges: Sequence[str]) -> List[List[List[str]]]:
+        """Return the values of several A1 ranges fetched in one values.batchGet call."""
+        if not ranges:
+            return []
+        response = self._execute(
+            lambda: self.client.service.spreadsheets()
+            .values()
+            .batchGet(spreadsheetId=self.spreadsheet_id, ranges=list(ranges)),
+            f"Failed to batch fetch {len(ranges)} ranges",
+        )
+        return [entry.get("values", []) for entry in response.get("valueRanges", [])]
+
+    def last_data_row(self, sheet_name: str, columns: Sequence[int], start_row: int) -> int:
+        """Return the last row from `start_row` on with a value in any of `columns` (start_row - 1 if none).
+
+        One values.batchGet of the open-ended ranges (`A2:A`); the API trims
+        trailing empty rows, so the longest range ends at the data, blank
+        gaps included. Only the given columns are transferred.
+        """
+        ranges = [f"{sheet_name}!{column_letter(a)}{start_row}:{column_letter(b)}" for a, b in consecutive_runs(columns)]
+        return start_row - 1 + max((len(values) for values in self.batch_fetch_values(ranges)), default=0)
+
+    def iter_row_blocks(
+        self,
+        sheet_name: str,
+        start_row: int,
+        block_size: int = DEFAULT_READ_BLOCK_SIZE,
+        last_column: str = "ZZ",
+        key_columns: Sequence[int] = (0,),
+    ) -> Iterator[Tuple[int, List[List[str]]]]:
+        """Yield (first_row_number, rows) for consecutive blocks of `block_size` rows.
+
+        Blocks are fetched only when the caller asks for the next one, up to
+        the last row with a value in `key_columns` (column A by default), found
+        first with `last_data_row`. Blank rows inside a block are kept and
+        blocks with no values at all are skipped, so rows after a long blank
+        gap are still read.
+        """
+        for first_row, last_row in row_windows(start_row, self.last_data_row(sheet_name, key_columns, start_row), block_size):
+            rows = self.fetch_values(f"{sheet_name}!A{first_row}:{last_column}{last_row}")
+            if rows:
+                yield first_row, rows
+
     def update_values(
         self,
         range_name: str,
@@ -78,29 +291,203 @@ class SpreadsheetHandle:
     ) -> int:
         """Write values into the target range and return updated cell count."""
         body = {"values": values}
-        try:
-            response = (
-                self.client.service.spreadsheets()
-                .values()
-                .update(
-                    spreadsheetId=self.spreadsheet_id,
-                    range=range_name,
-                    valueInputOption=value_input_option,
-                    body=body,
-                )
-                .execute()
-            )
-        except HttpError as err:
-            raise RuntimeError(f"Failed to update {range_name}: {err}") from err
+        response = self._execute(
+            lambda: self.client.service.spreadsheets()
+            .values()
+            .update(
+                spreadsheetId=self.spreadsheet_id,
+                range=range_name,
+                valueInputOption=value_input_option,
+                body=body,
+            ),
+            f"Failed to update {range_name}",
+        )
         return int(response.get("updatedCells", 0))
 
+    def batch_update_values(
+        self,
+        data: Sequence[Tuple[str, List[List[str]]]],
+        value_input_option: str = "USER_ENTERED",
+    ) -> int:
+        """Write several ranges in one values.batchUpdate call and return updated cell count."""
+        if not data:
+            return 0
+        body = {
+            "valueInputOption": value_input_option,
+            "data": [{"range": range_name, "values": values} for range_name, values in data],
+        }
+        response = self._execute(
+            lambda: self.client.service.spreadsheets()
+            .values()
+            .batchUpdate(spreadsheetId=self.spreadsheet_id, body=body),
+            f"Failed to batch update {len(data)} ranges",
+        )
+        return int(response.get("totalUpdatedCells", 0))
+
     def batch_update(self, requests: Iterable[dict]) -> None:
         """Send raw batchUpdate requests to the Sheets API."""
         body = {"requests": list(requests)}
-        try:
-            self.client.service.spreadsheets().batchUpdate(
+        self._execute(
+            lambda: self.client.service.spreadsheets().batchUpdate(
                 spreadsheetId=self.spreadsheet_id,
                 body=body,
-            ).execute()
-        except HttpError as err:
-            raise RuntimeError(f"Batch update failed: {err}") from err
+            ),
+            "Batch update failed",
+        )
+
+
+def row_windows(start_row: int, last_row: int, block_size: int) -> Iterator[Tuple[int, int]]:
+    """Yield inclusive (first, last) row numbers covering start_row..last_row in blocks."""
+    block_size = max(1, block_size)
+    for first in range(start_row, last_row + 1, block_size):
+        yield first, min(first + block_size - 1, last_row)
+
+
+def column_letter(index: int) -> str:
+    """Return the A1 letters for a zero-based column index."""
+    index += 1
+    letters: List[str] = []
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters.append(chr(65 + remainder))
+    return "".join(reversed(letters))
+
+
+def consecutive_runs(values: Iterable[int]) -> List[Tuple[int, int]]:
+    """Group integers into inclusive (first, last) runs of consecutive values."""
+    runs: List[Tuple[int, int]] = []
+    for value in sorted(set(values)):
+        if runs and value == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], value)
+        else:
+            runs.append((value, value))
+    return runs
+
+
+def iter_column_blocks(
+    handle: SpreadsheetHandle,
+    sheet_name: str,
+    columns: Sequence[int],
+    start_row: int,
+    block_size: int = DEFAULT_READ_BLOCK_SIZE,
+    key_columns: Optional[Sequence[int]] = None,
+) -> Iterator[Tuple[int, List[List[str]]]]:
+    """Like `SpreadsheetHandle.iter_row_blocks`, but fetch only `columns` (zero-based).
+
+    Each block is one values.batchGet with a range per run of adjacent
+    columns. Rows are rebuilt at their sheet positions so the same column
+    indexes apply; cells outside `columns` read as "". Reading ends at the
+    last row with a value in `key_columns` (all of `columns` by default);
+    blocks where none of `columns` has a value are skipped.
+    """
+    runs = consecutive_runs(columns)
+    if not runs:
+        return
+    width = runs[-1][1] + 1
+    last_row = handle.last_data_row(sheet_name, columns if key_columns is None else key_columns, start_row)
+    for first_row, block_last_row in row_windows(start_row, last_row, block_size):
+        ranges = [f"{sheet_name}!{column_letter(a)}{first_row}:{column_letter(b)}{block_last_row}" for a, b in runs]
+        rows: List[List[str]] = [[""] * width for _ in range(block_last_row - first_row + 1)]
+        filled = 0
+        for (first_column, _), values in zip(runs, handle.batch_fetch_values(ranges)):
+            for offset, cells in enumerate(values):
+                rows[offset][first_column : first_column + len(cells)] = cells
+            filled = max(filled, len(values))
+        if filled:
+            yield first_row, rows[:filled]
+
+
+def fetch_column_cells(handle: SpreadsheetHandle, sheet_name: str, column: int, row_numbers: Iterable[int]) -> Dict[int, str]:
+    """Return {row_number: value} for one column at the given rows, in one values.batchGet."""
+    runs = consecutive_runs(row_numbers)
+    letter = column_letter(column)
+    ranges = [f"{sheet_name}!{letter}{first}:{letter}{last}" for first, last in runs]
+    cells: Dict[int, str] = {}
+    for (first, _), values in zip(runs, handle.batch_fetch_values(ranges)):
+        for offset, row in enumerate(values):
+            if row:
+                cells[first + offset] = row[0]
+    return cells
+
+
+@dataclass
+class SheetBatchWriter:
+    """Buffer range updates and send them through one values.batchUpdate request.
+
+    Pending updates are flushed once `max_ranges` are queued, when `add` or
+    `flush_if_due` is called more than `flush_interval` seconds after the oldest
+    pending update, on explicit `flush()`, and when used as a context manager,
+    on exit. There is no background timer, so all Sheets traffic stays on the
+    caller's thread: the interval is only checked when the caller calls one of
+    these, and a caller blocked on a slow row keeps its writes until then.
+    `on_flush(range_count, updated_cells, keys)` is called after each successful
+    flush with the non-None `key` values passed to `add` for the flushed ranges.
+    """
+
+    handle: SpreadsheetHandle
+    max_ranges: int = DEFAULT_BATCH_SIZE
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    value_input_option: str = "USER_ENTERED"
+    on_flush: Optional[Callable[[int, int, List[Any]], None]] = None
+    flushes: int = field(default=0, init=False)
+    updated_cells: int = field(default=0, init=False)
+    _pending: List[Tuple[str, List[List[str]]]] = field(default_factory=list, init=False, repr=False)
+    _keys: List[Any] = field(default_factory=list, init=False, repr=False)
+    _oldest: Optional[float] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def add(self, range_name: str, values: List[List[str]], key: Any = None) -> int:
+        """Queue an update; return cells written if this call triggered a flush, else 0."""
+        with self._lock:
+            self._pending.append((range_name, values))
+            self._keys.append(key)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = self._due()
+        return self.flush() if due else 0
+
+    def flush_if_due(self) -> int:
+        """Flush if `max_ranges` or `flush_interval` has been reached; for loops that go a while without `add`."""
+        with self._lock:
+            due = self._due()
+        return self.flush() if due else 0
+
+    def _due(self) -> bool:
+        if not self._pending or self._oldest is None:
+            return False
+        return len(self._pending) >= self.max_ranges or time.monotonic() - self._oldest >= self.flush_interval
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Send all queued updates; entries stay queued if the request fails."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch = list(self._pending)
+            keys = [key for key in self._keys[: len(batch)] if key is not None]
+            updated = self.handle.batch_update_values(batch, self.value_input_option)
+            del self._pending[: len(batch)]
+            del self._keys[: len(batch)]
+            self._oldest = time.monotonic() if self._pending else None
+            self.flushes += 1
+            self.updated_cells += updated
+        if self.on_flush is not None:
+            self.on_flush(len(batch), updated, keys)
+        return updated
+
+    def __enter__(self) -> "SheetBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+            return
+        # Still write the rows finished before the error, but a failing flush
+        # must not replace the exception that is already propagating.
+        try:
+            self.flush()
+        except Exception as flush_error:
+            print(f"[write] {self.pending} queued ranges were not written: {flush_error}")
@@ -0,0 +1,334 @@
+"""
+処理概要:
+    - 標準ライブラリの `http.client` で接続をホストごとにプールし、keep-alive で使い回す同期HTTPトランスポート。
+    - 1件ごとのTCP/TLSハンドシェイクを省き、接続確立にかかった時間と再利用回数を統計として残します。
+    - `http2=True` の場合は `httpx`（`h2` 同梱版）の HTTP/2 クライアントに切り替えます。
+使用方法:
+    - `transport = HTTPTransport(HTTPSettings(pool_size=8))` を作り、`transport.request("POST", url, body, headers)` を呼びます。
+    - 戻り値は `(status, reason, body_bytes, headers)`。通信エラーは `TransportError` として送出されます。
+    - SSEなど本文を逐次読む場合は `with transport.stream(...) as (status, reason, lines, headers):` を使います。途中で抜けると接続は閉じられます。
+    - 実行後は `transport.stats.summary()` で接続確立回数・所要時間を確認できます。
+"""
+
+from __future__ import annotations
+
+import http.client
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+
+# A server may drop an idle keep-alive connection at any time; these are the
+# errors that show up when a request is written to such a connection.
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+# Only these are re-sent on a fresh connection after such an error: the
+# server may already have acted on a POST (created a batch, billed a message)
+# before dropping the connection, so the caller's retry policy decides.
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "DELETE"})
+
+
+class TransportError(RuntimeError):
+    """Network-level failure while talking to the remote host."""
+
+
+class TransportResponse(NamedTuple):
+    """A fully read response; `headers` supports case-insensitive `get`."""
+
+    status: int
+    reason: str
+    body: bytes
+    headers: Mapping[str, str]
+
+
+class StreamedResponse(NamedTuple):
+    """A response whose body is read line by line while it arrives."""
+
+    status: int
+    reason: str
+    lines: Iterator[bytes]
+    headers: Mapping[str, str]
+
+
+@dataclass
+class HTTPSettings:
+    """Pool size, timeouts and protocol for one HTTPTransport."""
+
+    pool_size: int = DEFAULT_POOL_SIZE
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+    http2: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "HTTPSettings":
+        return cls(
+            pool_size=max(1, int(data.get("pool_size", DEFAULT_POOL_SIZE))),  # type: ignore[arg-type]
+            connect_timeout=float(data.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)),  # type: ignore[arg-type]
+            read_timeout=float(data.get("read_timeout", DEFAULT_READ_TIMEOUT)),  # type: ignore[arg-type]
+            http2=bool(data.get("http2", False)),
+        )
+
+
+@dataclass
+class TransportStats:
+    """Counters describing how often connections were opened versus reused."""
+
+    requests: int = 0
+    connections_opened: int = 0
+    connect_seconds: float = 0.0
+    stale_retries: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record(self, opened: bool, connect_seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            if opened:
+                self.connections_opened += 1
+                self.connect_seconds += connect_seconds
+
+    def record_stale_retry(self) -> None:
+        with self._lock:
+            self.stale_retries += 1
+
+    @property
+    def setup_per_request(self) -> float:
+        return self.connect_seconds / self.requests if self.requests else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests} requests over {self.connections_opened} connections, "
+            f"setup {self.connect_seconds:.3f}s total / {self.setup_per_request * 1000:.1f}ms per request"
+        )
+
+
+def load_httpx():
+    """Import httpx on demand; it ships with the openai SDK but is optional here."""
+    try:
+        import httpx
+    except ImportError as err:  # pragma: no cover - depends on environment
+        raise RuntimeError("HTTP/2 and async transports require the 'httpx' package") from err
+    return httpx
+
+
+Origin = Tuple[str, str, int]
+
+
+def _split_url(url: str) -> Tuple[Origin, str]:
+    parts = urlsplit(url)
+    origin: Origin = (parts.scheme, parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80))
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return origin, path
+
+
+class HTTPTransport:
+    """Thread-safe keep-alive connection pool over http.client."""
+
+    def __init__(self, settings: Optional[HTTPSettings] = None) -> None:
+        self.settings = settings or HTTPSettings()
+        self.stats = TransportStats()
+        self._idle: Dict[Origin, "queue.LifoQueue[http.client.HTTPConnection]"] = {}
+        self._slots = threading.BoundedSemaphore(self.settings.pool_size)
+        self._lock = threading.Lock()
+        self._http2_client = None
+        if self.settings.http2:
+            httpx = load_httpx()
+            self._http2_client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(self.settings.read_timeout, connect=self.settings.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.settings.pool_size,
+                    max_keepalive_connections=self.settings.pool_size,
+                ),
+            )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> TransportResponse:
+        """Send one request and return (status, reason, body, headers)."""
+        if self._http2_client is not None:
+            return self._request_http2(method, url, body, headers)
+
+        origin, path = _split_url(url)
+        with self._slots:
+            conn, response = self._open(origin, method, path, body, headers)
+            try:
+                # The body must be fully read before the connection can carry another request.
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as err:
+                conn.close()
+                raise TransportError(str(err) or type(err).__name__) from err
+            self._release(origin, conn, response)
+            return TransportResponse(response.status, response.reason, payload, response.headers)
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Iterator[StreamedResponse]:
+        """Send one request and yield (status, reason, body lines, headers) while the body arrives.
+
+        Leaving the block before the body is exhausted closes the connection
+        instead of returning it to the pool, which stops the server from
+        sending (and billing) the rest of the response.
+        """
+        if self._http2_client is not None:
+            with self._stream_http2(method, url, body, headers) as streamed:
+                yield streamed
+            return
+
+        origin, path = _split_url(url)
+        with self._slots:
+            conn, response = self._open(origin, method, path, body, headers)
+            try:
+                yield StreamedResponse(response.status, response.reason, iter(response.readline, b""), response.headers)
+            except (OSError, http.client.HTTPException) as err:
+                conn.close()
+                raise TransportError(str(err) or type(err).__name__) from err
+            except BaseException:
+                conn.close()
+                raise
+            self._release(origin, conn, response)
+
+    def _open(
+        self,
+        origin: Origin,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        conn, reused = self._checkout(origin)
+        try:
+            response = self._send(conn, method, path, body, headers)
+        except _STALE_CONNECTION_ERRORS as err:
+            conn.close()
+            if not reused or method.upper() not in _IDEMPOTENT_METHODS:
+                raise TransportError(str(err) or type(err).__name__) from err
+            # The pooled connection had been closed by the server; retry once on a fresh one.
+            self.stats.record_stale_retry()
+            conn, reused = self._connect(origin)
+            try:
+                response = self._send(conn, method, path, body, headers)
+            except (OSError, http.client.HTTPException) as retry_err:
+                conn.close()
+                raise TransportError(str(retry_err) or type(retry_err).__name__) from retry_err
+        except (OSError, http.client.HTTPException) as err:
+            conn.close()
+            raise TransportError(str(err) or type(err).__name__) from err
+        self.stats.record(not reused, 0.0 if reused else getattr(conn, "_setup_seconds", 0.0))
+        return conn, response
+
+    def _release(self, origin: Origin, conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        # A closed connection (sock is None) would silently reopen on its next use with the connect timeout.
+        if response.isclosed() and not response.will_close and conn.sock is not None:
+            self._idle_queue(origin).put(conn)
+        else:
+            conn.close()
+
+    def _checkout(self, origin: Origin) -> Tuple[http.client.HTTPConnection, bool]:
+        idle = self._idle_queue(origin)
+        try:
+            return idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(origin)
+
+    def _connect(self, origin: Origin) -> Tuple[http.client.HTTPConnection, bool]:
+        scheme, host, port = origin
+        factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = factory(host, port, timeout=self.settings.connect_timeout)
+        started = time.perf_counter()
+        try:
+            conn.connect()
+        except OSError as err:
+            conn.close()
+            raise TransportError(f"Could not connect to {host}:{port}: {err}") from err
+        conn.sock.settimeout(self.settings.read_timeout)
+        # Attach the setup time to the connection so it is charged to the request that opened it.
+        conn._setup_seconds = time.perf_counter() - started  # type: ignore[attr-defined]
+        return conn, False
+
+    @staticmethod
+    def _send(
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> http.client.HTTPResponse:
+        conn.request(method, path, body=body, headers=dict(headers or {}))
+        return conn.getresponse()
+
+    def _request_http2(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> TransportResponse:
+        httpx = load_httpx()
+        try:
+            response = self._http2_client.request(method, url, content=body, headers=dict(headers or {}))  # type: ignore[union-attr]
+        except httpx.TransportError as err:
+            raise TransportError(str(err)) from err
+        # httpx does not expose handshake timing, so HTTP/2 requests only count towards `requests`.
+        self.stats.record(False, 0.0)
+        return TransportResponse(response.status_code, response.reason_phrase, response.content, response.headers)
+
+    @contextmanager
+    def _stream_http2(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> Iterator[StreamedResponse]:
+        httpx = load_httpx()
+        try:
+            with self._http2_client.stream(method, url, content=body, headers=dict(headers or {})) as response:  # type: ignore[union-attr]
+                self.stats.record(False, 0.0)
+                yield StreamedResponse(response.status_code, response.reason_phrase, response.iter_lines(), response.headers)
+        except httpx.TransportError as err:
+            raise TransportError(str(err)) from err
+
+    def _idle_queue(self, origin: Origin) -> "queue.LifoQueue[http.client.HTTPConnection]":
+        with self._lock:
+            idle = self._idle.get(origin)
+            if idle is None:
+                idle = queue.LifoQueue()
+                self._idle[origin] = idle
+            return idle
+
+    def close(self) -> None:
+        """Close every idle pooled connection."""
+        with self._lock:
+            queues = list(self._idle.values())
+            self._idle.clear()
+        for idle in queues:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+        if self._http2_client is not None:
+            self._http2_client.close()
+
+    def __enter__(self) -> "HTTPTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
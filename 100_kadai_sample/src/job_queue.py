@@ -0,0 +1,240 @@
+"""
+処理概要:
+    - 常駐ワーカー（`worker_daemon.py`）が処理するスプレッドシートの実行依頼を保存するSQLiteのジョブキュー。
+    - 依頼ごとに設定ファイル・実行オプション・状態（queued / running / done / failed / cancelled）と、処理済み・失敗・スキップした行数を記録するため、
+      別のプロセスから `status` で進捗を確認できます。
+    - 同じスプレッドシートの依頼は同時に実行しません（書き込み先と実行ジャーナルが衝突するため、前の依頼の完了を待ちます）。
+使用方法:
+    - `queue = JobQueue(Path("queue/jobs.sqlite3"))` で開き、`queue.submit(config_path, spreadsheet_id, options)` で依頼を登録します。
+    - ワーカーは `queue.claim(worker)` で最も古い実行可能な依頼を取り出し、行が終わるたびに `queue.record_row(job_id, status)`、
+      最後に `queue.finish(job_id, error)` を呼びます。
+    - ワーカーは実行中の依頼の `heartbeat` を定期的に更新します。`queue.requeue_running()` は最後の更新からリース期間（既定60秒）を
+      過ぎた依頼（実行中のまま終了したワーカーの依頼）だけを `resume` 付きで再登録するため、別のワーカーが処理中の依頼は奪いません。
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_QUEUE_PATH = "queue/jobs.sqlite3"
+FINISHED_STATES = ("done", "failed", "cancelled")
+# A running job whose worker has not sent a heartbeat for this long is treated as abandoned.
+DEFAULT_LEASE_SECONDS = 60.0
+# Row statuses reported by SheetJob.consume, grouped into the progress counters.
+_ROW_COUNTERS = {"error": "rows_failed", "skipped": "rows_skipped"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_path TEXT NOT NULL,
+    spreadsheet_id TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    rows_failed INTEGER NOT NULL DEFAULT 0,
+    rows_skipped INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+_COLUMNS = (
+    "id, config_path, spreadsheet_id, options, status, worker, attempts, "
+    "rows_done, rows_failed, rows_skipped, error, submitted, started, finished, heartbeat"
+)
+
+
+@dataclass
+class QueuedJob:
+    """One run request and its progress."""
+
+    id: int
+    config_path: str
+    spreadsheet_id: str
+    options: Dict[str, object]
+    status: str
+    worker: Optional[str] = None
+    attempts: int = 0
+    rows_done: int = 0
+    rows_failed: int = 0
+    rows_skipped: int = 0
+    error: Optional[str] = None
+    submitted: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    heartbeat: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "QueuedJob":
+        values = list(row)
+        values[3] = json.loads(values[3])
+        return cls(*values)
+
+    def elapsed(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds the job has been running (or ran), or None before it starts."""
+        if self.started is None:
+            return None
+        return (self.finished or now or time.time()) - self.started
+
+    def summary(self) -> str:
+        progress = f"{self.rows_done} done, {self.rows_failed} failed, {self.rows_skipped} skipped"
+        elapsed = self.elapsed()
+        timing = f" in {elapsed:.1f}s" if elapsed is not None else ""
+        error = f" ({self.error})" if self.error else ""
+        return f"#{self.id} {self.status:<9} {self.spreadsheet_id} {progress}{timing}{error}"
+
+
+@dataclass
+class JobQueue:
+    """Thread-safe SQLite queue shared by the worker and the submit/status commands."""
+
+    path: Path
+    _conn: sqlite3.Connection = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; claim() opens its own write transaction. Other processes
+        # (submit/status) may hold the file briefly, so wait rather than fail.
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat" not in columns:  # queues created before leases
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+
+    def submit(self, config_path: str, spreadsheet_id: str, options: Optional[Dict[str, object]] = None) -> int:
+        """Queue a run of `config_path` and return its job ID."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (config_path, spreadsheet_id, options, status, submitted) VALUES (?, ?, ?, 'queued', ?)",
+                (config_path, spreadsheet_id, json.dumps(options or {}, ensure_ascii=False), time.time()),
+            )
+            return int(cursor.lastrowid)  # type: ignore[arg-type]
+
+    def claim(self, worker: str) -> Optional[QueuedJob]:
+        """Mark the oldest queued job whose spreadsheet is idle as running and return it (None if none)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' AND spreadsheet_id NOT IN "
+                    "(SELECT spreadsheet_id FROM jobs WHERE status = 'running') ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started = ?, "
+                    "heartbeat = ?, finished = NULL, error = NULL WHERE id = ?",
+                    (worker, now, now, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = QueuedJob.from_row(row)
+        job.status, job.worker, job.attempts, job.started, job.error = "running", worker, job.attempts + 1, now, None
+        job.heartbeat = now
+        return job
+
+    def record_row(self, job_id: int, status: str) -> None:
+        """Count one finished row (`status` as returned by SheetJob.consume); this also renews the job's lease."""
+        counter = _ROW_COUNTERS.get(status, "rows_done")
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {counter} = {counter} + 1, heartbeat = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def heartbeat(self, job_ids: Iterable[int]) -> None:
+        """Renew the lease of running jobs, e.g. while a slow row has not finished yet."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running'",
+                [(now, job_id) for job_id in job_ids],
+            )
+
+    def finish(self, job_id: int, error: Optional[str] = None) -> None:
+        """Mark a running job done, or failed with `error`."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ? AND status = 'running'",
+                ("failed" if error else "done", error, time.time(), job_id),
+            )
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that has not started; return False when it is running or finished."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            return cursor.rowcount > 0
+
+    def requeue_running(self, lease: float = DEFAULT_LEASE_SECONDS) -> int:
+        """Put running jobs without a heartbeat for `lease` seconds back in the queue, resuming from their journals.
+
+        Jobs another live worker is still heartbeating are left alone, so a
+        second worker started on the same queue does not run them twice.
+        """
+        expired = time.time() - lease
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, options FROM jobs WHERE status = 'running' AND COALESCE(heartbeat, started, 0) < ?",
+                    (expired,),
+                ).fetchall()
+                for job_id, options in rows:
+                    resumed = dict(json.loads(options), resume=True)
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker = NULL, options = ? WHERE id = ?",
+                        (json.dumps(resumed, ensure_ascii=False), job_id),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return len(rows)
+
+    def get(self, job_id: int) -> Optional[QueuedJob]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return QueuedJob.from_row(row) if row is not None else None
+
+    def jobs(self, limit: int = 50) -> List[QueuedJob]:
+        """Return the most recent jobs, newest first."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [QueuedJob.from_row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {str(status): int(count) for status, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,203 @@
+"""
+処理概要:
+    - 1回の実行で発生したAPI呼び出し・行・段（検索／営業文）ごとの所要時間、送受信バイト数、トークン使用量、再試行、キャッシュのヒットを記録します。
+    - 各イベントをJSONL（1行1イベント）のトレースに書き出し、実行の最後に名前ごとの p50/p95/p99・最大値と時間帯別の件数（ヒストグラム）を集計して表示します。
+使用方法:
+    - `metrics = RunMetrics.open(path)` で開き（`path=None` ならトレースは書かずに集計のみ）、各クライアントの `metrics` に渡します。
+    - API呼び出しは `metrics.observe("call", "anthropic.messages", seconds, bytes_sent=..., input_tokens=...)`、
+      行は `metrics.row_started(row)` / `metrics.row_finished(row, status)`、回数だけの出来事は `metrics.count("retry", "openai", ...)` で記録します。
+    - 実行後は `metrics.summary_lines()` を表示し、`metrics.close()` でトレースを閉じます。
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, TextIO, Tuple
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is open-ended.
+BUCKET_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Numeric event fields that are summed per (event, name) for the summary.
+TOTAL_FIELDS = ("bytes_sent", "bytes_received", "input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+_TOTAL_LABELS = {
+    "bytes_sent": "sent",
+    "bytes_received": "received",
+    "input_tokens": "tokens in",
+    "output_tokens": "tokens out",
+    "cache_read_tokens": "cache read",
+    "cache_write_tokens": "cache write",
+}
+# Usage keys reported by the Anthropic and OpenAI APIs, mapped to TOTAL_FIELDS.
+_USAGE_KEYS = {
+    "input_tokens": "input_tokens",
+    "prompt_tokens": "input_tokens",
+    "output_tokens": "output_tokens",
+    "completion_tokens": "output_tokens",
+    "cache_read_input_tokens": "cache_read_tokens",
+    "cache_creation_input_tokens": "cache_write_tokens",
+}
+
+Key = Tuple[str, str]
+
+
+def usage_fields(usage: object) -> Dict[str, int]:
+    """Return token counts from an API `usage` object or dict, keyed like TOTAL_FIELDS."""
+    fields: Dict[str, int] = {}
+    if usage is None:
+        return fields
+    for source, target in _USAGE_KEYS.items():
+        value = usage.get(source) if isinstance(usage, dict) else getattr(usage, source, None)
+        if isinstance(value, int) and value:
+            fields[target] = fields.get(target, 0) + value
+    return fields
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of already sorted `values`."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound:g}s"
+
+
+@dataclass
+class Histogram:
+    """Durations observed under one name."""
+
+    samples: List[float] = field(default_factory=list)
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(BUCKET_BOUNDS) + 1))
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        for index, bound in enumerate(BUCKET_BOUNDS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def summary(self) -> str:
+        ordered = sorted(self.samples)
+        return (
+            f"{len(ordered)}x p50 {percentile(ordered, 0.5):.2f}s p95 {percentile(ordered, 0.95):.2f}s "
+            f"p99 {percentile(ordered, 0.99):.2f}s max {ordered[-1]:.2f}s (total {sum(ordered):.1f}s)"
+        )
+
+    def bucket_line(self) -> str:
+        labels = [f"<={_format_bound(bound)}" for bound in BUCKET_BOUNDS] + [f">{_format_bound(BUCKET_BOUNDS[-1])}"]
+        return " ".join(f"{label}:{count}" for label, count in zip(labels, self.buckets) if count)
+
+
+class RunMetrics:
+    """Thread-safe recorder of one run's timings and counters, with an optional JSONL trace."""
+
+    def __init__(self, trace_path: Optional[Path] = None, clock=time.perf_counter) -> None:
+        self.trace_path = trace_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fh: Optional[TextIO] = None
+        self._histograms: Dict[Key, Histogram] = {}
+        self._totals: Dict[Key, Dict[str, int]] = {}
+        self._counts: Dict[Key, int] = {}
+        self._row_started: Dict[int, float] = {}
+
+    @classmethod
+    def open(cls, trace_path: Optional[Path]) -> "RunMetrics":
+        """Create a recorder writing its trace to `trace_path` (replaced if it exists)."""
+        metrics = cls(trace_path)
+        if trace_path is not None:
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+            metrics._fh = trace_path.open("w", encoding="utf-8")
+        return metrics
+
+    def _write(self, event: Dict[str, object]) -> None:
+        # Called with the lock held.
+        if self._fh is not None:
+            self._fh.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def observe(self, event: str, name: str, seconds: float, **fields: object) -> None:
+        """Record one timed event such as an API call, a stage or a row."""
+        record: Dict[str, object] = {"ts": round(time.time(), 3), "event": event, "name": name, "seconds": round(seconds, 4)}
+        record.update(fields)
+        key = (event, name)
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).add(seconds)
+            totals = self._totals.setdefault(key, {})
+            for total in TOTAL_FIELDS:
+                value = fields.get(total)
+                if isinstance(value, int):
+                    totals[total] = totals.get(total, 0) + value
+            self._write(record)
+
+    def count(self, event: str, name: str, **fields: object) -> None:
+        """Record an untimed occurrence such as a retry or a cache hit."""
+        record: Dict[str, object] = {"ts": round(time.time(), 3), "event": event, "name": name}
+        record.update(fields)
+        with self._lock:
+            self._counts[(event, name)] = self._counts.get((event, name), 0) + 1
+            self._write(record)
+
+    def row_started(self, row_number: int) -> None:
+        """Mark the start of work on a row; repeated calls keep the first time."""
+        with self._lock:
+            self._row_started.setdefault(row_number, self._clock())
+
+    def row_finished(self, row_number: int, status: str, **fields: object) -> None:
+        """Record a row's wall time (from `row_started`) under `status` (written, skipped, error, ...)."""
+        with self._lock:
+            started = self._row_started.pop(row_number, None)
+        seconds = self._clock() - started if started is not None else 0.0
+        self.observe("row", status, seconds, row=row_number, **fields)
+
+    def totals(self, event: str, name: str) -> Mapping[str, int]:
+        with self._lock:
+            return dict(self._totals.get((event, name), {}))
+
+    def summary_lines(self) -> List[str]:
+        """Return one line per timed name (with its buckets) and one line of counters."""
+        lines: List[str] = []
+        with self._lock:
+            for (event, name), histogram in sorted(self._histograms.items()):
+                line = f"{event} {name}: {histogram.summary()}"
+                totals = self._totals.get((event, name), {})
+                parts = []
+                for total in TOTAL_FIELDS:
+                    value = totals.get(total)
+                    if value:
+                        shown = _format_bytes(value) if total.startswith("bytes") else str(value)
+                        parts.append(f"{_TOTAL_LABELS[total]} {shown}")
+                if parts:
+                    line += "; " + ", ".join(parts)
+                lines.append(line)
+                lines.append(f"  {histogram.bucket_line()}")
+            if self._counts:
+                counted = ", ".join(f"{event} {name} {count}" for (event, name), count in sorted(self._counts.items()))
+                lines.append(f"counts: {counted}")
+        return lines
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def __enter__(self) -> "RunMetrics":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
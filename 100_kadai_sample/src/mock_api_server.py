@@ -0,0 +1,786 @@
+"""
+処理概要:
+    - Anthropic `/v1/messages`、OpenAI `/v1/chat/completions`・`/v1/responses`・Batch API（`/v1/files`・`/v1/batches`）、
+      Google Sheets `values` API の代わりに応答するローカルHTTPサーバー。料金やクォータを消費せずに実際のクライアント・パイプラインを動かすための負荷試験用です。
+    - プロバイダーごとに応答遅延・ゆらぎ・エラー率・429（`Retry-After` 付き）を設定でき、呼び出し回数と処理時間を記録します。
+使用方法:
+    - `with MockAPIServer(profiles={"anthropic": MockProfile(latency=0.5)}) as server:` で起動し、
+      `server.url("anthropic")` などを各クライアントの接続先（`endpoints` 設定）に指定します。
+    - シートの内容は `server.sheet.put("結果", rows)` のように事前に書き込み、書き込み結果も `server.sheet` で確認できます。
+    - 実行後は `server.stats` から `/v1/messages` などの呼び出し回数・ステータス・処理時間を参照します。
+    - OpenAIのバッチは作成時に全行の応答を用意し、`MockProfile.batch_polls` 回の取得で `in_progress` を返した後に `completed` になります。
+      アップロードされたファイルと作成されたバッチは `server.batches` で確認できます。
+    - AnthropicのMessage Batches（`/v1/messages/batches`）も同様に `batch_polls` 回の取得後に `ended` となり、`results_url` から結果を取得できます。
+      `MockProfile.batch_expire_rate` の割合のリクエストは `expired` として返るため、同期APIへの切り替えを試せます。
+    - `/v1/messages` で `cache_control` 付きのブロックを受け取ると、その位置までの先頭部分を初回は `cache_creation_input_tokens`、
+      2回目以降は `cache_read_input_tokens` として `usage` に計上します（プロンプトキャッシュの確認用）。
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Collection, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_OUTPUT_CHARS = 400
+STREAM_CHUNK_CHARS = 20
+
+_A1_CELL = re.compile(r"^([A-Z]*)(\d*)$")
+
+
+@dataclass
+class MockProfile:
+    """Latency and failure behaviour for one provider."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+    output_chars: int = DEFAULT_OUTPUT_CHARS
+    token_interval: float = 0.0
+    batch_polls: int = 1
+    batch_expire_rate: float = 0.0
+
+    def delay(self, rng: random.Random) -> float:
+        return max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+
+
+@dataclass
+class CallRecord:
+    """One handled request."""
+
+    provider: str
+    route: str
+    status: int
+    seconds: float
+    response_bytes: int = 0
+
+
+@dataclass
+class ServerStats:
+    """Thread-safe log of handled requests."""
+
+    calls: List[CallRecord] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record(self, call: CallRecord) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def by_provider(self) -> Dict[str, List[CallRecord]]:
+        with self._lock:
+            grouped: Dict[str, List[CallRecord]] = {}
+            for call in self.calls:
+                grouped.setdefault(call.provider, []).append(call)
+            return grouped
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def parse_a1(range_name: str) -> Tuple[str, int, int, Optional[int], Optional[int]]:
+    """Return (sheet, first_row, first_col, last_row, last_col) as zero-based indexes; None means open-ended."""
+    sheet, _, cells = range_name.rpartition("!")
+    sheet = sheet.strip("'")
+    start, _, end = cells.partition(":")
+    start_match = _A1_CELL.match(start.upper())
+    if start_match is None:
+        raise ValueError(f"Unsupported A1 range: {range_name}")
+    first_col = _column_index(start_match.group(1)) if start_match.group(1) else 0
+    first_row = int(start_match.group(2)) - 1 if start_match.group(2) else 0
+    if not end:
+        return sheet, first_row, first_col, first_row, first_col
+    end_match = _A1_CELL.match(end.upper())
+    if end_match is None:
+        raise ValueError(f"Unsupported A1 range: {range_name}")
+    last_col = _column_index(end_match.group(1)) if end_match.group(1) else None
+    last_row = int(end_match.group(2)) - 1 if end_match.group(2) else None
+    return sheet, first_row, first_col, last_row, last_col
+
+
+class MockSpreadsheet:
+    """In-memory grid of sheets addressed with A1 ranges."""
+
+    def __init__(self) -> None:
+        self._sheets: Dict[str, List[List[str]]] = {}
+        self._lock = threading.Lock()
+        self.updated_cells = 0
+
+    def put(self, sheet: str, rows: List[List[str]], start_row: int = 0) -> None:
+        """Write `rows` into `sheet` starting at zero-based `start_row`, column A."""
+        with self._lock:
+            grid = self._sheets.setdefault(sheet, [])
+            self._write(grid, start_row, 0, rows)
+
+    def titles(self) -> List[str]:
+        with self._lock:
+            return list(self._sheets)
+
+    def rows(self, sheet: str) -> List[List[str]]:
+        with self._lock:
+            return [list(row) for row in self._sheets.get(sheet, [])]
+
+    def read(self, range_name: str) -> List[List[str]]:
+        sheet, first_row, first_col, last_row, last_col = parse_a1(range_name)
+        with self._lock:
+            grid = self._sheets.get(sheet, [])
+            end_row = len(grid) if last_row is None else min(last_row + 1, len(grid))
+            values = []
+            for row in grid[first_row:end_row]:
+                end_col = len(row) if last_col is None else last_col + 1
+                values.append(list(row[first_col:end_col]))
+        # The real API trims trailing empty rows and cells.
+        for row in values:
+            while row and row[-1] == "":
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def write(self, range_name: str, values: List[List[str]]) -> int:
+        sheet, first_row, first_col, _, _ = parse_a1(range_name)
+        with self._lock:
+            grid = self._sheets.setdefault(sheet, [])
+            count = self._write(grid, first_row, first_col, values)
+            self.updated_cells += count
+            return count
+
+    @staticmethod
+    def _write(grid: List[List[str]], first_row: int, first_col: int, values: List[List[str]]) -> int:
+        count = 0
+        for offset, row_values in enumerate(values):
+            while len(grid) <= first_row + offset:
+                grid.append([])
+            row = grid[first_row + offset]
+            while len(row) < first_col + len(row_values):
+                row.append("")
+            for col_offset, value in enumerate(row_values):
+                row[first_col + col_offset] = str(value)
+                count += 1
+        return count
+
+
+class MockBatchStore:
+    """Uploaded files and batches of the OpenAI Batch API, plus Anthropic Message Batches."""
+
+    def __init__(self) -> None:
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, dict] = {}
+        self.message_batches: Dict[str, dict] = {}
+        self._polls: Dict[str, int] = {}
+        self._answers: Dict[str, Tuple[List[str], List[str]]] = {}
+        self._message_answers: Dict[str, Tuple[bytes, Dict[str, int]]] = {}
+        self.message_results: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def add_file(self, data: bytes) -> str:
+        with self._lock:
+            file_id = f"file-mock{len(self.files) + 1}"
+            self.files[file_id] = data
+            return file_id
+
+    def create(self, input_file_id: str, endpoint: str, metadata: Optional[dict], output_chars: int) -> dict:
+        """Answer every request line now; the batch reports completion later."""
+        with self._lock:
+            data = self.files.get(input_file_id)
+        if data is None:
+            raise KeyError(input_file_id)
+        outputs: List[str] = []
+        errors: List[str] = []
+        for number, raw in enumerate(data.decode("utf-8").splitlines(), start=1):
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            body = line.get("body") or {}
+            prompt = body.get("input") if endpoint.endswith("/responses") else (body.get("messages") or [{}])[-1].get("content")
+            if not prompt:
+                response = {"status_code": 400, "body": {"error": {"type": "invalid_request_error", "message": "empty prompt"}}}
+                target = errors
+            else:
+                document = response_document(body, output_chars) if endpoint.endswith("/responses") else chat_completion_document(body, output_chars)
+                response = {"status_code": 200, "request_id": f"req_mock{number}", "body": document}
+                target = outputs
+            entry = {"id": f"batch_req_mock{number}", "custom_id": line.get("custom_id"), "response": response, "error": None}
+            target.append(json.dumps(entry, ensure_ascii=False))
+        with self._lock:
+            batch_id = f"batch_mock{len(self.batches) + 1}"
+            batch = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": endpoint,
+                "input_file_id": input_file_id,
+                "completion_window": "24h",
+                "status": "in_progress",
+                "output_file_id": None,
+                "error_file_id": None,
+                "created_at": int(time.time()),
+                "request_counts": {"total": len(outputs) + len(errors), "completed": 0, "failed": 0},
+                "metadata": metadata,
+            }
+            self.batches[batch_id] = batch
+            self._polls[batch_id] = 0
+            self._answers[batch_id] = (outputs, errors)
+            return dict(batch)
+
+    def retrieve(self, batch_id: str, polls_before_done: int) -> dict:
+        with self._lock:
+            batch = self.batches[batch_id]
+            self._polls[batch_id] += 1
+            if batch["status"] == "in_progress" and self._polls[batch_id] > polls_before_done:
+                outputs, errors = self._answers.pop(batch_id)
+                for key, lines in (("output_file_id", outputs), ("error_file_id", errors)):
+                    if lines:
+                        file_id = f"file-mock{len(self.files) + 1}"
+                        self.files[file_id] = ("\n".join(lines) + "\n").encode("utf-8")
+                        batch[key] = file_id
+                batch["status"] = "completed"
+                batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+            return dict(batch)
+
+    def create_message_batch(self, requests: List[dict], expired: Collection[str], output_chars: int) -> dict:
+        """Answer every request now; custom_ids in `expired` come back as expired."""
+        lines: List[str] = []
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        for request in requests:
+            params = request.get("params") or {}
+            prompt = message_prompt(params)
+            if request.get("custom_id") in expired:
+                result: dict = {"type": "expired"}
+            elif not prompt:
+                error = {"type": "invalid_request_error", "message": "empty prompt"}
+                result = {"type": "errored", "error": {"type": "error", "error": error}}
+            else:
+                result = {"type": "succeeded", "message": message_document(params, output_chars)}
+            counts[result["type"]] += 1
+            lines.append(json.dumps({"custom_id": request.get("custom_id"), "result": result}, ensure_ascii=False))
+        with self._lock:
+            batch_id = f"msgbatch_mock{len(self.message_batches) + 1}"
+            batch = {
+                "id": batch_id,
+                "type": "message_batch",
+                "processing_status": "in_progress",
+                "request_counts": dict(dict.fromkeys(counts, 0), processing=len(lines)),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "ended_at": None,
+                "results_url": None,
+            }
+            self.message_batches[batch_id] = batch
+            self._polls[batch_id] = 0
+            self._message_answers[batch_id] = (("\n".join(lines) + "\n").encode("utf-8"), counts)
+            return dict(batch)
+
+    def retrieve_message_batch(self, batch_id: str, polls_before_done: int, results_url: str) -> dict:
+        with self._lock:
+            batch = self.message_batches[batch_id]
+            self._polls[batch_id] += 1
+            if batch["processing_status"] == "in_progress" and self._polls[batch_id] > polls_before_done:
+                data, counts = self._message_answers.pop(batch_id)
+                self.message_results[batch_id] = data
+                batch["processing_status"] = "ended"
+                batch["request_counts"] = counts
+                batch["ended_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                batch["results_url"] = results_url
+            return dict(batch)
+
+
+def _mock_text(provider: str, prompt: str, length: int) -> str:
+    head = f"[mock {provider}] {prompt[:40]}"
+    filler = "モック応答の本文です。" * (length // 10 + 1)
+    return (head + " " + filler)[: max(length, len(head))]
+
+
+def message_prompt(body: dict) -> str:
+    """Return the last user message of a Messages API body, joining text blocks."""
+    content = (body.get("messages") or [{}])[-1].get("content", "")
+    if isinstance(content, list):
+        return "".join(str(block.get("text", "")) for block in content if isinstance(block, dict))
+    return str(content)
+
+
+def cached_prefix(body: dict) -> str:
+    """Return the text up to and including the last block marked with `cache_control`."""
+    content = (body.get("messages") or [{}])[-1].get("content", "")
+    if not isinstance(content, list):
+        return ""
+    marked = [index for index, block in enumerate(content) if isinstance(block, dict) and block.get("cache_control")]
+    if not marked:
+        return ""
+    return "".join(str(block.get("text", "")) for block in content[: marked[-1] + 1])
+
+
+def message_document(body: dict, output_chars: int) -> dict:
+    """Return a non-streaming Messages API reply to `body`."""
+    prompt = message_prompt(body)
+    text = _mock_text("anthropic", prompt, output_chars)
+    return {
+        "id": "msg_mock",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": len(prompt) // 3 + 1, "output_tokens": len(text) // 3 + 1},
+    }
+
+
+def chat_completion_document(body: dict, output_chars: int) -> dict:
+    """Return a non-streaming Chat Completions reply to `body`."""
+    prompt = str((body.get("messages") or [{}])[-1].get("content", ""))
+    text = _mock_text("openai", prompt, output_chars)
+    usage = {
+        "prompt_tokens": len(prompt) // 3 + 1,
+        "completion_tokens": len(text) // 3 + 1,
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    return {
+        "id": "chatcmpl-mock",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+def response_document(body: dict, output_chars: int) -> dict:
+    """Return a completed Responses API reply to `body`."""
+    prompt = str(body.get("input", ""))
+    text = _mock_text("openai", prompt, output_chars)
+    usage = {"input_tokens": len(prompt) // 3 + 1, "output_tokens": len(text) // 3 + 1}
+    usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+    return {
+        "id": "resp_mock",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model"),
+        "status": "completed",
+        "max_output_tokens": body.get("max_output_tokens"),
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_mock",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": body.get("tools", []),
+        "usage": usage,
+    }
+
+
+def _chunks(text: str) -> Iterator[str]:
+    for index in range(0, len(text), STREAM_CHUNK_CHARS):
+        yield text[index : index + STREAM_CHUNK_CHARS]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_MockHTTPServer"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:  # noqa: N802 - http.server naming
+        self._dispatch("PUT")
+
+    def _dispatch(self, method: str) -> None:
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        self._raw = self.rfile.read(length) if length else b""
+        is_json = self._raw and not self.headers.get("Content-Type", "").startswith("multipart/")
+        body = json.loads(self._raw) if is_json else {}
+
+        provider, route = self._route(method, path)
+        self._pending: Optional[Tuple[str, str, float]] = (provider or "unknown", route, time.perf_counter())
+        try:
+            if provider is None:
+                self._send_json(404, {"error": {"message": f"No mock route for {method} {path}"}})
+                return
+            profile = self.server.profiles.get(provider, MockProfile())
+            if self._inject_failure(profile):
+                return
+            with self.server.rng_lock:
+                delay = profile.delay(self.server.rng)
+            time.sleep(delay)
+            getattr(self, f"_handle_{route.replace('.', '_')}")(path, body, profile)
+        finally:
+            self._record(500)
+
+    def _record(self, status: int, response_bytes: int = 0) -> None:
+        # Called before the last bytes go out so a caller that has its reply also sees the record.
+        if self._pending is None:
+            return
+        provider, route, started = self._pending
+        self._pending = None
+        self.server.stats.record(
+            CallRecord(
+                provider=provider,
+                route=route,
+                status=status,
+                seconds=time.perf_counter() - started,
+                response_bytes=response_bytes,
+            )
+        )
+
+    @staticmethod
+    def _route(method: str, path: str) -> Tuple[Optional[str], str]:
+        if path.endswith("/v1/files") and method == "POST":
+            return "openai", "files.create"
+        if "/v1/files/" in path and path.endswith("/content"):
+            return "openai", "files.content"
+        if path.endswith("/v1/batches") and method == "POST":
+            return "openai", "batches.create"
+        if "/v1/batches/" in path and method == "GET":
+            return "openai", "batches.retrieve"
+        if path.endswith("/v1/messages/batches") and method == "POST":
+            return "anthropic", "message_batches.create"
+        if "/v1/messages/batches/" in path and method == "GET":
+            return "anthropic", "message_batches.results" if path.endswith("/results") else "message_batches.retrieve"
+        if path.endswith("/v1/messages"):
+            return "anthropic", "messages"
+        if path.endswith("/chat/completions"):
+            return "openai", "chat.completions"
+        if path.endswith("/responses"):
+            return "openai", "responses"
+        if "/v4/spreadsheets/" in path:
+            if path.endswith("/values:batchUpdate"):
+                return "sheets", "values.batchUpdate"
+            if path.endswith("/values:batchGet"):
+                return "sheets", "values.batchGet"
+            if path.endswith(":batchUpdate"):
+                return "sheets", "batchUpdate"
+            if "/values/" in path:
+                return "sheets", "values.get" if method == "GET" else "values.update"
+            return "sheets", "get"
+        return None, path
+
+    def _inject_failure(self, profile: MockProfile) -> bool:
+        with self.server.rng_lock:
+            roll = self.server.rng.random()
+        if roll < profile.throttle_rate:
+            self._send_json(
+                429,
+                {"error": {"type": "rate_limit_error", "message": "mock rate limit"}},
+                {"Retry-After": f"{profile.retry_after:g}"},
+            )
+            return True
+        if roll < profile.throttle_rate + profile.error_rate:
+            self._send_json(500, {"error": {"type": "api_error", "message": "mock server error"}})
+            return True
+        return False
+
+    def _send_json(self, status: int, document: object, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_bytes(status, json.dumps(document, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def _send_bytes(self, status: int, payload: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self._record(status, len(payload))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_events(self, frames: Iterator[str], profile: MockProfile) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        try:
+            for frame in frames:
+                data = frame.encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+                sent += len(data)
+                if profile.token_interval:
+                    time.sleep(profile.token_interval)
+            self._record(200, sent)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the stream.
+            self._record(200, sent)
+            self.close_connection = True
+
+    # -- Anthropic ---------------------------------------------------------
+
+    def _apply_prompt_cache(self, body: dict, usage: Dict[str, int]) -> None:
+        """Move the cached prefix's tokens from `input_tokens` to the cache read/write fields."""
+        prefix = cached_prefix(body)
+        if not prefix:
+            return
+        tokens = len(prefix) // 3 + 1
+        with self.server.prompt_cache_lock:
+            seen = prefix in self.server.cached_prefixes
+            self.server.cached_prefixes.add(prefix)
+        usage["input_tokens"] = max(1, usage["input_tokens"] - tokens)
+        usage["cache_read_input_tokens" if seen else "cache_creation_input_tokens"] = tokens
+
+    def _handle_messages(self, path: str, body: dict, profile: MockProfile) -> None:
+        document = message_document(body, profile.output_chars)
+        self._apply_prompt_cache(body, document["usage"])
+        if not body.get("stream"):
+            self._send_json(200, document)
+            return
+        text = document["content"][0]["text"]
+        usage = document["usage"]
+
+        def frames() -> Iterator[str]:
+            def event(kind: str, document: dict) -> str:
+                return f"event: {kind}\ndata: {json.dumps(dict(document, type=kind), ensure_ascii=False)}\n\n"
+
+            start_usage = {key: value for key, value in usage.items() if key != "output_tokens"}
+            yield event("message_start", {"message": {"id": "msg_mock", "usage": start_usage}})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for chunk in _chunks(text):
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": chunk}})
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {"delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": usage["output_tokens"]}})
+            yield event("message_stop", {})
+
+        self._send_events(frames(), profile)
+
+    def _handle_message_batches_create(self, path: str, body: dict, profile: MockProfile) -> None:
+        requests = list(body.get("requests") or [])
+        with self.server.rng_lock:
+            expired = {request.get("custom_id") for request in requests if self.server.rng.random() < profile.batch_expire_rate}
+        self._send_json(200, self.server.batches.create_message_batch(requests, expired, profile.output_chars))
+
+    def _handle_message_batches_retrieve(self, path: str, body: dict, profile: MockProfile) -> None:
+        batch_id = path.rsplit("/", 1)[-1]
+        results_url = f"http://{self.headers.get('Host')}{path}/results"
+        try:
+            batch = self.server.batches.retrieve_message_batch(batch_id, profile.batch_polls, results_url)
+        except KeyError:
+            self._send_json(404, {"error": {"type": "not_found_error", "message": f"No such batch: {batch_id}"}})
+            return
+        self._send_json(200, batch)
+
+    def _handle_message_batches_results(self, path: str, body: dict, profile: MockProfile) -> None:
+        batch_id = path.rsplit("/", 2)[-2]
+        data = self.server.batches.message_results.get(batch_id)
+        if data is None:
+            self._send_json(404, {"error": {"type": "not_found_error", "message": f"No results for batch: {batch_id}"}})
+            return
+        self._send_bytes(200, data, "application/binary")
+
+    # -- OpenAI ------------------------------------------------------------
+
+    def _handle_chat_completions(self, path: str, body: dict, profile: MockProfile) -> None:
+        document = chat_completion_document(body, profile.output_chars)
+        if not body.get("stream"):
+            self._send_json(200, document)
+            return
+        text = document["choices"][0]["message"]["content"]
+        usage = document["usage"]
+        base = {key: document[key] for key in ("id", "created", "model")}
+
+        def frames() -> Iterator[str]:
+            for chunk in _chunks(text):
+                delta = {"index": 0, "delta": {"content": chunk}, "finish_reason": None}
+                yield f"data: {json.dumps(dict(base, object='chat.completion.chunk', choices=[delta]), ensure_ascii=False)}\n\n"
+            done = {"index": 0, "delta": {}, "finish_reason": "stop"}
+            yield f"data: {json.dumps(dict(base, object='chat.completion.chunk', choices=[done]))}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps(dict(base, object='chat.completion.chunk', choices=[], usage=usage))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        self._send_events(frames(), profile)
+
+    def _handle_responses(self, path: str, body: dict, profile: MockProfile) -> None:
+        response = response_document(body, profile.output_chars)
+        if not body.get("stream"):
+            self._send_json(200, response)
+            return
+        text = response["output"][0]["content"][0]["text"]
+
+        def frames() -> Iterator[str]:
+            def event(kind: str, document: dict) -> str:
+                return f"event: {kind}\ndata: {json.dumps(dict(document, type=kind), ensure_ascii=False)}\n\n"
+
+            yield event("response.created", {"response": dict(response, status="in_progress", output=[])})
+            for chunk in _chunks(text):
+                yield event("response.output_text.delta", {"item_id": "msg_mock", "output_index": 0, "content_index": 0, "delta": chunk})
+            yield event("response.completed", {"response": response})
+
+        self._send_events(frames(), profile)
+
+    def _handle_files_create(self, path: str, body: dict, profile: MockProfile) -> None:
+        content_type = self.headers.get("Content-Type", "")
+        form = BytesParser(policy=policy.HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + self._raw)
+        parts = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+        if "file" not in parts:
+            self._send_json(400, {"error": {"type": "invalid_request_error", "message": "file is required"}})
+            return
+        data = parts["file"].get_payload(decode=True)
+        file_id = self.server.batches.add_file(data)
+        purpose = parts["purpose"].get_content().strip() if "purpose" in parts else ""
+        self._send_json(
+            200,
+            {"id": file_id, "object": "file", "bytes": len(data), "filename": parts["file"].get_filename(), "purpose": purpose},
+        )
+
+    def _handle_files_content(self, path: str, body: dict, profile: MockProfile) -> None:
+        file_id = path.split("/files/", 1)[1].rsplit("/content", 1)[0]
+        data = self.server.batches.files.get(file_id)
+        if data is None:
+            self._send_json(404, {"error": {"type": "invalid_request_error", "message": f"No such file: {file_id}"}})
+            return
+        self._send_bytes(200, data, "application/octet-stream")
+
+    def _handle_batches_create(self, path: str, body: dict, profile: MockProfile) -> None:
+        try:
+            batch = self.server.batches.create(
+                str(body.get("input_file_id", "")), str(body.get("endpoint", "")), body.get("metadata"), profile.output_chars
+            )
+        except KeyError as err:
+            self._send_json(400, {"error": {"type": "invalid_request_error", "message": f"No such file: {err}"}})
+            return
+        self._send_json(200, batch)
+
+    def _handle_batches_retrieve(self, path: str, body: dict, profile: MockProfile) -> None:
+        batch_id = path.rsplit("/", 1)[-1]
+        try:
+            batch = self.server.batches.retrieve(batch_id, profile.batch_polls)
+        except KeyError:
+            self._send_json(404, {"error": {"type": "invalid_request_error", "message": f"No such batch: {batch_id}"}})
+            return
+        self._send_json(200, batch)
+
+    # -- Google Sheets -----------------------------------------------------
+
+    def _range_from_path(self, path: str) -> str:
+        return unquote(path.split("/values/", 1)[1])
+
+    def _handle_values_get(self, path: str, body: dict, profile: MockProfile) -> None:
+        range_name = self._range_from_path(path)
+        self._send_json(200, {"range": range_name, "majorDimension": "ROWS", "values": self.server.sheet.read(range_name)})
+
+    def _handle_values_batchGet(self, path: str, body: dict, profile: MockProfile) -> None:  # noqa: N802 - route name
+        query = urlsplit(self.path).query
+        ranges = [unquote(part.split("=", 1)[1].replace("+", " ")) for part in query.split("&") if part.startswith("ranges=")]
+        self._send_json(
+            200,
+            {"valueRanges": [{"range": name, "majorDimension": "ROWS", "values": self.server.sheet.read(name)} for name in ranges]},
+        )
+
+    def _handle_values_update(self, path: str, body: dict, profile: MockProfile) -> None:
+        range_name = self._range_from_path(path)
+        updated = self.server.sheet.write(range_name, body.get("values", []))
+        self._send_json(200, {"updatedRange": range_name, "updatedCells": updated})
+
+    def _handle_values_batchUpdate(self, path: str, body: dict, profile: MockProfile) -> None:  # noqa: N802 - route name
+        total = sum(self.server.sheet.write(entry["range"], entry.get("values", [])) for entry in body.get("data", []))
+        self._send_json(200, {"totalUpdatedRanges": len(body.get("data", [])), "totalUpdatedCells": total})
+
+    def _handle_batchUpdate(self, path: str, body: dict, profile: MockProfile) -> None:  # noqa: N802 - route name
+        self._send_json(200, {"replies": [{} for _ in body.get("requests", [])]})
+
+    def _handle_get(self, path: str, body: dict, profile: MockProfile) -> None:
+        sheets = [
+            {"properties": {"title": title, "gridProperties": {"rowCount": max(1000, len(self.server.sheet.rows(title)))}}}
+            for title in self.server.sheet.titles()
+        ]
+        self._send_json(200, {"spreadsheetId": path.rsplit("/", 1)[-1], "sheets": sheets})
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, profiles: Dict[str, MockProfile], sheet: MockSpreadsheet, seed: Optional[int]) -> None:
+        super().__init__(address, _Handler)
+        self.profiles = profiles
+        self.sheet = sheet
+        self.batches = MockBatchStore()
+        self.cached_prefixes: Set[str] = set()
+        self.prompt_cache_lock = threading.Lock()
+        self.stats = ServerStats()
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients closing pooled keep-alive connections are expected, not errors.
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockAPIServer:
+    """Run the mock endpoints on a background thread."""
+
+    def __init__(
+        self,
+        profiles: Optional[Dict[str, MockProfile]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.sheet = MockSpreadsheet()
+        self._server = _MockHTTPServer((host, port), dict(profiles or {}), self.sheet, seed)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def stats(self) -> ServerStats:
+        return self._server.stats
+
+    @property
+    def batches(self) -> MockBatchStore:
+        return self._server.batches
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, provider: str) -> str:
+        """Return the endpoint setting each client expects for `provider`."""
+        if provider == "anthropic":
+            return f"{self.base_url}/v1/messages"
+        if provider == "openai":
+            return f"{self.base_url}/v1"
+        if provider == "sheets":
+            return self.base_url
+        raise ValueError(f"Unknown provider: {provider}")
+
+    def start(self) -> "MockAPIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockAPIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
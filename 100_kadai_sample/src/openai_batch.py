@@ -0,0 +1,248 @@
+"""
+処理概要:
+    - OpenAI Batch API（`/v1/files` と `/v1/batches`）でリクエストをまとめて送信し、完了を待って結果を回収するクライアント。
+    - 同期呼び出しより料金が安く、レート制限とは別枠で大量の行を処理できます（完了まで最大24時間）。夜間の一括更新向けです。
+使用方法:
+    - `write_request_file(path, endpoint, requests)` で `(custom_id, body)` の並びをJSONLファイルに書き出します。
+    - `OpenAIBatchClient.submit(path, endpoint)` でアップロードとバッチ作成を行い、`wait(batch_id)` で完了までポーリングします。
+    - `results(job)` は `custom_id` ごとの `batch_jobs.BatchResult`（本文テキストまたはエラー）を返します。出力・エラーファイルに無い `custom_id` は未処理です。
+    - 通信は `http_transport.HTTPTransport`、429・5xxの再送は `retry`（`retry_policy.RetryPolicy`）で行います。
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from batch_jobs import DEFAULT_POLL_INTERVAL, BatchResult, poll_until_done
+from http_transport import HTTPTransport, TransportError
+from retry_policy import RetryPolicy, network_error, status_error
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+CHAT_ENDPOINT = "/v1/chat/completions"
+RESPONSES_ENDPOINT = "/v1/responses"
+COMPLETION_WINDOW = "24h"
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """The fields of a batch object this module acts on."""
+
+    id: str
+    status: str
+    endpoint: str = ""
+    input_file_id: str = ""
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+
+    @classmethod
+    def from_document(cls, document: Mapping[str, object]) -> "BatchJob":
+        counts = document.get("request_counts") or {}
+        return cls(
+            id=str(document["id"]),
+            status=str(document.get("status", "")),
+            endpoint=str(document.get("endpoint", "")),
+            input_file_id=str(document.get("input_file_id", "")),
+            output_file_id=document.get("output_file_id") or None,  # type: ignore[arg-type]
+            error_file_id=document.get("error_file_id") or None,  # type: ignore[arg-type]
+            total=int(counts.get("total", 0) or 0),  # type: ignore[union-attr]
+            completed=int(counts.get("completed", 0) or 0),  # type: ignore[union-attr]
+            failed=int(counts.get("failed", 0) or 0),  # type: ignore[union-attr]
+        )
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def summary(self) -> str:
+        return f"{self.id} {self.status}: {self.completed}/{self.total} completed, {self.failed} failed"
+
+
+def write_request_file(path: Path, endpoint: str, requests: Iterable[Tuple[str, Mapping[str, object]]]) -> int:
+    """Write one JSONL request line per (custom_id, body) and return the line count."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with path.open("w", encoding="utf-8") as fh:
+        for custom_id, body in requests:
+            line = {"custom_id": custom_id, "method": "POST", "url": endpoint, "body": body}
+            fh.write(json.dumps(line, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def _response_text(body: Mapping[str, object]) -> Tuple[str, bool]:
+    """Return (text, truncated) from a raw Responses or Chat Completions body."""
+    texts: List[str] = []
+    for item in body.get("output") or []:  # type: ignore[union-attr]
+        if isinstance(item, dict) and item.get("type") == "message":
+            for part in item.get("content") or []:
+                if isinstance(part, dict) and part.get("type") == "output_text":
+                    texts.append(str(part.get("text", "")).strip())
+    truncated = body.get("status") == "incomplete"
+    for choice in body.get("choices") or []:  # type: ignore[union-attr]
+        content = (choice.get("message") or {}).get("content")
+        if isinstance(content, str):
+            texts.append(content.strip())
+        truncated = truncated or choice.get("finish_reason") == "length"
+    return "\n".join(text for text in texts if text), truncated
+
+
+def parse_result_lines(data: bytes) -> Dict[str, BatchResult]:
+    """Parse an output or error file into results keyed by custom_id."""
+    results: Dict[str, BatchResult] = {}
+    for raw in data.decode("utf-8").splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        custom_id = str(line.get("custom_id", ""))
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error"):
+            error = line["error"]
+            results[custom_id] = BatchResult(custom_id, error=f"{error.get('code')}: {error.get('message')}")
+        elif int(response.get("status_code", 0) or 0) != 200:
+            message = (body.get("error") or {}).get("message") if isinstance(body, dict) else None
+            results[custom_id] = BatchResult(custom_id, error=f"HTTP {response.get('status_code')}: {message or body}")
+        else:
+            text, truncated = _response_text(body)
+            if truncated:
+                results[custom_id] = BatchResult(custom_id, error="response was truncated at the max token limit")
+            elif not text:
+                results[custom_id] = BatchResult(custom_id, error="response did not contain any text output")
+            else:
+                results[custom_id] = BatchResult(custom_id, text=text)
+    return results
+
+
+def parse_request_lines(data: bytes) -> Dict[str, Dict[str, object]]:
+    """Parse a request file written by `write_request_file` into bodies keyed by custom_id."""
+    requests: Dict[str, Dict[str, object]] = {}
+    for raw in data.decode("utf-8").splitlines():
+        if raw.strip():
+            line = json.loads(raw)
+            requests[str(line.get("custom_id", ""))] = line.get("body") or {}
+    return requests
+
+
+def _multipart(fields: Mapping[str, str], filename: str, data: bytes) -> Tuple[bytes, str]:
+    """Encode form fields plus one file part as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/jsonl\r\n\r\n".encode("utf-8")
+        + data
+        + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+@dataclass
+class OpenAIBatchClient:
+    """Upload request files, create batches, poll them and fetch their results."""
+
+    api_key: str
+    base_url: str = DEFAULT_BASE_URL
+    transport: HTTPTransport = field(default_factory=HTTPTransport, repr=False)
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("openai"))
+    sleep: Callable[[float], None] = field(default=time.sleep, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required")
+        self.base_url = self.base_url.rstrip("/")
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        content_type: str = "application/json",
+        retry_network: bool = True,
+    ) -> bytes:
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": content_type}
+
+        def attempt() -> bytes:
+            try:
+                response = self.transport.request(method, self.base_url + path, body=body, headers=headers)
+            except TransportError as err:
+                if not retry_network:
+                    raise RuntimeError(f"Network error contacting OpenAI Batch API: {err}") from err
+                raise network_error(f"Network error contacting OpenAI Batch API: {err}") from err
+            if response.status >= 400:
+                detail = response.body.decode("utf-8", "replace")
+                message = f"OpenAI Batch API error: {response.status} {response.reason}: {detail[:200]}"
+                raise status_error("openai", response.status, message, response.headers, detail)
+            return response.body
+
+        return attempt() if self.retry is None else self.retry.call(attempt)
+
+    def _json(self, method: str, path: str, document: Optional[Mapping[str, object]] = None, **kwargs) -> Dict[str, object]:
+        body = json.dumps(document).encode("utf-8") if document is not None else None
+        return json.loads(self._request(method, path, body, **kwargs).decode("utf-8"))
+
+    def upload(self, path: Path) -> str:
+        """Upload a JSONL request file with purpose `batch` and return its file ID."""
+        body, content_type = _multipart({"purpose": "batch"}, path.name, path.read_bytes())
+        document = json.loads(self._request("POST", "/files", body, content_type).decode("utf-8"))
+        return str(document["id"])
+
+    def create(self, input_file_id: str, endpoint: str, metadata: Optional[Mapping[str, str]] = None) -> BatchJob:
+        """Create a batch over an uploaded file."""
+        document: Dict[str, object] = {
+            "input_file_id": input_file_id,
+            "endpoint": endpoint,
+            "completion_window": COMPLETION_WINDOW,
+        }
+        if metadata:
+            document["metadata"] = dict(metadata)
+        # A create whose reply was lost may already have started a billed batch,
+        # so only rejected requests (429/5xx) are sent again.
+        return BatchJob.from_document(self._json("POST", "/batches", document, retry_network=False))
+
+    def submit(self, path: Path, endpoint: str, metadata: Optional[Mapping[str, str]] = None) -> BatchJob:
+        """Upload `path` and create a batch over it."""
+        return self.create(self.upload(path), endpoint, metadata)
+
+    def retrieve(self, batch_id: str) -> BatchJob:
+        return BatchJob.from_document(self._json("GET", f"/batches/{batch_id}"))
+
+    def wait(
+        self,
+        batch_id: str,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        on_poll: Optional[Callable[[BatchJob], None]] = None,
+    ) -> BatchJob:
+        """Poll until the batch reaches a terminal status and return it."""
+        return poll_until_done(lambda: self.retrieve(batch_id), poll_interval, on_poll, self.sleep)
+
+    def download(self, file_id: str) -> bytes:
+        return self._request("GET", f"/files/{file_id}/content")
+
+    def requests(self, job: BatchJob) -> Dict[str, Dict[str, object]]:
+        """Return the request bodies the batch was created with, keyed by custom_id."""
+        return parse_request_lines(self.download(job.input_file_id))
+
+    def results(self, job: BatchJob) -> Dict[str, BatchResult]:
+        """Return results from the output and error files of a finished batch."""
+        results: Dict[str, BatchResult] = {}
+        for file_id in (job.output_file_id, job.error_file_id):
+            if file_id:
+                results.update(parse_result_lines(self.download(file_id)))
+        return results
+
+    def close(self) -> None:
+        """Close pooled keep-alive connections."""
+        self.transport.close()
@@ -6,15 +6,25 @@
     - 環境変数 `OPENAI_API_KEY` を設定するか、`OpenAIClient` に直接 `api_key` を渡してください。
     - `OpenAIClient.generate_text(prompt)` で通常の応答を取得します。
     - `OpenAIClient.search_and_generate(prompt)` でWeb検索ツールを有効化した応答を取得します。
+    - `OpenAIClient.stream_text(prompt)` / `stream_search(prompt)` は受信した差分を順次返す `streaming.TextStream` を返します（TTFT計測・途中打ち切り可）。
+    - `metrics`（`metrics.RunMetrics`）を渡すと、1回の送信ごとの所要時間・送受信バイト数（SDKが送受信するJSONのサイズの概算）・トークン使用量を記録します。
+    - 429・5xx・通信エラーは `retry`（`retry_policy.RetryPolicy`）に従ってバックオフしながら再送します（SDK自体の再試行は無効化）。
+    - asyncioから使う場合は `AsyncOpenAIClient` を使い、同名メソッドを `await` します（1つのイベントループで多数のリクエストを同時実行できます）。
 """
 
 from __future__ import annotations
 
+import json
 import os
+import time
 from dataclasses import dataclass, field
-from typing import Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
-from openai import APIError, OpenAI
+from metrics import RunMetrics, usage_fields
+from rate_limiter import ProviderRateLimiter, estimate_tokens
+from response_cache import ResponseCache, cache_key
+from retry_policy import RetryPolicy, network_error, status_error
+from streaming import AbortPredicate, StreamStats, TextStream, open_stream
 
 DEFAULT_MODEL = "GPT-5"
 DEFAULT_MAX_TOKENS = 10000
@@ -133,7 +143,55 @@ def _contains_truncation(response) -> bool:
     return False
 
 
-def _is_temperature_unsupported(error: APIError) -> bool:
+def _usage_tokens(response) -> Optional[int]:
+    """Return total tokens billed for a response when the API reports usage."""
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)
+    if total is None and isinstance(usage, dict):
+        total = usage.get("total_tokens")
+    return total if isinstance(total, int) else None
+
+
+def _endpoint(kwargs: Dict[str, object]) -> str:
+    """Name the API a request body targets: Responses bodies carry `input`, chat bodies `messages`."""
+    return "responses" if "input" in kwargs else "chat"
+
+
+def _response_size(response) -> int:
+    """Approximate received bytes by re-serialising the SDK object (the raw body is not exposed)."""
+    dump = getattr(response, "model_dump_json", None)
+    if callable(dump):
+        return len(dump().encode("utf-8"))
+    if isinstance(response, dict):
+        return len(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+    return 0
+
+
+def _field(obj, name: str):
+    """Read `name` from an SDK object or a plain dict."""
+    value = getattr(obj, name, None)
+    if value is None and isinstance(obj, dict):
+        value = obj.get(name)
+    return value
+
+
+def load_openai():
+    """Import the OpenAI SDK on demand; importing it takes most of a CLI's startup time."""
+    import openai
+
+    return openai
+
+
+_TRUNCATED_COMPLETION_MESSAGE = (
+    "OpenAI response was truncated (finish_reason=length); consider increasing max tokens or reducing prompt size."
+)
+
+
+def _is_temperature_unsupported(error: Exception) -> bool:
     """Return True if the error indicates temperature is not configurable."""
 
     param = getattr(error, "param", None)
@@ -153,6 +211,115 @@ def _is_temperature_unsupported(error: APIError) -> bool:
     return "temperature" in lowered and "unsupported" in lowered
 
 
+def _build_completion_kwargs(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: Optional[float],
+) -> Dict[str, object]:
+    """Construct Chat Completions request arguments."""
+    if not prompt:
+        raise ValueError("Prompt must be a non-empty string")
+
+    kwargs: Dict[str, object] = {
+        "model": model,
+        "messages": [
+            {"role": "user", "content": prompt},
+        ],
+        "max_completion_tokens": max_tokens,
+    }
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    return kwargs
+
+
+def _build_search_kwargs(
+    prompt: str,
+    model: str,
+    max_output_tokens: int,
+    temperature: Optional[float],
+) -> Dict[str, object]:
+    """Construct Responses API arguments with the web_search tool enabled."""
+    if not prompt:
+        raise ValueError("Prompt must be a non-empty string")
+
+    kwargs: Dict[str, object] = {
+        "model": model,
+        "input": prompt,
+        "tools": [{"type": "web_search"}],
+        "max_output_tokens": max_output_tokens,
+    }
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    return kwargs
+
+
+def _without_temperature(kwargs: Dict[str, object]) -> Dict[str, object]:
+    return {k: v for k, v in kwargs.items() if k != "temperature"}
+
+
+def _sdk_retry_options(retry: Optional[RetryPolicy]) -> Dict[str, object]:
+    """Disable the SDK's built-in retries when `retry` handles them, so attempts are not multiplied."""
+    return {"max_retries": 0} if retry is not None else {}
+
+
+def _api_error(err: Exception) -> RuntimeError:
+    """Map an SDK error to a RetryableError (429/5xx/network) or a plain RuntimeError."""
+    message = f"OpenAI API error: {err}"
+    if isinstance(err, load_openai().APIConnectionError):
+        return network_error(message)
+    status = getattr(err, "status_code", None)
+    if not isinstance(status, int):
+        return RuntimeError(message)
+    headers = getattr(getattr(err, "response", None), "headers", None)
+    return status_error("openai", status, message, headers, str(getattr(err, "code", None) or ""))
+
+
+def _completion_text(response) -> str:
+    """Return Chat Completions text or raise when empty/truncated."""
+    text = _extract_text_from_response(response)
+    if text:
+        if _contains_truncation(response):
+            raise RuntimeError(_TRUNCATED_COMPLETION_MESSAGE)
+        return text
+    raise RuntimeError("OpenAI API response did not contain any text output.")
+
+
+def _responses_truncation_message(response, fallback_limit: int) -> str:
+    limit = getattr(response, "max_output_tokens", None)
+    if not isinstance(limit, int):
+        if isinstance(response, dict):
+            candidate = response.get("max_output_tokens")
+            if isinstance(candidate, int):
+                limit = candidate
+    if not isinstance(limit, int):
+        limit = fallback_limit
+
+    incomplete = getattr(response, "incomplete_details", None)
+    if incomplete is None and isinstance(response, dict):
+        incomplete = response.get("incomplete_details")
+    detail = None
+    if isinstance(incomplete, dict):
+        detail = incomplete.get("reason") or incomplete.get("type")
+
+    detail_text = f" (reason={detail})" if isinstance(detail, str) else ""
+    return (
+        "OpenAI web-search response hit max_output_tokens="
+        f"{limit}{detail_text}; shorten or split the prompt to stay within {RESPONSES_MAX_TOKENS} tokens."
+    )
+
+
+def _search_text(text: str, response, fallback_limit: int) -> str:
+    """Return Responses API text or raise when empty/truncated."""
+    if text:
+        if _contains_truncation(response):
+            raise RuntimeError(_responses_truncation_message(response, fallback_limit))
+        return text
+    if _contains_truncation(response):
+        raise RuntimeError(_responses_truncation_message(response, fallback_limit))
+    raise RuntimeError("OpenAI API response did not contain any text output.")
+
+
 @dataclass
 class OpenAIClient:
     """Minimal client for OpenAI chat completions."""
@@ -161,13 +328,21 @@ class OpenAIClient:
     model: str = DEFAULT_MODEL
     max_tokens: int = DEFAULT_MAX_TOKENS
     temperature: Optional[float] = DEFAULT_TEMPERATURE
-    _client: OpenAI = field(init=False, repr=False)
+    rate_limiter: Optional[ProviderRateLimiter] = None
+    cache: Optional[ResponseCache] = None
+    base_url: Optional[str] = None
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("openai"))
+    metrics: Optional[RunMetrics] = field(default=None, repr=False)
+    stream_stats: StreamStats = field(default_factory=StreamStats, init=False, repr=False)
+    _client: Any = field(init=False, repr=False)
     _last_max_output_tokens: int = field(default=DEFAULT_MAX_TOKENS, init=False, repr=False)
 
     def __post_init__(self) -> None:
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
-        self._client = OpenAI(api_key=self.api_key)
+        self._client = load_openai().OpenAI(
+            api_key=self.api_key, base_url=self.base_url, **_sdk_retry_options(self.retry)
+        )
         self._last_max_output_tokens = min(max(self.max_tokens, 1), RESPONSES_MAX_TOKENS)
 
     @classmethod
@@ -182,68 +357,92 @@ class OpenAIClient:
             raise ValueError(f"Environment variable {env_var} is empty")
         return cls(api_key=key, model=model, max_tokens=max_tokens)
 
-    def _create_completion(self, prompt: str):
-        if not prompt:
-            raise ValueError("Prompt must be a non-empty string")
-
-        kwargs = {
-            "model": self.model,
-            "messages": [
-                {"role": "user", "content": prompt},
-            ],
-            "max_completion_tokens": self.max_tokens,
-        }
-        if self.temperature is not None:
-            kwargs["temperature"] = self.temperature
-
+    def _call(self, create, kwargs: Dict[str, object]):
         try:
-            return self._client.chat.completions.create(**kwargs)
-        except APIError as err:
+            return create(**kwargs)
+        except load_openai().APIError as err:
             if self.temperature is not None and _is_temperature_unsupported(err):
-                fallback_kwargs = {k: v for k, v in kwargs.items() if k != "temperature"}
                 try:
-                    return self._client.chat.completions.create(**fallback_kwargs)
-                except APIError as retry_err:
-                    raise RuntimeError(f"OpenAI API error: {retry_err}") from retry_err
-            raise RuntimeError(f"OpenAI API error: {err}") from err
+                    return create(**_without_temperature(kwargs))
+                except load_openai().APIError as retry_err:
+                    raise _api_error(retry_err) from retry_err
+            raise _api_error(err) from err
 
-    def _create_search_response(self, prompt: str):
-        if not prompt:
-            raise ValueError("Prompt must be a non-empty string")
+    def _retry(self, attempt):
+        return attempt() if self.retry is None else self.retry.call(attempt)
 
-        max_output_tokens = min(max(self.max_tokens, 1), RESPONSES_MAX_TOKENS)
-        self._last_max_output_tokens = max_output_tokens
-
-        kwargs = {
-            "model": self.model,
-            "input": prompt,
-            "tools": [{"type": "web_search"}],
-            "max_output_tokens": max_output_tokens,
-        }
-        if self.temperature is not None:
-            kwargs["temperature"] = self.temperature
+    def _observe(self, name: str, started: float, kwargs: Dict[str, object], status: int, received: int = 0, usage=None) -> None:
+        if self.metrics is None:
+            return
+        self.metrics.observe(
+            "call",
+            f"openai.{name}",
+            time.perf_counter() - started,
+            status=status,
+            bytes_sent=len(json.dumps(kwargs, ensure_ascii=False).encode("utf-8")),
+            bytes_received=received,
+            **usage_fields(usage),
+        )
 
+    def _timed_call(self, create, kwargs: Dict[str, object]):
+        started = time.perf_counter()
         try:
-            return self._client.responses.create(**kwargs)
-        except APIError as err:
-            if self.temperature is not None and _is_temperature_unsupported(err):
-                fallback_kwargs = {k: v for k, v in kwargs.items() if k != "temperature"}
-                try:
-                    return self._client.responses.create(**fallback_kwargs)
-                except APIError as retry_err:
-                    raise RuntimeError(f"OpenAI API error: {retry_err}") from retry_err
-            raise RuntimeError(f"OpenAI API error: {err}") from err
+            response = self._call(create, kwargs)
+        except Exception as err:
+            self._observe(_endpoint(kwargs), started, kwargs, getattr(err, "status", None) or 0)
+            raise
+        if self.metrics is not None and not kwargs.get("stream"):
+            self._observe(_endpoint(kwargs), started, kwargs, 200, _response_size(response), _field(response, "usage"))
+        return response
+
+    def _call_limited(self, create, kwargs: Dict[str, object], prompt: str, max_output_tokens: int):
+        def attempt():
+            if self.rate_limiter is None:
+                return self._timed_call(create, kwargs)
+            reserved = estimate_tokens(prompt, max_output_tokens)
+            self.rate_limiter.acquire(reserved)
+            try:
+                response = self._timed_call(create, kwargs)
+            except BaseException:
+                self.rate_limiter.refund(reserved)
+                raise
+            self.rate_limiter.settle(reserved, _usage_tokens(response))
+            return response
+
+        return self._retry(attempt)
+
+    def _search_max_tokens(self) -> int:
+        return min(max(self.max_tokens, 1), RESPONSES_MAX_TOKENS)
+
+    def request_body(self, prompt: str, use_web_search: bool) -> Dict[str, object]:
+        """Return the Responses (web search) or Chat Completions body `generate_text` / `search_and_generate` send."""
+        if use_web_search:
+            return _build_search_kwargs(prompt, self.model, self._search_max_tokens(), self.temperature)
+        return _build_completion_kwargs(prompt, self.model, self.max_tokens, self.temperature)
+
+    def cache_key_for(self, prompt: str, use_web_search: bool) -> str:
+        """Return the response cache key used for `prompt`, e.g. to store a Batch API result."""
+        if use_web_search:
+            return cache_key("openai:web_search", self.model, self._search_max_tokens(), self.temperature, prompt)
+        return cache_key("openai:chat", self.model, self.max_tokens, self.temperature, prompt)
+
+    def _create_completion(self, prompt: str):
+        kwargs = self.request_body(prompt, use_web_search=False)
+        return self._call_limited(self._client.chat.completions.create, kwargs, prompt, self.max_tokens)
+
+    def _create_search_response(self, prompt: str):
+        max_output_tokens = self._search_max_tokens()
+        self._last_max_output_tokens = max_output_tokens
+        kwargs = self.request_body(prompt, use_web_search=True)
+        return self._call_limited(self._client.responses.create, kwargs, prompt, max_output_tokens)
+
+    def _cached(self, use_web_search: bool, prompt: str, produce) -> str:
+        if self.cache is None:
+            return produce()
+        return self.cache.get_or_create(self.cache_key_for(prompt, use_web_search), produce)
 
     def generate_text(self, prompt: str) -> str:
-        response = self._create_completion(prompt)
-        text = _extract_text_from_response(response)
-        if text:
-            if _contains_truncation(response):
-                raise RuntimeError(
-                    "OpenAI response was truncated (finish_reason=length); consider increasing max tokens or reducing prompt size."
-                )
-            return text
-        raise RuntimeError("OpenAI API response did not contain any text output.")
+        return self._cached(False, prompt, lambda: _completion_text(self._create_completion(prompt)))
 
     def search_with_response(self, prompt: str) -> tuple[str, object]:
         response = self._create_search_response(prompt)
@@ -251,37 +450,206 @@ class OpenAIClient:
         return text, response
 
     def search_and_generate(self, prompt: str) -> str:
-        text, response = self.search_with_response(prompt)
-        if text:
-            if _contains_truncation(response):
-                raise RuntimeError(self._responses_truncation_message(response))
-            return text
-        if _contains_truncation(response):
-            raise RuntimeError(self._responses_truncation_message(response))
-        raise RuntimeError("OpenAI API response did not contain any text output.")
+        def produce() -> str:
+            text, response = self.search_with_response(prompt)
+            return _search_text(text, response, self._last_max_output_tokens)
+
+        return self._cached(True, prompt, produce)
 
     def _responses_truncation_message(self, response) -> str:
-        limit = getattr(response, "max_output_tokens", None)
-        if not isinstance(limit, int):
-            if isinstance(response, dict):
-                candidate = response.get("max_output_tokens")
-                if isinstance(candidate, int):
-                    limit = candidate
-        if not isinstance(limit, int):
-            limit = getattr(self, "_last_max_output_tokens", self.max_tokens)
-
-        incomplete = getattr(response, "incomplete_details", None)
-        if incomplete is None and isinstance(response, dict):
-            incomplete = response.get("incomplete_details")
-        detail = None
-        if isinstance(incomplete, dict):
-            detail = incomplete.get("reason") or incomplete.get("type")
-
-        detail_text = f" (reason={detail})" if isinstance(detail, str) else ""
-        return (
-            "OpenAI web-search response hit max_output_tokens="
-            f"{limit}{detail_text}; shorten or split the prompt to stay within {RESPONSES_MAX_TOKENS} tokens."
+        return _responses_truncation_message(response, getattr(self, "_last_max_output_tokens", self.max_tokens))
+
+    def stream_text(self, prompt: str, should_abort: Optional[AbortPredicate] = None) -> TextStream:
+        """Stream a Chat Completions reply; iterating yields text deltas as they arrive."""
+        kwargs = self.request_body(prompt, use_web_search=False)
+        kwargs["stream"] = True
+        kwargs["stream_options"] = {"include_usage": True}
+        return open_stream(
+            lambda stream: self._completion_deltas(stream, kwargs, prompt),
+            should_abort,
+            self.stream_stats,
+            self.cache,
+            self.cache_key_for(prompt, use_web_search=False),
+        )
+
+    def stream_search(self, prompt: str, should_abort: Optional[AbortPredicate] = None) -> TextStream:
+        """Stream a web-search Responses reply; iterating yields text deltas as they arrive."""
+        max_output_tokens = self._search_max_tokens()
+        kwargs = self.request_body(prompt, use_web_search=True)
+        kwargs["stream"] = True
+        return open_stream(
+            lambda stream: self._search_deltas(stream, kwargs, prompt, max_output_tokens),
+            should_abort,
+            self.stream_stats,
+            self.cache,
+            self.cache_key_for(prompt, use_web_search=True),
+        )
+
+    def _open_stream(self, stream: TextStream, create, kwargs: Dict[str, object], prompt: str, max_output_tokens: int):
+        # Only opening the stream is retried; a failure after deltas were yielded ends the stream.
+        def attempt():
+            reserved = 0
+            if self.rate_limiter is not None:
+                reserved = estimate_tokens(prompt, max_output_tokens)
+                self.rate_limiter.acquire(reserved)
+            stream.mark_sent()
+            try:
+                return reserved, self._timed_call(create, kwargs)
+            except BaseException:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.refund(reserved)
+                raise
+
+        return self._retry(attempt)
+
+    def _completion_deltas(self, stream: TextStream, kwargs: Dict[str, object], prompt: str) -> Iterator[str]:
+        reserved, events = self._open_stream(
+            stream, self._client.chat.completions.create, kwargs, prompt, self.max_tokens
         )
+        final = None
+        try:
+            for chunk in events:
+                usage = _usage_tokens(chunk)
+                if usage is not None:
+                    stream.usage_tokens = usage
+                    final = chunk
+                for choice in _field(chunk, "choices") or []:
+                    content = _field(_field(choice, "delta"), "content")
+                    if isinstance(content, str):
+                        yield content
+                    finish = _field(choice, "finish_reason")
+                    if finish:
+                        stream.finish_reason = finish
+        except load_openai().APIError as err:
+            raise RuntimeError(f"OpenAI API error: {err}") from err
+        finally:
+            # Closing the SDK stream drops the HTTP connection when aborting early.
+            events.close()
+            self._observe("chat.stream", stream.started, kwargs, 200, usage=_field(final, "usage"))
+
+        if stream.finish_reason == "length":
+            stream.error = _TRUNCATED_COMPLETION_MESSAGE
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(reserved, stream.usage_tokens)
+
+    def _search_deltas(
+        self, stream: TextStream, kwargs: Dict[str, object], prompt: str, max_output_tokens: int
+    ) -> Iterator[str]:
+        reserved, events = self._open_stream(stream, self._client.responses.create, kwargs, prompt, max_output_tokens)
+        final = None
+        try:
+            for event in events:
+                kind = _field(event, "type")
+                if kind == "response.output_text.delta":
+                    delta = _field(event, "delta")
+                    if isinstance(delta, str):
+                        yield delta
+                elif kind in ("response.completed", "response.incomplete"):
+                    response = _field(event, "response")
+                    final = response
+                    stream.finish_reason = _field(response, "status")
+                    stream.usage_tokens = _usage_tokens(response)
+                    if _contains_truncation(response):
+                        stream.error = _responses_truncation_message(response, max_output_tokens)
+                elif kind in ("response.failed", "error"):
+                    detail = _field(_field(event, "response"), "error") or _field(event, "message") or kind
+                    raise RuntimeError(f"OpenAI API error: {detail}")
+        except load_openai().APIError as err:
+            raise RuntimeError(f"OpenAI API error: {err}") from err
+        finally:
+            events.close()
+            self._observe("responses.stream", stream.started, kwargs, 200, usage=_field(final, "usage"))
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(reserved, stream.usage_tokens)
+
+
+@dataclass
+class AsyncOpenAIClient:
+    """asyncio counterpart of OpenAIClient built on the SDK's AsyncOpenAI."""
+
+    api_key: str
+    model: str = DEFAULT_MODEL
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    temperature: Optional[float] = DEFAULT_TEMPERATURE
+    rate_limiter: Optional[ProviderRateLimiter] = None
+    base_url: Optional[str] = None
+    retry: Optional[RetryPolicy] = field(default_factory=lambda: RetryPolicy("openai"))
+    _client: Any = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required")
+        self._client = load_openai().AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url, **_sdk_retry_options(self.retry)
+        )
+
+    @classmethod
+    def from_env(
+        cls,
+        env_var: str = "OPENAI_API_KEY",
+        model: str = DEFAULT_MODEL,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+    ) -> "AsyncOpenAIClient":
+        key = os.getenv(env_var, "").strip()
+        if not key:
+            raise ValueError(f"Environment variable {env_var} is empty")
+        return cls(api_key=key, model=model, max_tokens=max_tokens)
+
+    @property
+    def _max_output_tokens(self) -> int:
+        return min(max(self.max_tokens, 1), RESPONSES_MAX_TOKENS)
+
+    async def _call(self, create, kwargs: Dict[str, object]):
+        try:
+            return await create(**kwargs)
+        except load_openai().APIError as err:
+            if self.temperature is not None and _is_temperature_unsupported(err):
+                try:
+                    return await create(**_without_temperature(kwargs))
+                except load_openai().APIError as retry_err:
+                    raise _api_error(retry_err) from retry_err
+            raise _api_error(err) from err
+
+    async def _call_limited(self, create, kwargs: Dict[str, object], prompt: str, max_output_tokens: int):
+        async def attempt():
+            if self.rate_limiter is None:
+                return await self._call(create, kwargs)
+            reserved = estimate_tokens(prompt, max_output_tokens)
+            await self.rate_limiter.acquire_async(reserved)
+            try:
+                response = await self._call(create, kwargs)
+            except BaseException:
+                self.rate_limiter.refund(reserved)
+                raise
+            self.rate_limiter.settle(reserved, _usage_tokens(response))
+            return response
+
+        return await (attempt() if self.retry is None else self.retry.call_async(attempt))
+
+    async def generate_text(self, prompt: str) -> str:
+        kwargs = _build_completion_kwargs(prompt, self.model, self.max_tokens, self.temperature)
+        response = await self._call_limited(self._client.chat.completions.create, kwargs, prompt, self.max_tokens)
+        return _completion_text(response)
+
+    async def search_with_response(self, prompt: str) -> tuple[str, object]:
+        kwargs = _build_search_kwargs(prompt, self.model, self._max_output_tokens, self.temperature)
+        response = await self._call_limited(self._client.responses.create, kwargs, prompt, self._max_output_tokens)
+        return _extract_text_from_response(response), response
+
+    async def search_and_generate(self, prompt: str) -> str:
+        text, response = await self.search_with_response(prompt)
+        return _search_text(text, response, self._max_output_tokens)
+
+    async def aclose(self) -> None:
+        """Close pooled connections held by the SDK client."""
+        await self._client.close()
+
+    async def __aenter__(self) -> "AsyncOpenAIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
 
 def read_api_key(env_var: str = "OPENAI_API_KEY") -> Optional[str]:
@@ -0,0 +1,167 @@
+"""
+処理概要:
+    - 2段構成（前段→後段）のパイプラインで行を流し、各段を独立したスレッド数で並行実行します。
+    - 前段（OpenAI検索）の結果は上限付きキューを通じて後段（Claude営業文生成）へ順次渡されるため、両プロバイダーの処理枠を同時に使えます。
+使用方法:
+    - `run_two_stage(items, first, second, first_workers=2, second_workers=4, queue_size=8)` の結果を `for` で受け取ります。
+    - `first(item)` の戻り値が `second(item, value)` に渡され、最終結果は `row_executor.TaskOutcome` として入力順に返ります。
+    - 各段のAPI呼び出しペースは各クライアントに渡した `rate_limiter.ProviderRateLimiter` で制御します。
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple, TypeVar
+
+from row_executor import TaskOutcome
+
+T = TypeVar("T")
+M = TypeVar("M")
+R = TypeVar("R")
+
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+@dataclass
+class StageSettings:
+    """Concurrency for one pipeline stage (request pacing lives in rate_limiter)."""
+
+    concurrency: int = 1
+
+
+def _start(target: Callable[..., None], *args: Any) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args, name=f"pipeline-{target.__name__}", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_two_stage(
+    items: Iterable[T],
+    first: Callable[[T], M],
+    second: Callable[[T, M], R],
+    *,
+    first_workers: int = 1,
+    second_workers: int = 1,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> Iterator[TaskOutcome[T, R]]:
+    """Stream items through `first` then `second`, yielding outcomes in input order.
+
+    Stage-one results are handed over through a queue holding at most
+    `queue_size` entries, so a fast first stage cannot run arbitrarily far
+    ahead of the second. An exception in either stage is recorded on that
+    item's outcome and skips the remaining stage for it only.
+
+    When the caller stops iterating early (break, an exception, or closing
+    the generator), every feeder and worker thread exits within about 0.1s
+    once its current call returns, instead of waiting on a queue forever.
+    """
+    first_workers = max(1, first_workers)
+    second_workers = max(1, second_workers)
+    queue_size = max(1, queue_size)
+
+    inbox: "queue.Queue[object]" = queue.Queue(maxsize=queue_size)
+    handoff: "queue.Queue[object]" = queue.Queue(maxsize=queue_size)
+    results: "queue.Queue[object]" = queue.Queue()
+    # Bounds everything between the feeder and the reorder buffer so a slow
+    # head row cannot make finished rows pile up without limit.
+    window = threading.Semaphore(queue_size * 2 + first_workers + second_workers)
+    stop = threading.Event()
+    remaining = {"first": first_workers, "second": second_workers}
+    remaining_lock = threading.Lock()
+
+    def _put(target: "queue.Queue[object]", value: object) -> bool:
+        while not stop.is_set():
+            try:
+                target.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(source: "queue.Queue[object]") -> object:
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _finish(stage: str, downstream: "queue.Queue[object]", count: int) -> None:
+        with remaining_lock:
+            remaining[stage] -= 1
+            last = remaining[stage] == 0
+        if last:
+            for _ in range(count):
+                _put(downstream, _DONE)
+
+    def feed() -> None:
+        try:
+            for seq, item in enumerate(items):
+                while not window.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if not _put(inbox, (seq, item)):
+                    return
+        except Exception as err:  # noqa: BLE001 - surface iterator failures to the consumer
+            results.put(err)
+        finally:
+            for _ in range(first_workers):
+                _put(inbox, _DONE)
+
+    def run_first() -> None:
+        while True:
+            entry = _get(inbox)
+            if entry is _DONE:
+                break
+            seq, item = entry  # type: ignore[misc]
+            try:
+                value: Tuple[bool, object] = (True, first(item))
+            except Exception as err:  # noqa: BLE001 - per-row errors are reported, not raised
+                value = (False, err)
+            if not _put(handoff, (seq, item, value)):
+                break
+        _finish("first", handoff, second_workers)
+
+    def run_second() -> None:
+        while True:
+            entry = _get(handoff)
+            if entry is _DONE:
+                break
+            seq, item, (ok, value) = entry  # type: ignore[misc]
+            if not ok:
+                outcome: TaskOutcome = TaskOutcome(item=item, error=value)  # type: ignore[arg-type]
+            else:
+                try:
+                    outcome = TaskOutcome(item=item, result=second(item, value))  # type: ignore[arg-type]
+                except Exception as err:  # noqa: BLE001 - per-row errors are reported, not raised
+                    outcome = TaskOutcome(item=item, error=err)
+            results.put((seq, outcome))
+        _finish("second", results, 1)
+
+    _start(feed)
+    for _ in range(first_workers):
+        _start(run_first)
+    for _ in range(second_workers):
+        _start(run_second)
+
+    buffered: Dict[int, TaskOutcome[T, R]] = {}
+    next_seq = 0
+    try:
+        while True:
+            entry = results.get()
+            if entry is _DONE:
+                break
+            if isinstance(entry, Exception):
+                raise entry
+            seq, outcome = entry  # type: ignore[misc]
+            buffered[seq] = outcome
+            while next_seq in buffered:
+                window.release()
+                yield buffered.pop(next_seq)
+                next_seq += 1
+    finally:
+        stop.set()
@@ -3,60 +3,181 @@
     - スプレッドシートから取得したテンプレート文字列と自社情報を組み合わせて、企業調査および営業文作成用のプロンプトを生成します。
     - `{{company_name}}`, `{{company_url}}`, `{{num_employees}}`, `{{company_description}}`, `{{registered_company_name}}`,
       `{{registered_company_name_encoded}}`, `{{company_name_encoded}}`, `{{self_info}}` などのプレースホルダを辞書から置換するだけのシンプルな仕組みです。
+    - テンプレートは `PromptBuilder` の生成時に一度だけ解析（コンパイル）し、行ごとの描画は1回の結合で行います。
+      `{{self_info}}` は生成時に埋め込み済みになり、未知のプレースホルダは `unknown_placeholders` で確認できます（出力にはそのまま残ります）。
 使用方法:
     - `PromptBuilder` に検索用テンプレート、営業文テンプレート、自社紹介文（単一セル）を渡します。
     - `render_search_prompt` / `render_message_prompt` に企業情報の辞書を渡すと、Claude/OpenAIへ送る文字列を取得できます。
+    - 複数行をまとめて送信する場合は `render_search_prompts(companies)` / `render_message_prompts(companies, descriptions)` で
+      ブロック単位に生成できます（結果は1行ずつ生成した場合と同じです）。
+    - `message_prefix` は営業文プロンプトのうち全行で共通の先頭部分（最初の企業プレースホルダより前）です。
+      Claudeのプロンプトキャッシュ（`ClaudeClient.cache_prefix`）に渡すと、この部分の入力トークンが2行目以降はキャッシュから読まれます。
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Mapping
+import re
+from dataclasses import dataclass, field
+from typing import Collection, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 PLACEHOLDER_PREFIX = "{{"
 PLACEHOLDER_SUFFIX = "}}"
 
+COMPANY_KEYS: Tuple[str, ...] = (
+    "company_name",
+    "company_name_encoded",
+    "company_url",
+    "num_employees",
+    "contact_form_url",
+    "address",
+    "prefecture_id",
+    "registered_company_name",
+    "registered_company_name_encoded",
+)
+DESCRIPTION_KEY = "company_description"
+SELF_INFO_KEY = "self_info"
+
+_PLACEHOLDER = re.compile(re.escape(PLACEHOLDER_PREFIX) + r"([^{}]*)" + re.escape(PLACEHOLDER_SUFFIX))
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A template parsed once into literal segments and placeholder slots.
+
+    `segments` holds the literal text with an empty string at every slot;
+    `slots` maps those positions to placeholder names and `keys` lists the
+    distinct names once.
+    """
+
+    segments: Tuple[str, ...]
+    slots: Tuple[Tuple[int, str], ...]
+    keys: Tuple[str, ...]
+    unknown: Tuple[str, ...]
+
+    def render(self, values: Mapping[str, str]) -> str:
+        """Fill every slot from `values` and join the segments once."""
+        parts = list(self.segments)
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return "".join(parts)
+
+    @property
+    def prefix(self) -> str:
+        """Literal text before the first slot, identical in every rendering."""
+        return self.segments[0]
+
+    def render_rows(
+        self,
+        rows: Iterable[Mapping[str, str]],
+        columns: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> List[str]:
+        """Render one string per row; absent names render empty.
+
+        `columns` supplies per-row values by position for names that are not
+        in the row mappings (e.g. one description per row).
+        """
+        columns = columns or {}
+        from_row = [(index, name) for index, name in self.slots if name not in columns]
+        from_column = [(index, columns[name]) for index, name in self.slots if name in columns]
+        segments = list(self.segments)
+        rendered: List[str] = []
+        for position, values in enumerate(rows):
+            parts = segments.copy()
+            for index, name in from_row:
+                parts[index] = values.get(name, "")
+            for index, column in from_column:
+                parts[index] = column[position]
+            rendered.append("".join(parts))
+        return rendered
+
+
+def compile_template(template: str, known: Collection[str], constants: Mapping[str, str]) -> CompiledTemplate:
+    """Split `template` into literal text and `{{name}}` fields.
+
+    Names in `constants` are baked into the literal text, names in `known`
+    become per-row fields, and any other placeholder is kept verbatim and
+    listed in `unknown`. Substituted values are never scanned for further
+    placeholders.
+    """
+    segments: List[str] = []
+    slots: List[Tuple[int, str]] = []
+    unknown: List[str] = []
+    literal: List[str] = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(template):
+        literal.append(template[position : match.start()])
+        name = match.group(1)
+        if name in constants:
+            literal.append(constants[name])
+        elif name in known:
+            # Adjacent literal text is merged so each slot sits between two segments.
+            segments.append("".join(literal))
+            literal = []
+            slots.append((len(segments), name))
+            segments.append("")
+        else:
+            literal.append(match.group(0))
+            if name not in unknown:
+                unknown.append(name)
+        position = match.end()
+    literal.append(template[position:])
+    segments.append("".join(literal))
+    keys = tuple(dict.fromkeys(name for _, name in slots))
+    return CompiledTemplate(segments=tuple(segments), slots=tuple(slots), keys=keys, unknown=tuple(unknown))
+
 
 @dataclass
 class PromptBuilder:
     """Render prompts for company research and outreach message."""
 
     search_template: str
-    message_template: str
-    self_info: str
+    message_template: str = ""
+    self_info: str = ""
+    _search: CompiledTemplate = field(init=False, repr=False)
+    _message: CompiledTemplate = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        constants = {SELF_INFO_KEY: self.self_info}
+        self._search = compile_template(self.search_template, COMPANY_KEYS, constants)
+        self._message = compile_template(self.message_template, COMPANY_KEYS + (DESCRIPTION_KEY,), constants)
+
+    @property
+    def unknown_placeholders(self) -> Dict[str, Tuple[str, ...]]:
+        """Return unrecognised placeholder names per template ("search" / "message"), omitting clean ones."""
+        found = {"search": self._search.unknown, "message": self._message.unknown}
+        return {name: names for name, names in found.items() if names}
+
+    @property
+    def message_prefix(self) -> str:
+        """Return the leading message text every row shares.
+
+        `{{self_info}}` is part of it only when it comes before every
+        per-company placeholder in the message template.
+        """
+        return self._message.prefix
 
     def render_search_prompt(self, company: Mapping[str, str]) -> str:
         """Return search prompt text; fallback to company URL or name when template is empty."""
-        replacements = self._base_replacements(company)
-        prompt = self._substitute(self.search_template, replacements)
+        prompt = self._search.render({key: company.get(key, "") for key in self._search.keys})
         fallback = company.get("company_url") or company.get("company_name", "")
         return prompt.strip() or fallback
 
     def render_message_prompt(self, company: Mapping[str, str], company_description: str) -> str:
         """Return outreach prompt filled with company description and self info."""
-        replacements = self._base_replacements(company)
-        replacements["company_description"] = company_description
-        return self._substitute(self.message_template, replacements)
-
-    def _substitute(self, template: str, replacements: Dict[str, str]) -> str:
-        """Naive placeholder substitution using {{key}} markers."""
-        result = template
-        for key, value in replacements.items():
-            placeholder = f"{PLACEHOLDER_PREFIX}{key}{PLACEHOLDER_SUFFIX}"
-            result = result.replace(placeholder, value)
-        return result
-
-    def _base_replacements(self, company: Mapping[str, str]) -> Dict[str, str]:
-        """Return common replacements shared across prompts."""
-        return {
-            "company_name": company.get("company_name", ""),
-            "company_name_encoded": company.get("company_name_encoded", ""),
-            "company_url": company.get("company_url", ""),
-            "num_employees": company.get("num_employees", ""),
-            "contact_form_url": company.get("contact_form_url", ""),
-            "address": company.get("address", ""),
-            "prefecture_id": company.get("prefecture_id", ""),
-            "registered_company_name": company.get("registered_company_name", ""),
-            "registered_company_name_encoded": company.get("registered_company_name_encoded", ""),
-            "self_info": self.self_info,
-        }
+        values = {key: company.get(key, "") for key in self._message.keys}
+        values[DESCRIPTION_KEY] = company_description
+        return self._message.render(values)
+
+    def render_search_prompts(self, companies: Sequence[Mapping[str, str]]) -> List[str]:
+        """Return `render_search_prompt` for every company, sharing the compiled template across the block."""
+        prompts = self._search.render_rows(companies)
+        return [
+            prompt.strip() or company.get("company_url") or company.get("company_name", "")
+            for prompt, company in zip(prompts, companies)
+        ]
+
+    def render_message_prompts(self, companies: Sequence[Mapping[str, str]], descriptions: Sequence[str]) -> List[str]:
+        """Return `render_message_prompt` for every (company, description) pair."""
+        if len(companies) != len(descriptions):
+            raise ValueError(f"Got {len(companies)} companies but {len(descriptions)} descriptions")
+        return self._message.render_rows(companies, {DESCRIPTION_KEY: descriptions})
@@ -0,0 +1,225 @@
+"""
+処理概要:
+    - プロバイダー（OpenAI / Anthropic / Google Sheets）ごとに「1分あたりのリクエスト数」と「1分あたりのトークン数」を
+      トークンバケットで管理し、予算を使い切ったときだけ待機させるレートリミッター。
+    - 複数スレッド（`--workers` / `--pipeline`）から同じリミッターを共有しても予算が正しく配分されます。
+    - バケットの容量（連続して使える量）は既定で1分の予算の1/10（6秒分）です。起動直後に1分ぶんを一度に送ることはありません。
+使用方法:
+    - 設定ファイルの `rate_limits` セクションを `parse_rate_limits(data)` で読み込み、`RateLimiterRegistry` を作ります。
+    - 各クライアントは `registry.get("openai")` などで得た `ProviderRateLimiter` の `acquire(tokens)` をAPI呼び出し直前に呼びます。
+    - 実際の使用トークン数が分かったら `settle(reserved, actual)` で見積もりとの差を精算します。失敗した呼び出し（再試行の前）は `refund(reserved)` でトークンの予約を返します。
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional
+
+PROVIDERS = ("openai", "anthropic", "sheets")
+DEFAULT_BURST_SECONDS = 6.0
+
+
+@dataclass
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of blocking.
+
+    `reserve` deducts immediately (the balance may go negative) and returns how
+    long the caller must wait for the balance to recover. Callers therefore
+    queue up in reservation order and only wait once the budget is exhausted.
+    An amount larger than `capacity` is charged in full and simply owes a
+    longer wait.
+    """
+
+    capacity: float
+    refill_per_second: float
+    _balance: float = field(init=False, repr=False)
+    _updated: float = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.capacity <= 0 or self.refill_per_second <= 0:
+            raise ValueError("TokenBucket capacity and refill rate must be positive")
+        self._balance = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._balance = min(self.capacity, self._balance + elapsed * self.refill_per_second)
+            self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Deduct `amount` and return the seconds to wait before using it."""
+        amount = max(amount, 0.0)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._balance -= amount
+            if self._balance >= 0:
+                return 0.0
+            return -self._balance / self.refill_per_second
+
+    def adjust(self, delta: float) -> None:
+        """Give back (positive) or additionally consume (negative) budget without waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._balance = min(self.capacity, self._balance + delta)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._balance
+
+
+@dataclass
+class ProviderLimits:
+    """Per-minute budgets for one provider; None disables that dimension.
+
+    `request_burst` / `token_burst` are how much may be used back to back
+    before the per-minute pace applies; None means `DEFAULT_BURST_SECONDS`
+    worth of the budget (at least 1).
+    """
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    request_burst: Optional[float] = None
+    token_burst: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "ProviderLimits":
+        rpm = data.get("requests_per_minute")
+        tpm = data.get("tokens_per_minute")
+        request_burst = data.get("request_burst")
+        token_burst = data.get("token_burst")
+        return cls(
+            requests_per_minute=float(rpm) if rpm else None,  # type: ignore[arg-type]
+            tokens_per_minute=float(tpm) if tpm else None,  # type: ignore[arg-type]
+            request_burst=float(request_burst) if request_burst else None,  # type: ignore[arg-type]
+            token_burst=float(token_burst) if token_burst else None,  # type: ignore[arg-type]
+        )
+
+
+class ProviderRateLimiter:
+    """Combine request and token budgets for a single provider."""
+
+    def __init__(self, name: str, limits: Optional[ProviderLimits] = None) -> None:
+        self.name = name
+        self.limits = limits or ProviderLimits()
+        self._requests = self._bucket(self.limits.requests_per_minute, self.limits.request_burst)
+        self._tokens = self._bucket(self.limits.tokens_per_minute, self.limits.token_burst)
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+        self.waits = 0
+
+    @staticmethod
+    def _bucket(per_minute: Optional[float], burst: Optional[float]) -> Optional[TokenBucket]:
+        if not per_minute:
+            return None
+        capacity = burst if burst else max(1.0, per_minute * DEFAULT_BURST_SECONDS / 60.0)
+        return TokenBucket(capacity=capacity, refill_per_second=per_minute / 60.0)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request plus `tokens`; return the delay owed before sending."""
+        delay = 0.0
+        if self._requests is not None:
+            delay = max(delay, self._requests.reserve(1))
+        if self._tokens is not None and tokens > 0:
+            delay = max(delay, self._tokens.reserve(tokens))
+        if delay > 0:
+            with self._lock:
+                self.total_wait += delay
+                self.waits += 1
+        return delay
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block the calling thread until the request fits the budget; return seconds waited."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """asyncio variant of `acquire` that yields to the event loop while waiting."""
+        import asyncio  # only async callers need it; keeps the CLIs' startup light
+
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def settle(self, reserved: int, actual: Optional[int]) -> None:
+        """Reconcile a token reservation with the usage reported by the API."""
+        if self._tokens is None or actual is None:
+            return
+        self._tokens.adjust(reserved - actual)
+
+    def refund(self, reserved: int) -> None:
+        """Give back the token reservation of an attempt that failed (429, 5xx, network error).
+
+        The request still counts against the request budget, but without this
+        every retry would hold another full token reservation and the limiter
+        would throttle hardest exactly when the API is already pushing back.
+        """
+        self.settle(reserved, 0)
+
+
+class RateLimiterRegistry:
+    """Hold one shared ProviderRateLimiter per provider name."""
+
+    def __init__(self, limits: Optional[Mapping[str, ProviderLimits]] = None) -> None:
+        self._limiters: Dict[str, ProviderRateLimiter] = {}
+        self._lock = threading.Lock()
+        for name, provider_limits in (limits or {}).items():
+            self._limiters[name] = ProviderRateLimiter(name, provider_limits)
+
+    def get(self, name: str) -> ProviderRateLimiter:
+        """Return the limiter for `name`, creating an unlimited one if not configured."""
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = ProviderRateLimiter(name)
+                self._limiters[name] = limiter
+            return limiter
+
+    def summary(self) -> str:
+        parts = []
+        with self._lock:
+            for name, limiter in sorted(self._limiters.items()):
+                if limiter.waits:
+                    parts.append(f"{name}: waited {limiter.waits}x / {limiter.total_wait:.1f}s")
+        return ", ".join(parts)
+
+
+def parse_rate_limits(data: Mapping[str, object]) -> Dict[str, ProviderLimits]:
+    """Read the `rate_limits` config section, falling back to legacy `request_interval`.
+
+    Configs that still set `request_interval` (seconds between rows) and have no
+    `rate_limits` section get an equivalent requests-per-minute budget with a
+    burst of 1 for the LLM providers, so existing setups keep their pacing.
+    """
+    section = data.get("rate_limits")
+    if isinstance(section, Mapping):
+        return {
+            name: ProviderLimits.from_dict(values)
+            for name, values in section.items()
+            if isinstance(values, Mapping)
+        }
+
+    interval = float(data.get("request_interval", 0) or 0)  # type: ignore[arg-type]
+    if interval <= 0:
+        return {}
+    rpm = 60.0 / interval
+    return {name: ProviderLimits(requests_per_minute=rpm, request_burst=1) for name in ("openai", "anthropic")}
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int = 0) -> int:
+    """Rough upper estimate of tokens charged for a request.
+
+    Uses UTF-8 bytes / 3, which is about one token per Japanese character and
+    errs high for ASCII text, plus the output allowance the API reserves.
+    """
+    return math.ceil(len(prompt.encode("utf-8")) / 3) + max(max_output_tokens, 0)
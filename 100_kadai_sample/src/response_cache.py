@@ -0,0 +1,191 @@
+"""
+処理概要:
+    - LLMの応答テキストを (プロバイダー, モデル, max_tokens, temperature, 送信プロンプト) のハッシュをキーにSQLiteへ保存する永続キャッシュ。
+    - 同じテンプレート・同じ企業行で再実行したときはネットワークに出ずに保存済みの応答を返し、有効期限（TTL）と容量上限（古い順に削除するLRU）で肥大化を防ぎます。
+使用方法:
+    - 設定ファイルの `cache` セクションを `CacheSettings.from_dict` で読み込み、`ResponseCache.open(settings)` で開きます。
+    - 各クライアントの `cache` に渡すと、`cache.get_or_create(key, produce)` で応答を再利用します。キーは `cache_key(...)` で作ります。
+    - 実行後は `cache.summary()` でヒット／ミス件数を表示できます。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Mapping, Optional
+
+from metrics import RunMetrics
+
+DEFAULT_CACHE_PATH = "cache/responses.sqlite3"
+DEFAULT_MAX_SIZE_MB = 256.0
+# Share of the size limit to free once it is exceeded, so eviction runs in
+# occasional chunks rather than on every insert.
+EVICTION_HEADROOM = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def cache_key(provider: str, model: str, max_tokens: int, temperature: Optional[float], prompt: str) -> str:
+    """Return the content address of one LLM request."""
+    material = json.dumps([provider, model, max_tokens, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheSettings:
+    """Typed view over the `cache` config section."""
+
+    enabled: bool = False
+    path: str = DEFAULT_CACHE_PATH
+    ttl_hours: Optional[float] = None
+    max_size_mb: float = DEFAULT_MAX_SIZE_MB
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "CacheSettings":
+        ttl = data.get("ttl_hours")
+        return cls(
+            enabled=bool(data.get("enabled", True)),
+            path=str(data.get("path", DEFAULT_CACHE_PATH)),
+            ttl_hours=float(ttl) if ttl else None,  # type: ignore[arg-type]
+            max_size_mb=float(data.get("max_size_mb", DEFAULT_MAX_SIZE_MB)),  # type: ignore[arg-type]
+        )
+
+
+@dataclass
+class ResponseCache:
+    """Thread-safe SQLite store of response texts with TTL and LRU size eviction."""
+
+    path: Path
+    ttl_seconds: Optional[float] = None
+    max_bytes: int = int(DEFAULT_MAX_SIZE_MB * 1024 * 1024)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    metrics: Optional[RunMetrics] = field(default=None, repr=False)
+    _conn: sqlite3.Connection = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+    # Access times of hits are applied lazily so a hit never waits on a disk write.
+    _touched: Dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._size = int(row[0])
+
+    @classmethod
+    def open(cls, settings: CacheSettings) -> Optional["ResponseCache"]:
+        """Open the configured cache, or return None when caching is disabled."""
+        if not settings.enabled:
+            return None
+        ttl = settings.ttl_hours * 3600 if settings.ttl_hours else None
+        return cls(Path(settings.path), ttl_seconds=ttl, max_bytes=int(settings.max_size_mb * 1024 * 1024))
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for `key`, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                cached = None
+            else:
+                self.hits += 1
+                self._touched[key] = now
+                cached = row[0]
+        if self.metrics is not None:
+            self.metrics.count("cache", "hit" if cached is not None else "miss")
+        return cached
+
+    def put(self, key: str, value: str) -> None:
+        """Store `value` under `key`, evicting least recently used entries past the size limit."""
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._apply_touched()
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * (1 - EVICTION_HEADROOM)))
+            self._conn.commit()
+
+    def get_or_create(self, key: str, produce: Callable[[], str]) -> str:
+        """Return the cached text or call `produce` and cache its result."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        value = produce()
+        self.put(key, value)
+        return value
+
+    def _apply_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, target: int) -> None:
+        if self.ttl_seconds is not None:
+            cutoff = time.time() - self.ttl_seconds
+            count, freed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE created < ?", (cutoff,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+            self._size -= int(freed)
+            self.evictions += int(count)
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((key,))
+            self._size -= size
+        if doomed:
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = f" ({self.hits / total:.0%} hit rate)" if total else ""
+        return f"{self.hits} hits / {self.misses} misses{rate}, {self.evictions} evicted"
+
+    def close(self) -> None:
+        """Write pending access times and close the database; later calls do nothing."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._apply_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,439 @@
+"""
+処理概要:
+    - OpenAI / Anthropic / Google Sheets の呼び出しで共通に使う再試行ポリシー。
+    - 失敗をプロバイダーごとに「スロットリング（429/529 など）」「一時的な障害（5xx・通信エラー）」「再試行しない」に分類し、
+      ジッター付き指数バックオフ（`Retry-After` ヘッダーがあればその秒数）で再送します。
+    - 再試行はプロバイダー単位の予算（通常の呼び出し1件ごとに `budget_ratio` 回分が貯まる）の範囲でのみ行い、障害時に再送が殺到するのを防ぎます。
+    - `AdaptiveConcurrency` はスロットリングを検知すると同時実行数を半減し、成功が続くと1ずつ戻す（AIMD）ゲートです。
+使用方法:
+    - 設定ファイルの `retry` セクションを `RetrySettings.from_dict` で読み込み、`RetryRegistry(settings).get("anthropic")` を各クライアントの `retry` に渡します。
+    - クライアントは1回分の送信処理を `policy.call(attempt)` に渡し、再試行すべき失敗は `status_error(...)` / `network_error(...)` が返す `RetryableError` として送出します。
+    - `policy.add_throttle_listener(gate.on_throttle)` でスロットリングを `AdaptiveConcurrency` に伝え、行の処理を `gate.run(func, item)` で包みます。
+    - 実行後は `registry.summary()` で再試行回数・待機時間を確認できます。
+"""
+
+from __future__ import annotations
+
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_BUDGET_RATIO = 0.2
+DEFAULT_BUDGET_MIN_RETRIES = 10
+
+THROTTLE = "throttle"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# Status codes worth retrying, per provider. 529 is Anthropic's "overloaded";
+# Sheets reports per-user quota exhaustion as 403 with a rateLimitExceeded reason.
+_THROTTLE_STATUSES: Dict[str, frozenset] = {
+    "anthropic": frozenset({429, 529}),
+    "openai": frozenset({429}),
+    "sheets": frozenset({429}),
+}
+_TRANSIENT_STATUSES = frozenset({408, 500, 502, 503, 504})
+_SHEETS_QUOTA_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+# OpenAI answers 429 both for rate limits and for an exhausted billing quota;
+# the latter will not clear up by waiting.
+_OPENAI_FATAL_CODES = ("insufficient_quota",)
+
+
+class RetryableError(RuntimeError):
+    """A failed attempt that the retry policy may repeat."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None, throttled: bool = False) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the delay in seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def classify(provider: str, status: int, detail: str = "") -> str:
+    """Return THROTTLE, TRANSIENT or FATAL for an HTTP status from `provider`."""
+    if status in _THROTTLE_STATUSES.get(provider, frozenset({429})):
+        if provider == "openai" and any(code in detail for code in _OPENAI_FATAL_CODES):
+            return FATAL
+        return THROTTLE
+    if provider == "sheets" and status == 403 and any(reason in detail for reason in _SHEETS_QUOTA_REASONS):
+        return THROTTLE
+    if status in _TRANSIENT_STATUSES:
+        return TRANSIENT
+    return FATAL
+
+
+def status_error(
+    provider: str,
+    status: int,
+    message: str,
+    headers: Optional[Mapping[str, str]] = None,
+    detail: str = "",
+) -> RuntimeError:
+    """Build the exception for a failed HTTP response: retryable or plain RuntimeError."""
+    kind = classify(provider, status, detail)
+    if kind == FATAL:
+        return RuntimeError(message)
+    retry_after = None
+    if headers is not None:
+        retry_after = parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    return RetryableError(message, status=status, retry_after=retry_after, throttled=kind == THROTTLE)
+
+
+def network_error(message: str) -> RetryableError:
+    """Build the exception for a connection failure or timeout."""
+    return RetryableError(message)
+
+
+@dataclass
+class RetrySettings:
+    """Typed view over the `retry` config section."""
+
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+    budget_ratio: float = DEFAULT_BUDGET_RATIO
+    budget_min_retries: int = DEFAULT_BUDGET_MIN_RETRIES
+    adaptive_concurrency: bool = True
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> "RetrySettings":
+        return cls(
+            max_attempts=max(1, int(data.get("max_attempts", DEFAULT_MAX_ATTEMPTS))),  # type: ignore[arg-type]
+            base_delay=float(data.get("base_delay", DEFAULT_BASE_DELAY)),  # type: ignore[arg-type]
+            max_delay=float(data.get("max_delay", DEFAULT_MAX_DELAY)),  # type: ignore[arg-type]
+            budget_ratio=float(data.get("budget_ratio", DEFAULT_BUDGET_RATIO)),  # type: ignore[arg-type]
+            budget_min_retries=int(data.get("budget_min_retries", DEFAULT_BUDGET_MIN_RETRIES)),  # type: ignore[arg-type]
+            adaptive_concurrency=bool(data.get("adaptive_concurrency", True)),
+        )
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a share of normal calls.
+
+    Every first attempt deposits `ratio` tokens and every retry withdraws one,
+    so during an outage retries add at most `ratio` extra load. The bucket
+    starts (and is capped) at `min_retries` tokens to allow short bursts.
+    """
+
+    def __init__(self, ratio: float = DEFAULT_BUDGET_RATIO, min_retries: int = DEFAULT_BUDGET_MIN_RETRIES) -> None:
+        self.ratio = max(0.0, ratio)
+        self.capacity = float(max(0, min_retries))
+        self._tokens = self.capacity
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+@dataclass
+class RetryStats:
+    """Thread-safe counters for one provider's retries."""
+
+    calls: int = 0
+    retries: int = 0
+    throttled: int = 0
+    gave_up: int = 0
+    budget_exhausted: int = 0
+    waited_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def record_retry(self, delay: float, throttled: bool) -> None:
+        with self._lock:
+            self.retries += 1
+            self.waited_seconds += delay
+            if throttled:
+                self.throttled += 1
+
+    def record_give_up(self, budget: bool) -> None:
+        with self._lock:
+            self.gave_up += 1
+            if budget:
+                self.budget_exhausted += 1
+
+
+class RetryPolicy:
+    """Run one logical call, repeating attempts that raise RetryableError."""
+
+    def __init__(
+        self,
+        provider: str,
+        settings: Optional[RetrySettings] = None,
+        budget: Optional[RetryBudget] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.provider = provider
+        self.settings = settings or RetrySettings()
+        self.budget = budget or RetryBudget(self.settings.budget_ratio, self.settings.budget_min_retries)
+        self.stats = RetryStats()
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        # Listener lists are copy-on-write: campaigns sharing this policy add and
+        # remove gates while other threads notify, so a list is never mutated
+        # once published and notifying needs no lock.
+        self._listeners_lock = threading.Lock()
+        self._throttle_listeners: List[Callable[[], None]] = []
+        self._success_listeners: List[Callable[[], None]] = []
+        self._retry_listeners: List[Callable[[str, float, bool], None]] = []
+
+    def add_throttle_listener(self, listener: Callable[[], None]) -> None:
+        with self._listeners_lock:
+            self._throttle_listeners = self._throttle_listeners + [listener]
+
+    def add_success_listener(self, listener: Callable[[], None]) -> None:
+        with self._listeners_lock:
+            self._success_listeners = self._success_listeners + [listener]
+
+    def add_retry_listener(self, listener: Callable[[str, float, bool], None]) -> None:
+        """Call `listener(provider, delay, throttled)` before every retry."""
+        with self._listeners_lock:
+            self._retry_listeners = self._retry_listeners + [listener]
+
+    def remove_listener(self, listener: Callable[..., None]) -> None:
+        """Detach `listener` from every event it was added for."""
+        with self._listeners_lock:
+            self._throttle_listeners = [item for item in self._throttle_listeners if item != listener]
+            self._success_listeners = [item for item in self._success_listeners if item != listener]
+            self._retry_listeners = [item for item in self._retry_listeners if item != listener]
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before attempt `attempt + 1` ("full jitter" backoff)."""
+        if retry_after is not None:
+            return retry_after
+        ceiling = min(self.settings.max_delay, self.settings.base_delay * (2 ** (attempt - 1)))
+        return self._rng.uniform(0.0, ceiling)
+
+    def _next_delay(self, attempt: int, err: RetryableError) -> Optional[float]:
+        """Return the wait before retrying, or None when the error must be raised."""
+        if err.throttled:
+            for listener in self._throttle_listeners:
+                listener()
+        if attempt >= self.settings.max_attempts:
+            self.stats.record_give_up(budget=False)
+            return None
+        # A Retry-After longer than max_delay would stall a worker for too long.
+        if err.retry_after is not None and err.retry_after > self.settings.max_delay:
+            self.stats.record_give_up(budget=False)
+            return None
+        if not self.budget.withdraw():
+            self.stats.record_give_up(budget=True)
+            return None
+        delay = self.delay(attempt, err.retry_after)
+        self.stats.record_retry(delay, err.throttled)
+        for listener in self._retry_listeners:
+            listener(self.provider, delay, err.throttled)
+        return delay
+
+    def _succeeded(self) -> None:
+        for listener in self._success_listeners:
+            listener()
+
+    def call(self, attempt: Callable[[], T]) -> T:
+        """Call `attempt` until it succeeds, raises a non-retryable error, or retries run out."""
+        self.stats.record_call()
+        self.budget.deposit()
+        number = 1
+        while True:
+            try:
+                result = attempt()
+            except RetryableError as err:
+                delay = self._next_delay(number, err)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                number += 1
+                continue
+            self._succeeded()
+            return result
+
+    async def call_async(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """asyncio counterpart of `call`."""
+        import asyncio  # only async callers need it; keeps the CLIs' startup light
+
+        self.stats.record_call()
+        self.budget.deposit()
+        number = 1
+        while True:
+            try:
+                result = await attempt()
+            except RetryableError as err:
+                delay = self._next_delay(number, err)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                number += 1
+                continue
+            self._succeeded()
+            return result
+
+    def summary(self) -> Optional[str]:
+        stats = self.stats
+        if not stats.retries and not stats.gave_up:
+            return None
+        parts = [f"{stats.retries} retries ({stats.throttled} throttled, waited {stats.waited_seconds:.1f}s)"]
+        if stats.gave_up:
+            parts.append(f"{stats.gave_up} gave up")
+        if stats.budget_exhausted:
+            parts.append(f"{stats.budget_exhausted} over retry budget")
+        return f"{self.provider} " + ", ".join(parts)
+
+
+class RetryRegistry:
+    """One RetryPolicy per provider sharing the same settings."""
+
+    def __init__(self, settings: Optional[RetrySettings] = None) -> None:
+        self.settings = settings or RetrySettings()
+        self._policies: Dict[str, RetryPolicy] = {}
+        self._retry_listeners: List[Callable[[str, float, bool], None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> RetryPolicy:
+        with self._lock:
+            policy = self._policies.get(provider)
+            if policy is None:
+                policy = RetryPolicy(provider, self.settings)
+                for listener in self._retry_listeners:
+                    policy.add_retry_listener(listener)
+                self._policies[provider] = policy
+            return policy
+
+    def add_retry_listener(self, listener: Callable[[str, float, bool], None]) -> None:
+        """Attach `listener` to every provider's policy, including ones created later."""
+        with self._lock:
+            self._retry_listeners.append(listener)
+            for policy in self._policies.values():
+                policy.add_retry_listener(listener)
+
+    def adaptive_gate(self, providers: Sequence[str], maximum: int) -> Optional["AdaptiveConcurrency"]:
+        """Return an AIMD gate driven by `providers`' throttling, or None when disabled or serial."""
+        if not self.settings.adaptive_concurrency or maximum <= 1:
+            return None
+        gate = AdaptiveConcurrency(maximum)
+        for provider in providers:
+            policy = self.get(provider)
+            policy.add_throttle_listener(gate.on_throttle)
+            policy.add_success_listener(gate.on_success)
+        return gate
+
+    def release_gate(self, gate: "AdaptiveConcurrency") -> None:
+        """Stop `gate` following throttling; registries shared across runs would otherwise keep every run's gate."""
+        with self._lock:
+            policies = list(self._policies.values())
+        for policy in policies:
+            policy.remove_listener(gate.on_throttle)
+            policy.remove_listener(gate.on_success)
+
+    def summary(self) -> str:
+        with self._lock:
+            policies = list(self._policies.values())
+        return "; ".join(line for line in (policy.summary() for policy in policies) if line)
+
+
+class AdaptiveConcurrency:
+    """AIMD gate on in-flight calls.
+
+    `on_throttle` halves the limit (at most once per `cooldown` seconds so one
+    burst of 429s counts once); every `limit` successes raise it by one, up to
+    `maximum`.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = self.maximum
+        self.lowest = self.maximum
+        self.decreases = 0
+        self._decrease = decrease
+        self._cooldown = cooldown
+        self._clock = clock
+        self._last_decrease = float("-inf")
+        self._successes = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            now = self._clock()
+            if now - self._last_decrease < self._cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, int(self.limit * self._decrease))
+            self.lowest = min(self.lowest, self.limit)
+            self.decreases += 1
+            self._successes = 0
+
+    def on_success(self) -> None:
+        with self._cond:
+            if self.limit >= self.maximum:
+                return
+            self._successes += 1
+            if self._successes >= self.limit:
+                self._successes = 0
+                self.limit += 1
+                self._cond.notify_all()
+
+    def run(self, func: Callable[..., T], *args: object) -> T:
+        """Call `func(*args)` once fewer than `limit` calls are in flight."""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+        try:
+            return func(*args)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def wrap(self, func: Callable[..., T]) -> Callable[..., T]:
+        return lambda *args: self.run(func, *args)
+
+    def summary(self) -> Optional[str]:
+        if not self.decreases:
+            return None
+        return f"reduced {self.decreases}x (lowest {self.lowest}/{self.maximum}, now {self.limit})"
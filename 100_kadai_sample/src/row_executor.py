@@ -0,0 +1,92 @@
+"""
+処理概要:
+    - 行単位の処理関数を最大N件まで並行実行し、結果を入力順に返す小さな実行エンジン。
+    - ネットワーク待ちが大半を占めるLLM呼び出しをスレッドで重ねつつ、ログ出力やシート書き込みは呼び出し側で行順に行えます。
+使用方法:
+    - `for outcome in run_ordered(func, items, workers=4): ...` のように使います。
+    - 各 `TaskOutcome` は `item` / `result` / `error` を持ち、行ごとの例外は `error` に格納されるため全体は止まりません。
+    - `workers` が1以下の場合はスレッドを使わず、呼び出し元スレッドで逐次実行します。
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Deque, Generic, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# How many finished-but-unreported results may pile up behind a slow head row,
+# expressed as a multiple of the worker count.
+REORDER_WINDOW_FACTOR = 4
+
+
+@dataclass
+class TaskOutcome(Generic[T, R]):
+    """Result of running the task function on a single item."""
+
+    item: T
+    result: Optional[R] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run_inline(func: Callable[[T], R], item: T) -> TaskOutcome[T, R]:
+    try:
+        return TaskOutcome(item=item, result=func(item))
+    except Exception as err:  # noqa: BLE001 - per-row errors are reported, not raised
+        return TaskOutcome(item=item, error=err)
+
+
+def _resolve(item: T, future: "Future[R]") -> TaskOutcome[T, R]:
+    error = future.exception()
+    if error is not None:
+        return TaskOutcome(item=item, error=error)
+    return TaskOutcome(item=item, result=future.result())
+
+
+def run_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 1,
+) -> Iterator[TaskOutcome[T, R]]:
+    """Apply `func` to every item with at most `workers` calls in flight, yielding in input order."""
+    if workers <= 1:
+        for item in items:
+            yield _run_inline(func, item)
+        return
+
+    window = workers * REORDER_WINDOW_FACTOR
+    source = iter(items)
+    exhausted = False
+    pending: Deque[Tuple[T, "Future[R]"]] = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            running = sum(1 for _, future in pending if not future.done())
+            while not exhausted and running < workers and len(pending) < window:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((item, pool.submit(func, item)))
+                running += 1
+
+            if not pending:
+                return
+
+            head_item, head_future = pending[0]
+            if head_future.done():
+                pending.popleft()
+                yield _resolve(head_item, head_future)
+                continue
+
+            # Wait for any in-flight task so freed slots can be refilled while
+            # the head row is still running.
+            wait([future for _, future in pending if not future.done()], return_when=FIRST_COMPLETED)
@@ -0,0 +1,167 @@
+"""
+処理概要:
+    - 長時間の実行中に生成した検索結果・セールスレターを、行番号と企業ハッシュをキーに追記専用のJSONLへ記録します。
+    - 途中でプロセスが落ちても、次回 `--resume` で未書き込みの結果を再送し、生成済みのLLM呼び出しを再度支払わずに続きから処理できます。
+使用方法:
+    - `journal = RunJournal.open(path, resume=True)` で開き、`journal.state` から前回までの結果を参照します。
+    - 生成のたびに `record_search` / `record_letter`、シートへの書き込み完了後に `record_written` を呼びます。
+    - `resume=False` で開くと既存のジャーナルは `*.prev.jsonl` へ退避され、新しい実行として記録を始めます。
+      それまでの退避分は `*.prev2.jsonl`、`*.prev3.jsonl` へ順に送られ、直近3回分を残します。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+
+JournalKey = Tuple[int, str]
+# Archived journals of earlier runs kept next to the current one (`*.prev.jsonl` is the newest).
+KEEP_PREVIOUS = 3
+
+
+def company_hash(*fields: str) -> str:
+    """Return a short stable hash identifying the company on a row."""
+    digest = hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+    return digest[:16]
+
+
+@dataclass
+class JournalEntry:
+    """Latest known progress for one (row, company) key."""
+
+    search_result: Optional[str] = None
+    sales_letter: Optional[str] = None
+    written: bool = False
+
+
+@dataclass
+class JournalState:
+    """Replay of a journal file keyed by (row_number, company_hash)."""
+
+    entries: Dict[JournalKey, JournalEntry] = field(default_factory=dict)
+
+    def get(self, key: JournalKey) -> Optional[JournalEntry]:
+        return self.entries.get(key)
+
+    @property
+    def pending_writes(self) -> int:
+        return sum(1 for entry in self.entries.values() if entry.sales_letter is not None and not entry.written)
+
+    @property
+    def written(self) -> int:
+        return sum(1 for entry in self.entries.values() if entry.written)
+
+    def apply(self, event: Dict[str, object]) -> None:
+        key = (int(event["row"]), str(event["hash"]))  # type: ignore[arg-type]
+        entry = self.entries.setdefault(key, JournalEntry())
+        kind = event.get("event")
+        if kind == "search":
+            entry.search_result = str(event.get("search_result", ""))
+        elif kind == "letter":
+            entry.search_result = str(event.get("search_result", entry.search_result or ""))
+            entry.sales_letter = str(event.get("sales_letter", ""))
+        elif kind == "written":
+            entry.written = True
+
+
+def load_state(path: Path) -> JournalState:
+    """Read a journal file; a torn final line from a crash is ignored."""
+    state = JournalState()
+    if not path.exists():
+        return state
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(event, dict) and "row" in event and "hash" in event:
+                state.apply(event)
+    return state
+
+
+def archive_paths(path: Path, keep: int = KEEP_PREVIOUS) -> List[Path]:
+    """Return the archive names of `path`, newest first: `x.prev.jsonl`, `x.prev2.jsonl`, ..."""
+    return [
+        path.with_name(f"{path.stem}.prev{'' if generation == 1 else generation}{path.suffix}")
+        for generation in range(1, keep + 1)
+    ]
+
+
+def archive_journal(path: Path, keep: int = KEEP_PREVIOUS) -> Path:
+    """Move `path` to its newest archive name, shifting older archives back and dropping the oldest."""
+    archives = archive_paths(path, keep)
+    for newer, older in reversed(list(zip(archives, archives[1:]))):
+        if newer.exists():
+            newer.replace(older)
+    path.replace(archives[0])
+    return archives[0]
+
+
+class RunJournal:
+    """Thread-safe append-only JSONL journal of completed work."""
+
+    def __init__(self, path: Path, state: Optional[JournalState] = None) -> None:
+        self.path = path
+        self.state = state or JournalState()
+        self._lock = threading.Lock()
+        self._fh: Optional[TextIO] = None
+
+    @classmethod
+    def open(cls, path: Path, resume: bool) -> "RunJournal":
+        """Open `path`, replaying it when resuming or archiving it otherwise."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            return cls(path, load_state(path))
+        if path.exists():
+            archive_journal(path)
+        return cls(path)
+
+    def _append(self, event: Dict[str, object]) -> None:
+        event["ts"] = round(time.time(), 3)
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            if self._fh is None:
+                self._fh = self.path.open("a", encoding="utf-8")
+            self._fh.write(line + "\n")
+            # Flush every line so a killed process loses at most the line in flight.
+            self._fh.flush()
+            self.state.apply(event)
+
+    def record_search(self, key: JournalKey, search_result: str) -> None:
+        self._append({"event": "search", "row": key[0], "hash": key[1], "search_result": search_result})
+
+    def record_letter(self, key: JournalKey, search_result: str, sales_letter: str) -> None:
+        self._append(
+            {
+                "event": "letter",
+                "row": key[0],
+                "hash": key[1],
+                "search_result": search_result,
+                "sales_letter": sales_letter,
+            }
+        )
+
+    def record_written(self, keys: Iterable[JournalKey]) -> None:
+        for row, digest in keys:
+            self._append({"event": "written", "row": row, "hash": digest})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,700 @@
+"""
+処理概要:
+    - `fill_spreadsheet.py`（検索＋営業文）と `search_single.py`（検索のみ）が共有する、スプレッドシートの行処理の基盤です。
+    - 設定ファイルの共通項目とサービスアカウントの解決、ヘッダーからの列の特定、行ブロックからの `CompanyRecord` の生成、
+      Sheets / OpenAI クライアントとレート制限・再試行・応答キャッシュ・計測の準備、行の並行実行と結果の行順処理、実行後の集計表示をまとめています。
+    - 接続・キャッシュ・まとめ書き込みなどの改善はここと各クライアントモジュールに入れれば、両方のジョブに効きます。
+使用方法:
+    - 設定クラスの `from_dict` で `common_settings(data)` を展開し、`load_job_config(path, Config.from_dict)` で読み込みます。
+    - `job = SheetJob.start(config, metrics_path)` でSheetsに接続し、`job.prompt_builder()` / `job.read_columns()` / `job.records(blocks, limit)` で入力を準備します。
+    - `outcomes = job.run_rows(task, records, workers, ["openai"])` を `job.consume(outcomes, on_row, on_skip)` で行順に処理し、
+      最後に `job.finish()` でキャッシュ・レート制限・再試行・同時実行数・計測の集計を表示します。
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+from dataclasses import astuple, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import quote_plus
+
+from batch_jobs import BatchSettings
+from google_sheets_client import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_READ_BLOCK_SIZE,
+    GoogleSheetsClient,
+    SheetBatchWriter,
+    SheetsSettings,
+    SpreadsheetHandle,
+)
+from http_transport import HTTPSettings, HTTPTransport
+from metrics import RunMetrics
+from openai_client import OpenAIClient, read_api_key as read_openai_key
+from prompt_builder import PromptBuilder
+from rate_limiter import RateLimiterRegistry, parse_rate_limits
+from response_cache import CacheSettings, ResponseCache
+from retry_policy import AdaptiveConcurrency, RetryRegistry, RetrySettings
+from row_executor import TaskOutcome, run_ordered
+from token_cache import TokenCache
+
+CURRENT_DIR = Path(__file__).resolve().parent
+
+C = TypeVar("C")
+R = TypeVar("R")
+
+
+# --------------------------------- Config -----------------------------------
+
+
+def common_settings(data: Mapping[str, Any]) -> Dict[str, object]:
+    """Return the config fields both jobs read, as keyword arguments for their config classes."""
+    ranges = data.get("ranges", {})
+    output = data.get("output", {})
+    openai = data.get("openai", {})
+    return {
+        "spreadsheet_id": str(data["spreadsheet_id"]),
+        "service_account_file": str(data["service_account_file"]),
+        "search_prompt_range": str(ranges["search_prompt_template"]),
+        "business_info_range": str(ranges["business_info"]),
+        "output_sheet_name": str(output.get("sheet_name", "結果")),
+        "output_start_row": int(output.get("start_row", 2)),
+        "write_batch_size": max(1, int(output.get("batch_size", DEFAULT_BATCH_SIZE))),
+        "write_flush_interval": float(output.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+        "read_block_size": max(1, int(output.get("read_block_size", DEFAULT_READ_BLOCK_SIZE))),
+        "openai_api_key": str(openai.get("api_key", "")) or None,
+        "openai_api_key_env": str(openai.get("api_key_env", "OPENAI_API_KEY")),
+        "openai_base_url": str(openai.get("base_url", "")) or None,
+        "sheets_api_endpoint": str(data.get("sheets_api_endpoint", "")) or None,
+        "rate_limits": parse_rate_limits(data),  # type: ignore[arg-type]
+        "cache": CacheSettings.from_dict(data.get("cache", {"enabled": False})),
+        "retry": RetrySettings.from_dict(data.get("retry", {})),
+        "batch": BatchSettings.from_dict(data.get("batch", {})),
+        "sheets": SheetsSettings.from_dict(data.get("sheets", {})),
+    }
+
+
+def resolve_service_account(config_path: Path, service_account_file: str, sheets_api_endpoint: Optional[str]) -> str:
+    """Return the credential file as an absolute path, so runs work from any working directory.
+
+    Relative paths are tried against the config file's folder, the repository
+    root and this folder, then GOOGLE_APPLICATION_CREDENTIALS. A custom Sheets
+    endpoint (local mock) needs no credentials, so a missing file is accepted.
+    """
+    given = Path(service_account_file)
+    candidates: List[Path] = []
+    if given.is_absolute():
+        candidates.append(given)
+    else:
+        candidates.append(config_path.parent / given)
+        candidates.append(CURRENT_DIR.parent.parent / given)
+        candidates.append(CURRENT_DIR / given)
+    env = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "").strip()
+    if env:
+        candidates.append(Path(env))
+
+    for candidate in candidates:
+        try:
+            if candidate.exists():
+                return str(candidate.resolve())
+        except OSError:
+            # Ignore permission or transient FS errors when checking candidates
+            continue
+    if sheets_api_endpoint:
+        return service_account_file
+    tried = ", ".join(str(p) for p in candidates)
+    raise FileNotFoundError(f"Service account file not found. Tried: {tried}")
+
+
+def load_job_config(path: Path, parse: Callable[[Dict[str, object]], C]) -> C:
+    """Read a JSON config with `parse` and resolve its file paths against the config's folder."""
+    with path.open("r", encoding="utf-8") as fh:
+        config = parse(json.load(fh))
+    settings: Any = config
+    settings.service_account_file = resolve_service_account(
+        path, settings.service_account_file, settings.sheets_api_endpoint
+    )
+    # The response cache and batch request files live next to the config file unless given absolutely.
+    if not Path(settings.cache.path).is_absolute():
+        settings.cache.path = str(path.parent / settings.cache.path)
+    if not Path(settings.batch.dir).is_absolute():
+        settings.batch.dir = str(path.parent / settings.batch.dir)
+    for name in ("token_cache", "discovery_document"):
+        value = getattr(settings.sheets, name)
+        if value and not Path(value).is_absolute():
+            setattr(settings.sheets, name, str(path.parent / value))
+    return config
+
+
+def load_env_file(path: Path) -> None:
+    """Load API keys from a `.env` file when python-dotenv is installed.
+
+    Called after argument parsing, so `--help` and argument errors do not
+    import it.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:  # pragma: no cover - optional dependency
+        return
+    load_dotenv(path)
+
+
+def open_token_cache(config: Any, metrics: Optional[RunMetrics] = None) -> Optional[TokenCache]:
+    """Return the encrypted access-token cache from `sheets.token_cache`, or None when it is off.
+
+    Local mock endpoints are not authenticated, so they never get one.
+    """
+    if not config.sheets.token_cache or config.sheets_api_endpoint:
+        return None
+    return TokenCache(Path(config.sheets.token_cache), config.service_account_file, metrics=metrics)
+
+
+def openai_api_key(config: Any) -> str:
+    """Return `openai.api_key`, else the key in `openai.api_key_env`; raise when neither is set."""
+    key = config.openai_api_key or read_openai_key(config.openai_api_key_env)
+    if not key:
+        raise ValueError("OpenAI API key is not configured. Provide openai.api_key or set environment variable.")
+    return key
+
+
+# ------------------------------ Row processing ------------------------------
+
+
+@dataclass
+class ColumnIndexes:
+    """Hold zero-based column indexes resolved from the header row."""
+
+    name: int
+    url: int
+    search_result: int
+    sales_letter: Optional[int] = None
+    num_employees: Optional[int] = None
+    contact_form_url: Optional[int] = None
+    address: Optional[int] = None
+    prefecture_id: Optional[int] = None
+    registered_company_name: Optional[int] = None
+
+    def input_columns(self) -> List[int]:
+        """Return the columns `CompanyRecord.prompt_context` draws from."""
+        optional = (self.num_employees, self.contact_form_url, self.address, self.prefecture_id, self.registered_company_name)
+        return [self.name, self.url] + [index for index in optional if index is not None]
+
+
+@dataclass
+class CompanyRecord:
+    """Represent a single spreadsheet row with the required context."""
+
+    row_number: int
+    name: str
+    url: str
+    search_result: str
+    sales_letter: str = ""
+    num_employees: str = ""
+    contact_form_url: str = ""
+    address: str = ""
+    prefecture_id: str = ""
+    registered_company_name: str = ""
+
+    def prompt_context(self) -> Dict[str, str]:
+        """Return replacements for prompt templates."""
+        return {
+            "company_name": self.name,
+            "company_name_encoded": url_encode(self.name),
+            "company_url": self.url,
+            "num_employees": self.num_employees,
+            "contact_form_url": self.contact_form_url,
+            "address": self.address,
+            "prefecture_id": self.prefecture_id,
+            "registered_company_name": self.registered_company_name,
+            "registered_company_name_encoded": url_encode(self.registered_company_name),
+        }
+
+
+def url_encode(value: str) -> str:
+    if not value:
+        return ""
+    return quote_plus(value)
+
+
+def safe_get(row: List[str], index: Optional[int]) -> str:
+    """Return the stripped cell at `index`, or "" when the column is absent or the row is short."""
+    if index is None:
+        return ""
+    if index < len(row):
+        return row[index].strip()
+    return ""
+
+
+def build_column_indexes(header: List[str], require_sales_letter: bool = False) -> ColumnIndexes:
+    """Locate the input and output columns by their header labels.
+
+    NAME and the optional inputs before URL, and 検索結果 / セールスレター
+    after it, are preferred when a label appears more than once.
+    """
+    positions: Dict[str, List[int]] = {}
+    for idx, value in enumerate(cell.strip() for cell in header):
+        if not value:
+            continue
+        positions.setdefault(value, []).append(idx)
+
+    def pick(label: str, *, required: bool = False, prefer_before: Optional[int] = None, prefer_after: Optional[int] = None) -> Optional[int]:
+        candidates = positions.get(label, [])
+        if prefer_before is not None:
+            before_candidates = [idx for idx in candidates if idx < prefer_before]
+            if before_candidates:
+                candidates = before_candidates
+        if prefer_after is not None:
+            after_candidates = [idx for idx in candidates if idx > prefer_after]
+            if after_candidates:
+                candidates = after_candidates
+        if not candidates:
+            if required:
+                raise ValueError(f"列 '{label}' がヘッダーにありません。スプレッドシートを確認してください。")
+            return None
+        return candidates[0]
+
+    url_idx = pick("URL", required=True)
+    if url_idx is None:  # for type checker; runtime guarded above
+        raise AssertionError("URL column lookup failed")
+
+    name_idx = pick("NAME", required=True, prefer_before=url_idx)
+    if name_idx is None:
+        raise AssertionError("NAME column lookup failed")
+    num_idx = pick("NUM_EMPLOYEES", prefer_before=url_idx)
+    contact_idx = pick("CONTACT_FORM_URL", prefer_after=url_idx)
+    address_idx = pick("ADDRESS", prefer_after=url_idx)
+    prefecture_idx = pick("PREFECTURE_ID", prefer_after=url_idx)
+
+    registered_idx = None
+    for label in ("REGISTERED_COMPANY_NAME", "REGISTERED_NAME", "登記業名"):
+        candidate = pick(label, prefer_before=url_idx)
+        if candidate is not None:
+            registered_idx = candidate
+            break
+
+    search_idx = pick("検索結果", required=True, prefer_after=url_idx)
+    if search_idx is None:
+        raise AssertionError("検索結果 column lookup failed")
+    sales_idx = pick("セールスレター", required=require_sales_letter, prefer_after=search_idx)
+
+    return ColumnIndexes(
+        name=name_idx,
+        url=url_idx,
+        search_result=search_idx,
+        sales_letter=sales_idx if require_sales_letter else None,
+        num_employees=num_idx,
+        contact_form_url=contact_idx,
+        address=address_idx,
+        prefecture_id=prefecture_idx,
+        registered_company_name=registered_idx,
+    )
+
+
+def build_company_records(rows: List[List[str]], columns: ColumnIndexes, start_row: int) -> List[CompanyRecord]:
+    """Return a record for each row with a NAME or URL; `start_row` is the sheet row of `rows[0]`."""
+    records: List[CompanyRecord] = []
+    for offset, row in enumerate(rows):
+        name = safe_get(row, columns.name)
+        url = safe_get(row, columns.url)
+        if not name and not url:
+            continue
+        records.append(
+            CompanyRecord(
+                row_number=start_row + offset,
+                name=name,
+                url=url,
+                search_result=safe_get(row, columns.search_result),
+                sales_letter=safe_get(row, columns.sales_letter),
+                num_employees=safe_get(row, columns.num_employees),
+                contact_form_url=safe_get(row, columns.contact_form_url),
+                address=safe_get(row, columns.address),
+                prefecture_id=safe_get(row, columns.prefecture_id),
+                registered_company_name=safe_get(row, columns.registered_company_name),
+            )
+        )
+    return records
+
+
+def iter_company_records(blocks: Iterable[Tuple[int, List[List[str]]]], columns: ColumnIndexes) -> Iterator[CompanyRecord]:
+    """Build records block by block as `blocks` are fetched."""
+    for first_row, rows in blocks:
+        yield from build_company_records(rows, columns, first_row)
+
+
+def read_single_cells(sheet: SpreadsheetHandle, ranges: Sequence[str]) -> List[str]:
+    """Return the first cell of each range, fetched in one `values.batchGet`; raise when one is empty."""
+    cells: List[str] = []
+    for range_name, values in zip(ranges, sheet.batch_fetch_values(ranges)):
+        if not values or not values[0]:
+            raise ValueError(f"Range {range_name} is empty; check spreadsheet setup")
+        cells.append(values[0][0])
+    return cells
+
+
+def report_flush(range_count: int, updated_cells: int) -> None:
+    print(f"[write] Flushed {range_count} ranges in one batchUpdate ({updated_cells} cells)")
+
+
+# --------------------------------- Engine -----------------------------------
+
+
+def budget_summary_lines(
+    caches: Sequence[ResponseCache], rate_limiters: RateLimiterRegistry, retries: RetryRegistry
+) -> List[str]:
+    """Return the `[cache]`, `[rate-limit]` and `[retry]` summary lines (empty parts are left out)."""
+    lines = [f"[cache] {cache.summary()}" for cache in caches]
+    waited = rate_limiters.summary()
+    if waited:
+        lines.append(f"[rate-limit] {waited}")
+    retried = retries.summary()
+    if retried:
+        lines.append(f"[retry] {retried}")
+    return lines
+
+
+@dataclass
+class WarmClients:
+    """Budgets, clients and caches a resident worker keeps across runs.
+
+    Every run started with the same instance draws on one set of rate
+    limiters and retry policies, so concurrent campaigns share the provider
+    quotas instead of each assuming it has them to itself. Clients are keyed
+    by the settings that shape them and built on first use.
+    """
+
+    rate_limiters: RateLimiterRegistry
+    retries: RetryRegistry
+    _sheets: Dict[Tuple[str, Optional[str]], GoogleSheetsClient] = field(default_factory=dict, init=False, repr=False)
+    _openai: Dict[Tuple[object, ...], OpenAIClient] = field(default_factory=dict, init=False, repr=False)
+    _transports: Dict[Tuple[object, ...], HTTPTransport] = field(default_factory=dict, init=False, repr=False)
+    _caches: Dict[str, ResponseCache] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "WarmClients":
+        """Share the limits in the `rate_limits` and `retry` sections of a config document."""
+        return cls(RateLimiterRegistry(parse_rate_limits(data)), RetryRegistry(RetrySettings.from_dict(data.get("retry", {}))))
+
+    def sheets(self, config: Any) -> GoogleSheetsClient:
+        """One Sheets client per service account and endpoint; its token and discovery service stay warm."""
+        key = (config.service_account_file, config.sheets_api_endpoint)
+        with self._lock:
+            client = self._sheets.get(key)
+            if client is None:
+                client = GoogleSheetsClient(
+                    service_account_file=config.service_account_file,
+                    rate_limiter=self.rate_limiters.get("sheets"),
+                    api_endpoint=config.sheets_api_endpoint,
+                    retry=self.retries.get("sheets"),
+                    token_cache=open_token_cache(config),
+                    discovery_document=config.sheets.discovery_document or None,
+                )
+                self._sheets[key] = client
+            return client
+
+    def cache(self, settings: CacheSettings) -> Optional[ResponseCache]:
+        """One response cache per file, or None when `settings` disable it."""
+        if not settings.enabled:
+            return None
+        with self._lock:
+            cache = self._caches.get(settings.path)
+            if cache is None:
+                cache = ResponseCache.open(settings)
+                self._caches[settings.path] = cache  # type: ignore[assignment]
+            return cache
+
+    def openai(self, config: Any, model: str, max_tokens: int, cache: Optional[ResponseCache]) -> OpenAIClient:
+        key = (openai_api_key(config), config.openai_base_url, model, max_tokens, id(cache))
+        with self._lock:
+            client = self._openai.get(key)
+            if client is None:
+                client = OpenAIClient(
+                    api_key=key[0],  # type: ignore[arg-type]
+                    model=model,
+                    max_tokens=max_tokens,
+                    rate_limiter=self.rate_limiters.get("openai"),
+                    cache=cache,
+                    base_url=config.openai_base_url,
+                    retry=self.retries.get("openai"),
+                )
+                self._openai[key] = client
+            return client
+
+    def transport(self, settings: HTTPSettings) -> HTTPTransport:
+        """One keep-alive pool per HTTP setting, so later runs reuse open connections."""
+        key = astuple(settings)
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is None:
+                transport = HTTPTransport(settings)
+                self._transports[key] = transport
+            return transport
+
+    def summary_lines(self) -> List[str]:
+        """`[cache]` / `[rate-limit]` / `[retry]` totals across every run that used these clients."""
+        with self._lock:
+            caches = list(self._caches.values())
+        return budget_summary_lines(caches, self.rate_limiters, self.retries)
+
+    def close(self) -> None:
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            for cache in self._caches.values():
+                cache.close()
+            self._transports.clear()
+            self._caches.clear()
+            self._openai.clear()
+            self._sheets.clear()
+
+
+@dataclass
+class SheetJob:
+    """Clients and run-wide state one job shares across its rows.
+
+    Rate limiters, retry policies, the response cache and the metrics
+    recorder are created once per run and handed to every client, so all
+    worker threads draw on the same budgets and report into one summary.
+    """
+
+    config: Any
+    rate_limiters: RateLimiterRegistry
+    retries: RetryRegistry
+    sheets: GoogleSheetsClient
+    sheet: SpreadsheetHandle
+    metrics: Optional[RunMetrics] = None
+    metrics_path: Optional[Path] = None
+    cache: Optional[ResponseCache] = None
+    gates: Dict[str, AdaptiveConcurrency] = field(default_factory=dict)
+    clients: Optional[WarmClients] = None
+    progress: Optional[Callable[[int, str], None]] = None
+
+    @classmethod
+    def start(
+        cls,
+        config: Any,
+        metrics_path: Optional[Path] = None,
+        clients: Optional[WarmClients] = None,
+        progress: Optional[Callable[[int, str], None]] = None,
+    ) -> "SheetJob":
+        """Create the shared registries and open the configured spreadsheet.
+
+        With `clients`, the run uses the worker's registries and clients
+        instead (its own `rate_limits` / `retry` sections are ignored) and
+        `progress(row_number, status)` is called for every finished row.
+        """
+        if clients is not None:
+            if metrics_path is not None:
+                raise ValueError("--metrics traces are per process; they cannot be combined with shared clients")
+            sheets = clients.sheets(config)
+            return cls(
+                config=config,
+                rate_limiters=clients.rate_limiters,
+                retries=clients.retries,
+                sheets=sheets,
+                sheet=sheets.open_spreadsheet(config.spreadsheet_id),
+                clients=clients,
+                progress=progress,
+            )
+        rate_limiters = RateLimiterRegistry(config.rate_limits)
+        retries = RetryRegistry(config.retry)
+        metrics = RunMetrics.open(metrics_path) if metrics_path is not None else None
+        if metrics is not None:
+            retries.add_retry_listener(
+                lambda provider, delay, throttled: metrics.count(  # type: ignore[union-attr]
+                    "retry", provider, delay=round(delay, 3), throttled=throttled
+                )
+            )
+        sheets = GoogleSheetsClient(
+            service_account_file=config.service_account_file,
+            rate_limiter=rate_limiters.get("sheets"),
+            api_endpoint=config.sheets_api_endpoint,
+            retry=retries.get("sheets"),
+            metrics=metrics,
+            token_cache=open_token_cache(config, metrics),
+            discovery_document=config.sheets.discovery_document or None,
+        )
+        return cls(
+            config=config,
+            rate_limiters=rate_limiters,
+            retries=retries,
+            sheets=sheets,
+            sheet=sheets.open_spreadsheet(config.spreadsheet_id),
+            metrics=metrics,
+            metrics_path=metrics_path,
+            progress=progress,
+        )
+
+    def prompt_builder(self, message_range: Optional[str] = None) -> PromptBuilder:
+        """Read the prompt templates and business info in one request and build the prompt builder."""
+        ranges = [self.config.search_prompt_range, self.config.business_info_range]
+        if message_range is not None:
+            ranges.append(message_range)
+        cells = read_single_cells(self.sheet, ranges)
+        builder = PromptBuilder(
+            search_template=cells[0],
+            self_info=cells[1],
+            message_template=cells[2] if message_range is not None else "",
+        )
+        for template, names in builder.unknown_placeholders.items():
+            listed = ", ".join("{{" + name + "}}" for name in names)
+            print(f"[template] Unknown placeholders in the {template} template are left as is: {listed}")
+        return builder
+
+    def read_columns(self, require_sales_letter: bool = False) -> ColumnIndexes:
+        header_rows = self.sheet.fetch_values(f"{self.config.output_sheet_name}!A1:ZZ1")
+        if not header_rows:
+            raise ValueError("ヘッダー行が取得できませんでした。スプレッドシートの設定を確認してください。")
+        return build_column_indexes(header_rows[0], require_sales_letter)
+
+    def records(
+        self, blocks: Iterable[Tuple[int, List[List[str]]]], columns: ColumnIndexes, limit: Optional[int]
+    ) -> Optional[Iterator[CompanyRecord]]:
+        """Return the rows to process, or None (after saying so) when the sheet has none.
+
+        Only the first block is fetched here; later blocks are read as the
+        rows before them are processed, and not at all past `limit`.
+        """
+        records: Iterator[CompanyRecord] = iter_company_records(blocks, columns)
+        if limit is not None:
+            records = itertools.islice(records, limit)
+        first_record = next(records, None)
+        if first_record is None:
+            print("処理対象の企業行がありません。シートのデータを確認してください。")
+            return None
+        return itertools.chain([first_record], records)
+
+    def open_cache(self, enabled: bool) -> Optional[ResponseCache]:
+        """Open the response cache shared by every client of this run (None when disabled)."""
+        if self.clients is not None:
+            # The worker's cache outlives this run, so it does not report into its trace.
+            self.cache = self.clients.cache(self.config.cache) if enabled else None
+            return self.cache
+        self.cache = ResponseCache.open(self.config.cache) if enabled else None
+        if self.cache is not None:
+            self.cache.metrics = self.metrics
+        return self.cache
+
+    def openai_client(self, model: str, max_tokens: int) -> OpenAIClient:
+        if self.clients is not None:
+            return self.clients.openai(self.config, model, max_tokens, self.cache)
+        return OpenAIClient(
+            api_key=openai_api_key(self.config),
+            model=model,
+            max_tokens=max_tokens,
+            rate_limiter=self.rate_limiters.get("openai"),
+            cache=self.cache,
+            base_url=self.config.openai_base_url,
+            retry=self.retries.get("openai"),
+            metrics=self.metrics,
+        )
+
+    def transport(self, settings: HTTPSettings) -> HTTPTransport:
+        """A keep-alive pool for direct HTTP clients; the worker's warm pool when shared."""
+        if self.clients is not None:
+            return self.clients.transport(settings)
+        return HTTPTransport(settings)
+
+    def release_transport(self, transport: HTTPTransport) -> None:
+        """Close a pool from `transport` unless it belongs to the worker."""
+        if self.clients is None:
+            transport.close()
+
+    def writer(self, on_flush: Optional[Callable[[int, int, List[object]], None]] = None) -> SheetBatchWriter:
+        """Return a batch writer for the output sheet; each flush is logged unless `on_flush` is given."""
+        return SheetBatchWriter(
+            self.sheet,
+            max_ranges=self.config.write_batch_size,
+            flush_interval=self.config.write_flush_interval,
+            on_flush=on_flush or (lambda range_count, updated_cells, _keys: report_flush(range_count, updated_cells)),
+        )
+
+    def gate(self, name: str, providers: Sequence[str], maximum: int) -> Optional[AdaptiveConcurrency]:
+        """Return an AIMD gate for `providers` (None when disabled); it is reported by `finish`."""
+        gate = self.retries.adaptive_gate(providers, maximum)
+        if gate is not None:
+            self.gates[name] = gate
+        return gate
+
+    def run_rows(
+        self,
+        task: Callable[[CompanyRecord], R],
+        records: Iterable[CompanyRecord],
+        workers: int,
+        providers: Sequence[str],
+    ) -> Iterator[TaskOutcome[CompanyRecord, R]]:
+        """Run `task` on up to `workers` rows at once, in row order; throttling from `providers` lowers the count."""
+        gate = self.gate("rows", providers, workers)
+        return run_ordered(task if gate is None else gate.wrap(task), records, workers=workers)
+
+    def consume(
+        self,
+        outcomes: Iterable[TaskOutcome[CompanyRecord, Optional[R]]],
+        on_row: Callable[[CompanyRecord, R], str],
+        on_skip: Callable[[CompanyRecord], None],
+        writer: Optional[SheetBatchWriter] = None,
+    ) -> int:
+        """Handle finished rows in order on this thread and return how many `on_row` took.
+
+        Failed rows are logged as `[error]` and the run continues. A `None`
+        result goes to `on_skip`; other results go to `on_row`, which queues
+        the write and returns the row's status for the metrics. With `writer`,
+        its `flush_interval` is checked after every row, including skipped
+        and failed ones, so queued writes do not wait for the next `add`.
+        """
+        processed = 0
+        for outcome in outcomes:
+            record = outcome.item
+            if outcome.error is not None:
+                identifier = record.name or record.url or f"row {record.row_number}"
+                print(f"[error] {identifier}: {outcome.error}")
+                status = "error"
+            elif outcome.result is None:
+                on_skip(record)
+                status = "skipped"
+            else:
+                status = on_row(record, outcome.result)
+                processed += 1
+            if writer is not None:
+                writer.flush_if_due()
+            if self.metrics is not None:
+                self.metrics.row_finished(record.row_number, status)
+            if self.progress is not None:
+                self.progress(record.row_number, status)
+        return processed
+
+    def close(self) -> None:
+        if self.clients is not None:
+            # The worker keeps the cache and clients; only this run's gates go.
+            for gate in self.gates.values():
+                self.retries.release_gate(gate)
+            return
+        if self.cache is not None:
+            self.cache.close()
+        if self.metrics is not None:
+            self.metrics.close()
+
+    def finish(self, gates: Optional[Mapping[str, AdaptiveConcurrency]] = None) -> None:
+        """Close the cache and trace and print the `[cache]` ... `[metrics]` summary lines.
+
+        With shared clients the cache, rate-limit and retry totals span every
+        run, so their owner prints them (`WarmClients.summary_lines`) instead.
+        """
+        self.gates.update(gates or {})
+        self.close()
+        if self.clients is None:
+            caches = [self.cache] if self.cache is not None else []
+            for line in budget_summary_lines(caches, self.rate_limiters, self.retries):
+                print(line)
+        for name, gate in self.gates.items():
+            adapted = gate.summary()
+            if adapted:
+                print(f"[concurrency] {name}: {adapted}")
+        if self.metrics is not None:
+            for line in self.metrics.summary_lines():
+                print(f"[metrics] {line}")
+            print(f"[metrics] Trace written to {self.metrics_path}")
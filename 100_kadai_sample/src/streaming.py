@@ -0,0 +1,200 @@
+"""
+処理概要:
+    - Server-Sent Events（SSE）形式の応答を1イベントずつ読み出すパーサーと、LLMのストリーミング応答を表す `TextStream`。
+    - テキスト差分を受け取った順に返しながら、最初のトークンまでの時間（TTFT）を計測し、呼び出し側の条件で途中打ち切りができます。
+使用方法:
+    - `stream = claude_client.stream_text(prompt, should_abort=max_chars(4000))` のように各クライアントから受け取ります。
+    - `for delta in stream: ...` で差分を順次処理するか、`stream.final_text()` で全文を受け取ります（打ち切り・途中終了時は例外）。
+    - `StreamStats` に記録した `time_to_first_token` は `summary()` で集計して表示できます。
+"""
+
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+from response_cache import ResponseCache
+
+AbortPredicate = Callable[[str], bool]
+
+
+@dataclass
+class SSEEvent:
+    """One dispatched server-sent event."""
+
+    event: str
+    data: str
+
+
+def iter_sse_events(lines: Iterable[Union[bytes, str]]) -> Iterator[SSEEvent]:
+    """Parse an SSE byte/text line stream into events, following the WHATWG rules we need."""
+    event = ""
+    data: List[str] = []
+    for raw in lines:
+        line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        line = line.rstrip("\r\n")
+        if not line:
+            if data:
+                yield SSEEvent(event=event or "message", data="\n".join(data))
+            event, data = "", []
+            continue
+        if line.startswith(":"):
+            continue
+        name, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if name == "event":
+            event = value
+        elif name == "data":
+            data.append(value)
+    if data:
+        yield SSEEvent(event=event or "message", data="\n".join(data))
+
+
+def max_chars(limit: int) -> AbortPredicate:
+    """Abort once the accumulated text exceeds `limit` characters."""
+    return lambda text: len(text) > limit
+
+
+def stop_marker(marker: str) -> AbortPredicate:
+    """Abort as soon as `marker` appears in the accumulated text."""
+    return lambda text: marker in text
+
+
+class TextStream:
+    """Iterator over text deltas of one streamed response.
+
+    The source generator receives this object so it can report
+    `finish_reason`, `usage_tokens` and `error` (an unusable result such as a
+    truncated answer) once the provider sends them. Closing the source, which
+    happens on early abort, must release the underlying connection.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[["TextStream"], Iterator[str]],
+        should_abort: Optional[AbortPredicate] = None,
+        on_finish: Optional[Callable[["TextStream"], None]] = None,
+    ) -> None:
+        self.started = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+        self.elapsed: Optional[float] = None
+        self.aborted = False
+        self.finish_reason: Optional[str] = None
+        self.usage_tokens: Optional[int] = None
+        self.error: Optional[str] = None
+        self._parts: List[str] = []
+        self._should_abort = should_abort
+        self._on_finish = on_finish
+        self._source = produce(self)
+        self._done = False
+        self._exhausted = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def mark_sent(self) -> None:
+        """Restart the clock once the request actually leaves (after any rate-limit wait)."""
+        self.started = time.perf_counter()
+
+    def __iter__(self) -> Iterator[str]:
+        if self._done:
+            return
+        try:
+            for delta in self._source:
+                if not delta:
+                    continue
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - self.started
+                self._parts.append(delta)
+                yield delta
+                if self._should_abort is not None and self._should_abort(self.text):
+                    self.aborted = True
+                    break
+            else:
+                self._exhausted = True
+        finally:
+            self._finish()
+
+    def _finish(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
+        self.elapsed = time.perf_counter() - self.started
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+    @property
+    def completed(self) -> bool:
+        """True when the provider finished the answer and nothing marked it unusable."""
+        return self._exhausted and self.error is None
+
+    def final_text(self) -> str:
+        """Consume the rest of the stream and return the text, raising if it is unusable."""
+        for _ in self:
+            pass
+        if self.aborted:
+            raise RuntimeError(f"Streamed response aborted by caller after {len(self.text)} characters")
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        text = self.text.strip()
+        if not text:
+            raise RuntimeError("Streamed response did not contain any text output.")
+        return text
+
+
+@dataclass
+class StreamStats:
+    """Thread-safe collection of time-to-first-token figures for one client."""
+
+    first_token_seconds: List[float] = field(default_factory=list)
+    streams: int = 0
+    aborted: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def record(self, stream: TextStream) -> None:
+        with self._lock:
+            self.streams += 1
+            if stream.aborted:
+                self.aborted += 1
+            if stream.time_to_first_token is not None:
+                self.first_token_seconds.append(stream.time_to_first_token)
+
+    def summary(self) -> str:
+        with self._lock:
+            if not self.first_token_seconds:
+                return f"{self.streams} streams, {self.aborted} aborted"
+            median = statistics.median(self.first_token_seconds)
+            worst = max(self.first_token_seconds)
+            return (
+                f"{self.streams} streams, first token p50 {median:.2f}s / max {worst:.2f}s, "
+                f"{self.aborted} aborted"
+            )
+
+
+def open_stream(
+    produce: Callable[[TextStream], Iterator[str]],
+    should_abort: Optional[AbortPredicate],
+    stats: StreamStats,
+    cache: Optional[ResponseCache] = None,
+    key: Optional[str] = None,
+) -> TextStream:
+    """Create a TextStream that replays cache hits and stores completed answers."""
+    cached = cache.get(key) if cache is not None and key is not None else None
+    if cached is not None:
+        return TextStream(lambda stream: iter([cached]), should_abort, stats.record)
+
+    def on_finish(stream: TextStream) -> None:
+        stats.record(stream)
+        text = stream.text.strip()
+        if cache is not None and key is not None and stream.completed and text:
+            cache.put(key, text)
+
+    return TextStream(produce, should_abort, on_finish)
@@ -0,0 +1,70 @@
+"""
+Overview:
+    - Startup regression tests: importing the CLIs must not load the OpenAI SDK, the Google API client,
+      python-dotenv or asyncio, and `--help` must work without touching them.
+Usage:
+    - Execute `python -m unittest src.test_bench_startup` from the repository root.
+"""
+
+import subprocess
+import sys
+import unittest
+
+from bench_startup import CLI_MODULES, CURRENT_DIR, DEFERRED_MODULES, loaded_deferred, measure, parse_importtime, subtree
+
+# Prints the deferred modules loaded by `main(["--help"])`.
+HELP_SCRIPT = """import sys
+import {module}
+try:
+    {module}.main(["--help"])
+except SystemExit:
+    pass
+print([name for name in {deferred!r} if name in sys.modules])
+"""
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 | site
+import time:        50 |         50 |     openai.types
+import time:       300 |        350 |   openai
+import time:       900 |       1250 | openai_client
+"""
+
+
+class ParseImportTimeTests(unittest.TestCase):
+    """Read `-X importtime` lines into a tree."""
+
+    def test_depth_and_subtree(self) -> None:
+        """Indentation gives the depth; a subtree is the nested imports listed before its module."""
+        entries = parse_importtime(SAMPLE)
+        self.assertEqual(
+            [(entry.module, entry.depth) for entry in entries],
+            [("site", 0), ("openai.types", 2), ("openai", 1), ("openai_client", 0)],
+        )
+        self.assertEqual([entry.module for entry in subtree(entries, "openai_client")], ["openai.types", "openai"])
+        self.assertEqual(loaded_deferred(subtree(entries, "openai_client")), ["openai"])
+        self.assertEqual(loaded_deferred(subtree(entries, "site")), [])
+
+
+class StartupTests(unittest.TestCase):
+    """Heavy dependencies load on first use, not at import."""
+
+    def test_cli_imports_defer_heavy_dependencies(self) -> None:
+        """Importing each CLI module loads none of the deferred dependencies."""
+        for module in CLI_MODULES:
+            with self.subTest(module=module):
+                self.assertEqual(loaded_deferred(subtree(measure(module), module)), [])
+
+    def test_help_runs_without_loading_dependencies(self) -> None:
+        """`--help` prints usage and still leaves the deferred dependencies unloaded."""
+        for module in CLI_MODULES:
+            with self.subTest(module=module):
+                script = HELP_SCRIPT.format(module=module, deferred=DEFERRED_MODULES)
+                completed = subprocess.run(
+                    [sys.executable, "-c", script], cwd=str(CURRENT_DIR), capture_output=True, text=True, check=True
+                )
+                self.assertIn("usage:", completed.stdout)
+                self.assertEqual(completed.stdout.splitlines()[-1], "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Overview:
+    - Unit tests for the Anthropic Message Batches client: result parsing and a create/poll/results round trip against the mock server.
+Usage:
+    - Execute `python -m unittest src.test_claude_batch` from the repository root.
+"""
+
+import json
+import unittest
+
+from claude_client import ClaudeBatchClient, ClaudeClient, MessageBatch, parse_batch_results
+from mock_api_server import MockAPIServer, MockProfile
+
+
+def _line(custom_id, result) -> str:
+    return json.dumps({"custom_id": custom_id, "result": result})
+
+
+class ResultParsingTests(unittest.TestCase):
+    """Validate how results lines and batch documents are read."""
+
+    def test_result_types(self) -> None:
+        """Succeeded lines carry the joined text; every other type becomes an error."""
+        message = {"content": [{"type": "text", "text": "拝啓"}, {"type": "text", "text": "、貴社"}]}
+        error = {"type": "error", "error": {"type": "invalid_request_error", "message": "bad prompt"}}
+        data = "\n".join(
+            [
+                _line("row-2", {"type": "succeeded", "message": message}),
+                _line("row-3", {"type": "errored", "error": error}),
+                _line("row-4", {"type": "expired"}),
+                _line("row-5", {"type": "canceled"}),
+                "",
+            ]
+        ).encode("utf-8")
+        results = parse_batch_results(data)
+        self.assertEqual((results["row-2"].text, results["row-2"].error), ("拝啓、貴社", None))
+        self.assertEqual(results["row-3"].error, "invalid_request_error: bad prompt")
+        self.assertEqual(results["row-4"].error, "request expired")
+        self.assertEqual(results["row-5"].error, "request canceled")
+
+    def test_batch_document(self) -> None:
+        """Counts default to zero and only `ended` is terminal."""
+        batch = MessageBatch.from_document(
+            {"id": "msgbatch_1", "processing_status": "in_progress", "request_counts": {"processing": 3}}
+        )
+        self.assertEqual((batch.processing, batch.succeeded, batch.results_url), (3, 0, None))
+        self.assertFalse(batch.done)
+        self.assertTrue(MessageBatch.from_document({"id": "msgbatch_1", "processing_status": "ended"}).done)
+
+    def test_request_params_match_generate_text(self) -> None:
+        """Batch params are the synchronous request body; cache keys match generate_text's."""
+        client = ClaudeClient(api_key="mock", model="m", max_tokens=64)
+        self.assertEqual(
+            client.request_params("A社へ"),
+            {"model": "m", "max_tokens": 64, "messages": [{"role": "user", "content": "A社へ"}]},
+        )
+        self.assertNotEqual(client.cache_key_for("A社へ"), ClaudeClient(api_key="mock", model="m2").cache_key_for("A社へ"))
+
+
+class BatchRoundTripTests(unittest.TestCase):
+    """Drive the client against the mock Message Batches endpoints."""
+
+    def test_create_wait_and_collect_results(self) -> None:
+        """Create, poll until ended and read the results file."""
+        with MockAPIServer(profiles={"anthropic": MockProfile(batch_polls=2, output_chars=80)}) as server:
+            sleeps = []
+            client = ClaudeBatchClient(api_key="mock", api_url=server.url("anthropic"), sleep=sleeps.append)
+            sync = ClaudeClient(api_key="mock", model="m")
+            try:
+                batch = client.create([("row-2", sync.request_params("A社への営業文")), ("row-3", sync.request_params(""))])
+                polled = []
+                finished = client.wait(batch.id, poll_interval=5, on_poll=polled.append)
+                results = client.results(finished)
+            finally:
+                client.close()
+            routes = [call.route for call in server.stats.calls]
+        self.assertEqual((batch.processing_status, batch.processing, batch.succeeded), ("in_progress", 2, 0))
+        self.assertEqual([item.processing_status for item in polled], ["in_progress", "in_progress", "ended"])
+        self.assertEqual(sleeps, [5, 5])
+        self.assertEqual((finished.succeeded, finished.errored, finished.processing), (1, 1, 0))
+        self.assertTrue(results["row-2"].text.startswith("[mock anthropic] A社への営業文"))
+        self.assertEqual(results["row-3"].error, "invalid_request_error: empty prompt")
+        self.assertEqual(routes[0], "message_batches.create")
+        self.assertEqual(routes[-1], "message_batches.results")
+
+    def test_expired_requests(self) -> None:
+        """The mock's batch_expire_rate returns requests as expired."""
+        with MockAPIServer(profiles={"anthropic": MockProfile(batch_polls=0, batch_expire_rate=1.0)}) as server:
+            client = ClaudeBatchClient(api_key="mock", api_url=server.url("anthropic"))
+            try:
+                batch = client.wait(client.create([("row-2", ClaudeClient(api_key="mock").request_params("A社"))]).id)
+                results = client.results(batch)
+            finally:
+                client.close()
+        self.assertEqual(batch.expired, 1)
+        self.assertEqual(results["row-2"].error, "request expired")
+
+
+if __name__ == "__main__":
+    unittest.main()
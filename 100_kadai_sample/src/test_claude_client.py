@@ -0,0 +1,165 @@
+"""
+Overview:
+    - Unit tests for ClaudeClient prompt caching: how a shared prefix is sent as a cached content block
+      and how cache usage is totalled, against the mock server; for the token reservations of retried calls;
+      and for AsyncClaudeClient's connection limit, result order and errors (skipped when `httpx` is not installed).
+Usage:
+    - Execute `python -m unittest src.test_claude_client` from the repository root.
+"""
+
+import asyncio
+import importlib.util
+import json
+import time
+import unittest
+
+from claude_client import CACHE_CONTROL, AsyncClaudeClient, ClaudeClient, PromptCacheStats, _usage_tokens
+from http_transport import TransportResponse
+from mock_api_server import MockAPIServer, MockProfile
+from rate_limiter import ProviderLimits, ProviderRateLimiter, estimate_tokens
+from retry_policy import RetryPolicy, RetrySettings
+
+
+class CachePrefixPayloadTests(unittest.TestCase):
+    """Validate the message content built for a cache prefix."""
+
+    def test_prefix_becomes_cached_block(self) -> None:
+        """The prefix is a marked block and the rest follows as plain text."""
+        client = ClaudeClient(api_key="mock", cache_prefix="自社情報: 当社\n")
+        content = client.request_params("自社情報: 当社\nA社向け")["messages"][0]["content"]
+        self.assertEqual(
+            content,
+            [
+                {"type": "text", "text": "自社情報: 当社\n", "cache_control": CACHE_CONTROL},
+                {"type": "text", "text": "A社向け"},
+            ],
+        )
+
+    def test_whole_prompt_and_mismatch(self) -> None:
+        """A prompt equal to the prefix sends one block; other prompts stay plain strings."""
+        client = ClaudeClient(api_key="mock", cache_prefix="固定")
+        self.assertEqual(len(client.request_params("固定")["messages"][0]["content"]), 1)
+        self.assertEqual(client.request_params("別の文面")["messages"][0]["content"], "別の文面")
+        self.assertEqual(ClaudeClient(api_key="mock").request_params("固定")["messages"][0]["content"], "固定")
+
+    def test_cache_key_ignores_prefix_split(self) -> None:
+        """Splitting the prompt does not change the response-cache key."""
+        self.assertEqual(
+            ClaudeClient(api_key="mock", cache_prefix="固定").cache_key_for("固定A"),
+            ClaudeClient(api_key="mock").cache_key_for("固定A"),
+        )
+
+
+class PromptCacheUsageTests(unittest.TestCase):
+    """Validate cache usage accounting."""
+
+    def test_usage_totals(self) -> None:
+        """Cache writes count toward the rate-limit usage; reads do not."""
+        usage = {"input_tokens": 10, "cache_creation_input_tokens": 100, "cache_read_input_tokens": 500, "output_tokens": 5}
+        self.assertEqual(_usage_tokens({"usage": usage}), 115)
+        stats = PromptCacheStats()
+        stats.record(usage)
+        stats.record(None)
+        self.assertEqual((stats.requests, stats.cache_read_tokens, stats.cache_write_tokens), (1, 500, 100))
+        self.assertIn("500 input tokens read from cache (82%)", stats.summary())
+
+    def test_second_request_reads_prefix_from_cache(self) -> None:
+        """The mock writes the prefix once and reads it on later sync and streamed calls."""
+        prefix = "自社情報: " + "当社は業務効率化ツールを提供しています。" * 20 + "\n"
+        with MockAPIServer() as server:
+            client = ClaudeClient(api_key="mock", api_url=server.url("anthropic"), cache_prefix=prefix)
+            try:
+                client.generate_text(prefix + "A社向け")
+                client.generate_text(prefix + "B社向け")
+                client.stream_text(prefix + "C社向け").final_text()
+            finally:
+                client.close()
+        stats = client.prompt_cache_stats
+        self.assertEqual(stats.requests, 3)
+        self.assertGreater(stats.cache_write_tokens, 0)
+        self.assertEqual(stats.cache_read_tokens, 2 * stats.cache_write_tokens)
+
+
+class _FlakyTransport:
+    """Answer with the queued error statuses first, then with a reply that used `tokens` tokens."""
+
+    def __init__(self, statuses, tokens: int) -> None:
+        self.statuses = list(statuses)
+        self.tokens = tokens
+        self.requests = 0
+
+    def request(self, method, url, body=None, headers=None) -> TransportResponse:
+        self.requests += 1
+        if self.statuses:
+            return TransportResponse(self.statuses.pop(0), "error", b"{}", {})
+        document = {
+            "content": [{"type": "text", "text": "ok"}],
+            "usage": {"input_tokens": self.tokens, "output_tokens": 0},
+        }
+        return TransportResponse(200, "OK", json.dumps(document).encode("utf-8"), {})
+
+
+class RetryReservationTests(unittest.TestCase):
+    """Failed attempts should give their token reservation back."""
+
+    def test_retries_do_not_drain_the_token_bucket(self) -> None:
+        """Two throttled attempts and one success should cost only the tokens the success used."""
+        limiter = ProviderRateLimiter("anthropic", ProviderLimits(tokens_per_minute=1_000_000, token_burst=1_000_000))
+        transport = _FlakyTransport([429, 529], tokens=100)
+        client = ClaudeClient(
+            api_key="mock",
+            max_tokens=5_000,
+            rate_limiter=limiter,
+            transport=transport,  # type: ignore[arg-type]
+            retry=RetryPolicy("anthropic", RetrySettings(base_delay=0.0, max_delay=0.0), sleep=lambda _: None),
+        )
+        prompt = "A社向け" * 100
+        self.assertEqual(client.generate_text(prompt), "ok")
+        self.assertEqual(transport.requests, 3)
+        self.assertGreater(estimate_tokens(prompt, 5_000) * 2, 10_000)
+        # Refill over the test's runtime is negligible next to the reservations.
+        self.assertAlmostEqual(limiter._tokens.available, 1_000_000 - 100, delta=1_000)  # type: ignore[union-attr]
+
+
+@unittest.skipUnless(importlib.util.find_spec("httpx"), "AsyncClaudeClient requires httpx")
+class AsyncClaudeClientTests(unittest.TestCase):
+    """Many generations share one pool of at most `max_connections` connections."""
+
+    def test_connection_limit_and_result_order(self) -> None:
+        """Six 0.1s requests over two connections take three rounds and come back in prompt order."""
+
+        async def generate(server: MockAPIServer):
+            async with AsyncClaudeClient(api_key="mock", api_url=server.url("anthropic"), max_connections=2) as client:
+                return await asyncio.gather(*(client.generate_text(f"会社{index}") for index in range(6)))
+
+        with MockAPIServer(profiles={"anthropic": MockProfile(latency=0.1)}) as server:
+            started = time.perf_counter()
+            texts = asyncio.run(generate(server))
+            elapsed = time.perf_counter() - started
+
+        self.assertGreaterEqual(elapsed, 0.3)
+        for index, text in enumerate(texts):
+            self.assertTrue(text.startswith(f"[mock anthropic] 会社{index}"), text[:30])
+
+    def test_errors_propagate_and_refund_the_reservation(self) -> None:
+        """A request that keeps failing raises after its retries and leaves the token budget untouched."""
+        limiter = ProviderRateLimiter("anthropic", ProviderLimits(tokens_per_minute=1_000_000, token_burst=1_000_000))
+        retry = RetryPolicy("anthropic", RetrySettings(max_attempts=2, base_delay=0.0, max_delay=0.0))
+
+        async def generate(server: MockAPIServer):
+            async with AsyncClaudeClient(
+                api_key="mock", api_url=server.url("anthropic"), rate_limiter=limiter, retry=retry
+            ) as client:
+                return await client.generate_text("A社向け")
+
+        with MockAPIServer(profiles={"anthropic": MockProfile(error_rate=1.0)}) as server:
+            with self.assertRaises(RuntimeError):
+                asyncio.run(generate(server))
+            calls = [call.status for call in server.stats.by_provider()["anthropic"]]
+
+        self.assertEqual(calls, [500, 500])
+        self.assertAlmostEqual(limiter._tokens.available, 1_000_000, delta=1_000)  # type: ignore[union-attr]
+
+
+if __name__ == "__main__":
+    unittest.main()
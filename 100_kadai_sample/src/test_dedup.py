@@ -0,0 +1,118 @@
+"""
+Overview:
+    - Unit tests covering company grouping keys and shared search/letter calls used by `--dedupe`.
+Usage:
+    - Execute `python -m unittest src.test_dedup` from the repository root.
+"""
+
+import threading
+import unittest
+
+from dedup import CompanyDedup, SharedCalls, company_key
+
+
+class CompanyKeyTests(unittest.TestCase):
+    """Ensure rows of the same company map to one key."""
+
+    def test_url_host_is_normalized(self) -> None:
+        """Scheme, www., case and the page path should not split a company with a registered name."""
+        keys = {
+            company_key("https://www.Example.co.jp/about", "ABC株式会社"),
+            company_key("http://example.co.jp", "ABC株式会社"),
+            company_key("example.co.jp/contact/", "ＡＢＣ 株式会社"),
+        }
+        self.assertEqual({"host:example.co.jp|registered:abc株式会社"}, keys)
+
+    def test_page_is_used_without_registered_name(self) -> None:
+        """Without a registered name only the same page (ignoring a trailing / and the query) matches."""
+        self.assertEqual(company_key("https://www.example.co.jp/about/?ref=1"), "page:example.co.jp/about")
+        self.assertEqual(company_key("http://example.co.jp/"), company_key("example.co.jp"))
+
+    def test_shared_host_does_not_merge_companies(self) -> None:
+        """Different companies on one shared host must keep separate keys."""
+        self.assertNotEqual(
+            company_key("https://sites.google.com/view/a"), company_key("https://sites.google.com/view/b")
+        )
+        self.assertNotEqual(
+            company_key("https://www.facebook.com/pages", "A株式会社"),
+            company_key("https://www.facebook.com/pages", "B株式会社"),
+        )
+
+    def test_registered_name_is_used_without_url(self) -> None:
+        """Width, case and spaces in the registered name should be folded."""
+        self.assertEqual(company_key("", "ＡＢＣ 株式会社"), company_key("", "abc株式会社"))
+        self.assertEqual(company_key("", "ABC株式会社"), "registered:abc株式会社")
+
+    def test_rows_without_identity_are_not_grouped(self) -> None:
+        self.assertIsNone(company_key("", ""))
+
+
+class SharedCallsTests(unittest.TestCase):
+    """Ensure one call is made per key and its result reaches every caller."""
+
+    def test_later_callers_reuse_the_result(self) -> None:
+        calls = SharedCalls()
+        produced = []
+
+        def produce() -> str:
+            produced.append(1)
+            return "result"
+
+        self.assertEqual("result", calls.run("host:a", 2, produce))
+        self.assertEqual("result", calls.run("host:a", 5, produce))
+        self.assertEqual("other", calls.run("host:b", 6, lambda: "other"))
+        self.assertEqual(1, len(produced))
+        self.assertEqual({5: 2}, calls.sources)
+        self.assertEqual("2 calls for 3 rows (1 shared, 33%)", calls.summary())
+
+    def test_rows_without_key_always_call(self) -> None:
+        calls = SharedCalls()
+        self.assertEqual("a", calls.run(None, 2, lambda: "a"))
+        self.assertEqual("b", calls.run(None, 3, lambda: "b"))
+        self.assertEqual((2, 0), (calls.calls, calls.shared))
+
+    def test_concurrent_callers_wait_for_the_call_in_flight(self) -> None:
+        calls = SharedCalls()
+        started = threading.Event()
+        release = threading.Event()
+        counter = []
+
+        def produce() -> str:
+            counter.append(1)
+            started.set()
+            release.wait(2)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(calls.run("k", 2, produce)))
+        leader.start()
+        started.wait(2)
+        follower = threading.Thread(target=lambda: results.append(calls.run("k", 3, produce)))
+        follower.start()
+        release.set()
+        leader.join(2)
+        follower.join(2)
+        self.assertEqual(["result", "result"], results)
+        self.assertEqual(1, len(counter))
+
+    def test_failed_call_is_retried_by_the_next_caller(self) -> None:
+        calls = SharedCalls()
+
+        def fail() -> str:
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            calls.run("k", 2, fail)
+        self.assertEqual("ok", calls.run("k", 3, lambda: "ok"))
+        self.assertEqual({}, calls.sources)
+
+    def test_group_splits_leaders_and_followers(self) -> None:
+        dedup = CompanyDedup()
+        groups = dedup.letter.group([("a", 2), (None, 3), ("a", 4), ("b", 5), (None, 6)])
+        self.assertEqual({2: [4], 3: [], 5: [], 6: []}, groups)
+        self.assertEqual(2, dedup.source_of(4))
+        self.assertIsNone(dedup.source_of(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Overview:
+    - Unit tests for the fan-out runner: weighted round-robin scheduling across sources, config discovery and
+      naming, and an end-to-end run of two spreadsheets of different sizes against the local mock APIs.
+Usage:
+    - Execute `python -m unittest src.test_fanout_runner` from the repository root.
+"""
+
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import fanout_runner
+from campaign_fixtures import HEADER, campaign_config, put_prompt_sheets
+from fanout_runner import FairScheduler, campaign_names, collect_configs, parse_weights, run_fanout
+from mock_api_server import MockAPIServer
+
+
+def drain(scheduler: FairScheduler) -> list:
+    order = []
+    while True:
+        picked = scheduler.next()
+        if picked is None:
+            return order
+        order.append(picked[0])
+
+
+class FairSchedulerTests(unittest.TestCase):
+    """Rows are taken from every sheet in turn, in proportion to the weights."""
+
+    def test_round_robin_until_a_source_runs_out(self) -> None:
+        scheduler = FairScheduler()
+        scheduler.add("big", iter(range(5)))
+        scheduler.add("small", iter(range(2)))
+        self.assertEqual(drain(scheduler), ["big", "small", "big", "small", "big", "big", "big"])
+        self.assertEqual(scheduler.picked, {"big": 5, "small": 2})
+        self.assertFalse(scheduler)
+
+    def test_weights_are_smooth(self) -> None:
+        scheduler = FairScheduler()
+        scheduler.add("a", iter(range(6)), weight=2)
+        scheduler.add("b", iter(range(3)))
+        self.assertEqual(drain(scheduler), ["a", "b", "a", "a", "b", "a", "a", "b", "a"])
+
+    def test_rejects_bad_weights(self) -> None:
+        with self.assertRaises(ValueError):
+            FairScheduler().add("a", iter(()), weight=0)
+        with self.assertRaises(ValueError):
+            parse_weights(["c=2"], ["a", "b"])
+        self.assertEqual(parse_weights(["b=3"], ["a", "b"]), {"a": 1, "b": 3})
+
+
+class ConfigDiscoveryTests(unittest.TestCase):
+    def test_directories_expand_and_names_stay_unique(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            for name in ("b.json", "a.json", "notes.txt"):
+                (root / name).write_text("{}", encoding="utf-8")
+            paths = collect_configs([root, root / "a.json"])
+        self.assertEqual([path.name for path in paths], ["a.json", "b.json", "a.json"])
+        self.assertEqual(campaign_names(paths), ["a", "b", "a-2"])
+
+
+class FanoutTests(unittest.TestCase):
+    """Two sheets share one pool of workers; the small one is not held back by the large one."""
+
+    def test_sheets_are_interleaved_and_filled(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, MockAPIServer() as server:
+            root = Path(tmp)
+            put_prompt_sheets(server)
+            sizes = {"結果A": 6, "結果B": 2}
+            for sheet_name, size in sizes.items():
+                rows = [[f"{sheet_name}-{index}社", f"https://{index}.example"] for index in range(size)]
+                server.sheet.put(sheet_name, [HEADER] + rows)
+            paths = []
+            for spreadsheet_id, sheet_name in (("big", "結果A"), ("small", "結果B")):
+                path = root / f"{spreadsheet_id}.json"
+                config = campaign_config(server, spreadsheet_id, sheet_name)
+                config["rate_limits"] = {"openai": {"requests_per_minute": 6000}}
+                path.write_text(json.dumps(config), encoding="utf-8")
+                paths.append(path)
+
+            out = io.StringIO()
+            with redirect_stdout(out):
+                processed = run_fanout([root], workers=1)
+            written = {name: server.sheet.rows(name) for name in sizes}
+            journals = sorted(path.name for path in (root / "journal").iterdir())
+
+        log = out.getvalue()
+        self.assertEqual(processed, {"big": 6, "small": 2}, log)
+        for name, size in sizes.items():
+            self.assertTrue(all(row[3] and row[4] for row in written[name][1 : size + 1]), written[name])
+        self.assertEqual(journals, ["big.jsonl", "small.jsonl"])
+        # With one worker the rows alternate, so the small sheet is done before the big one's third row.
+        lines = log.splitlines()
+        self.assertLess(lines.index("[small] [write] Queued 結果B!D3:E3"), lines.index("[big] [write] Queued 結果A!D4:E4"))
+        self.assertIn("[small] Completed processing 2 companies.", lines)
+        self.assertIn("[small] [write] Flushed 2 ranges in one batchUpdate (4 cells)", lines)
+        self.assertIn("[fanout] Rows started per sheet: big=6, small=2", lines)
+
+    def test_started_campaigns_are_closed_when_the_run_fails(self) -> None:
+        """A failure after rows were journaled closes every campaign's journal before the error propagates."""
+        seen = {}
+        real_run_interleaved = fanout_runner.run_interleaved
+
+        def run_then_fail(campaigns, *args):
+            seen.update(campaigns)
+            real_run_interleaved(campaigns, *args)
+            raise RuntimeError("sheet went away")
+
+        with tempfile.TemporaryDirectory() as tmp, MockAPIServer() as server:
+            root = Path(tmp)
+            put_prompt_sheets(server)
+            for spreadsheet_id, sheet_name in (("a", "結果A"), ("b", "結果B")):
+                server.sheet.put(sheet_name, [HEADER, [f"{sheet_name}社", "https://a.example"]])
+                config = campaign_config(server, spreadsheet_id, sheet_name)
+                (root / f"{spreadsheet_id}.json").write_text(json.dumps(config), encoding="utf-8")
+
+            fanout_runner.run_interleaved = run_then_fail
+            try:
+                with redirect_stdout(io.StringIO()), self.assertRaises(RuntimeError):
+                    run_fanout([root], workers=2)
+            finally:
+                fanout_runner.run_interleaved = real_run_interleaved
+
+        self.assertEqual(sorted(seen), ["a", "b"])
+        for campaign in seen.values():
+            self.assertIsNone(campaign.journal._fh)  # type: ignore[union-attr]
+
+
+if __name__ == "__main__":
+    unittest.main()
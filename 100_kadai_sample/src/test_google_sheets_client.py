@@ -0,0 +1,240 @@
+"""
+Overview:
+    - Unit tests for the Sheets client helpers: the buffered `SheetBatchWriter` and when it sends its queued ranges,
+      block-wise reading (`row_windows`, `iter_row_blocks`) against an in-memory sheet, and the A1 helpers and
+      values.batchGet ranges used to read only some columns (`column_letter`, `consecutive_runs`,
+      `iter_column_blocks`, `fetch_column_cells`).
+Usage:
+    - Execute `python -m unittest src.test_google_sheets_client` from the repository root.
+"""
+
+import io
+import re
+import time
+import unittest
+from contextlib import redirect_stdout
+from typing import List, Sequence, Tuple
+
+from google_sheets_client import (
+    SheetBatchWriter,
+    SpreadsheetHandle,
+    column_letter,
+    consecutive_runs,
+    fetch_column_cells,
+    iter_column_blocks,
+    row_windows,
+)
+
+
+class FakeHandle:
+    """Records every values.batchUpdate and counts one updated cell per value."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.batches: List[List[Tuple[str, List[List[str]]]]] = []
+        self.fail = fail
+
+    def batch_update_values(self, data, value_input_option: str = "USER_ENTERED") -> int:
+        if self.fail:
+            raise RuntimeError("sheets unavailable")
+        self.batches.append(list(data))
+        return sum(len(row) for _, values in data for row in values)
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for char in letters:
+        number = number * 26 + ord(char) - 64
+    return number
+
+
+class GridSheet(SpreadsheetHandle):
+    """Serve reads from an in-memory grid and record every range asked for, without a Sheets service."""
+
+    def __init__(self, rows: List[List[str]], grid_rows: int = 1000) -> None:
+        super().__init__(client=None, spreadsheet_id="grid")  # type: ignore[arg-type]
+        self.rows = rows
+        self.grid_rows = grid_rows
+        self.requests: List[List[str]] = []
+
+    def _read(self, range_name: str) -> List[List[str]]:
+        first_col, first_row, last_col, last_row = re.fullmatch(r".+!([A-Z]+)(\d+):([A-Z]+)(\d*)", range_name).groups()
+        left, right = _column_number(first_col) - 1, _column_number(last_col)
+        # Open-ended ranges (A2:A) stop at the grid, like the API.
+        last = min(int(last_row or self.grid_rows), self.grid_rows)
+        values = [list(row[left:right]) for row in self.rows[int(first_row) - 1 : last]]
+        # Like the API: trailing empty cells and rows are left out.
+        for row in values:
+            while row and not row[-1]:
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def fetch_values(self, range_name: str) -> List[List[str]]:
+        self.requests.append([range_name])
+        return self._read(range_name)
+
+    def batch_fetch_values(self, ranges: Sequence[str]) -> List[List[List[str]]]:
+        self.requests.append(list(ranges))
+        return [self._read(range_name) for range_name in ranges]
+
+
+class RowWindowTests(unittest.TestCase):
+    """Row ranges are split into inclusive blocks."""
+
+    def test_windows_cover_the_range(self) -> None:
+        """The last block is cut at `last_row`; an empty range yields nothing."""
+        self.assertEqual(list(row_windows(2, 11, 4)), [(2, 5), (6, 9), (10, 11)])
+        self.assertEqual(list(row_windows(2, 5, 4)), [(2, 5)])
+        self.assertEqual(list(row_windows(2, 1, 4)), [])
+        self.assertEqual(list(row_windows(3, 4, 0)), [(3, 3), (4, 4)])
+
+
+class IterRowBlocksTests(unittest.TestCase):
+    """Blocks are read lazily, up to the last row with data rather than the whole grid."""
+
+    def test_reads_only_up_to_the_data(self) -> None:
+        """A 1000-row grid holding 7 rows costs one extent read and three block reads."""
+        rows = [["NAME"]] + [[f"{index}社", ""] for index in range(2, 9)]
+        sheet = GridSheet(rows)
+        blocks = list(sheet.iter_row_blocks("S", start_row=2, block_size=3, last_column="B"))
+        self.assertEqual([first for first, _ in blocks], [2, 5, 8])
+        self.assertEqual(blocks[2][1], [["8社"]])
+        self.assertEqual(sheet.requests, [["S!A2:A"], ["S!A2:B4"], ["S!A5:B7"], ["S!A8:B8"]])
+
+    def test_rows_after_a_long_blank_gap_are_read(self) -> None:
+        """Blank rows within a block are kept; a whole block of blank rows is skipped, not the end of the read."""
+        rows = [["NAME"], ["A社"], [""], [""], ["B社"], [""], [""], [""], [""], ["C社"]]
+        sheet = GridSheet(rows)
+        blocks = list(sheet.iter_row_blocks("S", start_row=2, block_size=4))
+        self.assertEqual(blocks, [(2, [["A社"], [], [], ["B社"]]), (10, [["C社"]])])
+        self.assertEqual(len(sheet.requests), 4)
+
+    def test_key_columns_decide_where_the_data_ends(self) -> None:
+        """Rows past the last value in the key columns are not read."""
+        rows = [["NAME", "URL"], ["A社", "a"], ["", "b"], ["", "c"]]
+        sheet = GridSheet(rows, grid_rows=len(rows))
+        self.assertEqual(list(sheet.iter_row_blocks("S", start_row=2, last_column="B")), [(2, [["A社", "a"]])])
+        self.assertEqual(sheet.requests, [["S!A2:A"], ["S!A2:B2"]])
+
+        sheet.requests.clear()
+        blocks = list(sheet.iter_row_blocks("S", start_row=2, last_column="B", key_columns=(0, 1)))
+        self.assertEqual(blocks, [(2, [["A社", "a"], ["", "b"], ["", "c"]])])
+        self.assertEqual(sheet.requests, [["S!A2:B"], ["S!A2:B4"]])
+
+
+class ColumnHelperTests(unittest.TestCase):
+    """A1 column letters and runs of adjacent indexes."""
+
+    def test_column_letters_roll_over(self) -> None:
+        """Zero-based indexes map to A..Z, then AA, AZ, BA and beyond."""
+        cases = {0: "A", 25: "Z", 26: "AA", 51: "AZ", 52: "BA", 701: "ZZ", 702: "AAA"}
+        self.assertEqual({index: column_letter(index) for index in cases}, cases)
+
+    def test_runs_merge_adjacent_values(self) -> None:
+        """Unsorted, repeated values group into inclusive runs; gaps start a new run."""
+        self.assertEqual(consecutive_runs([7, 1, 2, 4, 3, 9, 2, 10]), [(1, 4), (7, 7), (9, 10)])
+        self.assertEqual(consecutive_runs([]), [])
+
+
+class ColumnReadTests(unittest.TestCase):
+    """Only the wanted columns and rows are requested, one values.batchGet per block."""
+
+    def test_column_blocks_request_one_range_per_run(self) -> None:
+        """Columns A, B, E and AA become three ranges; rows come back at their sheet positions."""
+        wide = [f"c{index}" for index in range(27)]
+        rows = [wide, wide, wide[:2], [], wide]
+        sheet = GridSheet(rows, grid_rows=len(rows))
+        blocks = list(iter_column_blocks(sheet, "S", [4, 0, 26, 1], start_row=2, block_size=3))
+        self.assertEqual(sheet.requests[0], ["S!A2:B", "S!E2:E", "S!AA2:AA"])
+        self.assertEqual(sheet.requests[1], ["S!A2:B4", "S!E2:E4", "S!AA2:AA4"])
+        self.assertEqual(sheet.requests[2], ["S!A5:B5", "S!E5:E5", "S!AA5:AA5"])
+        first_row, block = blocks[0]
+        self.assertEqual(first_row, 2)
+        self.assertEqual((block[0][0], block[0][1], block[0][2], block[0][4], block[0][26]), ("c0", "c1", "", "c4", "c26"))
+        self.assertEqual(block[1], ["c0", "c1"] + [""] * 25)
+        # Row 4 is empty, so the API leaves it out of the block.
+        self.assertEqual(len(block), 2)
+        self.assertEqual(blocks[1][0], 5)
+
+    def test_column_cells_for_scattered_rows(self) -> None:
+        """Rows 2-4 and 9 of column D are fetched as two ranges in one request; empty cells are left out."""
+        rows = [[""] * 3 + [f"d{number}"] for number in range(1, 11)]
+        rows[2] = []
+        sheet = GridSheet(rows)
+        cells = fetch_column_cells(sheet, "S", 3, [9, 2, 4, 3])
+        self.assertEqual(sheet.requests, [["S!D2:D4", "S!D9:D9"]])
+        self.assertEqual(cells, {2: "d2", 4: "d4", 9: "d9"})
+        self.assertEqual(fetch_column_cells(sheet, "S", 3, []), {})
+
+
+class SheetBatchWriterTests(unittest.TestCase):
+    """Queued ranges go out in one request on size, age, explicit flush and exit."""
+
+    def test_flushes_when_max_ranges_are_queued(self) -> None:
+        """The add that reaches `max_ranges` sends every queued range together."""
+        handle = FakeHandle()
+        flushed = []
+        writer = SheetBatchWriter(handle, max_ranges=3, flush_interval=60, on_flush=lambda *args: flushed.append(args))
+        self.assertEqual(writer.add("S!A2", [["a"]], key="r2"), 0)
+        self.assertEqual(writer.add("S!A3", [["b"]]), 0)
+        self.assertEqual(handle.batches, [])
+        self.assertEqual(writer.add("S!A4:B4", [["c", "d"]], key="r4"), 4)
+        self.assertEqual([name for name, _ in handle.batches[0]], ["S!A2", "S!A3", "S!A4:B4"])
+        self.assertEqual(flushed, [(3, 4, ["r2", "r4"])])
+        self.assertEqual((writer.pending, writer.flushes, writer.updated_cells), (0, 1, 4))
+
+    def test_flushes_when_the_oldest_update_is_due(self) -> None:
+        """Once `flush_interval` has passed, the next add or `flush_if_due` sends the queue."""
+        handle = FakeHandle()
+        writer = SheetBatchWriter(handle, max_ranges=100, flush_interval=0.05)
+        writer.add("S!A2", [["a"]])
+        self.assertEqual(writer.flush_if_due(), 0)
+        time.sleep(0.06)
+        self.assertEqual(writer.flush_if_due(), 1)
+        writer.add("S!A3", [["b"]])
+        time.sleep(0.06)
+        self.assertEqual(writer.add("S!A4", [["c"]]), 2)
+        self.assertEqual(len(handle.batches), 2)
+        self.assertEqual(writer.flush_if_due(), 0)
+
+    def test_exit_flushes_what_is_left(self) -> None:
+        """Leaving the with block sends ranges below both thresholds."""
+        handle = FakeHandle()
+        with SheetBatchWriter(handle, max_ranges=100, flush_interval=60) as writer:
+            writer.add("S!A2", [["a"]])
+            self.assertEqual(handle.batches, [])
+        self.assertEqual(len(handle.batches), 1)
+        self.assertEqual(writer.pending, 0)
+
+    def test_failed_flush_keeps_the_queue(self) -> None:
+        """A failing request leaves the ranges queued for the next flush."""
+        handle = FakeHandle(fail=True)
+        writer = SheetBatchWriter(handle, max_ranges=100, flush_interval=60)
+        writer.add("S!A2", [["a"]])
+        with self.assertRaises(RuntimeError):
+            writer.flush()
+        self.assertEqual(writer.pending, 1)
+        handle.fail = False
+        self.assertEqual(writer.flush(), 1)
+
+    def test_exit_on_error_keeps_the_original_exception(self) -> None:
+        """A flush that fails while a row error propagates does not replace that error."""
+        handle = FakeHandle(fail=True)
+        out = io.StringIO()
+        with redirect_stdout(out), self.assertRaises(KeyError):
+            with SheetBatchWriter(handle, max_ranges=100, flush_interval=60) as writer:
+                writer.add("S!A2", [["a"]])
+                raise KeyError("row failed")
+        self.assertIn("[write] 1 queued ranges were not written: sheets unavailable", out.getvalue())
+
+        handle.fail = False
+        with self.assertRaises(KeyError):
+            with SheetBatchWriter(handle, max_ranges=100, flush_interval=60) as writer:
+                writer.add("S!A2", [["a"]])
+                raise KeyError("row failed")
+        self.assertEqual(len(handle.batches), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
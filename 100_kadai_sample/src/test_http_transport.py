@@ -0,0 +1,126 @@
+"""
+Overview:
+    - Unit tests covering the pooled keep-alive HTTP transport against a local HTTP server.
+Usage:
+    - Execute `python -m unittest src.test_http_transport` from the repository root.
+"""
+
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_transport import HTTPSettings, HTTPTransport, TransportError
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = 500 if self.path == "/fail" else 200
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Simulate a server that silently drops idle keep-alive connections.
+        self.close_connection = self.path == "/drop"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path == "/stall":
+            # Promise a body, send one line of it and stop answering.
+            self.send_response(200)
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b"data: 1\n")
+            self.wfile.flush()
+            time.sleep(1)
+            return
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class HTTPTransportTests(unittest.TestCase):
+    """Ensure connections are reused and failures are surfaced."""
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_sequential_requests_share_one_connection(self) -> None:
+        """Keep-alive should open a single connection for back-to-back requests."""
+        with HTTPTransport() as transport:
+            for index in range(5):
+                status, _, body, _ = transport.request("POST", f"{self.url}/v1", body=str(index).encode())
+                self.assertEqual((200, str(index).encode()), (status, body))
+            self.assertEqual((5, 1), (transport.stats.requests, transport.stats.connections_opened))
+
+    def test_error_status_is_returned_not_raised(self) -> None:
+        """HTTP error statuses should be returned so callers can map them."""
+        with HTTPTransport() as transport:
+            status, _, _, _ = transport.request("POST", f"{self.url}/fail", body=b"x")
+        self.assertEqual(500, status)
+
+    def test_stale_pooled_connection_is_retried(self) -> None:
+        """A pooled connection closed by the server should be replaced transparently for a GET."""
+        with HTTPTransport() as transport:
+            transport.request("POST", f"{self.url}/drop", body=b"a")
+            time.sleep(0.05)
+            status, _, body, _ = transport.request("GET", f"{self.url}/v1")
+            self.assertEqual((200, b"/v1"), (status, body))
+            self.assertEqual((1, 2), (transport.stats.stale_retries, transport.stats.connections_opened))
+
+    def test_post_on_stale_connection_is_not_resent(self) -> None:
+        """A POST may already have been acted on, so a stale connection should raise instead of re-sending it."""
+        with HTTPTransport() as transport:
+            transport.request("POST", f"{self.url}/drop", body=b"a")
+            time.sleep(0.05)
+            with self.assertRaises(TransportError):
+                transport.request("POST", f"{self.url}/v1", body=b"b")
+            self.assertEqual((0, 1), (transport.stats.stale_retries, transport.stats.connections_opened))
+            # The next request opens a fresh connection.
+            status, _, body, _ = transport.request("POST", f"{self.url}/v1", body=b"c")
+            self.assertEqual((200, b"c"), (status, body))
+
+    def test_stream_failure_does_not_pool_the_connection(self) -> None:
+        """A read that times out mid-stream should raise and leave no closed connection in the pool."""
+        with HTTPTransport(HTTPSettings(read_timeout=0.3)) as transport:
+            with self.assertRaises(TransportError):
+                with transport.stream("GET", f"{self.url}/stall") as streamed:
+                    self.assertEqual(b"data: 1\n", next(streamed.lines))
+                    list(streamed.lines)
+            self.assertEqual([], [conn for idle in transport._idle.values() for conn in idle.queue])
+            status, _, body, _ = transport.request("GET", f"{self.url}/v1")
+            self.assertEqual((200, b"/v1"), (status, body))
+            self.assertEqual(2, transport.stats.connections_opened)
+
+
+class UnreachableHostTests(unittest.TestCase):
+    """Ensure connection failures surface as TransportError."""
+
+    def test_connection_refused_raises_transport_error(self) -> None:
+        """Unreachable hosts should raise TransportError."""
+        # A port that was just free and has nothing listening on it.
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        with HTTPTransport(HTTPSettings(connect_timeout=1)) as transport:
+            with self.assertRaises(TransportError):
+                transport.request("POST", f"http://127.0.0.1:{port}/v1", body=b"x")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Overview:
+    - Unit tests for the run metrics layer: percentiles and histogram buckets, usage mapping, the JSONL trace,
+      row timing, and the retry, cache and Claude call events fed into it.
+Usage:
+    - Execute `python -m unittest src.test_metrics` from the repository root.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from claude_client import ClaudeClient
+from metrics import Histogram, RunMetrics, percentile, usage_fields
+from mock_api_server import MockAPIServer
+from response_cache import ResponseCache
+from retry_policy import RetryRegistry, RetrySettings, status_error
+
+
+class HistogramTests(unittest.TestCase):
+    """Validate percentiles and bucket counts."""
+
+    def test_nearest_rank_percentiles(self) -> None:
+        values = [float(n) for n in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_buckets_include_an_open_ended_last_bucket(self) -> None:
+        histogram = Histogram()
+        for seconds in (0.01, 0.3, 0.4, 120.0):
+            histogram.add(seconds)
+        self.assertEqual(histogram.bucket_line(), "<=0.05s:1 <=0.5s:2 >60s:1")
+        self.assertIn("4x p50 0.30s", histogram.summary())
+
+
+class UsageFieldsTests(unittest.TestCase):
+    """Map both providers' usage keys onto one set of totals."""
+
+    def test_anthropic_and_openai_keys(self) -> None:
+        anthropic = {"input_tokens": 10, "output_tokens": 5, "cache_read_input_tokens": 100, "cache_creation_input_tokens": 0}
+        self.assertEqual(usage_fields(anthropic), {"input_tokens": 10, "output_tokens": 5, "cache_read_tokens": 100})
+
+        class Usage:
+            prompt_tokens = 7
+            completion_tokens = 3
+
+        self.assertEqual(usage_fields(Usage()), {"input_tokens": 7, "output_tokens": 3})
+        self.assertEqual(usage_fields(None), {})
+
+
+class RunMetricsTests(unittest.TestCase):
+    """Validate the trace file, totals, row timing and the end-of-run summary."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "trace" / "run.jsonl"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _events(self):
+        return [json.loads(line) for line in self.path.read_text(encoding="utf-8").splitlines()]
+
+    def test_trace_and_summary(self) -> None:
+        with RunMetrics.open(self.path) as metrics:
+            metrics.observe("call", "openai.chat", 0.2, status=200, bytes_sent=2048, input_tokens=10)
+            metrics.observe("call", "openai.chat", 0.4, status=200, bytes_sent=1024, input_tokens=5)
+            metrics.count("cache", "hit")
+            lines = metrics.summary_lines()
+            self.assertEqual(metrics.totals("call", "openai.chat"), {"bytes_sent": 3072, "input_tokens": 15})
+
+        events = self._events()
+        self.assertEqual([event["event"] for event in events], ["call", "call", "cache"])
+        self.assertEqual(events[0]["bytes_sent"], 2048)
+        self.assertTrue(lines[0].startswith("call openai.chat: 2x p50 0.20s"))
+        self.assertIn("sent 3.0KB, tokens in 15", lines[0])
+        self.assertEqual(lines[-1], "counts: cache hit 1")
+
+    def test_row_time_runs_from_first_start(self) -> None:
+        ticks = iter([1.0, 1.5, 4.0])
+        metrics = RunMetrics(clock=lambda: next(ticks))
+        metrics.row_started(2)
+        metrics.row_started(2)  # a later stage of the same row keeps the first time
+        metrics.row_finished(2, "queued")
+        self.assertIn("row queued: 1x p50 3.00s", metrics.summary_lines()[0])
+
+    def test_retries_and_cache_lookups_are_counted(self) -> None:
+        metrics = RunMetrics()
+        registry = RetryRegistry(RetrySettings(max_attempts=3, base_delay=0.0, max_delay=0.0))
+        registry.add_retry_listener(lambda provider, delay, throttled: metrics.count("retry", provider, throttled=throttled))
+        errors = [status_error("openai", 429, "slow down"), status_error("openai", 503, "unavailable")]
+
+        def attempt() -> str:
+            if errors:
+                raise errors.pop(0)
+            return "ok"
+
+        self.assertEqual(registry.get("openai").call(attempt), "ok")
+
+        with ResponseCache(Path(self._tmp.name) / "cache.sqlite3", metrics=metrics) as cache:
+            cache.put("k", "v")
+            cache.get("k")
+            cache.get("missing")
+        self.assertEqual(metrics.summary_lines()[-1], "counts: cache hit 1, cache miss 1, retry openai 2")
+
+    def test_claude_calls_record_bytes_and_tokens(self) -> None:
+        metrics = RunMetrics()
+        with MockAPIServer() as server:
+            client = ClaudeClient(api_key="mock", api_url=server.url("anthropic"), metrics=metrics)
+            try:
+                client.generate_text("A社向けの営業文")
+                client.stream_text("B社向けの営業文").final_text()
+            finally:
+                client.close()
+        for name in ("anthropic.messages", "anthropic.messages.stream"):
+            totals = metrics.totals("call", name)
+            self.assertGreater(totals.get("bytes_sent", 0), 0, name)
+            self.assertGreater(totals.get("bytes_received", 0), 0, name)
+            self.assertGreater(totals.get("output_tokens", 0), 0, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
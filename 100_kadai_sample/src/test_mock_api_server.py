@@ -0,0 +1,140 @@
+"""
+Overview:
+    - Unit tests for the local mock API server: A1 range handling, Sheets values routes, Claude replies and fault injection;
+      and the benchmark's client-side latency report.
+Usage:
+    - Execute `python -m unittest src.test_mock_api_server` from the repository root.
+"""
+
+import json
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import quote
+
+from bench_pipeline import (
+    build_profiles,
+    client_latencies,
+    format_report,
+    parse_args,
+    percentile,
+    run_benchmark,
+    seed_spreadsheet,
+)
+from claude_client import ClaudeClient
+from mock_api_server import MockAPIServer, MockProfile, MockSpreadsheet, parse_a1
+
+
+def _request(url: str, method: str = "GET", document=None):
+    data = json.dumps(document).encode("utf-8") if document is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+class MockSpreadsheetTests(unittest.TestCase):
+    """Validate A1 parsing and the in-memory grid."""
+
+    def test_parse_a1_handles_open_ranges_and_quoted_names(self) -> None:
+        """Column-only and row-only ends stay open-ended."""
+        self.assertEqual(parse_a1("'結果'!A2:ZZ"), ("結果", 1, 0, None, 701))
+        self.assertEqual(parse_a1("結果!C5"), ("結果", 4, 2, 4, 2))
+        self.assertEqual(parse_a1("結果!A2:A"), ("結果", 1, 0, None, 0))
+
+    def test_read_trims_trailing_blanks_and_write_counts_cells(self) -> None:
+        """Reads mimic the API's trimming; writes extend the grid."""
+        sheet = MockSpreadsheet()
+        sheet.put("結果", [["NAME", "URL", ""], ["A社", "https://a.example", ""], ["", "", ""]])
+        self.assertEqual(sheet.read("結果!A1:ZZ"), [["NAME", "URL"], ["A社", "https://a.example"]])
+        self.assertEqual(sheet.write("結果!D3", [["done"]]), 1)
+        self.assertEqual(sheet.read("結果!A3:ZZ3"), [["", "", "", "done"]])
+
+
+class MockAPIServerTests(unittest.TestCase):
+    """Drive the server over HTTP the way the real clients do."""
+
+    def test_sheets_values_routes(self) -> None:
+        """values.get, values.batchGet and values.batchUpdate share one grid."""
+        with MockAPIServer() as server:
+            server.sheet.put("結果", [["NAME", "URL"], ["A社", "https://a.example"]])
+            base = f"{server.url('sheets')}/v4/spreadsheets/mock/values"
+            got = _request(f"{base}/{quote('結果!A1:ZZ1')}")
+            self.assertEqual(got["values"], [["NAME", "URL"]])
+
+            updated = _request(
+                f"{base}:batchUpdate",
+                "POST",
+                {"valueInputOption": "RAW", "data": [{"range": "結果!C2", "values": [["検索結果"]]}]},
+            )
+            self.assertEqual(updated["totalUpdatedCells"], 1)
+
+            batch = _request(f"{base}:batchGet?ranges={quote('結果!C2')}&ranges={quote('結果!A2')}")
+            self.assertEqual([entry["values"] for entry in batch["valueRanges"]], [[["検索結果"]], [["A社"]]])
+
+            routes = [call.route for call in server.stats.calls]
+            self.assertEqual(routes, ["values.get", "values.batchUpdate", "values.batchGet"])
+            self.assertTrue(all(call.response_bytes > 0 for call in server.stats.calls))
+
+    def test_claude_client_round_trip_and_streaming(self) -> None:
+        """The mock answers both the JSON and SSE forms of /v1/messages."""
+        with MockAPIServer(profiles={"anthropic": MockProfile(output_chars=120)}) as server:
+            client = ClaudeClient(api_key="mock", api_url=server.url("anthropic"))
+            try:
+                text = client.generate_text("営業文を作成してください")
+                # A second call reuses the keep-alive connection.
+                self.assertEqual(client.generate_text("営業文を作成してください"), text)
+                streamed = client.stream_text("営業文を作成してください")
+                self.assertEqual(streamed.final_text(), text)
+                self.assertEqual(streamed.finish_reason, "end_turn")
+            finally:
+                client.close()
+            self.assertTrue(text.startswith("[mock anthropic]"))
+            self.assertEqual(len(server.stats.by_provider()["anthropic"]), 3)
+
+    def test_throttle_rate_returns_429_with_retry_after(self) -> None:
+        """Injected throttling is visible to clients and counted per call."""
+        with MockAPIServer(profiles={"openai": MockProfile(throttle_rate=1.0, retry_after=2.5)}) as server:
+            with self.assertRaises(urllib.error.HTTPError) as caught:
+                _request(f"{server.url('openai')}/chat/completions", "POST", {"messages": [{"content": "x"}]})
+            self.assertEqual(caught.exception.code, 429)
+            self.assertEqual(caught.exception.headers["Retry-After"], "2.5")
+            self.assertEqual([call.status for call in server.stats.calls], [429])
+
+    def test_percentile_uses_nearest_rank(self) -> None:
+        """Benchmark percentiles pick observed values."""
+        values = [float(index) for index in range(1, 101)]
+        self.assertEqual(percentile(values, 0.50), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.95), 0.0)
+
+
+class BenchReportTests(unittest.TestCase):
+    """The benchmark reports what the client waited for, not just the mock's configured latency."""
+
+    def test_client_latency_includes_retry_waits(self) -> None:
+        """A throttled search takes at least its Retry-After longer on the client than in the mock."""
+        args = parse_args(
+            ["--rows", "6", "--workers", "2", "--latency", "openai=0.02", "--latency", "anthropic=0.02",
+             "--throttle-rate", "0.5", "--retry-after", "0.2", "--seed", "4"]
+        )
+        with MockAPIServer(profiles=build_profiles(args), seed=args.seed) as server, tempfile.TemporaryDirectory() as tmp:
+            seed_spreadsheet(server, args.rows)
+            trace_path = Path(tmp) / "trace.jsonl"
+            elapsed = run_benchmark(server, args, trace_path)
+            client = client_latencies(trace_path)
+            calls = server.stats.by_provider()
+
+        throttled = sum(1 for call in calls["openai"] if call.status == 429)
+        self.assertGreater(throttled, 0)
+        self.assertEqual(len(client["search"]), 6)
+        self.assertEqual(len(client["row"]), 6)
+        self.assertGreaterEqual(max(client["search"]), 0.2)
+        report = format_report("fill", args.rows, elapsed, calls, client)
+        self.assertIn("svc p50", report[1])
+        self.assertTrue(report[-2].startswith("[bench] row           6"), report)
+
+
+if __name__ == "__main__":
+    unittest.main()
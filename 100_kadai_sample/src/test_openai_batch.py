@@ -0,0 +1,111 @@
+"""
+Overview:
+    - Unit tests for the OpenAI Batch API client: request files, result parsing and a submit/poll/download round trip against the mock server.
+Usage:
+    - Execute `python -m unittest src.test_openai_batch` from the repository root.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from batch_jobs import BatchSettings, chunked
+from mock_api_server import MockAPIServer, MockProfile
+from openai_batch import (
+    CHAT_ENDPOINT,
+    RESPONSES_ENDPOINT,
+    OpenAIBatchClient,
+    parse_result_lines,
+    write_request_file,
+)
+
+
+def _line(custom_id, status_code=200, body=None, error=None) -> str:
+    return json.dumps({"custom_id": custom_id, "response": {"status_code": status_code, "body": body or {}}, "error": error})
+
+
+class RequestFileTests(unittest.TestCase):
+    """Validate the JSONL request file layout."""
+
+    def test_writes_one_line_per_request(self) -> None:
+        """Each line carries custom_id, method, url and the body unchanged."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "nested" / "search.jsonl"
+            requests = [("row-2", {"model": "m", "input": "A社"}), ("row-3", {"model": "m", "input": "B社"})]
+            self.assertEqual(write_request_file(path, RESPONSES_ENDPOINT, requests), 2)
+            lines = [json.loads(raw) for raw in path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(
+            lines[0],
+            {"custom_id": "row-2", "method": "POST", "url": "/v1/responses", "body": {"model": "m", "input": "A社"}},
+        )
+        self.assertEqual([line["custom_id"] for line in lines], ["row-2", "row-3"])
+
+    def test_chunked_and_settings_limits(self) -> None:
+        """Requests split into batches of max_requests; settings clamp bad values."""
+        requests = [(f"row-{index}", {}) for index in range(5)]
+        self.assertEqual([len(group) for group in chunked(requests, 2)], [2, 2, 1])
+        settings = BatchSettings.from_dict({"max_requests": 0, "poll_interval": -1})
+        self.assertEqual((settings.max_requests, settings.poll_interval), (1, 0.0))
+
+
+class ResultParsingTests(unittest.TestCase):
+    """Validate how output and error file lines become results."""
+
+    def test_success_and_failure_lines(self) -> None:
+        """Text comes from either endpoint's body; failures keep their reason."""
+        responses_body = {"status": "completed", "output": [{"type": "message", "content": [{"type": "output_text", "text": " 結果 "}]}]}
+        chat_body = {"choices": [{"message": {"content": "chat"}, "finish_reason": "stop"}]}
+        data = "\n".join(
+            [
+                _line("row-2", body=responses_body),
+                _line("row-3", body=chat_body),
+                _line("row-4", 400, {"error": {"message": "bad input"}}),
+                _line("row-5", body={"choices": [{"message": {"content": "cut"}, "finish_reason": "length"}]}),
+                _line("row-6", error={"code": "batch_expired", "message": "not run"}),
+                "",
+            ]
+        ).encode("utf-8")
+        results = parse_result_lines(data)
+        self.assertEqual((results["row-2"].text, results["row-2"].error), ("結果", None))
+        self.assertEqual(results["row-3"].text, "chat")
+        self.assertEqual(results["row-4"].error, "HTTP 400: bad input")
+        self.assertIn("truncated", results["row-5"].error)
+        self.assertEqual(results["row-6"].error, "batch_expired: not run")
+
+
+class BatchRoundTripTests(unittest.TestCase):
+    """Drive the client against the mock Batch API endpoints."""
+
+    def test_submit_wait_and_collect_results(self) -> None:
+        """Upload, create, poll until completed and read both result files."""
+        with MockAPIServer(profiles={"openai": MockProfile(batch_polls=2, output_chars=80)}) as server:
+            sleeps = []
+            client = OpenAIBatchClient(api_key="mock", base_url=server.url("openai"), sleep=sleeps.append)
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / "search.jsonl"
+                bodies = [
+                    ("row-2", {"model": "m", "messages": [{"role": "user", "content": "A社を調べて"}]}),
+                    ("row-3", {"model": "m", "messages": [{"role": "user", "content": ""}]}),
+                ]
+                write_request_file(path, CHAT_ENDPOINT, bodies)
+                try:
+                    job = client.submit(path, CHAT_ENDPOINT, {"job": "test"})
+                    polled = []
+                    finished = client.wait(job.id, poll_interval=5, on_poll=polled.append)
+                    results = client.results(finished)
+                finally:
+                    client.close()
+            routes = [call.route for call in server.stats.calls]
+        self.assertEqual(job.status, "in_progress")
+        self.assertEqual([item.status for item in polled], ["in_progress", "in_progress", "completed"])
+        self.assertEqual(sleeps, [5, 5])
+        self.assertEqual((finished.total, finished.completed, finished.failed), (2, 1, 1))
+        self.assertTrue(results["row-2"].text.startswith("[mock openai] A社を調べて"))
+        self.assertEqual(results["row-3"].error, "HTTP 400: empty prompt")
+        self.assertEqual(routes[:2], ["files.create", "batches.create"])
+        self.assertEqual(routes.count("files.content"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
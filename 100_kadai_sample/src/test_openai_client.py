@@ -0,0 +1,66 @@
+"""
+Overview:
+    - Unit tests for AsyncOpenAIClient against the local mock server: many requests in flight on one event loop,
+      results in the order they were asked for, and errors that reach the caller with their token reservation returned.
+Usage:
+    - Execute `python -m unittest src.test_openai_client` from the repository root.
+"""
+
+import asyncio
+import time
+import unittest
+
+from mock_api_server import MockAPIServer, MockProfile
+from openai_client import AsyncOpenAIClient
+from rate_limiter import ProviderLimits, ProviderRateLimiter
+from retry_policy import RetryPolicy, RetrySettings
+
+
+def no_wait_retry(max_attempts: int = 2) -> RetryPolicy:
+    return RetryPolicy("openai", RetrySettings(max_attempts=max_attempts, base_delay=0.0, max_delay=0.0))
+
+
+class AsyncOpenAIClientTests(unittest.TestCase):
+    """One event loop drives many generations without a thread per request."""
+
+    def test_requests_run_concurrently_and_keep_their_order(self) -> None:
+        """Twenty 0.2s requests finish well under their serial time, each answer matching its prompt."""
+
+        async def generate(server: MockAPIServer):
+            async with AsyncOpenAIClient(api_key="mock", base_url=server.url("openai"), retry=no_wait_retry()) as client:
+                return await asyncio.gather(*(client.generate_text(f"会社{index:02d}") for index in range(20)))
+
+        with MockAPIServer(profiles={"openai": MockProfile(latency=0.2)}) as server:
+            started = time.perf_counter()
+            texts = asyncio.run(generate(server))
+            elapsed = time.perf_counter() - started
+            calls = len(server.stats.by_provider()["openai"])
+
+        self.assertEqual(calls, 20)
+        self.assertLess(elapsed, 20 * 0.2 / 2)
+        for index, text in enumerate(texts):
+            self.assertTrue(text.startswith(f"[mock openai] 会社{index:02d} "), text[:30])
+
+    def test_errors_propagate_and_refund_the_reservation(self) -> None:
+        """A request that keeps failing raises after its retries and leaves the token budget untouched."""
+        limiter = ProviderRateLimiter("openai", ProviderLimits(tokens_per_minute=1_000_000, token_burst=1_000_000))
+
+        async def generate(server: MockAPIServer):
+            async with AsyncOpenAIClient(
+                api_key="mock", base_url=server.url("openai"), rate_limiter=limiter, retry=no_wait_retry(3)
+            ) as client:
+                return await asyncio.gather(client.generate_text("A社"), client.generate_text("B社"), return_exceptions=True)
+
+        with MockAPIServer(profiles={"openai": MockProfile(error_rate=1.0)}) as server:
+            results = asyncio.run(generate(server))
+            calls = [call.status for call in server.stats.by_provider()["openai"]]
+
+        self.assertEqual(calls, [500] * 6)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+            self.assertIn("OpenAI API error", str(result))
+        self.assertAlmostEqual(limiter._tokens.available, 1_000_000, delta=1_000)  # type: ignore[union-attr]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Overview:
+    - Unit tests covering run_two_stage to verify ordered output, per-stage error isolation and that its threads
+      exit when the caller stops early.
+Usage:
+    - Execute `python -m unittest src.test_pipeline` from the repository root.
+"""
+
+import random
+import threading
+import time
+import unittest
+
+from pipeline import run_two_stage
+
+
+class RunTwoStageTests(unittest.TestCase):
+    """Ensure rows flow through both stages and come back in input order."""
+
+    def test_results_follow_input_order(self) -> None:
+        """Random per-stage latency must not reorder the reported outcomes."""
+
+        def first(value: int) -> int:
+            time.sleep(random.random() / 100)
+            return value * 10
+
+        def second(value: int, searched: int) -> int:
+            time.sleep(random.random() / 100)
+            return searched + value
+
+        outcomes = list(run_two_stage(range(30), first, second, first_workers=3, second_workers=2, queue_size=2))
+        self.assertEqual([value * 11 for value in range(30)], [outcome.result for outcome in outcomes])
+
+    def test_first_stage_error_skips_second_stage_for_that_item(self) -> None:
+        """A failing first stage should surface on its outcome without calling the second stage."""
+        seen = []
+
+        def first(value: int) -> int:
+            if value == 2:
+                raise RuntimeError("search failed")
+            return value
+
+        def second(value: int, searched: int) -> int:
+            seen.append(value)
+            return searched
+
+        outcomes = list(run_two_stage(range(4), first, second, first_workers=2, second_workers=2))
+        self.assertEqual("search failed", str(outcomes[2].error))
+        self.assertEqual([0, 1, 3], sorted(seen))
+        self.assertEqual([0, 1, None, 3], [outcome.result for outcome in outcomes])
+
+    def test_stopping_early_ends_every_thread(self) -> None:
+        """Closing the results after one row must not leave threads blocked on a full queue."""
+
+        def pipeline_threads() -> list:
+            return [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+
+        outcomes = run_two_stage(
+            range(1000), lambda value: value, lambda value, searched: searched, first_workers=3, second_workers=2, queue_size=1
+        )
+        self.assertEqual(0, next(outcomes).result)
+        self.assertTrue(pipeline_threads())
+        outcomes.close()
+        deadline = time.monotonic() + 2
+        while pipeline_threads() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual([], pipeline_threads())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,15 @@
 """
 Overview:
-    - Unit tests covering PromptBuilder search prompt generation to verify company names are injected.
+    - Unit tests covering PromptBuilder search prompt generation to verify company names are injected,
+      the compiled templates behind it, the shared message prefix and block rendering for batch submission.
 Usage:
     - Execute `python -m unittest src.test_prompt_builder` from the repository root.
 """
 
 import unittest
 
-from prompt_builder import PromptBuilder
+from bench_prompt_builder import legacy_message_prompt, legacy_search_prompt, sample_companies, sample_templates
+from prompt_builder import COMPANY_KEYS, PromptBuilder, compile_template
 
 
 class PromptBuilderSearchPromptTests(unittest.TestCase):
@@ -51,5 +53,108 @@ class PromptBuilderSearchPromptTests(unittest.TestCase):
         self.assertEqual("https://acme.example", prompt)
 
 
+class CompiledTemplateTests(unittest.TestCase):
+    """Ensure compiled templates render like the previous str.replace loop."""
+
+    def test_matches_previous_implementation(self) -> None:
+        """Every placeholder, repeated ones and self_info render identically."""
+        templates = sample_templates(100)
+        templates["search"] += " {{company_name}} / {{prefecture_id}} / {{self_info}}"
+        builder = PromptBuilder(search_template=templates["search"], message_template=templates["message"], self_info="自社")
+        for company in sample_companies(5):
+            self.assertEqual(
+                builder.render_search_prompt(company),
+                legacy_search_prompt(templates["search"], "自社", company),
+            )
+            self.assertEqual(
+                builder.render_message_prompt(company, "説明"),
+                legacy_message_prompt(templates["message"], "自社", company, "説明"),
+            )
+
+    def test_unknown_placeholders_are_reported_and_kept(self) -> None:
+        """Typos surface at construction time but still render verbatim."""
+        builder = PromptBuilder(
+            search_template="{{company_nmae}} {{company_description}} {{company_name}}",
+            message_template="{{company_description}}",
+            self_info="",
+        )
+        self.assertEqual(builder.unknown_placeholders, {"search": ("company_nmae", "company_description")})
+        self.assertEqual(
+            builder.render_search_prompt({"company_name": "Acme"}),
+            "{{company_nmae}} {{company_description}} Acme",
+        )
+
+    def test_literal_braces_and_missing_values(self) -> None:
+        """Single braces are plain text and absent company keys render empty."""
+        compiled = compile_template('{"q": "{{company_url}}"} {x}', COMPANY_KEYS, {})
+        self.assertEqual(compiled.keys, ("company_url",))
+        builder = PromptBuilder(search_template='{"q": "{{company_url}}", "n": "{{num_employees}}"} {x}')
+        self.assertEqual(builder.render_search_prompt({"company_url": "u"}), '{"q": "u", "n": ""} {x}')
+
+    def test_values_are_not_rescanned(self) -> None:
+        """Placeholder-like text inside company data is inserted literally."""
+        builder = PromptBuilder(search_template="{{company_name}}", message_template="", self_info="secret")
+        self.assertEqual(builder.render_search_prompt({"company_name": "{{self_info}}"}), "{{self_info}}")
+
+    def test_message_prefix_is_shared_by_every_row(self) -> None:
+        """The prefix holds self_info and text up to the first company placeholder."""
+        builder = PromptBuilder(
+            search_template="",
+            message_template="自社: {{self_info}}\n{{unknown}}宛先: {{company_name}}\n{{company_description}}",
+            self_info="当社",
+        )
+        self.assertEqual(builder.message_prefix, "自社: 当社\n{{unknown}}宛先: ")
+        for company in ({"company_name": "A社"}, {}):
+            self.assertTrue(builder.render_message_prompt(company, "説明").startswith(builder.message_prefix))
+        self.assertEqual(PromptBuilder(search_template="", message_template="{{company_name}} {{self_info}}").message_prefix, "")
+
+
+class BlockRenderingTests(unittest.TestCase):
+    """Ensure block rendering matches the single-row methods."""
+
+    def setUp(self) -> None:
+        templates = sample_templates(100)
+        self.builder = PromptBuilder(
+            search_template=templates["search"] + " {{company_name}} {{unknown}}",
+            message_template=templates["message"] + " {{company_description}}",
+            self_info="自社",
+        )
+        self.companies = sample_companies(5) + [{"company_name": "Sparse"}]
+
+    def test_search_prompts_match_single_rows(self) -> None:
+        """Every row, including one with missing keys, renders identically."""
+        expected = [self.builder.render_search_prompt(company) for company in self.companies]
+        self.assertEqual(self.builder.render_search_prompts(self.companies), expected)
+
+    def test_search_prompts_keep_fallback(self) -> None:
+        """A blank template falls back to URL or name per row."""
+        builder = PromptBuilder(search_template="  ")
+        companies = [{"company_url": "https://acme.example", "company_name": "Acme"}, {"company_name": "Beta"}]
+        self.assertEqual(builder.render_search_prompts(companies), ["https://acme.example", "Beta"])
+
+    def test_message_prompts_match_single_rows(self) -> None:
+        """Each description lands in its own row's prompt."""
+        descriptions = [f"説明{index}" for index in range(len(self.companies))]
+        expected = [
+            self.builder.render_message_prompt(company, description)
+            for company, description in zip(self.companies, descriptions)
+        ]
+        self.assertEqual(self.builder.render_message_prompts(self.companies, descriptions), expected)
+
+    def test_message_prompts_ignore_description_in_company(self) -> None:
+        """The description argument wins over a same-named company key, as in the single-row method."""
+        company = {"company_name": "Acme", "company_description": "stale"}
+        self.assertEqual(
+            self.builder.render_message_prompts([company], ["fresh"]),
+            [self.builder.render_message_prompt(company, "fresh")],
+        )
+
+    def test_message_prompts_reject_length_mismatch(self) -> None:
+        """Companies and descriptions must pair up one to one."""
+        with self.assertRaises(ValueError):
+            self.builder.render_message_prompts(self.companies, ["only one"])
+        self.assertEqual(self.builder.render_message_prompts([], []), [])
+
+
 if __name__ == "__main__":
     unittest.main()
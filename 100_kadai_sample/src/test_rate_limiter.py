@@ -0,0 +1,98 @@
+"""
+Overview:
+    - Unit tests covering the token-bucket rate limiter and the rate_limits config parsing.
+Usage:
+    - Execute `python -m unittest src.test_rate_limiter` from the repository root.
+"""
+
+import unittest
+
+from rate_limiter import ProviderLimits, ProviderRateLimiter, TokenBucket, parse_rate_limits
+
+
+class TokenBucketTests(unittest.TestCase):
+    """Ensure callers only wait once the budget is exhausted."""
+
+    def test_no_wait_while_budget_remains(self) -> None:
+        """Reservations within capacity should not be delayed."""
+        bucket = TokenBucket(capacity=3, refill_per_second=1)
+        self.assertEqual([0.0, 0.0, 0.0], [bucket.reserve(1) for _ in range(3)])
+
+    def test_wait_grows_with_deficit(self) -> None:
+        """Each reservation past capacity should owe one more refill interval."""
+        bucket = TokenBucket(capacity=1, refill_per_second=10)
+        bucket.reserve(1)
+        self.assertAlmostEqual(0.1, bucket.reserve(1), places=2)
+        self.assertAlmostEqual(0.2, bucket.reserve(1), places=2)
+
+    def test_adjust_refunds_unused_budget(self) -> None:
+        """Refunding an over-estimate should make the budget usable again immediately."""
+        bucket = TokenBucket(capacity=100, refill_per_second=0.001)
+        bucket.reserve(100)
+        bucket.adjust(60)
+        self.assertEqual(0.0, bucket.reserve(50))
+
+
+class ProviderRateLimiterTests(unittest.TestCase):
+    """Ensure request and token budgets are enforced independently."""
+
+    def test_token_budget_blocks_even_when_requests_remain(self) -> None:
+        """A large token reservation should delay the next call despite spare request budget."""
+        limiter = ProviderRateLimiter(
+            "openai", ProviderLimits(requests_per_minute=600, tokens_per_minute=600, token_burst=600)
+        )
+        self.assertEqual(0.0, limiter.reserve(600))
+        self.assertGreater(limiter.reserve(60), 0.0)
+
+    def test_refund_returns_the_token_reservation(self) -> None:
+        """A failed attempt's tokens should go back to the bucket; its request still counts."""
+        limiter = ProviderRateLimiter(
+            "openai", ProviderLimits(requests_per_minute=60, tokens_per_minute=60_000, request_burst=60, token_burst=60_000)
+        )
+        limiter.reserve(50_000)
+        limiter.refund(50_000)
+        self.assertAlmostEqual(limiter._tokens.available, 60_000, delta=10)  # type: ignore[union-attr]
+        self.assertAlmostEqual(limiter._requests.available, 59, delta=0.1)  # type: ignore[union-attr]
+
+    def test_cold_start_bursts_only_the_default_share(self) -> None:
+        """A fresh limiter lets a tenth of the minute through at once, not the whole minute."""
+        limiter = ProviderRateLimiter("openai", ProviderLimits(requests_per_minute=100))
+        delays = [limiter.reserve() for _ in range(11)]
+        self.assertEqual(delays[:10], [0.0] * 10)
+        self.assertAlmostEqual(delays[10], 0.6, places=2)
+
+    def test_request_larger_than_the_burst_is_charged_in_full(self) -> None:
+        """A reservation above the token burst waits for the whole excess to refill."""
+        limiter = ProviderRateLimiter("anthropic", ProviderLimits(tokens_per_minute=60_000, token_burst=1_000))
+        self.assertAlmostEqual(limiter.reserve(3_000), 2.0, places=2)
+
+    def test_unlimited_limiter_never_waits(self) -> None:
+        """Providers without configured limits should pass straight through."""
+        limiter = ProviderRateLimiter("sheets")
+        self.assertEqual(0.0, sum(limiter.reserve(10_000) for _ in range(100)))
+
+
+class ParseRateLimitsTests(unittest.TestCase):
+    """Ensure config parsing supports the new section and the legacy interval."""
+
+    def test_reads_rate_limits_section(self) -> None:
+        limits = parse_rate_limits(
+            {"rate_limits": {"sheets": {"requests_per_minute": 60}, "openai": {"tokens_per_minute": 600, "token_burst": 50}}}
+        )
+        self.assertEqual(60.0, limits["sheets"].requests_per_minute)
+        self.assertIsNone(limits["sheets"].tokens_per_minute)
+        self.assertIsNone(limits["sheets"].request_burst)
+        self.assertEqual(50.0, limits["openai"].token_burst)
+
+    def test_legacy_request_interval_becomes_rpm(self) -> None:
+        limits = parse_rate_limits({"request_interval": 2.0})
+        self.assertEqual(30.0, limits["openai"].requests_per_minute)
+        self.assertEqual(30.0, limits["anthropic"].requests_per_minute)
+        self.assertNotIn("sheets", limits)
+        limiter = ProviderRateLimiter("openai", limits["openai"])
+        self.assertEqual(0.0, limiter.reserve())
+        self.assertAlmostEqual(2.0, limiter.reserve(), places=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
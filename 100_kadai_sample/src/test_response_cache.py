@@ -0,0 +1,84 @@
+"""
+Overview:
+    - Unit tests covering the on-disk LLM response cache (hits, TTL expiry, and LRU size eviction).
+Usage:
+    - Execute `python -m unittest src.test_response_cache` from the repository root.
+"""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from response_cache import CacheSettings, ResponseCache, cache_key
+
+
+class ResponseCacheTests(unittest.TestCase):
+    """Ensure cached responses are reused, expired, and evicted as configured."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "cache" / "responses.sqlite3"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_hit_skips_producer_and_persists(self) -> None:
+        """A second lookup, even from a reopened cache, should not call the producer."""
+        calls = []
+
+        def produce() -> str:
+            calls.append(1)
+            return "answer"
+
+        key = cache_key("openai:chat", "gpt-5", 100, None, "prompt")
+        with ResponseCache(self.path) as cache:
+            self.assertEqual("answer", cache.get_or_create(key, produce))
+            self.assertEqual("answer", cache.get_or_create(key, produce))
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+        with ResponseCache(self.path) as cache:
+            self.assertEqual("answer", cache.get_or_create(key, produce))
+        self.assertEqual(1, len(calls))
+
+    def test_key_covers_request_settings(self) -> None:
+        """Changing any request setting should produce a different key."""
+        base = cache_key("openai:chat", "gpt-5", 100, None, "prompt")
+        self.assertNotEqual(base, cache_key("openai:web_search", "gpt-5", 100, None, "prompt"))
+        self.assertNotEqual(base, cache_key("openai:chat", "gpt-5", 200, None, "prompt"))
+        self.assertNotEqual(base, cache_key("openai:chat", "gpt-5", 100, 0.2, "prompt"))
+
+    def test_expired_entries_are_misses(self) -> None:
+        """Entries older than the TTL should not be returned."""
+        with ResponseCache(self.path, ttl_seconds=0.01) as cache:
+            cache.put("k", "v")
+            time.sleep(0.02)
+            self.assertIsNone(cache.get("k"))
+
+    def test_size_limit_evicts_least_recently_used(self) -> None:
+        """Going over the size limit should drop entries that were not read recently."""
+        with ResponseCache(self.path, max_bytes=30) as cache:
+            cache.put("a", "x" * 10)
+            cache.put("b", "x" * 10)
+            cache.get("a")
+            cache.put("c", "x" * 15)
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(1, cache.evictions)
+
+    def test_close_twice_is_harmless(self) -> None:
+        """A campaign and its job both close the cache; the second close should do nothing."""
+        cache = ResponseCache(self.path)
+        cache.put("a", "x")
+        cache.get("a")
+        cache.close()
+        cache.close()
+        with ResponseCache(self.path) as reopened:
+            self.assertEqual("x", reopened.get("a"))
+
+    def test_disabled_settings_open_nothing(self) -> None:
+        """A disabled cache section should yield no cache."""
+        self.assertIsNone(ResponseCache.open(CacheSettings(enabled=False, path=str(self.path))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+"""
+Overview:
+    - Unit tests for the shared retry policy: error classification, Retry-After parsing, backoff, retry budget and AIMD concurrency.
+Usage:
+    - Execute `python -m unittest src.test_retry_policy` from the repository root.
+"""
+
+import email.utils
+import threading
+import time
+import unittest
+
+from claude_client import ClaudeClient
+from mock_api_server import MockAPIServer, MockProfile
+from retry_policy import (
+    FATAL,
+    THROTTLE,
+    TRANSIENT,
+    AdaptiveConcurrency,
+    RetryableError,
+    RetryBudget,
+    RetryPolicy,
+    RetryRegistry,
+    RetrySettings,
+    classify,
+    parse_retry_after,
+    status_error,
+)
+
+
+def _failing(errors, result="ok"):
+    """Return an attempt function raising `errors` in turn, then returning `result`."""
+    pending = list(errors)
+    calls = []
+
+    def attempt():
+        calls.append(len(calls) + 1)
+        if pending:
+            raise pending.pop(0)
+        return result
+
+    return attempt, calls
+
+
+class ClassificationTests(unittest.TestCase):
+    """Validate which failures are worth retrying for each provider."""
+
+    def test_provider_specific_statuses(self) -> None:
+        """529 is Anthropic's overload signal; Sheets reports quota as 403."""
+        self.assertEqual(classify("anthropic", 529), THROTTLE)
+        self.assertEqual(classify("openai", 529), FATAL)
+        self.assertEqual(classify("sheets", 403, "rateLimitExceeded"), THROTTLE)
+        self.assertEqual(classify("sheets", 403, "PERMISSION_DENIED"), FATAL)
+        self.assertEqual(classify("openai", 503), TRANSIENT)
+        self.assertEqual(classify("anthropic", 400), FATAL)
+
+    def test_openai_insufficient_quota_is_not_retried(self) -> None:
+        """A billing-quota 429 does not clear up by waiting."""
+        self.assertEqual(classify("openai", 429, '{"code": "insufficient_quota"}'), FATAL)
+        self.assertNotIsInstance(status_error("openai", 429, "quota", detail="insufficient_quota"), RetryableError)
+
+    def test_status_error_reads_retry_after(self) -> None:
+        """Header lookup accepts either capitalisation."""
+        err = status_error("anthropic", 429, "slow down", {"retry-after": "3"})
+        self.assertIsInstance(err, RetryableError)
+        self.assertEqual((err.status, err.retry_after, err.throttled), (429, 3.0, True))
+
+    def test_parse_retry_after_formats(self) -> None:
+        """Both delta-seconds and HTTP-date values are understood."""
+        self.assertEqual(parse_retry_after("2.5"), 2.5)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+        future = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(future), 30, delta=2)
+        self.assertEqual(parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT"), 0.0)
+
+
+class RetryPolicyTests(unittest.TestCase):
+    """Exercise the retry loop with an injected sleep."""
+
+    def setUp(self) -> None:
+        self.sleeps = []
+
+    def _policy(self, **settings) -> RetryPolicy:
+        return RetryPolicy("anthropic", RetrySettings(**settings), sleep=self.sleeps.append)
+
+    def test_retries_until_success_with_capped_jitter(self) -> None:
+        """Waits stay within the exponential ceiling for each attempt."""
+        policy = self._policy(base_delay=1.0, max_delay=3.0)
+        attempt, calls = _failing([RetryableError("e")] * 3)
+        self.assertEqual(policy.call(attempt), "ok")
+        self.assertEqual(len(calls), 4)
+        for delay, ceiling in zip(self.sleeps, (1.0, 2.0, 3.0)):
+            self.assertLessEqual(delay, ceiling)
+        self.assertEqual(policy.stats.retries, 3)
+
+    def test_retry_after_overrides_backoff(self) -> None:
+        """The server's hint is used verbatim when it fits within max_delay."""
+        policy = self._policy()
+        attempt, _ = _failing([RetryableError("429", status=429, retry_after=4.0, throttled=True)])
+        policy.call(attempt)
+        self.assertEqual(self.sleeps, [4.0])
+        self.assertEqual(policy.stats.throttled, 1)
+
+    def test_gives_up_when_retry_after_exceeds_max_delay(self) -> None:
+        """A long Retry-After is surfaced instead of stalling a worker."""
+        policy = self._policy(max_delay=10.0)
+        attempt, calls = _failing([RetryableError("429", retry_after=120.0, throttled=True)])
+        with self.assertRaises(RetryableError):
+            policy.call(attempt)
+        self.assertEqual((len(calls), self.sleeps), (1, []))
+
+    def test_gives_up_after_max_attempts(self) -> None:
+        """The last error propagates once attempts run out."""
+        policy = self._policy(max_attempts=3)
+        attempt, calls = _failing([RetryableError("e")] * 5)
+        with self.assertRaises(RetryableError):
+            policy.call(attempt)
+        self.assertEqual(len(calls), 3)
+        waited = sum(self.sleeps)
+        self.assertEqual(policy.summary(), f"anthropic 2 retries (0 throttled, waited {waited:.1f}s), 1 gave up")
+
+    def test_fatal_errors_are_not_retried(self) -> None:
+        """Plain RuntimeError passes straight through."""
+        policy = self._policy()
+        attempt, calls = _failing([RuntimeError("bad request")])
+        with self.assertRaises(RuntimeError):
+            policy.call(attempt)
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(policy.summary())
+
+    def test_budget_limits_retries_across_calls(self) -> None:
+        """Once the bucket is empty, failures are raised without waiting."""
+        policy = RetryPolicy("openai", RetrySettings(), budget=RetryBudget(ratio=0.0, min_retries=2), sleep=self.sleeps.append)
+        attempt, calls = _failing([RetryableError("e")] * 10)
+        with self.assertRaises(RetryableError):
+            policy.call(attempt)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(policy.stats.budget_exhausted, 1)
+
+    def test_listeners_receive_throttle_and_success(self) -> None:
+        """Throttles and successes are reported to subscribers."""
+        policy = self._policy()
+        events = []
+        policy.add_throttle_listener(lambda: events.append("throttle"))
+        policy.add_success_listener(lambda: events.append("success"))
+        attempt, _ = _failing([RetryableError("429", throttled=True), RetryableError("500")])
+        policy.call(attempt)
+        self.assertEqual(events, ["throttle", "success"])
+
+    def test_listener_removed_while_notifying_still_hears_that_event(self) -> None:
+        """Releasing a gate during a notification must not make the others skip it."""
+        policy = self._policy()
+        events = []
+
+        def first() -> None:
+            events.append("first")
+            policy.remove_listener(second)
+
+        def second() -> None:
+            events.append("second")
+
+        policy.add_success_listener(first)
+        policy.add_success_listener(second)
+        policy.call(lambda: "ok")
+        policy.call(lambda: "ok")
+        self.assertEqual(events, ["first", "second", "first"])
+
+
+class AdaptiveConcurrencyTests(unittest.TestCase):
+    """Validate the AIMD limit arithmetic."""
+
+    def test_halves_on_throttle_and_recovers_additively(self) -> None:
+        """One decrease per cooldown; `limit` successes add one slot."""
+        now = [0.0]
+        gate = AdaptiveConcurrency(8, cooldown=1.0, clock=lambda: now[0])
+        gate.on_throttle()
+        gate.on_throttle()
+        self.assertEqual(gate.limit, 4)
+        now[0] = 2.0
+        gate.on_throttle()
+        self.assertEqual(gate.limit, 2)
+        for _ in range(2):
+            gate.on_success()
+        self.assertEqual(gate.limit, 3)
+        self.assertEqual(gate.summary(), "reduced 2x (lowest 2/8, now 3)")
+
+    def test_registry_gate_disabled_for_serial_runs(self) -> None:
+        """No gate is needed with one worker or when switched off."""
+        self.assertIsNone(RetryRegistry().adaptive_gate(["openai"], 1))
+        self.assertIsNone(RetryRegistry(RetrySettings(adaptive_concurrency=False)).adaptive_gate(["openai"], 8))
+        self.assertIsNotNone(RetryRegistry().adaptive_gate(["openai"], 8))
+
+    def test_registry_listeners_reach_policies_created_concurrently(self) -> None:
+        """A retry listener added while other threads create policies ends up on every policy exactly once."""
+        registry = RetryRegistry()
+
+        def listener(provider: str, delay: float, throttled: bool) -> None:
+            pass
+
+        threads = [
+            threading.Thread(target=lambda base=base: [registry.get(f"p{base}-{index}") for index in range(200)])
+            for base in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        registry.add_retry_listener(listener)
+        for thread in threads:
+            thread.join()
+        policies = [registry.get(f"p{base}-{index}") for base in range(4) for index in range(200)]
+        self.assertTrue(all(policy._retry_listeners == [listener] for policy in policies))
+
+
+class ClientRetryTests(unittest.TestCase):
+    """Drive a real client against the mock server with injected throttling."""
+
+    def test_claude_client_recovers_from_throttling(self) -> None:
+        """429s with Retry-After: 0 are retried until the call succeeds."""
+        profile = MockProfile(throttle_rate=0.5, retry_after=0.0)
+        with MockAPIServer(profiles={"anthropic": profile}, seed=7) as server:
+            policy = RetryPolicy("anthropic", RetrySettings(max_attempts=10))
+            client = ClaudeClient(api_key="mock", api_url=server.url("anthropic"), retry=policy)
+            try:
+                texts = [client.generate_text(f"営業文を作成してください {index}") for index in range(5)]
+            finally:
+                client.close()
+            statuses = [call.status for call in server.stats.calls]
+        self.assertTrue(all(text.startswith("[mock anthropic]") for text in texts))
+        self.assertEqual(statuses.count(200), 5)
+        self.assertGreater(statuses.count(429), 0)
+        self.assertEqual(policy.stats.throttled, statuses.count(429))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Overview:
+    - Unit tests covering run_ordered to verify bounded concurrency, ordering and per-item error isolation.
+Usage:
+    - Execute `python -m unittest src.test_row_executor` from the repository root.
+"""
+
+import threading
+import time
+import unittest
+
+from row_executor import run_ordered
+
+
+class RunOrderedTests(unittest.TestCase):
+    """Ensure results come back in input order regardless of completion order."""
+
+    def test_serial_path_preserves_order(self) -> None:
+        """`workers=1` should process items inline in order."""
+        outcomes = list(run_ordered(lambda value: value * 2, [1, 2, 3], workers=1))
+        self.assertEqual([2, 4, 6], [outcome.result for outcome in outcomes])
+
+    def test_concurrent_results_are_reported_in_input_order(self) -> None:
+        """Slow early items must not be overtaken in the reported sequence."""
+
+        def task(value: int) -> int:
+            time.sleep(0.02 * (5 - value))
+            return value
+
+        outcomes = list(run_ordered(task, range(5), workers=5))
+        self.assertEqual([0, 1, 2, 3, 4], [outcome.result for outcome in outcomes])
+
+    def test_errors_do_not_stop_remaining_items(self) -> None:
+        """An exception should be captured on its outcome while other items still run."""
+
+        def task(value: int) -> int:
+            if value == 1:
+                raise RuntimeError("boom")
+            return value
+
+        for workers in (1, 3):
+            outcomes = list(run_ordered(task, [0, 1, 2], workers=workers))
+            self.assertEqual([True, False, True], [outcome.ok for outcome in outcomes])
+            self.assertEqual("boom", str(outcomes[1].error))
+            self.assertEqual(2, outcomes[2].result)
+
+    def test_in_flight_calls_never_exceed_worker_count(self) -> None:
+        """No more than `workers` task calls should overlap."""
+        lock = threading.Lock()
+        active = 0
+        peak = 0
+
+        def task(value: int) -> int:
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            return value
+
+        results = [outcome.result for outcome in run_ordered(task, range(20), workers=3)]
+        self.assertEqual(list(range(20)), results)
+        self.assertLessEqual(peak, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Overview:
+    - Unit tests covering the append-only run journal used by `--resume`.
+Usage:
+    - Execute `python -m unittest src.test_run_journal` from the repository root.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from run_journal import RunJournal, company_hash, load_state
+
+
+class RunJournalTests(unittest.TestCase):
+    """Ensure journaled progress survives a restart."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "journal" / "sheet.jsonl"
+        self.key = (2, company_hash("Example", "https://example.com", ""))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_resume_replays_results_and_written_rows(self) -> None:
+        """Reopening with resume should restore generated text and written flags."""
+        other = (3, company_hash("Other", "https://other.example", ""))
+        with RunJournal.open(self.path, resume=False) as journal:
+            journal.record_search(self.key, "search")
+            journal.record_letter(self.key, "search", "letter")
+            journal.record_search(other, "only search")
+            journal.record_written([self.key])
+
+        state = RunJournal.open(self.path, resume=True).state
+        entry = state.get(self.key)
+        self.assertIsNotNone(entry)
+        self.assertEqual(("search", "letter", True), (entry.search_result, entry.sales_letter, entry.written))
+        self.assertIsNone(state.get(other).sales_letter)
+        self.assertEqual((1, 0), (state.written, state.pending_writes))
+
+    def test_torn_last_line_is_ignored(self) -> None:
+        """A partially written final line from a crash should not break loading."""
+        with RunJournal.open(self.path, resume=False) as journal:
+            journal.record_letter(self.key, "search", "letter")
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write('{"event": "written", "row": 2, "ha')
+
+        state = load_state(self.path)
+        self.assertEqual(1, state.pending_writes)
+
+    def test_fresh_run_archives_previous_journal(self) -> None:
+        """Starting without resume should move the old journal aside."""
+        with RunJournal.open(self.path, resume=False) as journal:
+            journal.record_search(self.key, "search")
+        RunJournal.open(self.path, resume=False).close()
+
+        self.assertFalse(self.path.exists())
+        self.assertEqual(1, len(load_state(self.path.with_name("sheet.prev.jsonl")).entries))
+
+    def test_archives_rotate_instead_of_overwriting(self) -> None:
+        """Each fresh run shifts older archives back; only the oldest beyond three is dropped."""
+        for run in range(1, 6):
+            with RunJournal.open(self.path, resume=False) as journal:
+                journal.record_search((run, "h"), f"run {run}")
+
+        def run_of(name: str) -> int:
+            return next(iter(load_state(self.path.with_name(name)).entries))[0]
+
+        self.assertEqual(
+            [run_of(name) for name in ("sheet.jsonl", "sheet.prev.jsonl", "sheet.prev2.jsonl", "sheet.prev3.jsonl")],
+            [5, 4, 3, 2],
+        )
+        self.assertEqual(len(list(self.path.parent.iterdir())), 4)
+
+    def test_hash_distinguishes_companies(self) -> None:
+        """Different company fields on the same row should produce different keys."""
+        self.assertNotEqual(company_hash("A", "https://a"), company_hash("B", "https://a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Overview:
+    - Unit tests for the search-only CLI's Batch API path: collecting a batch submitted by an earlier run with
+      `--batch-id` against the local mock APIs, and the options that cannot be combined with it.
+Usage:
+    - Execute `python -m unittest src.test_search_single` from the repository root.
+"""
+
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+from campaign_fixtures import SEARCH_HEADER, put_prompt_sheets, search_config
+from mock_api_server import MockAPIServer
+from search_single import load_config, parse_args, run_search_job
+
+
+class BatchResumeTests(unittest.TestCase):
+    """Results of a submitted batch are only written to rows that still want them."""
+
+    def test_resume_skips_filled_and_changed_rows(self) -> None:
+        """Rows filled by hand or edited since submission keep their cells; the rest are written."""
+        with tempfile.TemporaryDirectory() as tmp, MockAPIServer() as server:
+            put_prompt_sheets(server)
+            rows = [["A社", "https://a.example"], ["B社", "https://b.example"], ["C社", "https://c.example"]]
+            server.sheet.put("結果", [SEARCH_HEADER] + rows)
+            path = Path(tmp) / "config.json"
+            document = search_config(server, "sheet", "結果")
+            document["batch"] = {"poll_interval": 0}
+            path.write_text(json.dumps(document), encoding="utf-8")
+            config = load_config(path)
+
+            out = io.StringIO()
+            with redirect_stdout(out):
+                run_search_job(config, limit=None, overwrite=False, dry_run=False, use_web_search=False, batch=True)
+            batch_id = next(line.rsplit(" ", 1)[1] for line in out.getvalue().splitlines() if "--batch-id" in line)
+
+            # The first run waited and wrote every row. As if it had stopped after
+            # submitting: row 2 is then filled by hand, row 3 is given another
+            # company and row 4 is still empty.
+            server.sheet.put(
+                "結果",
+                [
+                    SEARCH_HEADER,
+                    ["A社", "https://a.example", "", "手入力"],
+                    ["B2社", "https://b.example", "", ""],
+                    ["C社", "https://c.example", "", ""],
+                ],
+            )
+            out = io.StringIO()
+            with redirect_stdout(out):
+                run_search_job(
+                    config, limit=None, overwrite=False, dry_run=False, use_web_search=False, batch_ids=[batch_id]
+                )
+            written = server.sheet.rows("結果")
+
+        log = out.getvalue()
+        self.assertIn("[skip] Row 2 already has search result for A社", log)
+        self.assertIn(f"[skip] Row 3 changed since batch {batch_id} was submitted", log)
+        self.assertIn("Completed generating search results for 1 rows.", log)
+        self.assertEqual(written[1][3], "手入力")
+        self.assertEqual(written[2][3], "")
+        self.assertTrue(written[3][3].startswith("[mock openai] C社"), written[3])
+
+    def test_batch_id_rejects_incompatible_options(self) -> None:
+        for argv in (["--batch-id", "b", "--workers", "4"], ["--batch-id", "b", "--batch"]):
+            with self.subTest(argv=argv), redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                parse_args(["--config", "c.json"] + argv)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Overview:
+    - Unit tests for the shared sheet job core: header column detection, record building, config path
+      resolution, and the prompt inputs read in one request against the local mock Sheets API.
+Usage:
+    - Execute `python -m unittest src.test_sheet_job` from the repository root.
+"""
+
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+
+from mock_api_server import MockAPIServer
+from sheet_job import SheetJob, build_column_indexes, build_company_records, common_settings, load_job_config
+
+HEADER = ["NAME", "URL", "ADDRESS", "検索結果", "セールスレター"]
+
+
+def settings_from(document: dict) -> SimpleNamespace:
+    return SimpleNamespace(**common_settings(document))
+
+
+def config_document(**overrides: object) -> dict:
+    document = {
+        "spreadsheet_id": "mock-spreadsheet",
+        "service_account_file": "missing.json",
+        "ranges": {"search_prompt_template": "'検索'!A2", "business_info": "'自社情報'!A2"},
+        "output": {"sheet_name": "結果"},
+        "cache": {"enabled": True, "path": "cache/responses.sqlite3"},
+    }
+    document.update(overrides)
+    return document
+
+
+class ColumnTests(unittest.TestCase):
+    """Locate columns by header label."""
+
+    def test_sales_letter_is_optional_for_search_only_jobs(self) -> None:
+        columns = build_column_indexes(["NAME", "URL", "検索結果"])
+        self.assertEqual((columns.name, columns.url, columns.search_result), (0, 1, 2))
+        self.assertIsNone(columns.sales_letter)
+        with self.assertRaises(ValueError):
+            build_column_indexes(["NAME", "URL", "検索結果"], require_sales_letter=True)
+
+    def test_repeated_labels_prefer_the_output_side_of_url(self) -> None:
+        columns = build_column_indexes(["検索結果", "NAME", "URL", "ADDRESS", "検索結果", "セールスレター"], require_sales_letter=True)
+        self.assertEqual((columns.search_result, columns.sales_letter, columns.address), (4, 5, 3))
+        self.assertEqual(columns.input_columns(), [1, 2, 3])
+
+    def test_rows_without_name_or_url_are_skipped(self) -> None:
+        columns = build_column_indexes(HEADER, require_sales_letter=True)
+        rows = [["A社", "https://a.example", " 東京 "], [], ["", "", "大阪"], ["B社"]]
+        records = build_company_records(rows, columns, start_row=2)
+        self.assertEqual([record.row_number for record in records], [2, 5])
+        self.assertEqual(records[0].address, "東京")
+        self.assertEqual(records[1].prompt_context()["company_name_encoded"], "B%E7%A4%BE")
+
+
+class ConfigTests(unittest.TestCase):
+    """Resolve config-relative paths and tolerate missing credentials only for a custom endpoint."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "config.json"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _load(self, document: dict):
+        self.path.write_text(json.dumps(document), encoding="utf-8")
+        return load_job_config(self.path, settings_from)
+
+    def test_paths_resolve_next_to_the_config(self) -> None:
+        (Path(self._tmp.name) / "sa.json").write_text("{}", encoding="utf-8")
+        settings = self._load(config_document(service_account_file="sa.json"))
+        self.assertEqual(settings.service_account_file, str((Path(self._tmp.name) / "sa.json").resolve()))
+        self.assertEqual(settings.cache.path, str(Path(self._tmp.name) / "cache/responses.sqlite3"))
+        self.assertEqual(settings.output_start_row, 2)
+
+    def test_missing_credentials_need_a_custom_endpoint(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            self._load(config_document())
+        settings = self._load(config_document(sheets_api_endpoint="http://127.0.0.1:1/sheets"))
+        self.assertEqual(settings.service_account_file, "missing.json")
+
+
+class SheetJobTests(unittest.TestCase):
+    """Read the prompt inputs and rows through the mock Sheets API."""
+
+    def test_templates_are_read_in_one_request(self) -> None:
+        with MockAPIServer() as server:
+            server.sheet.put("検索", [["template"], ["{{company_name}} {{unknown}}"]])
+            server.sheet.put("自社情報", [["info"], ["自社"]])
+            server.sheet.put("結果", [HEADER, ["A社", "https://a.example"], ["", ""], ["B社", "https://b.example", "", "済"]])
+            config = settings_from(config_document(sheets_api_endpoint=server.url("sheets")))
+            job = SheetJob.start(config)
+            out = io.StringIO()
+            with redirect_stdout(out):
+                builder = job.prompt_builder()
+                columns = job.read_columns()
+                records = job.records([(2, job.sheet.fetch_values("結果!A2:D4"))], columns, limit=None)
+            job.close()
+            calls = [call.route for call in server.stats.calls if call.provider == "sheets"]
+
+        self.assertEqual(builder.render_search_prompt({"company_name": "A社"}), "A社 {{unknown}}")
+        self.assertIn("{{unknown}}", out.getvalue())
+        self.assertEqual([(record.row_number, record.search_result) for record in records], [(2, ""), (4, "済")])
+        self.assertEqual(calls.count("values.batchGet"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Overview:
+    - Unit tests covering the SSE parser, TextStream abort handling, and ClaudeClient streaming against a local server.
+Usage:
+    - Execute `python -m unittest src.test_streaming` from the repository root.
+"""
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from claude_client import ClaudeClient
+from streaming import StreamStats, TextStream, iter_sse_events, max_chars, stop_marker
+
+
+def _claude_events(chunks):
+    yield {"type": "message_start", "message": {"usage": {"input_tokens": 7}}}
+    for chunk in chunks:
+        yield {"type": "content_block_delta", "delta": {"type": "text_delta", "text": chunk}}
+    yield {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 3}}
+    yield {"type": "message_stop"}
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    chunks = ["Hello", ", ", "world"]
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in _claude_events(self.chunks):
+            frame = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+            self.wfile.write(f"{len(frame):X}\r\n".encode() + frame + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class SSEParserTests(unittest.TestCase):
+    """Ensure SSE framing rules are applied."""
+
+    def test_events_split_on_blank_lines(self) -> None:
+        """Comments are skipped and multi-line data is joined with newlines."""
+        lines = [b": keep-alive\n", b"event: ping\n", b"data: a\n", b"data: b\n", b"\n", b"data: c\r\n", b"\r\n"]
+        events = [(event.event, event.data) for event in iter_sse_events(lines)]
+        self.assertEqual([("ping", "a\nb"), ("message", "c")], events)
+
+
+class TextStreamTests(unittest.TestCase):
+    """Ensure deltas, abort predicates, and stats behave as documented."""
+
+    def test_abort_closes_source_and_marks_stream(self) -> None:
+        """An abort predicate should stop iteration and close the source generator."""
+        closed = []
+
+        def produce(stream):
+            try:
+                for part in ["ab", "cd", "ef", "gh"]:
+                    yield part
+            finally:
+                closed.append(True)
+
+        stats = StreamStats()
+        stream = TextStream(produce, max_chars(3), stats.record)
+        with self.assertRaises(RuntimeError):
+            stream.final_text()
+        self.assertEqual(("abcd", True, [True]), (stream.text, stream.aborted, closed))
+        self.assertEqual((1, 1), (stats.streams, stats.aborted))
+        self.assertIsNotNone(stream.time_to_first_token)
+
+    def test_stop_marker(self) -> None:
+        """A stop marker should trigger once it appears in the accumulated text."""
+        stream = TextStream(lambda _: iter(["x", "EN", "D", "y"]), stop_marker("END"))
+        self.assertEqual(["x", "EN", "D"], list(stream))
+        self.assertTrue(stream.aborted)
+
+    def test_source_error_sets_final_error(self) -> None:
+        """An error reported by the source should make final_text raise."""
+
+        def produce(stream):
+            yield "partial"
+            stream.error = "truncated"
+
+        with self.assertRaisesRegex(RuntimeError, "truncated"):
+            TextStream(produce).final_text()
+
+
+class ClaudeStreamingTests(unittest.TestCase):
+    """Ensure ClaudeClient.stream_text parses Anthropic SSE events over the pooled transport."""
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/messages"
+        self.client = ClaudeClient(api_key="test", api_url=url)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_stream_yields_deltas_and_reuses_connection(self) -> None:
+        """Deltas should arrive in order and a fully read stream should keep its connection."""
+        first = self.client.stream_text("prompt")
+        self.assertEqual(["Hello", ", ", "world"], list(first))
+        self.assertEqual(("end_turn", 10), (first.finish_reason, first.usage_tokens))
+        self.assertEqual("Hello, world", self.client.stream_text("prompt").final_text())
+        self.assertEqual(1, self.client.transport.stats.connections_opened)
+
+    def test_abort_drops_connection(self) -> None:
+        """Aborting mid-stream should close the connection instead of pooling it."""
+        stream = self.client.stream_text("prompt", should_abort=max_chars(4))
+        self.assertEqual(["Hello"], list(stream))
+        self.client.stream_text("prompt").final_text()
+        self.assertEqual(2, self.client.transport.stats.connections_opened)
+
+
+if __name__ == "__main__":
+    unittest.main()
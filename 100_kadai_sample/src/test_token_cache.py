@@ -0,0 +1,108 @@
+"""
+Overview:
+    - Unit tests for the encrypted Sheets access-token cache and the offline discovery document:
+      round trip, expiry margin, wrong key / corrupt files, and a service built from a local document
+      against the mock Sheets API.
+Usage:
+    - Execute `python -m unittest src.test_token_cache` from the repository root.
+"""
+
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from google_sheets_client import DEFAULT_SCOPES, GoogleSheetsClient, load_credentials
+from mock_api_server import MockAPIServer
+from token_cache import TokenCache
+
+
+def write_service_account(path: Path, email: str = "runner@example.iam.gserviceaccount.com") -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode("ascii")
+    info = {
+        "type": "service_account",
+        "project_id": "test",
+        "private_key_id": "1",
+        "private_key": pem,
+        "client_email": email,
+        "client_id": "1",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+    path.write_text(json.dumps(info), encoding="utf-8")
+    return str(path)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TokenCacheTests(unittest.TestCase):
+    """Reuse tokens until they are close to expiry and ignore anything that cannot be trusted."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.account = write_service_account(self.root / "sa.json")
+        self.cache = TokenCache(self.root / "cache" / "sheets_token.enc", self.account)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _minted(self, expires_in: timedelta):
+        credentials = load_credentials(self.account, DEFAULT_SCOPES)
+        credentials.token = "ya29.cached"
+        credentials.expiry = utcnow() + expires_in
+        return credentials
+
+    def test_saved_token_is_reused_without_a_refresh(self) -> None:
+        self.cache.save(self._minted(timedelta(hours=1)))
+        self.assertNotIn(b"ya29", self.cache.path.read_bytes())
+        self.assertEqual(self.cache.path.stat().st_mode & 0o777, 0o600)
+
+        credentials = load_credentials(self.account, DEFAULT_SCOPES, self.cache)
+        self.assertEqual(credentials.token, "ya29.cached")
+        self.assertTrue(credentials.valid)
+
+    def test_tokens_near_expiry_are_not_reused(self) -> None:
+        self.cache.save(self._minted(timedelta(minutes=2)))
+        credentials = load_credentials(self.account, DEFAULT_SCOPES, self.cache)
+        self.assertIsNone(credentials.token)
+
+    def test_other_accounts_scopes_and_corrupt_files_are_misses(self) -> None:
+        self.cache.save(self._minted(timedelta(hours=1)))
+        other = TokenCache(self.cache.path, write_service_account(self.root / "other.json"))
+        self.assertFalse(other.load(load_credentials(other.service_account_file, DEFAULT_SCOPES)))
+        self.assertFalse(self.cache.load(load_credentials(self.account, DEFAULT_SCOPES[:1])))
+
+        self.cache.path.write_bytes(b"not a fernet token")
+        self.assertFalse(self.cache.load(load_credentials(self.account, DEFAULT_SCOPES)))
+
+
+class DiscoveryDocumentTests(unittest.TestCase):
+    """Build the service from a local discovery document without touching the network."""
+
+    def test_local_document_serves_requests(self) -> None:
+        import googleapiclient
+
+        bundled = Path(googleapiclient.__file__).parent / "discovery_cache" / "documents" / "sheets.v4.json"
+        with MockAPIServer() as server:
+            server.sheet.put("結果", [["NAME"], ["A社"]])
+            client = GoogleSheetsClient(
+                service_account_file="unused.json",
+                api_endpoint=server.url("sheets"),
+                discovery_document=str(bundled),
+                retry=None,
+            )
+            values = client.open_spreadsheet("mock-spreadsheet").fetch_values("結果!A1:A2")
+        self.assertEqual(values, [["NAME"], ["A社"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
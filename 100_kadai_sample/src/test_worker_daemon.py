@@ -0,0 +1,128 @@
+"""
+Overview:
+    - Unit tests for the SQLite job queue (claim order, one running job per spreadsheet, progress counters,
+      requeue after a crash once the heartbeat lease expires) and the resident worker running two campaigns
+      on shared clients against the local mock APIs.
+Usage:
+    - Execute `python -m unittest src.test_worker_daemon` from the repository root.
+"""
+
+import io
+import json
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from campaign_fixtures import HEADER, campaign_config, put_prompt_sheets
+from job_queue import JobQueue
+from mock_api_server import MockAPIServer
+from sheet_job import WarmClients
+from worker_daemon import ThreadOutput, Worker
+
+
+class JobQueueTests(unittest.TestCase):
+    """Queue bookkeeping shared by the worker and the submit/status commands."""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(Path(self._tmp.name) / "queue" / "jobs.sqlite3")
+
+    def tearDown(self) -> None:
+        self.queue.close()
+        self._tmp.cleanup()
+
+    def test_one_running_job_per_spreadsheet(self) -> None:
+        first = self.queue.submit("a.json", "sheet-a", {"workers": 2})
+        second = self.queue.submit("a2.json", "sheet-a")
+        third = self.queue.submit("b.json", "sheet-b")
+
+        claimed = self.queue.claim("w-1")
+        self.assertEqual((claimed.id, claimed.status, claimed.options), (first, "running", {"workers": 2}))
+        self.assertEqual(self.queue.claim("w-2").id, third)
+        self.assertIsNone(self.queue.claim("w-3"))
+
+        self.queue.finish(first)
+        self.assertEqual(self.queue.claim("w-1").id, second)
+        self.assertEqual(self.queue.counts(), {"done": 1, "running": 2})
+
+    def test_progress_cancel_and_requeue(self) -> None:
+        job_id = self.queue.submit("a.json", "sheet-a")
+        waiting = self.queue.submit("b.json", "sheet-b")
+        self.queue.claim("w-1")
+        for status in ("queued", "replayed", "error", "skipped", "dry-run"):
+            self.queue.record_row(job_id, status)
+        job = self.queue.get(job_id)
+        self.assertEqual((job.rows_done, job.rows_failed, job.rows_skipped), (3, 1, 1))
+
+        self.assertFalse(self.queue.cancel(job_id))
+        self.assertTrue(self.queue.cancel(waiting))
+        time.sleep(0.01)
+        self.assertEqual(self.queue.requeue_running(lease=0.0), 1)
+        requeued = self.queue.claim("w-2")
+        self.assertEqual((requeued.id, requeued.options, requeued.attempts), (job_id, {"resume": True}, 2))
+        self.queue.finish(job_id, "boom")
+        self.assertEqual(self.queue.get(job_id).status, "failed")
+
+    def test_requeue_leaves_jobs_with_a_live_heartbeat(self) -> None:
+        """A second worker starting on the queue must not take jobs another worker is still running."""
+        live = self.queue.submit("a.json", "sheet-a")
+        stale = self.queue.submit("b.json", "sheet-b")
+        self.queue.claim("w-1")
+        self.queue.claim("w-2")
+        self.assertEqual(self.queue.requeue_running(), 0)
+
+        time.sleep(0.2)
+        self.queue.heartbeat([live])
+        self.assertEqual(self.queue.requeue_running(lease=0.1), 1)
+        self.assertEqual(self.queue.get(live).status, "running")
+        self.assertEqual((self.queue.get(stale).status, self.queue.get(stale).options), ("queued", {"resume": True}))
+
+
+class WorkerTests(unittest.TestCase):
+    """Two campaigns run side by side on one set of warm clients."""
+
+    def test_campaigns_share_clients_and_report_progress(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, MockAPIServer() as server:
+            root = Path(tmp)
+            put_prompt_sheets(server)
+            for sheet_name in ("結果A", "結果B"):
+                rows = [[f"{sheet_name}-{index}社", f"https://{index}.example"] for index in range(3)]
+                server.sheet.put(sheet_name, [HEADER] + rows)
+            with JobQueue(root / "queue" / "jobs.sqlite3") as queue:
+                for spreadsheet_id, sheet_name in (("sheet-a", "結果A"), ("sheet-b", "結果B")):
+                    path = root / f"{spreadsheet_id}.json"
+                    path.write_text(json.dumps(campaign_config(server, spreadsheet_id, sheet_name)), encoding="utf-8")
+                    queue.submit(str(path), spreadsheet_id, {"workers": 2})
+
+                clients = WarmClients.from_dict({"rate_limits": {"openai": {"requests_per_minute": 6000}}})
+                daemon_out = io.StringIO()
+                worker = Worker(
+                    queue=queue,
+                    clients=clients,
+                    campaigns=2,
+                    poll_interval=0.05,
+                    log_dir=root / "logs",
+                    exit_when_idle=True,
+                    output=ThreadOutput(daemon_out),
+                )
+                with redirect_stdout(worker.output):  # type: ignore[arg-type]
+                    worker.serve()
+                jobs = sorted(queue.jobs(), key=lambda job: job.id)
+            sheets_clients = len(clients._sheets)
+            clients.close()
+            log = (root / "logs" / "1.log").read_text(encoding="utf-8")
+            written = server.sheet.rows("結果B")
+
+        self.assertEqual([(job.status, job.rows_done) for job in jobs], [("done", 3), ("done", 3)], daemon_out.getvalue())
+        self.assertIn("Completed processing 3 companies.", log)
+        self.assertNotIn("Completed processing", daemon_out.getvalue())
+        self.assertTrue(all(row[3] and row[4] for row in written[1:4]), written)
+        # Both campaigns drew on the one OpenAI limiter and reused one Sheets client.
+        self.assertEqual(clients.rate_limiters.get("openai").limits.requests_per_minute, 6000)
+        self.assertEqual(sheets_clients, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+処理概要:
+    - サービスアカウントで取得したGoogleのアクセストークンを暗号化してファイルに保存し、有効期限まで次回以降の実行で再利用するキャッシュ。
+    - cronなどで短い実行を繰り返す場合でも、トークンが有効な間はOAuthのトークン発行（秘密鍵での署名とトークンエンドポイントへの往復）を省けます。
+    - 暗号鍵はサービスアカウントJSONの秘密鍵から導出するため、別の秘密を管理する必要はありません（鍵を読めない人はトークンも読めません）。
+使用方法:
+    - `cache = TokenCache(Path("cache/sheets_token.enc"), service_account_file)` を作り、`GoogleSheetsClient(token_cache=cache)` に渡します。
+    - 認証情報の作成直後に `cache.load(credentials)` で保存済みのトークンを設定し、トークンが更新されたら `cache.save(credentials)` で書き戻します。
+    - 暗号化には `cryptography`（google-auth の依存として導入済み）の Fernet を使います。ファイルが壊れている・鍵が違う・期限切れの場合は
+      読み込みを諦めて通常どおりトークンを発行します。
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from metrics import RunMetrics
+
+DEFAULT_TOKEN_CACHE_PATH = "cache/sheets_token.enc"
+# Tokens this close to expiry are not reused, so a run never starts with a
+# token that lapses after its first few requests.
+EXPIRY_MARGIN = timedelta(minutes=5)
+_KEY_CONTEXT = b"kadai-sheets-token-cache:v1:"
+
+
+def load_fernet():
+    """Import Fernet on demand; `cryptography` is installed with google-auth."""
+    try:
+        from cryptography.fernet import Fernet, InvalidToken
+    except ImportError as err:  # pragma: no cover - depends on environment
+        raise RuntimeError("The Sheets token cache requires the 'cryptography' package") from err
+    return Fernet, InvalidToken
+
+
+def derive_key(service_account_file: str) -> bytes:
+    """Return a Fernet key derived from the service account's private key."""
+    with open(service_account_file, "r", encoding="utf-8") as fh:
+        info = json.load(fh)
+    secret = str(info.get("private_key", ""))
+    if not secret:
+        raise ValueError(f"{service_account_file} has no private_key to derive the token cache key from")
+    digest = hashlib.sha256(_KEY_CONTEXT + secret.encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest)
+
+
+def _utcnow() -> datetime:
+    # google-auth stores `expiry` as a naive UTC datetime.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class TokenCache:
+    """Encrypted file holding one access token for a service account and scope set."""
+
+    path: Path
+    service_account_file: str
+    metrics: Optional[RunMetrics] = field(default=None, repr=False)
+    _key: Optional[bytes] = field(default=None, init=False, repr=False)
+
+    def _fernet(self):
+        Fernet, _ = load_fernet()
+        if self._key is None:
+            self._key = derive_key(self.service_account_file)
+        return Fernet(self._key)
+
+    @staticmethod
+    def _identity(credentials: Any) -> Any:
+        return [
+            str(getattr(credentials, "service_account_email", "")),
+            sorted(getattr(credentials, "scopes", None) or []),
+        ]
+
+    def load(self, credentials: Any) -> bool:
+        """Set `credentials.token` / `expiry` from the cache; return False when nothing usable is stored."""
+        token = self._read(credentials)
+        if self.metrics is not None:
+            self.metrics.count("cache", "token_hit" if token is not None else "token_miss")
+        if token is None:
+            return False
+        credentials.token, credentials.expiry = token
+        return True
+
+    def _read(self, credentials: Any) -> Optional[Tuple[str, datetime]]:
+        try:
+            sealed = self.path.read_bytes()
+        except OSError:
+            return None
+        _, InvalidToken = load_fernet()
+        try:
+            entry = json.loads(self._fernet().decrypt(sealed))
+        except (InvalidToken, ValueError):
+            # A corrupt file or one sealed with another service account's key.
+            return None
+        if entry.get("identity") != self._identity(credentials):
+            return None
+        try:
+            expiry = datetime.fromisoformat(str(entry["expiry"]))
+        except (KeyError, ValueError):
+            return None
+        if expiry - EXPIRY_MARGIN <= _utcnow():
+            return None
+        return str(entry["token"]), expiry
+
+    def save(self, credentials: Any) -> None:
+        """Encrypt the current token and write it atomically, readable by the owner only."""
+        token = getattr(credentials, "token", None)
+        expiry = getattr(credentials, "expiry", None)
+        if not token or expiry is None:
+            return
+        entry = {"identity": self._identity(credentials), "token": token, "expiry": expiry.isoformat()}
+        sealed = self._fernet().encrypt(json.dumps(entry).encode("utf-8"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(sealed)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
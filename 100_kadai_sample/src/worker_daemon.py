@@ -0,0 +1,340 @@
+"""
+処理概要:
+    - `fill_spreadsheet.run_job` を常駐プロセスで実行するワーカー。SQLiteのジョブキュー（`job_queue.py`）から実行依頼を取り出し、
+      複数のキャンペーン（別々のスプレッドシート・設定ファイル）を並行して処理します。
+    - OpenAI / Claude のHTTP接続プール、Sheetsのディスカバリーサービスとアクセストークン、応答キャッシュを実行をまたいで使い回すため、
+      依頼ごとにプロセスを起動してクライアントを作り直す必要がありません。
+    - レート制限と再試行（バックオフ・同時実行数の自動調整）は全キャンペーンで共有するため、同時に走るキャンペーンがプロバイダーの上限を奪い合いません。
+    - 進捗（処理済み・失敗・スキップした行数）はキューに記録され、`status` で別のプロセスから確認できます。各依頼の出力は `logs/<ジョブID>.log` に書き出します。
+使用方法:
+    - ワーカーの起動: `python3 worker_daemon.py serve --config ../80_tools/config.json --campaigns 3`
+      （`--config` の `rate_limits` / `retry` を全キャンペーンの共有上限として使います。`--exit-when-idle` でキューが空になったら終了します）
+    - 依頼の登録: `python3 worker_daemon.py submit --config ../80_tools/client_a.json --workers 4`
+      （`--limit` / `--overwrite` / `--dry-run` / `--web-search` / `--pipeline` / `--stream` / `--batch` / `--dedupe` / `--no-cache` / `--resume` は `fill_spreadsheet.py` と同じ）
+    - 進捗の確認: `python3 worker_daemon.py status`（`--job 3` で1件）、未開始の依頼の取り消し: `python3 worker_daemon.py cancel --job 3`
+    - キューの場所は `--queue`（既定: `100_kadai_sample/queue/jobs.sqlite3`）で変更できます。Ctrl+C で新しい依頼の取り出しを止め、実行中の依頼の完了を待って終了します
+      （2回押すと即座に終了し、実行中だった依頼はリース期間 `--lease`（既定60秒）が過ぎた後のワーカーの起動時・待機中に `--resume` 付きで再開されます）。
+    - 実行中の依頼には定期的に heartbeat を書き込むため、同じキューで2つ目のワーカーを起動しても、動いているワーカーの依頼を横取りしません。
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, TextIO
+
+from fill_spreadsheet import default_journal_path, load_config, run_job
+from job_queue import DEFAULT_LEASE_SECONDS, DEFAULT_QUEUE_PATH, JobQueue, QueuedJob
+from sheet_job import WarmClients, load_env_file
+
+CURRENT_DIR = Path(__file__).resolve().parent
+
+DEFAULT_CAMPAIGNS = 2
+DEFAULT_POLL_INTERVAL = 2.0
+# Run options accepted by `submit`, mapped to run_job keyword arguments.
+RUN_FLAGS = ("overwrite", "dry_run", "web_search", "pipeline", "resume", "stream", "batch", "dedupe", "no_cache")
+
+
+class ThreadOutput(io.TextIOBase):
+    """sys.stdout replacement that sends each thread's prints to the stream it registered.
+
+    Campaigns print their progress exactly as the CLI does; routing by thread
+    keeps concurrent campaigns' lines in separate log files. Threads without a
+    stream (row workers, the daemon itself) write to the original stdout.
+    """
+
+    def __init__(self, fallback: TextIO) -> None:
+        super().__init__()
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def _target(self) -> TextIO:
+        return getattr(self._local, "stream", None) or self.fallback
+
+    def write(self, text: str) -> int:  # type: ignore[override]
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    @contextmanager
+    def redirect(self, stream: TextIO) -> Iterator[None]:
+        self._local.stream = stream
+        try:
+            yield
+        finally:
+            self._local.stream = None
+
+
+def run_options(job: QueuedJob) -> Dict[str, object]:
+    """Translate the stored submit options into run_job keyword arguments."""
+    options = job.options
+    return {
+        "limit": options.get("limit"),
+        "overwrite": bool(options.get("overwrite")),
+        "dry_run": bool(options.get("dry_run")),
+        "use_web_search": bool(options.get("web_search")),
+        "workers": int(options.get("workers", 1)),  # type: ignore[arg-type]
+        "pipelined": bool(options.get("pipeline")),
+        "resume": bool(options.get("resume")),
+        "use_cache": not options.get("no_cache"),
+        "stream": bool(options.get("stream")),
+        "batch": bool(options.get("batch")),
+        "dedupe": bool(options.get("dedupe")),
+    }
+
+
+@dataclass
+class Worker:
+    """Claim queued runs and process up to `campaigns` of them at once on shared clients."""
+
+    queue: JobQueue
+    clients: WarmClients
+    campaigns: int = DEFAULT_CAMPAIGNS
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+    log_dir: Optional[Path] = None
+    exit_when_idle: bool = False
+    name: str = "worker"
+    lease: float = DEFAULT_LEASE_SECONDS
+    stop: threading.Event = field(default_factory=threading.Event)
+    output: Optional[ThreadOutput] = field(default=None, repr=False)
+    _running: Set[int] = field(default_factory=set, init=False, repr=False)
+    _running_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def process(self, job: QueuedJob) -> Optional[str]:
+        """Run one claimed job and return its error message (None on success)."""
+        try:
+            config_path = Path(job.config_path)
+            config = load_config(config_path)
+            run_job(
+                config,
+                journal_path=default_journal_path(config_path, config),
+                clients=self.clients,
+                progress=lambda row, status: self.queue.record_row(job.id, status),
+                **run_options(job),  # type: ignore[arg-type]
+            )
+        except Exception as err:  # noqa: BLE001 - one campaign failing must not stop the worker
+            traceback.print_exc(file=sys.stdout)
+            return f"{type(err).__name__}: {err}"
+        return None
+
+    def _run_logged(self, job: QueuedJob) -> Optional[str]:
+        if self.log_dir is None or self.output is None:
+            return self.process(job)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with (self.log_dir / f"{job.id}.log").open("a", encoding="utf-8", buffering=1) as log:
+            with self.output.redirect(log):
+                return self.process(job)
+
+    def _loop(self, slot: int) -> None:
+        worker = f"{self.name}-{slot}"
+        while not self.stop.is_set():
+            job = self.queue.claim(worker)
+            if job is None:
+                if self.exit_when_idle and not self.queue.counts().get("running"):
+                    return
+                self.stop.wait(self.poll_interval)
+                continue
+            print(f"[worker] {worker} started #{job.id} {job.spreadsheet_id} ({job.config_path})")
+            with self._running_lock:
+                self._running.add(job.id)
+            try:
+                error = self._run_logged(job)
+            finally:
+                with self._running_lock:
+                    self._running.discard(job.id)
+            self.queue.finish(job.id, error)
+            finished = self.queue.get(job.id)
+            print(f"[worker] {finished.summary() if finished else f'#{job.id} finished'}")
+
+    def start(self) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=self._loop, args=(slot,), name=f"{self.name}-{slot}", daemon=True)
+            for slot in range(1, max(1, self.campaigns) + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def requeue_expired(self) -> int:
+        """Requeue jobs whose worker stopped sending heartbeats for `lease` seconds; return how many."""
+        requeued = self.queue.requeue_running(self.lease)
+        if requeued:
+            print(f"[worker] Requeued {requeued} jobs left running by a stopped worker; they resume from their journals")
+        return requeued
+
+    def _watch(self, threads: List[threading.Thread]) -> None:
+        # Renew the running jobs' leases well before they expire, and pick up
+        # jobs abandoned by other workers that stopped in the meantime.
+        interval = max(self.lease / 3, 0.5)
+        renewed = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+            if time.monotonic() - renewed >= interval:
+                with self._running_lock:
+                    running = list(self._running)
+                self.queue.heartbeat(running)
+                if not self.stop.is_set():
+                    self.requeue_expired()
+                renewed = time.monotonic()
+
+    def serve(self) -> None:
+        """Run until stopped (or the queue drains with `exit_when_idle`); Ctrl+C finishes running jobs first."""
+        threads = self.start()
+        try:
+            self._watch(threads)
+        except KeyboardInterrupt:
+            self.stop.set()
+            print("[worker] Stopping: waiting for running campaigns (press Ctrl+C again to exit now)")
+            self._watch(threads)
+
+
+def shared_clients(config_path: Optional[Path]) -> WarmClients:
+    """Build the clients shared by every campaign from the `rate_limits` / `retry` sections of `config_path`."""
+    if config_path is None:
+        return WarmClients.from_dict({})
+    with config_path.open("r", encoding="utf-8") as fh:
+        return WarmClients.from_dict(json.load(fh))
+
+
+def submit(queue: JobQueue, args: argparse.Namespace) -> int:
+    config_path = args.config.resolve()
+    config = load_config(config_path)
+    options: Dict[str, object] = {"workers": args.workers}
+    if args.limit is not None:
+        options["limit"] = args.limit
+    for flag in RUN_FLAGS:
+        if getattr(args, flag):
+            options[flag] = True
+    return queue.submit(str(config_path), config.spreadsheet_id, options)
+
+
+def print_status(queue: JobQueue, job_id: Optional[int], limit: int) -> None:
+    if job_id is not None:
+        job = queue.get(job_id)
+        if job is None:
+            raise SystemExit(f"Job #{job_id} was not found")
+        print(job.summary())
+        print(f"  config: {job.config_path}")
+        print(f"  options: {json.dumps(job.options, ensure_ascii=False)}")
+        return
+    counts = queue.counts()
+    print("[queue] " + (", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "empty"))
+    for job in queue.jobs(limit):
+        print(job.summary())
+
+
+def serve_queue(queue: JobQueue, args: argparse.Namespace) -> None:
+    if args.config is None:
+        print("[worker] No --config given: provider rate limits are not enforced across campaigns")
+    clients = shared_clients(args.config)
+    output = ThreadOutput(sys.stdout)
+    worker = Worker(
+        queue=queue,
+        clients=clients,
+        campaigns=args.campaigns,
+        poll_interval=args.poll,
+        log_dir=args.logs or args.queue.parent / "logs",
+        exit_when_idle=args.exit_when_idle,
+        lease=args.lease,
+        output=output,
+    )
+    worker.requeue_expired()
+    sys.stdout = output  # type: ignore[assignment]
+    started = time.perf_counter()
+    try:
+        worker.serve()
+    finally:
+        sys.stdout = output.fallback
+        summary = clients.summary_lines()
+        clients.close()
+    print(f"[worker] Stopped after {time.perf_counter() - started:.1f}s")
+    for line in summary:
+        print(line)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Resident worker that runs queued fill_spreadsheet jobs.")
+    parser.add_argument(
+        "--queue",
+        type=Path,
+        default=CURRENT_DIR.parent / DEFAULT_QUEUE_PATH,
+        help="ジョブキュー(SQLite)のパス（既定: 100_kadai_sample/queue/jobs.sqlite3）",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="キューの依頼を処理し続けます")
+    serve.add_argument("--config", type=Path, default=None, help="全キャンペーンで共有する rate_limits / retry を読む設定ファイル")
+    serve.add_argument("--campaigns", type=int, default=DEFAULT_CAMPAIGNS, help="同時に処理する依頼の数")
+    serve.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL, help="キューが空のときの確認間隔（秒）")
+    serve.add_argument("--logs", type=Path, default=None, help="依頼ごとのログの保存先（既定: キューと同じフォルダの logs）")
+    serve.add_argument("--exit-when-idle", action="store_true", help="キューが空になったら終了します（cron向け）")
+    serve.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help="heartbeat がこの秒数途切れた実行中の依頼を、停止したワーカーのものとして再開します",
+    )
+
+    submit_cmd = commands.add_parser("submit", help="実行依頼を登録します")
+    submit_cmd.add_argument("--config", required=True, type=Path, help="キャンペーンの設定ファイル")
+    submit_cmd.add_argument("--limit", type=int, default=None, help="Process only the first N companies")
+    submit_cmd.add_argument("--workers", type=int, default=1, help="この依頼で同時に処理する行数")
+    submit_cmd.add_argument("--overwrite", action="store_true", help="既存のフォーム文章結果があっても上書きします")
+    submit_cmd.add_argument("--dry-run", action="store_true", help="シート更新を行わず処理内容だけ表示します")
+    submit_cmd.add_argument("--web-search", action="store_true", help="OpenAIのWeb検索機能を使用します")
+    submit_cmd.add_argument("--pipeline", action="store_true", help="2段パイプラインで処理します")
+    submit_cmd.add_argument("--resume", action="store_true", help="実行ジャーナルから続きを処理します")
+    submit_cmd.add_argument("--stream", action="store_true", help="応答をストリーミングで受信します")
+    submit_cmd.add_argument("--batch", action="store_true", help="営業文をMessage Batches APIでまとめて生成します")
+    submit_cmd.add_argument("--dedupe", action="store_true", help="同じ企業の行の検索・営業文を1回だけ生成します")
+    submit_cmd.add_argument("--no-cache", action="store_true", help="応答キャッシュを使いません")
+
+    status = commands.add_parser("status", help="依頼の状態と進捗を表示します")
+    status.add_argument("--job", type=int, default=None, help="表示する依頼のID")
+    status.add_argument("--limit", type=int, default=20, help="表示する依頼の件数（新しい順）")
+
+    cancel = commands.add_parser("cancel", help="未開始の依頼を取り消します")
+    cancel.add_argument("--job", type=int, required=True, help="取り消す依頼のID")
+
+    args = parser.parse_args(argv)
+    if args.command == "submit":
+        if args.workers < 1:
+            parser.error("--workers must be >= 1")
+        if args.batch and (args.pipeline or args.stream):
+            parser.error("--batch cannot be combined with --pipeline or --stream")
+    if args.command == "serve" and args.campaigns < 1:
+        parser.error("--campaigns must be >= 1")
+    if args.command == "serve" and args.lease <= 0:
+        parser.error("--lease must be > 0")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    load_env_file(CURRENT_DIR.parent / ".env")
+    with JobQueue(args.queue) as queue:
+        if args.command == "submit":
+            job_id = submit(queue, args)
+            print(f"[queue] Submitted #{job_id} ({args.config})")
+        elif args.command == "status":
+            print_status(queue, args.job, args.limit)
+        elif args.command == "cancel":
+            if not queue.cancel(args.job):
+                raise SystemExit(f"Job #{args.job} is not queued (only jobs that have not started can be cancelled)")
+            print(f"[queue] Cancelled #{args.job}")
+        else:
+            serve_queue(queue, args)
+
+
+if __name__ == "__main__":
+    main()